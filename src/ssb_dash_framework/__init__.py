@@ -97,6 +97,7 @@ from .utils import _get_connection_callable
 from .utils import _get_connection_object
 from .utils import _get_kostra_r
 from .utils import active_no_duplicates_refnr_list
+from .utils import add_alerts
 from .utils import conn_is_ibis
 from .utils import create_alert
 from .utils import create_database
@@ -106,9 +107,12 @@ from .utils import get_connection
 from .utils import hb_method
 from .utils import ibis_filter_with_dict
 from .utils import module_validator
+from .utils import register_document_source
 from .utils import set_connection
+from .utils import set_document_cache
 from .utils import set_eimerdb_connection
 from .utils import set_postgres_connection
+from .utils import set_read_replica
 from .utils import set_sqlite_connection
 from .utils import sidebar_button
 
@@ -196,6 +200,7 @@ __all__ = [
     "_get_connection_callable",
     "_get_connection_object",
     "active_no_duplicates_refnr_list",
+    "add_alerts",
     "app_setup",
     "apply_app_settings",
     "apply_edits",
@@ -218,13 +223,16 @@ __all__ = [
     "main_layout",
     "module_validator",
     "register_control",
+    "register_document_source",
     "register_implementation_modules",
     "register_module",
     "register_modules",
     "run_app_from_config",
     "set_connection",
+    "set_document_cache",
     "set_eimerdb_connection",
     "set_postgres_connection",
+    "set_read_replica",
     "set_sqlite_connection",
     "set_variables",
     "sidebar_button",
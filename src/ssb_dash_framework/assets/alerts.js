@@ -0,0 +1,109 @@
+window.dash_clientside = window.dash_clientside || {};
+
+// Tells the server which browser session an alert belongs to, for the alert log.
+if (!document.cookie.split('; ').some(c => c.startsWith('ssb_alert_session='))) {
+    const session = window.crypto && window.crypto.randomUUID
+        ? window.crypto.randomUUID()
+        : Date.now().toString(36) + Math.random().toString(36).slice(2);
+    document.cookie = 'ssb_alert_session=' + session + '; path=/; SameSite=Lax';
+}
+
+window.dash_clientside.alerts = (function() {
+    const no_update = () => window.dash_clientside.no_update;
+    // When this browser first saw each ephemeral alert, so toasts last their full
+    // duration regardless of the difference between the server and browser clocks.
+    const firstSeen = new Map();
+
+    function alertKey(a) {
+        return a.id || (a.created_at + ':' + a.message);
+    }
+
+    function component(namespace, type, props) {
+        return {namespace: namespace, type: type, props: props};
+    }
+
+    function div(children, className) {
+        return component('dash_html_components', 'Div', {children: children, className: className});
+    }
+
+    function markdown(a, style) {
+        const message = a.count > 1 ? a.message + ' (' + a.count + '×)' : a.message;
+        return component('dash_core_components', 'Markdown', {
+            children: message, className: 'content', style: style
+        });
+    }
+
+    function icon(name) {
+        return name ? component('dash_iconify', 'DashIconify', {icon: name}) : null;
+    }
+
+    function sameAlert(a, b) {
+        return a.message === b.message && a.color === b.color
+            && Boolean(a.ephemeral) === Boolean(b.ephemeral)
+            && (a.position || 'bottom-left') === (b.position || 'bottom-left');
+    }
+
+    return {
+        // Merges repeats of the same alert that follow each other into the newest
+        // one, and drops the oldest alerts when there are more than max_alerts.
+        compact: function(alerts, settings) {
+            if (!alerts || alerts.length === 0) return no_update();
+            const maxAlerts = (settings && settings.max_alerts) || alerts.length;
+            const compacted = [];
+            for (const a of alerts) {
+                const previous = compacted[compacted.length - 1];
+                if (previous && sameAlert(previous, a)) {
+                    compacted[compacted.length - 1] = Object.assign({}, previous, {
+                        count: (previous.count || 1) + (a.count || 1)
+                    });
+                } else {
+                    compacted.push(a);
+                }
+            }
+            if (compacted.length === alerts.length && alerts.length <= maxAlerts) {
+                return no_update();
+            }
+            return compacted.slice(0, maxAlerts);
+        },
+
+        toasts: function(alerts, n_intervals) {
+            const now = Date.now();
+            const containers = {'bottom-left': [], 'center': [], 'top-right': []};
+            const shown = new Set();
+            for (const a of alerts || []) {
+                if (!a.ephemeral) continue;
+                const key = alertKey(a);
+                if (!firstSeen.has(key)) firstSeen.set(key, now);
+                const age = (now - firstSeen.get(key)) / 1000;
+                const duration = a.duration || 5;
+                shown.add(key);
+                if (age >= duration) continue;
+                const position = a.position || 'bottom-left';
+                if (!(position in containers)) continue;
+                const dying = age > duration - 0.8 ? 'alert-dying' : '';
+                containers[position].push(component('dash_bootstrap_components', 'Alert', {
+                    children: [
+                        div(icon(a.icon), 'icon-panel'),
+                        div(markdown(a, {'font-size': '16px'}), 'dialog-content')
+                    ],
+                    dismissable: false,
+                    className: 'ssb-dialog ' + a.color + ' alert-toast ' + dying
+                }));
+            }
+            for (const key of Array.from(firstSeen.keys())) {
+                if (!shown.has(key)) firstSeen.delete(key);
+            }
+            const active = Object.values(containers).some(c => c.length > 0);
+            // The interval only runs while a toast is showing.
+            return [containers['bottom-left'], containers['center'], containers['top-right'], !active];
+        },
+
+        dismiss: function(isOpenList, alerts) {
+            const inputs = window.dash_clientside.callback_context.inputs_list[0] || [];
+            const closed = new Set(inputs.filter(i => i.value === false).map(i => i.id.index));
+            if (!alerts || closed.size === 0) return no_update();
+            const remaining = alerts.filter(a => !closed.has(alertKey(a)));
+            return remaining.length === alerts.length ? no_update() : remaining;
+        }
+    };
+})();
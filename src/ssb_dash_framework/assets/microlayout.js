@@ -0,0 +1,124 @@
+window.dash_clientside = window.dash_clientside || {};
+
+(function() {
+    // The number syntax accepted by float() in Python, and its special values.
+    const DIGITS = "\\d(?:_?\\d)*";
+    const FLOAT = new RegExp(
+        "^[+-]?(?:" + DIGITS + "(?:\\.(?:" + DIGITS + ")?)?|\\." + DIGITS + ")" +
+        "(?:[eE][+-]?" + DIGITS + ")?$"
+    );
+    const SPECIAL = /^([+-]?)(inf|infinity|nan)$/i;
+
+    function pyRepr(text) {
+        if (text.includes("'") && !text.includes('"')) {
+            return '"' + text + '"';
+        }
+        return "'" + text.replace(/\\/g, "\\\\").replace(/'/g, "\\'") + "'";
+    }
+
+    // float(value) in Python.
+    function toFloat(value) {
+        if (typeof value !== "string") {
+            return Number(value);
+        }
+        const text = value.trim();
+        if (FLOAT.test(text)) {
+            return Number(text.replace(/_/g, ""));
+        }
+        const special = SPECIAL.exec(text);
+        if (special) {
+            if (special[2].toLowerCase() === "nan") {
+                return NaN;
+            }
+            return special[1] === "-" ? -Infinity : Infinity;
+        }
+        throw new Error("could not convert string to float: " + pyRepr(value));
+    }
+
+    // f"{x:.{decimals}f}" in Python. toFixed rounds ties away from zero and
+    // switches to exponent notation from 1e21, Python does neither.
+    function format(x, decimals) {
+        if (Number.isNaN(x)) {
+            return "nan";
+        }
+        if (!Number.isFinite(x)) {
+            return x < 0 ? "-inf" : "inf";
+        }
+        const sign = x < 0 || Object.is(x, -0) ? "-" : "";
+        x = Math.abs(x);
+        const point = (digits) => decimals > 0
+            ? digits.slice(0, -decimals) + "." + digits.slice(-decimals)
+            : digits;
+
+        if (x >= 1e21) {
+            return sign + point(BigInt(x).toString() + "0".repeat(decimals));
+        }
+        // x is exactly halfway between two results when x * 2^(decimals + 1)
+        // is an odd integer. Multiplying by a power of two is exact.
+        const scaled = x * 2 ** (decimals + 1);
+        if (Number.isInteger(scaled) && scaled % 2 === 1) {
+            const twice = BigInt(scaled) * 5n ** BigInt(decimals);
+            let n = (twice - 1n) / 2n;
+            if (n % 2n === 1n) {
+                n += 1n;
+            }
+            return sign + point(n.toString().padStart(decimals + 1, "0"));
+        }
+        return sign + x.toFixed(decimals);
+    }
+
+    function isMissing(value) {
+        return value === null || value === undefined;
+    }
+
+    window.dash_clientside.microlayout = {
+        // CalculatedField._evaluate, for formulas compiled by CalculatedField._compile.
+        // formula.ops holds [operation, literal] pairs, with null for the fields,
+        // whose values are passed in order.
+        calculate: function(formula, values) {
+            const decimals = formula.decimals;
+            try {
+                if (values.every(isMissing)) {
+                    return format(0, decimals);
+                }
+                const opValues = {
+                    exponent: [],
+                    multiplication: [],
+                    division: [],
+                    addition: [],
+                    subtraction: [],
+                };
+                let incompleteMultiplicative = false;
+                let i = 0;
+                for (const [op, literal] of formula.ops) {
+                    const value = literal === null ? values[i++] : literal;
+                    if (!isMissing(value) && String(value).trim() !== "") {
+                        const fval = toFloat(value);
+                        if (op === "division" && fval === 0) {
+                            incompleteMultiplicative = true;
+                        } else {
+                            opValues[op].push(fval);
+                        }
+                    } else if (["multiplication", "division", "exponent"].includes(op)) {
+                        incompleteMultiplicative = true;
+                    }
+                }
+                if (incompleteMultiplicative) {
+                    return format(0, decimals);
+                }
+
+                let result = 0;
+                if (opValues.multiplication.length || opValues.division.length) {
+                    result = 1;
+                    opValues.multiplication.forEach((v) => { result *= v; });
+                    opValues.division.forEach((v) => { result /= v; });
+                }
+                opValues.addition.forEach((v) => { result += v; });
+                opValues.subtraction.forEach((v) => { result -= v; });
+                return format(result, decimals);
+            } catch (e) {
+                return "Error: " + e.message;
+            }
+        }
+    };
+})();
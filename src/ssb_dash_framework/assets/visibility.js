@@ -0,0 +1,18 @@
+window.dash_clientside = window.dash_clientside || {};
+
+window.dash_clientside.visibility = {
+    // Passes the variable values on to the deferred inputs of a module, but only
+    // while the module is visible and only the values that changed since.
+    // Called with: visible, ...values, visibleWhen, ...current store values.
+    gate: function(visible, ...rest) {
+        const no_update = window.dash_clientside.no_update;
+        const n = (rest.length - 1) / 2;
+        const values = rest.slice(0, n);
+        const visibleWhen = rest[n];
+        const current = rest.slice(n + 1);
+        if (visible !== visibleWhen) {
+            return values.map(() => no_update);
+        }
+        return values.map((value, i) => value === current[i] ? no_update : value);
+    }
+};
@@ -12,6 +12,7 @@ from psycopg_pool import ConnectionPool
 from ..utils.config_tools.connection import _get_connection_object
 from ..utils.config_tools.connection import get_connection
 from ..utils.core_query_functions import ibis_filter_with_dict
+from ..utils.unit_cache import evict_unit_table
 
 logger = logging.getLogger(__name__)
 
@@ -229,6 +230,7 @@ class ControlFrameworkBase:  # TODO: Add some common control methods here for ea
             raise NotImplementedError(
                 f"Connection type '{type(connection_object)}' is currently not implemented."
             )
+        evict_unit_table("kontroller")
         logger.info(f"Done inserting {control}")
 
     def register_all_controls(self) -> None:
@@ -355,6 +357,7 @@ class ControlFrameworkBase:  # TODO: Add some common control methods here for ea
         )
         self.update_existing_records(results)
         self.insert_new_records(results)
+        evict_unit_table("kontrollutslag")
         logger.info(f"Updated kontrollutslag based on new run of '{control}'")
         return results
 
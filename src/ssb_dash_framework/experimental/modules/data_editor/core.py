@@ -21,7 +21,6 @@ from ....utils.config_tools.connection import get_connection
 from ....utils.config_tools.set_variables import get_ident
 from ....utils.config_tools.set_variables import get_time_units
 from ....utils.core_query_functions import create_filter_dict
-from ....utils.core_query_functions import ibis_filter_with_dict
 from .registry import DataEditorRegistry
 
 logger = logging.getLogger(__name__)
@@ -436,6 +435,10 @@ class DataEditorInfoRow:
             raise TypeError(
                 "Argument 'variables' must be either list of InfoRowField or a dictionary that is convertable to a list of InfoRowField."
             )
+        for source in {
+            x.source for x in self.info_variables if x.source != "variableselector"
+        }:
+            DataEditorRegistry.register_unit_source(source, key="ident")
         self.module_callbacks()
 
         DataEditorRegistry.info_fields.append(self)
@@ -484,7 +487,7 @@ class DataEditorInfoRow:
             *[variableselector.get_all_states()],
         )
         def get_data_for_info_row_fields(
-            ident: str, altinnskjema: str, *args: Any
+            ident: str, refnr: str, *args: Any
         ) -> list[str | int | float | bool | None]:
             logger.debug(f"ident: {ident}\nargs: {args}")
             if not ident:
@@ -494,26 +497,24 @@ class DataEditorInfoRow:
             time_units = args[: len(time_unit_list)]
             collected_states = 0
             states = args[len(time_unit_list) :]
-            filter_dict = create_filter_dict(time_unit_list, time_units)
-            with get_connection(necessary_tables=["enhetsinfo"]) as conn:
-                for info_var in self.info_variables:
-                    logger.debug(f"Getting data for {info_var}")
-                    if info_var.source == "variableselector":
-                        value = states[collected_states]
-                        collected_states += 1
-                    else:
-                        t = conn.table(info_var.source)
-                        t = t.filter(_.ident == ident).filter(
-                            ibis_filter_with_dict(filter_dict)
-                        )
-                        data = t.filter(
-                            _.variabel == info_var.source_variable_name
-                        ).limit(1).execute()
-                        if data.empty:
-                            raise PreventUpdate
-                        logger.debug(data)
-                        value = data["verdi"].item()
-                    info_values.append(value)
+            context = DataEditorRegistry.get_unit_context(
+                refnr, ident, create_filter_dict(time_unit_list, time_units)
+            )
+            for info_var in self.info_variables:
+                logger.debug(f"Getting data for {info_var}")
+                if info_var.source == "variableselector":
+                    value = states[collected_states]
+                    collected_states += 1
+                else:
+                    t = context.get(info_var.source)
+                    if t is None:
+                        raise PreventUpdate
+                    data = t[t["variabel"] == info_var.source_variable_name]
+                    if data.empty:
+                        raise PreventUpdate
+                    logger.debug(data)
+                    value = data["verdi"].iloc[:1].item()
+                info_values.append(value)
             logger.debug("info_values: ", info_values)
             return info_values
 
@@ -19,6 +19,7 @@ from .....utils.config_tools.connection import _get_connection_object
 from .....utils.config_tools.connection import get_connection
 from .....utils.core_models import UpdateSkjemadata
 from ..core import DataEditorDataView
+from .....utils.alert_handler import add_alerts
 from .....utils.alert_handler import create_alert
 logger = logging.getLogger(__name__)
 
@@ -162,10 +163,9 @@ class DataEditorTable(DataEditorDataView):
             ),
             State("dataeditortableselector", "value"),
             State(f"{self.module_name}-{self.module_number}-aggrid", "columnDefs"),
-            State("alert_store", "data"),
             prevent_initial_call=True,
         )
-        def update_table(edited, table: str, columndefs, alert_store):
+        def update_table(edited, table: str, columndefs):
             """Updates the data in the backend."""
             logger.info("Attempting to update data.")
             columns = [col["field"] for col in columndefs]
@@ -193,7 +193,7 @@ class DataEditorTable(DataEditorDataView):
             elif isinstance(_get_connection_object(), ConnectionPool):
                 logger.debug("Attempting to update using ibis logic.")
                 feedback = update.update_ibis(long)
-            return [feedback, *alert_store]
+            return add_alerts(feedback)
 
         @callback(  # type: ignore[misc]
             self.variable_selector.get_output_object("variabel"),
@@ -8,7 +8,6 @@ from dash import Output
 from dash import callback
 from dash import html
 from dash.exceptions import PreventUpdate
-from ibis import _
 from psycopg_pool import ConnectionPool
 import dash_bootstrap_components as dbc
 from dash import dcc
@@ -20,12 +19,11 @@ from ssb_dash_framework.utils.config_tools.set_variables import get_time_units
 from ssb_dash_framework.utils.config_tools.set_variables import get_ident
 from ssb_dash_framework.utils.core_query_functions import (
     create_filter_dict,
-    ibis_filter_with_dict,
 )
 
 from ssb_dash_framework.utils.config_tools.connection import _get_connection_object
-from ssb_dash_framework.utils.config_tools.connection import get_connection
 from ..core import DataEditorHelperButton
+from ..registry import DataEditorRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -57,6 +55,7 @@ class DataEditorContactInfo(DataEditorHelperButton):
 
         super().__init__(label="Kontaktinfo")
 
+        DataEditorRegistry.register_unit_source("kontaktinfo")
         self.module_callbacks()
 
     def create_info_card(
@@ -198,7 +197,7 @@ class DataEditorContactInfo(DataEditorHelperButton):
         connection_object = _get_connection_object()
         variableselector = VariableSelector(
             selected_inputs=["refnr"],
-            selected_states=[],
+            selected_states=[get_ident(), *get_time_units().keys()],
         )
 
         @callback(
@@ -243,9 +242,10 @@ class DataEditorContactInfo(DataEditorHelperButton):
                 component_property="children",
             ),
             variableselector.get_input(get_refnr()),
+            variableselector.get_all_states(),
         )
         def create_info_cards_kontaktinfo(
-            refnr: str,
+            refnr: str, ident: str, *time_units: Any
         ) -> tuple[str, str, str, str, str, list[str], str, str, dict[str, str], str]:
             """Returns a tuple of strings with the values for info cards for the kontaktinfo module in DataEditor.
             These cards will hold kontaktinfo foretak.
@@ -255,9 +255,9 @@ class DataEditorContactInfo(DataEditorHelperButton):
 
             if isinstance(connection_object, ConnectionPool):
                 logger.debug("Using ConnectionPool logic.")
-                with get_connection(necessary_tables=["kontaktinfo"]) as conn:
-                    t = conn.table("kontaktinfo")
-                    data = t.filter(_.refnr == refnr).execute()
+                data = DataEditorRegistry.get_unit_context(
+                    refnr, ident, create_filter_dict(list(get_time_units()), time_units)
+                )["kontaktinfo"]
 
                 orgnr = data["ident"].item()
                 skjema = data["skjema"].item()
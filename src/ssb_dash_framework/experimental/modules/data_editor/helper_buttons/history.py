@@ -7,17 +7,18 @@ from dash import Input
 from dash import Output
 from dash import callback
 from dash import html
-from ibis import _
 from psycopg_pool import ConnectionPool
 import dash_bootstrap_components as dbc
 
 from ssb_dash_framework import VariableSelector
+from ssb_dash_framework.utils.config_tools.set_variables import get_ident
 from ssb_dash_framework.utils.config_tools.set_variables import get_refnr
 from ssb_dash_framework.utils.config_tools.set_variables import get_time_units
+from ssb_dash_framework.utils.core_query_functions import create_filter_dict
 
 from .....utils.config_tools.connection import _get_connection_object
-from .....utils.config_tools.connection import get_connection
 from ..core import DataEditorHelperButton
+from ..registry import DataEditorRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -46,12 +47,17 @@ class DataEditorHistory(DataEditorHelperButton):
         DataEditorHistory._id_number += 1
         self.variableselector = VariableSelector(
             selected_inputs=[],
-            selected_states=[get_refnr(), *[x for x in get_time_units().keys()]],
+            selected_states=[
+                get_refnr(),
+                get_ident(),
+                *[x for x in get_time_units().keys()],
+            ],
         )
         self.modal_body = self._create_modal_body()
 
         super().__init__(label="Historikk")
 
+        DataEditorRegistry.register_unit_source("skjemadataendringshistorikk")
         self.module_callbacks()
 
     def _create_modal_body(self) -> html.Div:
@@ -94,40 +100,42 @@ class DataEditorHistory(DataEditorHelperButton):
             Input(f"{self.module_name}-{self.module_number}-toggle", "value"),
             *self.variableselector.get_all_callback_objects(),
         )
-        def update_history_view(is_open, insert_toggle: bool, refnr, *args):
+        def update_history_view(is_open, insert_toggle: bool, refnr, ident, *args):
 
             if isinstance(connection_object, ConnectionPool):
                 logger.debug("Using ConnectionPool logic.")
-                with get_connection() as conn:
-                    t = conn.table("skjemadataendringshistorikk")
-                    query = t.filter(_.refnr == refnr).order_by(_.endret_tid.desc())
-                    if insert_toggle:
-                        query = query.filter(
-                            _.process_type != "Altinn3"
-                        )  # Filtering here to not show the original insert in the history table as the original data will be visible as "old value" in the changelog.
-                    df = query.to_pandas()
-                    df["endret_tid"] = (
-                        pd.to_datetime(df["endret_tid"], utc=True)
-                        .dt.tz_convert(local_tz)
-                        .dt.floor("s")
-                        .dt.tz_localize(None)
-                        .dt.strftime("%Y-%m-%d %H:%M:%S")
-                    )
-                    columns = [
-                        {
-                            "headerName": col,
-                            "field": col,
-                            "filter": True,
-                            "resizable": True,
-                            "hide": col
-                            in [
-                                "skjema",
-                                "refnr",
-                            ],
-                        }
-                        for col in df.columns
-                    ]
-                    return df.to_dict("records"), columns
+                df = DataEditorRegistry.get_unit_context(
+                    refnr, ident, create_filter_dict(list(get_time_units()), args)
+                )["skjemadataendringshistorikk"].sort_values(
+                    "endret_tid", ascending=False
+                )
+                if insert_toggle:
+                    df = df[
+                        df["process_type"] != "Altinn3"
+                    ]  # Filtering here to not show the original insert in the history table as the original data will be visible as "old value" in the changelog.
+                # The cached frame is shared, so the formatted column goes in a copy.
+                df = df.assign(
+                    endret_tid=pd.to_datetime(df["endret_tid"], utc=True)
+                    .dt.tz_convert(local_tz)
+                    .dt.floor("s")
+                    .dt.tz_localize(None)
+                    .dt.strftime("%Y-%m-%d %H:%M:%S")
+                )
+                columns = [
+                    {
+                        "headerName": col,
+                        "field": col,
+                        "filter": True,
+                        "resizable": True,
+                        "hide": col
+                        in [
+                            "skjema",
+                            "refnr",
+                        ],
+                    }
+                    for col in df.columns
+                ]
+                return df.to_dict("records"), columns
             # elif isinstance(connection_object, EimerDBInstance):
             #     try:
             #         partition_args = dict(zip([x for x in get_time_units().keys()], args, strict=False))
@@ -1,10 +1,25 @@
+import logging
 from typing import Any
 from typing import ClassVar
+from typing import Literal
+
+import pandas as pd
+
+from ....utils.config_tools.set_variables import get_time_units
+from ....utils.prefetch import UnitPrefetcher
+from ....utils.unit_cache import get_unit_tables
+
+logger = logging.getLogger(__name__)
 
 
 class DataEditorRegistry:
     """Helper class to keep track of what has been added to the DataEditor.
 
+    Components that show data for the selected unit declare the tables they read with
+    :meth:`register_unit_source`, and read them with :meth:`get_unit_context`. The
+    first component to ask for a unit loads every declared table for it, one query
+    per table, and the rest read the same cached result.
+
     Note:
         This class can be printed to check currently registered modules and covered table-form pairs.
     """
@@ -14,8 +29,74 @@ class DataEditorRegistry:
     helper_modules: ClassVar[list[Any]] = []
     sidebar_modules: ClassVar[list[Any]] = []
     main_views: ClassVar[dict[Any, Any]] = dict()
+    unit_sources: ClassVar[dict[str, Literal["refnr", "ident"]]] = {}
     _table_form_covered: ClassVar[list[tuple[str, str]]] = []
 
+    @classmethod
+    def register_unit_source(
+        cls, table: str, key: Literal["refnr", "ident"] = "refnr"
+    ) -> None:
+        """Declares a table that is read for the selected unit.
+
+        Args:
+            table: Name of the table.
+            key: What the table is filtered on. 'refnr' reads the rows of the selected
+                form, 'ident' reads the rows of the selected unit in the selected time
+                units.
+
+        Raises:
+            ValueError: If the table is already registered with another key.
+        """
+        registered = cls.unit_sources.get(table)
+        if registered is not None and registered != key:
+            raise ValueError(
+                f"Table '{table}' is already registered with key '{registered}', can not register it with key '{key}'."
+            )
+        cls.unit_sources[table] = key
+        UnitPrefetcher.register_loader(cls.__name__, cls._prefetch)
+
+    @classmethod
+    def get_unit_context(
+        cls,
+        refnr: str | None,
+        ident: str | None,
+        time_units: dict[str, Any],
+        ttl: float | None = None,
+    ) -> dict[str, pd.DataFrame]:
+        """Returns the rows of every registered table for a unit.
+
+        Tables are skipped if the values they are filtered on are missing, so
+        components should check that their table is in the result.
+
+        Args:
+            refnr: The selected form.
+            ident: The selected unit.
+            time_units: The selected time units.
+            ttl: Seconds to keep data loaded by this call. Defaults to the ttl of the
+                helper-table cache.
+
+        Returns:
+            The rows for the unit, by table name.
+        """
+        has_time_units = all(value is not None for value in time_units.values())
+        slices: dict[str, dict[str, Any]] = {}
+        for table, key in cls.unit_sources.items():
+            if key == "refnr" and refnr:
+                slices[table] = {"refnr": refnr}
+            elif key == "ident" and ident and has_time_units:
+                slices[table] = {"ident": ident, **time_units}
+        logger.debug(f"Getting unit context for {slices}")
+        return get_unit_tables(slices, ttl=ttl)
+
+    @classmethod
+    def _prefetch(cls, unit: dict[str, Any]) -> None:
+        cls.get_unit_context(
+            unit.get("refnr"),
+            unit.get("ident"),
+            {key: unit.get(key) for key in get_time_units()},
+            ttl=UnitPrefetcher.ttl,
+        )
+
     def __str__(self) -> str:
         """Creates a string representation giving information about currently registered modules and table-form pairs."""
         lines = ["info_fields:"]
@@ -28,6 +109,9 @@ class DataEditorRegistry:
             lines.append(f"{sidebar_module}")
         for view in self.main_views:
             lines.append(f"{view}")
+        lines.append("Unit sources:")
+        for table, key in self.unit_sources.items():
+            lines.append(f"{table} ({key})")
         lines.append("Table - Form pairs covered:")
         for pair in self._table_form_covered:
             lines.append(f"{pair}")
@@ -11,7 +11,6 @@ from dash import dcc
 from dash import html
 from dash.exceptions import PreventUpdate
 from eimerdb import EimerDBInstance
-from ibis import _
 from psycopg_pool import ConnectionPool
 
 from ssb_dash_framework import VariableSelector
@@ -20,9 +19,11 @@ from ssb_dash_framework import get_connection
 from ssb_dash_framework.utils.core_query_functions import create_filter_dict
 from ssb_dash_framework.utils.core_query_functions import ibis_filter_with_dict
 
+from .....utils.alert_handler import add_alerts
 from .....utils.config_tools.set_variables import get_ident
 from .....utils.config_tools.set_variables import get_time_units
 from .....utils.core_models import UpdateSkjemamottakKommentar
+from .....utils.unit_cache import get_unit_table
 from ..core import DataEditorHelperSidebar
 
 logger = logging.getLogger(__name__)
@@ -128,21 +129,17 @@ class DataEditorSidebarComment(DataEditorHelperSidebar):
         )
         def get_comment(refnr: str) -> str:
             """Gets the comment for the selected 'refnr'."""
-            with get_connection() as conn:
-                s = conn.table("skjemamottak")
-                comment = (
-                    s.filter(_.refnr == refnr)
-                    .select("kommentar")
-                    .limit(1)
-                    .to_pandas()["kommentar"]
-                )
+            if not refnr:
+                return ""
+            # Same cached slice as the DataEditorRegistry unit context.
+            comment = get_unit_table("skjemamottak", refnr=refnr)["kommentar"]
             if len(comment) == 0:
                 return ""
 
             if len(comment) > 1:
                 print(f"Multiple comments found for refnr={refnr}: {comment}")
 
-            return comment[0]
+            return comment.iloc[0]
 
 
         @callback(
@@ -150,10 +147,9 @@ class DataEditorSidebarComment(DataEditorHelperSidebar):
             Input(f"{self.module_name}-{self.module_number}-save-button", "n_clicks"),
             State(f"{self.module_name}-{self.module_number}-comment-text", "value"),
             State(f"{self.module_name}-{self.module_number}-dropdown-refnr", "value"),
-            State("alert_store", "data"),
             prevent_initial_call=True,
         )
-        def update_output(save_click: int | None, value: Any, refnr: str, alert_store):
+        def update_output(save_click: int | None, value: Any, refnr: str):
             """Update the comment when button is clicked."""
             if (
                 not callback_context.triggered_id
@@ -174,4 +170,4 @@ class DataEditorSidebarComment(DataEditorHelperSidebar):
                     f"Connection of type '{type(_get_connection_object())}' is not implemented yet."
                 )
 
-            return [feedback, *alert_store]
+            return add_alerts(feedback)
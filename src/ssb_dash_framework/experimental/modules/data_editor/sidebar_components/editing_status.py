@@ -24,13 +24,16 @@ from ssb_dash_framework import VariableSelector
 from ssb_dash_framework.utils.core_query_functions import create_filter_dict
 from ssb_dash_framework.utils.core_query_functions import ibis_filter_with_dict
 
+from .....utils.alert_handler import add_alerts
 from .....utils.config_tools.connection import _get_connection_object
 from .....utils.config_tools.connection import get_connection
 from .....utils.config_tools.set_variables import get_ident
 from .....utils.config_tools.set_variables import get_time_units
 from .....utils.core_models import UpdateSkjemamottakAktiv
 from .....utils.core_models import UpdateSkjemamottak
+from .....utils.prefetch import UnitPrefetcher
 from ..core import DataEditorHelperSidebar
+from ..registry import DataEditorRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -81,6 +84,7 @@ class DataEditorSidebarEditingStatus(DataEditorHelperSidebar):
             ]
         )
 
+        DataEditorRegistry.register_unit_source("skjemamottak")
         self.module_callbacks()
         super().__init__()
 
@@ -156,6 +160,11 @@ class DataEditorSidebarEditingStatus(DataEditorHelperSidebar):
             ]
         )
 
+    @staticmethod
+    def _unit_context(args: tuple[Any, ...]) -> dict[str, Any]:
+        """Maps the ident and time unit states to the columns used by prefetch loaders."""
+        return {"ident": args[0], **dict(zip(get_time_units().keys(), args[1:]))}
+
     def module_callbacks(self) -> None:
         """Registers the callbacks for the module."""
 
@@ -169,15 +178,20 @@ class DataEditorSidebarEditingStatus(DataEditorHelperSidebar):
             Input("skjemamottak-status-signal", "data"),
             State(f"{self.module_name}-{self.module_number}-checkbox", "value"),
             State(f"{self.module_name}-{self.module_number}-radioitems", "value"),
+            self.variableselector.get_state(get_ident()),
+            *[self.variableselector.get_state(x) for x in get_time_units()],
         )
-        def set_initial_status(refnr, status_signal, current_checkbox, current_radio):
+        def set_initial_status(
+            refnr, status_signal, current_checkbox, current_radio, *args
+        ):
 
             if not refnr:
                 raise PreventUpdate
 
-            with get_connection() as conn:
-                t = conn.table("skjemamottak")
-                data = t.filter(_.refnr == refnr).to_pandas()
+            unit = self._unit_context(args)
+            data = DataEditorRegistry.get_unit_context(
+                refnr, unit.pop("ident"), unit
+            )["skjemamottak"]
 
             if data.empty:
                 raise PreventUpdate
@@ -204,14 +218,12 @@ class DataEditorSidebarEditingStatus(DataEditorHelperSidebar):
             Input(f"{self.module_name}-{self.module_number}-checkbox", "value"),
             Input(f"{self.module_name}-{self.module_number}-radioitems", "value"),
             State(self.variableselector.get_input("refnr").component_id, "value"),
-            State("alert_store", "data"),
             prevent_initial_call=True,
         )
         def update_status(
             aktiv_status,
             status_code,
             refnr,
-            alert_store,
         ):
 
             triggered_id = ctx.triggered_id
@@ -242,7 +254,7 @@ class DataEditorSidebarEditingStatus(DataEditorHelperSidebar):
             else:
                 raise NotImplementedError
 
-            return [feedback, *alert_store], time.time()
+            return add_alerts(feedback), time.time()
 
         @callback(
             Output(f"{self.module_name}-{self.module_number}-form-table", "rowData"),
@@ -287,8 +299,10 @@ class DataEditorSidebarEditingStatus(DataEditorHelperSidebar):
                     .dt.tz_localize(None)
                     .dt.strftime("%Y-%m-%d %H:%M:%S")
                 )
+            records = data.to_dict("records")
+            UnitPrefetcher.prefetch(records, **self._unit_context(args))
             return (
-                data.to_dict("records"),
+                records,
                 [{"field": x, "headerName": x} for x in data.columns],
                 True,
             )
@@ -303,10 +317,18 @@ class DataEditorSidebarEditingStatus(DataEditorHelperSidebar):
             ),
             self.variableselector.get_input("refnr"),
             self.variableselector.get_input("altinnskjema"),
+            State(
+                f"{self.module_name}-{self.module_number}-form-table", "virtualRowData"
+            ),
+            self.variableselector.get_all_states(),
             prevent_initial_call=True,
         )
         def selected_refnr(
-            selected_row: list[dict[str, Any]], current_refnr, current_altinnskjema
+            selected_row: list[dict[str, Any]],
+            current_refnr,
+            current_altinnskjema,
+            rows: list[dict[str, Any]] | None,
+            *args: Any,
         ):
 
             logger.debug(f"Args:\nselected_row: {selected_row}")
@@ -316,6 +338,9 @@ class DataEditorSidebarEditingStatus(DataEditorHelperSidebar):
 
             refnr = selected_row[0]["refnr"]
             skjema = selected_row[0]["skjema"]
+            UnitPrefetcher.prefetch(
+                rows, current=selected_row[0], **self._unit_context(args)
+            )
 
             return (
                 refnr if refnr != current_refnr else no_update,
@@ -1,30 +1,36 @@
 from abc import ABC
 from abc import abstractmethod
-import base64
-import io
 import logging
 from typing import ClassVar
 from typing import Any
 
-from PIL import Image
 from dash import callback, clientside_callback, dcc, html
 from dash import ClientsideFunction
+from dash import no_update
 from dash.dependencies import Input, State
 from dash.dependencies import Output
 from dash.development.base_component import Component
 from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 from dash_iconify import DashIconify
-import gcsfs
 
 from ..setup.variableselector import VariableSelector
 from ..utils import TabImplementation
 from ..utils import WindowImplementation
+from ..utils.alert_handler import add_alerts
 from ..utils.alert_handler import create_alert
+from ..utils.document_server import document_url
+from ..utils.document_server import fetch_document
+from ..utils.document_server import get_page_renderer
+from ..utils.document_server import register_document_source
 from ..utils.module_validation import module_validator
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_DOCUMENT_ROOT = (
+    "gs://ssb-skatt-naering-data-delt-naeringspesifikasjon-selskap-prod/bildefil"
+)
+
 
 class Aarsregnskap(ABC):
     """Module for displaying annual financial statements (Årsregnskap).
@@ -46,18 +52,34 @@ class Aarsregnskap(ABC):
 
     def __init__(
         self,
+        document_root: str = DEFAULT_DOCUMENT_ROOT,
+        prefetch_grid_ids: list[str] | None = None,
+        prefetch_count: int = 3,
     ) -> None:
         """Initialize the Aarsregnskap component.
 
         Sets up the label, validates required variables, and initializes the
         layout and callbacks for the module.
+
+        Args:
+            document_root: Folder containing the 'g{aar}/{orgnr}_{aar}.pdf' (or '.tif') files.
+                Can be a bucket path or a local directory. Defaults to the shared næringsspesifikasjon bucket.
+            prefetch_grid_ids: Ids of AgGrids listing the units the user works through, for example
+                a control view's 'kontrollutslag' grid. When the selected unit changes, the årsregnskap
+                of the next units in these grids are fetched and rendered in the background.
+                Rows must have a 'foretak' or 'ident' column.
+            prefetch_count: How many of the following units to prefetch. Defaults to 3.
         """
+        self.prefetch_grid_ids = prefetch_grid_ids or []
+        self.prefetch_count = prefetch_count
         self.module_number = Aarsregnskap._id_number
         self.module_name = self.__class__.__name__
         Aarsregnskap._id_number += 1
         self.label = "Årsregnskap"
         self.icon = DashIconify(icon="feather:file-text", width=24)
         self._is_valid()
+        self.source_name = f"aarsregnskap-{self.module_number}"
+        self.document_source = register_document_source(self.source_name, document_root)
         self.module_layout = self._create_layout()
         self.module_callbacks()
         module_validator(self)
@@ -208,6 +230,67 @@ class Aarsregnskap(ABC):
         """
         pass
 
+    def _find_document(self, aar: int | str, orgnr: str) -> str | None:
+        """Returns the path of the årsregnskap for a unit, preferring PDF over TIF.
+
+        Args:
+            aar: The year.
+            orgnr: The organization number.
+
+        Returns:
+            The path relative to the document root, or None if no file exists.
+        """
+        base_name = f"g{aar}/{orgnr}_{aar}"
+        for extension in (".pdf", ".tif"):
+            if self.document_source.exists(f"{base_name}{extension}"):
+                return f"{base_name}{extension}"
+        return None
+
+    def _page_images(self, document: str, pages: int) -> list[html.Img]:
+        """Creates lazily loaded image elements for each page of a document.
+
+        Args:
+            document: Path of the document relative to the document root.
+            pages: Number of pages in the document.
+
+        Returns:
+            One image element per page.
+        """
+        return [
+            html.Img(
+                src=document_url(self.source_name, document, page=page),
+                loading="lazy",
+                style={
+                    "width": "100%",
+                    "display": "block",
+                    "marginBottom": "4px",
+                },
+            )
+            for page in range(pages)
+        ]
+
+    def prefetch(self, orgnrs: list[str], aar: int | str) -> None:
+        """Downloads and renders the first pages of the årsregnskap for units in the background.
+
+        Args:
+            orgnrs: Organization numbers to prefetch, typically the next units in a list.
+            aar: The year.
+        """
+        renderer = get_page_renderer()
+
+        def _warm(orgnr: str) -> None:
+            document = self._find_document(aar, orgnr)
+            if document is None:
+                return
+            if document.endswith(".tif"):
+                renderer.prefetch(self.source_name, document, pages=3)
+            else:
+                fetch_document(self.source_name, document)
+
+        for orgnr in orgnrs:
+            logger.debug(f"Prefetching årsregnskap for {orgnr} {aar}")
+            renderer.run_in_background(_warm, orgnr)
+
     def module_callbacks(self) -> None:
         """Registers Dash callbacks for the Årsregnskap module."""
 
@@ -253,21 +336,21 @@ class Aarsregnskap(ABC):
             Output("alert_store", "data", allow_duplicate=True),
             Input("tab-aarsregnskap-input-aar", "value"),
             Input("tab-aarsregnskap-input-orgnr", "value"),
-            State("alert_store", "data"),
             prevent_initial_call="initial_duplicate",
         )
-        def update_pdf_source(aar: int, orgnr: str, alert_store):
-            """Fetch and encode the PDF source based on the year and organization number.
-            If PDF cannot be found, it fetches the TIF-file instead (if it exists), and styles it like a PDF.
+        def update_pdf_source(aar: int, orgnr: str):
+            """Get the URL of the PDF based on the year and organization number.
+            If PDF cannot be found, it shows the pages of the TIF-file instead (if it exists), styled like a PDF.
             Returns an alert to the user if neither can be found.
 
+            The files are served from the document route, so only URLs are sent to the browser.
+
             Args:
                 aar: The year input value.
                 orgnr: The organization number input value.
-                alert_store: Alert setup.
 
             Returns:
-                A data URI for the PDF/TIF file, encoded in base64.
+                The URL for the PDF, or image elements for each page of a TIF.
             """
             show_iframe = {"display": "block"}
             hide_iframe = {"display": "none"}
@@ -278,109 +361,91 @@ class Aarsregnskap(ABC):
             if not aar or not orgnr:
                 raise PreventUpdate
 
-            fs = gcsfs.GCSFileSystem()
-            base_path = f"gs://ssb-skatt-naering-data-delt-naeringspesifikasjon-selskap-prod/bildefil/g{aar}/{orgnr}_{aar}"
-
-            MAX_SIZE = 1_000_000
-
-            # Try PDF first
-            try:
-                with fs.open(f"{base_path}.pdf", "rb") as f:
-                    pdf_bytes = f.read()
+            document = self._find_document(aar, orgnr)
 
-                if len(pdf_bytes) > MAX_SIZE:
-                    import fitz  # pymupdf
-
-                    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-                    images = []
-                    for page in doc:
-                        pix = page.get_pixmap(dpi=72)
-                        img = Image.frombytes(
-                            "RGB", [pix.width, pix.height], pix.samples
-                        )
-                        images.append(img)
-                    pdf_buffer = io.BytesIO()
-                    images[0].save(
-                        pdf_buffer,
-                        format="PDF",
-                        save_all=True,
-                        append_images=images[1:],
-                    )
-                    pdf_buffer.seek(0)
-                    pdf_bytes = pdf_buffer.getvalue()
-                    logger.info(f"Compressed PDF, new size: {len(pdf_bytes)} bytes")
-
-                encoded = base64.b64encode(pdf_bytes).decode("utf-8")
-                logger.info(f"Found PDF file, size: {len(pdf_bytes)} bytes")
+            if document is not None and document.endswith(".pdf"):
+                logger.info(f"Found PDF file for {orgnr} {aar}")
                 return (
-                    f"data:application/pdf;base64,{encoded}",
+                    document_url(self.source_name, document),
                     [],
                     show_iframe,
                     hide_div,
                     {"display": "none"},
                     brreg_link,
-                    [],
+                    no_update,
                 )
-
-            except FileNotFoundError:
-                logger.debug("PDF not found, trying TIF")
-
-            # Try TIF - convert each page to PNG
-            try:
-                with fs.open(f"{base_path}.tif", "rb") as f:
-                    tif_bytes = f.read()
-                tif_image = Image.open(io.BytesIO(tif_bytes))
-                img_elements = []
-                try:
-                    while True:
-                        png_buffer = io.BytesIO()
-                        tif_image.copy().convert("RGB").save(png_buffer, format="PNG")
-                        png_buffer.seek(0)
-                        encoded = base64.b64encode(png_buffer.getvalue()).decode(
-                            "utf-8"
-                        )
-                        img_elements.append(
-                            html.Img(
-                                src=f"data:image/png;base64,{encoded}",
-                                style={
-                                    "width": "100%",
-                                    "display": "block",
-                                    "marginBottom": "4px",
-                                },
-                            )
-                        )
-                        tif_image.seek(tif_image.tell() + 1)
-                except EOFError:
-                    pass
+            if document is not None:
+                # TIF files are shown page by page as PNG images, rendered on the
+                # page renderer's worker pool and loaded lazily by the browser.
+                # The page count is read from the TIF headers, and the full file is
+                # downloaded and the first pages rendered in the background.
+                logger.info(f"Showing {document} page by page")
+                renderer = get_page_renderer()
+                renderer.prefetch(self.source_name, document, pages=3)
                 return (
                     None,
-                    img_elements,
+                    self._page_images(
+                        document, renderer.page_count(self.source_name, document)
+                    ),
                     hide_iframe,
                     show_div,
                     {"display": "block"},
                     brreg_link,
-                    [],
-                )
-            except FileNotFoundError:
-                logger.debug("TIF not found either")
-                alert_store = [
-                    create_alert(
-                        message=f"Hverken PDF eller TIF av årsregnskapet funnet for årgang {aar}!",
-                        color="warning",
-                        duration=8,
-                        ephemeral=True,
-                    ),
-                    *alert_store,
-                ]
-                return (
-                    None,
-                    [],
-                    hide_iframe,
-                    hide_div,
-                    {"display": "none"},
-                    brreg_link,
-                    alert_store,
+                    no_update,
                 )
+            logger.debug("Neither PDF nor TIF found")
+            alert = create_alert(
+                message=f"Hverken PDF eller TIF av årsregnskapet funnet for årgang {aar}!",
+                color="warning",
+                duration=8,
+                ephemeral=True,
+            )
+            return (
+                None,
+                [],
+                hide_iframe,
+                hide_div,
+                {"display": "none"},
+                brreg_link,
+                add_alerts(alert),
+            )
+
+        if self.prefetch_grid_ids:
+
+            @callback(  # type: ignore[misc]
+                Input("tab-aarsregnskap-input-orgnr", "value"),
+                State("tab-aarsregnskap-input-aar", "value"),
+                *[
+                    State(grid_id, "virtualRowData")
+                    for grid_id in self.prefetch_grid_ids
+                ],
+                prevent_initial_call=True,
+            )
+            def prefetch_next_documents(
+                orgnr: str, aar: int, *grids: list[dict[str, Any]]
+            ) -> None:
+                """Warms the documents of the units following the current one in the editor's lists.
+
+                Args:
+                    orgnr: The current organization number.
+                    aar: The current year.
+                    *grids: Rows currently shown in the grids listed in ``prefetch_grid_ids``.
+                """
+                if not orgnr or not aar:
+                    return
+                upcoming: list[str] = []
+                for rows in grids:
+                    orgnrs = [
+                        str(row.get("foretak", row.get("ident")))
+                        for row in rows or []
+                        if row.get("foretak", row.get("ident")) is not None
+                    ]
+                    if str(orgnr) in orgnrs:
+                        position = orgnrs.index(str(orgnr))
+                        upcoming.extend(
+                            orgnrs[position + 1 : position + 1 + self.prefetch_count]
+                        )
+                self.prefetch(list(dict.fromkeys(upcoming)), aar)
 
         clientside_callback(
             ClientsideFunction(namespace="aarsregnskap", function_name="zoom"),
@@ -393,16 +458,40 @@ class Aarsregnskap(ABC):
 class AarsregnskapTab(TabImplementation, Aarsregnskap):
     """AarsregnskapTab is an implementation of the Aarsregnskap module as a tab in a Dash application."""
 
-    def __init__(self) -> None:
-        """Initializes the AarsregnskapTab class."""
-        Aarsregnskap.__init__(self)
+    def __init__(
+        self,
+        document_root: str = DEFAULT_DOCUMENT_ROOT,
+        prefetch_grid_ids: list[str] | None = None,
+        prefetch_count: int = 3,
+    ) -> None:
+        """Initializes the AarsregnskapTab class.
+
+        Args:
+            document_root: Folder containing the årsregnskap files. See Aarsregnskap.
+            prefetch_grid_ids: Grids listing the units to prefetch. See Aarsregnskap.
+            prefetch_count: How many of the following units to prefetch. See Aarsregnskap.
+        """
+        Aarsregnskap.__init__(self, document_root, prefetch_grid_ids, prefetch_count)
         TabImplementation.__init__(self)
 
 
 class AarsregnskapWindow(WindowImplementation, Aarsregnskap):
     """AarsregnskapWindow is an implementation of the Aarsregnskap module as a window in a Dash application."""
 
-    def __init__(self, **kwargs: Any) -> None:
-        """Initializes the AarsregnskapWindow class."""
-        Aarsregnskap.__init__(self)
+    def __init__(
+        self,
+        document_root: str = DEFAULT_DOCUMENT_ROOT,
+        prefetch_grid_ids: list[str] | None = None,
+        prefetch_count: int = 3,
+        **kwargs: Any,
+    ) -> None:
+        """Initializes the AarsregnskapWindow class.
+
+        Args:
+            document_root: Folder containing the årsregnskap files. See Aarsregnskap.
+            prefetch_grid_ids: Grids listing the units to prefetch. See Aarsregnskap.
+            prefetch_count: How many of the following units to prefetch. See Aarsregnskap.
+            **kwargs: Passed on to WindowImplementation.
+        """
+        Aarsregnskap.__init__(self, document_root, prefetch_grid_ids, prefetch_count)
         WindowImplementation.__init__(self, **kwargs)
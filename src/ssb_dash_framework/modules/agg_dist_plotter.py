@@ -7,6 +7,7 @@ from typing import ClassVar
 import dash_ag_grid as dag
 import dash_bootstrap_components as dbc
 import ibis
+import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from dash import Input
@@ -22,8 +23,13 @@ from ..utils import TabImplementation
 from ..utils import WindowImplementation
 from ..utils import active_no_duplicates_refnr_list
 from ..utils import get_connection
+from ..utils import is_tab_or_window
+from ..utils.config_tools import on_replica_refreshed
+from ..utils.config_tools import replica_staleness_text
 from ..utils.eimerdb_helpers import create_partition_select
 from ..utils.module_validation import module_validator
+from ..utils.unit_cache import TTLCache
+from ..utils.unit_cache import on_unit_table_evicted
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +46,24 @@ INITIAL_OPTIONS = [
 
 SQL_COLUMN_CONCAT = " || '_' || "
 
+# Aggregates keyed on a tuple of the tables they are computed from first, so edits to
+# any of those tables, and new read replica snapshots of them, drop them.
+_AGGREGATES: TTLCache[Any] = TTLCache(max_size=128, ttl=600.0)
+
+
+def _evict_aggregates(table: str, filters: dict[str, Any]) -> None:
+    _AGGREGATES.evict_where(lambda key: table in key[0])  # type: ignore[index]
+
+
+on_unit_table_evicted(_evict_aggregates)
+on_replica_refreshed(_evict_aggregates)
+
+
+def _freeze_partition_select(
+    partition_select: dict[str, list[int | str]],
+) -> tuple[tuple[str, tuple[int | str, ...]], ...]:
+    return tuple((key, tuple(value)) for key, value in sorted(partition_select.items()))
+
 
 class AggDistPlotter(ABC):
     """The AggDistPlotter module lets you view macro values for your variables and find the distribution between them and the largest contributors.
@@ -53,6 +77,7 @@ class AggDistPlotter(ABC):
     # TODO: Loosen constraints on datastructure.
 
     _id_number: ClassVar[int] = 0
+    sample_size: ClassVar[int] = 2000
     _required_variables: ClassVar[list[str]] = (
         [  # Used for validating that the variable selector has the required variables set. These are hard-coded in the callbacks.
             "ident",
@@ -260,9 +285,141 @@ class AggDistPlotter(ABC):
         logger.debug(f"Returning: {partition_dict}")
         return partition_dict
 
+    def get_distribution_summary(
+        self,
+        variabel: str,
+        skjema: str,
+        partition_select: dict[str, list[int | str]],
+    ) -> dict[str, pd.DataFrame]:
+        """Gets the summaries the distribution plots for a variable are drawn from.
+
+        The summaries are computed in the database and cached until the underlying
+        tables are edited, so the individual values never have to be sent to the
+        browser. Statistics are computed for every variable at once, and the rest
+        for the requested variable.
+
+        Args:
+            variabel: The variable to summarize.
+            skjema: The form to include, or 'all' for every form.
+            partition_select: The partitions to read.
+
+        Returns:
+            A dict with the DataFrames:
+                'stats': count, sum, mean, quartiles and whisker ends of the variable.
+                'top': the five largest values, with ident.
+                'bidrag': the ten idents with the largest sums.
+                'sample': a random sample of about sample_size values, with ident.
+        """
+        key = (
+            (self.main_table_name, "skjemamottak"),
+            _freeze_partition_select(partition_select),
+            skjema,
+        )
+
+        def connection() -> Any:
+            return get_connection(
+                read_only=True,
+                necessary_tables=["skjemamottak", self.main_table_name],
+                partition_select=partition_select,
+            )
+
+        def values(conn: Any) -> Any:
+            relevant_refnr = _AGGREGATES.get_or_load(
+                (*key, "refnr"), lambda: active_no_duplicates_refnr_list(conn, skjema)
+            )
+            t = conn.table(self.main_table_name)
+            return (
+                t.filter([t.refnr.isin(relevant_refnr), t.verdi.notnull()])
+                .cast({"verdi": "float"})
+                .cast({"verdi": "int"})
+            )
+
+        def load_stats() -> pd.DataFrame:
+            with connection() as conn:
+                t = values(conn)
+                return (
+                    t.group_by("variabel")
+                    .agg(
+                        antall=t.verdi.count(),
+                        sum=t.verdi.sum(),
+                        mean=t.verdi.mean(),
+                        min=t.verdi.min(),
+                        q1=t.verdi.quantile(0.25),
+                        median=t.verdi.quantile(0.5),
+                        q3=t.verdi.quantile(0.75),
+                        max=t.verdi.max(),
+                    )
+                    .to_pandas()
+                )
+
+        all_stats = _AGGREGATES.get_or_load((*key, "stats"), load_stats)
+        stats = all_stats[all_stats["variabel"] == variabel]
+
+        def load_variable() -> dict[str, pd.DataFrame]:
+            with connection() as conn:
+                t = values(conn)
+                t = t.filter(t.variabel == variabel)
+                result: dict[str, pd.DataFrame] = {
+                    "top": t.order_by(t.verdi.desc())
+                    .limit(5)
+                    .select("ident", "verdi")
+                    .to_pandas(),
+                    "bidrag": t.group_by("ident")
+                    .agg(verdi=t.verdi.sum())
+                    .order_by(ibis.desc("verdi"))
+                    .limit(10)
+                    .to_pandas(),
+                }
+                if stats.empty:
+                    result["stats"] = stats
+                    result["sample"] = pd.DataFrame(columns=["ident", "verdi"])
+                    return result
+                row = stats.iloc[0]
+                # Whiskers end at the most extreme values within 1.5 IQR, as in plotly.
+                iqr = row["q3"] - row["q1"]
+                fences = (
+                    t.filter(
+                        t.verdi.between(row["q1"] - 1.5 * iqr, row["q3"] + 1.5 * iqr)
+                    )
+                    .agg(lowerfence=t.verdi.min(), upperfence=t.verdi.max())
+                    .to_pandas()
+                )
+                result["stats"] = stats.assign(
+                    lowerfence=fences["lowerfence"].iloc[0],
+                    upperfence=fences["upperfence"].iloc[0],
+                )
+                if row["antall"] > self.sample_size:
+                    t = t.sample(self.sample_size / row["antall"])
+                result["sample"] = t.select("ident", "verdi").to_pandas()
+                return result
+
+        return _AGGREGATES.get_or_load(  # type: ignore[no-any-return]
+            (*key, "variabel", variabel), load_variable
+        )
+
+    @staticmethod
+    def _points_trace(variabel: str, sample_df: pd.DataFrame) -> go.Box:
+        """Draws the sampled values as jittered points next to a precomputed box."""
+        return go.Box(
+            x=[variabel] * len(sample_df),
+            y=sample_df["verdi"],
+            name="Observasjoner",
+            boxpoints="all",
+            jitter=0.3,
+            pointpos=0,
+            fillcolor="rgba(0,0,0,0)",
+            line={"width": 0},
+            hoveron="points",
+            hovertext=sample_df["ident"],
+            customdata=sample_df[["ident"]].values,
+        )
+
     def module_callbacks(self) -> None:
         """Defines the callbacks for the AggDistPlotter module."""
-        dynamic_states = self.variableselector.get_all_inputs()
+        # Only recomputed while the tab or window is visible.
+        dynamic_states = self.variableselector.get_all_inputs(
+            deferred=is_tab_or_window(self)
+        )
 
         @callback(  # type: ignore[misc]
             Output("aggdistplotter-radioitems", "options"),
@@ -330,59 +487,76 @@ class AggDistPlotter(ABC):
             _t_0 = str(time_vars[0])
             _t_1 = str(time_vars[1])
 
-            with get_connection(  # necessary_tables and partition_select are used for eimerdb connection.
-                necessary_tables=["skjemamottak", "datatyper", self.main_table_name],
-                partition_select=updated_partition_select,
-            ) as conn:
-                skjemadata_tbl = conn.table(self.main_table_name)
-                datatyper_tbl = conn.table("datatyper")
-
-                relevant_refnr = active_no_duplicates_refnr_list(conn, skjema)
-
-                skjemadata_tbl = (
-                    skjemadata_tbl.filter(skjemadata_tbl.refnr.isin(relevant_refnr))
-                    .join(
-                        datatyper_tbl.select("variabel", "datatype"),
-                        ["variabel"],
-                        how="inner",
-                    )
-                    .filter(datatyper_tbl.datatype.isin(["number", "int", "float"]))
-                    .cast({"verdi": "float", rullerende_var: "str"})
-                    .cast({"verdi": "int"})
-                    .mutate(verdi=lambda t: t["verdi"].round(0))
-                    .pivot_wider(
-                        id_cols=["variabel"],
-                        names_from=rullerende_var,  # TODO: Tidsenhet
-                        values_from="verdi",
-                        values_agg="sum",
-                    )
-                )
-                if _t_1 in skjemadata_tbl.columns:
-                    logger.debug("Calculating diff from last year.")
-                    skjemadata_tbl.mutate(
-                        diff=lambda t: t[_t_0] - t[_t_1],
-                        pdiff=lambda t: (
-                            (t[_t_0].fill_null(0) - t[_t_1].fill_null(0))
-                            / t[_t_1].fill_null(1)
-                            * 100
-                        ).round(2),
-                    )
-                else:
-                    logger.debug(
-                        f"Didn't find previous period value, no diff calculated. Columns in dataset: {skjemadata_tbl.columns}"
+            def load() -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+                with (
+                    get_connection(  # necessary_tables and partition_select are used for eimerdb connection.
+                        read_only=True,
+                        necessary_tables=[
+                            "skjemamottak",
+                            "datatyper",
+                            self.main_table_name,
+                        ],
+                        partition_select=updated_partition_select,
+                    ) as conn
+                ):
+                    skjemadata_tbl = conn.table(self.main_table_name)
+                    datatyper_tbl = conn.table("datatyper")
+
+                    relevant_refnr = active_no_duplicates_refnr_list(conn, skjema)
+
+                    skjemadata_tbl = (
+                        skjemadata_tbl.filter(skjemadata_tbl.refnr.isin(relevant_refnr))
+                        .join(
+                            datatyper_tbl.select("variabel", "datatype"),
+                            ["variabel"],
+                            how="inner",
+                        )
+                        .filter(datatyper_tbl.datatype.isin(["number", "int", "float"]))
+                        .cast({"verdi": "float", rullerende_var: "str"})
+                        .cast({"verdi": "int"})
+                        .mutate(verdi=lambda t: t["verdi"].round(0))
+                        .pivot_wider(
+                            id_cols=["variabel"],
+                            names_from=rullerende_var,  # TODO: Tidsenhet
+                            values_from="verdi",
+                            values_agg="sum",
+                        )
                     )
+                    if _t_1 in skjemadata_tbl.columns:
+                        logger.debug("Calculating diff from last year.")
+                        skjemadata_tbl.mutate(
+                            diff=lambda t: t[_t_0] - t[_t_1],
+                            pdiff=lambda t: (
+                                (t[_t_0].fill_null(0) - t[_t_1].fill_null(0))
+                                / t[_t_1].fill_null(1)
+                                * 100
+                            ).round(2),
+                        )
+                    else:
+                        logger.debug(
+                            f"Didn't find previous period value, no diff calculated. Columns in dataset: {skjemadata_tbl.columns}"
+                        )
 
-                pandas_table = skjemadata_tbl.to_pandas()
-                columns = [
-                    {
-                        "headerName": col,
-                        "field": col,
-                    }
-                    for col in pandas_table.columns
-                ]
-                columns[0]["checkboxSelection"] = True
-                columns[0]["headerCheckboxSelection"] = True
-                return pandas_table.to_dict("records"), columns
+                    pandas_table = skjemadata_tbl.to_pandas()
+                    columns = [
+                        {
+                            "headerName": col,
+                            "field": col,
+                        }
+                        for col in pandas_table.columns
+                    ]
+                    columns[0]["checkboxSelection"] = True
+                    columns[0]["headerCheckboxSelection"] = True
+                    return pandas_table.to_dict("records"), columns
+
+            key = (
+                (self.main_table_name, "skjemamottak", "datatyper"),
+                "table",
+                _freeze_partition_select(updated_partition_select),
+                skjema,
+                rullerende_var,
+            )
+            return _AGGREGATES.get_or_load(key, load)  # type: ignore[no-any-return]
 
         @callback(  # type: ignore[misc]
             Output("aggdistplotter-graph", "figure"),
@@ -431,98 +605,103 @@ class AggDistPlotter(ABC):
                     **partition_args,
                 )
 
-            with get_connection(
-                necessary_tables=["skjemamottak", self.main_table_name],
-                partition_select=partition_select,
-            ) as conn:
-                skjemamottak_tbl = conn.table("skjemamottak")
-                skjemadata_tbl = conn.table(self.main_table_name)
-
-                skjemamottak_tbl = (  # Get relevant refnr values from skjemamottak
-                    skjemamottak_tbl.filter(skjemamottak_tbl.aktiv)
-                    .order_by(ibis.desc(skjemamottak_tbl.dato_mottatt))
-                    .distinct(on=[*self.time_units, "ident"], keep="first")
-                )
-
-                relevant_refnr = active_no_duplicates_refnr_list(conn, skjema)
+            summary = self.get_distribution_summary(variabel, skjema, partition_select)
+            stats = summary["stats"]
+            if stats.empty:
+                logger.debug(f"No values found for {variabel}")
+                return go.Figure()
+            stats = stats.iloc[0]
+            top5_df = summary["top"]
+            sample_df = summary["sample"]
+            sample_text = (
+                f" Punktene er et utvalg på {len(sample_df)} av {int(stats['antall'])}."
+                if len(sample_df) < stats["antall"]
+                else ""
+            )
 
-                skjemadata_tbl = (
-                    skjemadata_tbl.filter(
-                        [
-                            skjemadata_tbl.refnr.isin(relevant_refnr),
-                            skjemadata_tbl.variabel == variabel,
-                            skjemadata_tbl.verdi.notnull(),
-                        ]
+            if graph_type == "box":
+                fig = go.Figure(
+                    go.Box(
+                        x=[variabel],
+                        q1=[stats["q1"]],
+                        median=[stats["median"]],
+                        q3=[stats["q3"]],
+                        lowerfence=[stats["lowerfence"]],
+                        upperfence=[stats["upperfence"]],
+                        mean=[stats["mean"]],
+                        name=variabel,
+                        boxpoints=False,
                     )
-                    .cast({"verdi": "float"})
-                    .cast({"verdi": "int"})
                 )
-
-                df = skjemadata_tbl.to_pandas()
-
-                top5_df = df.nlargest(5, "verdi")
-
-                if graph_type == "box":
-                    fig = px.box(
-                        df,
-                        x="variabel",
-                        y="verdi",
-                        hover_data=["ident", "verdi"],
-                        points="all",
-                        title=f"📦 Boksplott for {variabel}, {partition_select!s}.",
-                        template="plotly_dark",
-                    )
-                elif graph_type == "fiolin":
-                    fig = px.violin(
-                        df,
-                        x="variabel",
-                        y="verdi",
-                        hover_data=["ident", "verdi"],
-                        box=True,
+                fig.add_trace(self._points_trace(variabel, sample_df))
+                fig.update_layout(
+                    title=f"📦 Boksplott for {variabel}, {partition_select!s}.{sample_text}",
+                    template="plotly_dark",
+                )
+            elif graph_type == "fiolin":
+                fig = go.Figure(
+                    go.Violin(
+                        x=[variabel] * len(sample_df),
+                        y=sample_df["verdi"],
+                        name=variabel,
+                        box_visible=True,
                         points="all",
-                        title=f"🎻 Fiolinplott for {variabel}, {partition_select!s}.",
-                        template="plotly_dark",
-                    )
-                elif graph_type == "bidrag":
-                    agg_df = df.groupby("ident", as_index=False)["verdi"].sum()
-                    agg_df["verdi"] = (
-                        agg_df["verdi"] / agg_df["verdi"].sum() * 100
-                    ).round(2)
-                    agg_df = agg_df.sort_values("verdi", ascending=False).head(10)
-
-                    fig = px.bar(
-                        agg_df,
-                        x="verdi",
-                        y="ident",
-                        orientation="h",
-                        title=f"🥇 Bidragsanalyse - % av total verdi ({variabel})",
-                        template="plotly_dark",
-                        labels={"verdi": "%"},
-                        custom_data=["ident"],
+                        hovertext=sample_df["ident"],
+                        customdata=sample_df[["ident"]].values,
                     )
+                )
+                fig.update_layout(
+                    title=f"🎻 Fiolinplott for {variabel}, {partition_select!s}.{sample_text}",
+                    template="plotly_dark",
+                )
+            elif graph_type == "bidrag":
+                agg_df = summary["bidrag"].assign(
+                    verdi=lambda df: (df["verdi"] / stats["sum"] * 100).round(2)
+                )
 
-                    fig.update_layout(yaxis={"categoryorder": "total ascending"})
-
-                else:
-                    fig = go.Figure()
-
-                if graph_type in ["box", "fiolin"]:
-                    fig.add_scatter(
-                        x=[variabel] * len(top5_df),
-                        y=top5_df["verdi"],
-                        mode="markers",
-                        marker=dict(
-                            size=13,
-                            color="#00CC96",
-                            symbol="diamond",
-                            line=dict(width=1, color="white"),
-                        ),
-                        name="De fem største",
-                        hovertext=top5_df["ident"],
-                        hoverinfo="text+y",
-                        customdata=top5_df[["ident"]].values,
-                    )
-                return fig
+                fig = px.bar(
+                    agg_df,
+                    x="verdi",
+                    y="ident",
+                    orientation="h",
+                    title=f"🥇 Bidragsanalyse - % av total verdi ({variabel})",
+                    template="plotly_dark",
+                    labels={"verdi": "%"},
+                    custom_data=["ident"],
+                )
+
+                fig.update_layout(yaxis={"categoryorder": "total ascending"})
+
+            else:
+                fig = go.Figure()
+
+            if graph_type in ["box", "fiolin"]:
+                fig.add_scatter(
+                    x=[variabel] * len(top5_df),
+                    y=top5_df["verdi"],
+                    mode="markers",
+                    marker=dict(
+                        size=13,
+                        color="#00CC96",
+                        symbol="diamond",
+                        line=dict(width=1, color="white"),
+                    ),
+                    name="De fem største",
+                    hovertext=top5_df["ident"],
+                    hoverinfo="text+y",
+                    customdata=top5_df[["ident"]].values,
+                )
+            staleness = replica_staleness_text(["skjemamottak", self.main_table_name])
+            if staleness:
+                fig.add_annotation(
+                    text=staleness,
+                    xref="paper",
+                    yref="paper",
+                    x=0,
+                    y=-0.1,
+                    showarrow=False,
+                )
+            return fig
 
         @callback(  # type: ignore[misc]
             Output("var-ident", "value", allow_duplicate=True),
@@ -7,6 +7,7 @@ from typing import Any
 import dash_ag_grid as dag
 import dash_bootstrap_components as dbc
 import ibis
+from dash import Patch
 from dash import callback
 from dash import callback_context as ctx
 from dash import html
@@ -20,10 +21,12 @@ from eimerdb import EimerDBInstance
 from ..setup.variableselector import VariableSelector
 from ..utils import TabImplementation
 from ..utils import WindowImplementation
+from ..utils.alert_handler import add_alerts
 from ..utils.alert_handler import create_alert
 from ..utils.config_tools.connection import _get_connection_object
 from ..utils.config_tools.connection import get_connection
 from ..utils.module_validation import module_validator
+from ..utils.prefetch import UnitPrefetcher
 
 logger = logging.getLogger(__name__)
 
@@ -180,21 +183,17 @@ class ControlView(ABC):
         @callback(
             Output("alert_store", "data", allow_duplicate=True),
             Input(f"{self.module_number}-kontroll-run-button", "n_clicks"),
-            State("alert_store", "data"),
             prevent_initial_call=True,
         )
-        def alert_user_of_controls(
-            click: int | None, alert_store: list[dict[str, Any]]
-        ) -> list[dict[str, Any]]:
-            return [
+        def alert_user_of_controls(click: int | None) -> Patch:
+            return add_alerts(
                 create_alert(
                     "Kjører kontroller, dette kan ta litt tid, du får beskjed når den er ferdig. Ikke klikk på knappen igjen.",
                     "info",
                     ephemeral=True,
                     duration=10,
-                ),
-                *alert_store,
-            ]
+                )
+            )
 
         @callback(
             Output(f"{self.module_number}-kontroller", "rowData"),
@@ -203,7 +202,6 @@ class ControlView(ABC):
             Input("var-altinnskjema", "value"),
             Input(f"{self.module_number}-kontroll-refresh", "n_clicks"),
             Input(f"{self.module_number}-kontroll-run-button", "n_clicks"),
-            State("alert_store", "data"),
             *self.variableselector.get_all_inputs(),
             prevent_initial_call=True,
         )
@@ -211,7 +209,6 @@ class ControlView(ABC):
             skjema: str,
             refresh: int | None,
             rerun: int | None,
-            alert_store: list[dict[str, Any]],
             *args: Any,
         ):
             logger.debug(
@@ -243,15 +240,12 @@ class ControlView(ABC):
                         == "No control methods found. Remember to use the 'register_control' decorator function."
                     ):
                         logger.info("No control methods found.")
-                        alert_store = [
-                            create_alert(
-                                f"Ingen kontroller funnet i {control_class_instance.__class__.__name__}",
-                                "warning",
-                                ephemeral=True,
-                            ),
-                            *alert_store,
-                        ]
-                        return [], [], alert_store
+                        alert = create_alert(
+                            f"Ingen kontroller funnet i {control_class_instance.__class__.__name__}",
+                            "warning",
+                            ephemeral=True,
+                        )
+                        return [], [], add_alerts(alert)
                     else:
                         raise e
             else:
@@ -325,24 +319,18 @@ class ControlView(ABC):
                 columns[0]["checkboxSelection"] = True
                 columns[0]["headerCheckboxSelection"] = True
                 if ctx.triggered_id == f"{self.module_number}-kontroll-run-button":
-                    alert_store = [
-                        create_alert(
-                            f"Kontrollkjøring ferdig for kontroller i {control_class_instance.__class__.__name__}",
-                            "info",
-                            ephemeral=True,
-                        ),
-                        *alert_store,
-                    ]
+                    alert = create_alert(
+                        f"Kontrollkjøring ferdig for kontroller i {control_class_instance.__class__.__name__}",
+                        "info",
+                        ephemeral=True,
+                    )
                 else:
-                    alert_store = [
-                        create_alert(
-                            "Kontrollvisning oppdatert.",
-                            "info",
-                            ephemeral=True,
-                        ),
-                        *alert_store,
-                    ]
-                return result.to_dict("records"), columns, alert_store
+                    alert = create_alert(
+                        "Kontrollvisning oppdatert.",
+                        "info",
+                        ephemeral=True,
+                    )
+                return result.to_dict("records"), columns, add_alerts(alert)
 
         @callback(  # type: ignore[misc]
             Output(f"{self.module_number}-kontrollutslag", "rowData"),
@@ -416,10 +404,14 @@ class ControlView(ABC):
                 for output in self.outputs
             ],
             Input(f"{self.module_number}-kontrollutslag", "selectedRows"),
+            State(f"{self.module_number}-kontrollutslag", "virtualRowData"),
+            VariableSelector([], self.variableselector.inputs).get_all_states(),
             prevent_initial_call="initial_duplicate",
         )
         def output_to_varselector(
             selected_row: list[dict[Any, Any]],
+            rows: list[dict[Any, Any]] | None,
+            *time_unit_values: Any,
         ) -> Any | tuple[Any]:
             logger.debug(f"Selected row:\n{selected_row}")
             if selected_row is None:
@@ -429,6 +421,13 @@ class ControlView(ABC):
                 raise ValueError(
                     "Too many rows selected, logic won't work with more than one row."
                 )
+            if selected_row:
+                # The user works down this list, warm the caches for the next units.
+                UnitPrefetcher.prefetch(
+                    rows,
+                    current=selected_row[0],
+                    **dict(zip(self.time_units, time_unit_values, strict=False)),
+                )
             if len(self.outputs) == 1:
                 return selected_row[0][self.outputs[0]]
             elif len(self.outputs) > 1:
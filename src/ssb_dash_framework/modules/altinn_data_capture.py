@@ -1,10 +1,16 @@
 import logging
+import threading
+import time
 from abc import ABC
 from abc import abstractmethod
+from collections.abc import Hashable
+from dataclasses import dataclass
+from dataclasses import field
 from typing import Any
 from typing import ClassVar
 
 import dash_bootstrap_components as dbc
+import pandas as pd
 import plotly.express as px
 from dash import callback
 from dash import dcc
@@ -19,11 +25,82 @@ from ssb_dash_framework.utils import conn_is_ibis
 from ..setup.variableselector import VariableSelector
 from ..utils import TabImplementation
 from ..utils import WindowImplementation
+from ..utils.core_query_functions import ibis_filter_with_dict
 from ..utils.module_validation import module_validator
+from ..utils.unit_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class _CaptureIndex:
+    """Daily counts of received forms for one period and skjema.
+
+    Built from every row in skjemamottak once, and after that only updated with rows
+    received since the latest dato_mottatt seen, the high-watermark.
+
+    Attributes:
+        daily: Number of received forms per day.
+        latest: The last day each ident sent a form.
+        antall_tot: Number of units in the period.
+        watermark: The latest dato_mottatt seen.
+        seen_at_watermark: The (ident, refnr) of the rows received at the
+            watermark, so they are not counted again by the next update.
+        checked_at: When the index was last updated, from time.monotonic().
+    """
+
+    daily: pd.Series = field(default_factory=lambda: pd.Series(dtype="int64"))
+    latest: dict[str, pd.Timestamp] = field(default_factory=dict)
+    antall_tot: int = 0
+    watermark: pd.Timestamp | None = None
+    seen_at_watermark: set[tuple[str, str]] = field(default_factory=set)
+    checked_at: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add(self, rows: pd.DataFrame) -> None:
+        """Adds received forms to the counts, skipping rows seen before."""
+        rows = rows.assign(
+            dato_mottatt=pd.to_datetime(rows["dato_mottatt"]),
+            key=list(
+                zip(rows["ident"].astype(str), rows["refnr"].astype(str), strict=True)
+            ),
+        ).dropna(subset=["dato_mottatt"])
+        rows = rows[~rows["key"].isin(self.seen_at_watermark)]
+        if rows.empty:
+            return
+        days = rows["dato_mottatt"].dt.normalize()
+        self.daily = (
+            self.daily.add(days.value_counts(), fill_value=0)
+            .astype("int64")
+            .sort_index()
+        )
+        # Replaced instead of changed, so readers outside the lock see whole updates.
+        latest = dict(self.latest)
+        for ident, day in days.groupby(rows["ident"].astype(str)).max().items():
+            if ident not in latest or day > latest[ident]:
+                latest[ident] = day
+        self.latest = latest
+        watermark = rows["dato_mottatt"].max()
+        at_watermark = set(rows.loc[rows["dato_mottatt"] == watermark, "key"])
+        if self.watermark is not None and watermark == self.watermark:
+            self.seen_at_watermark |= at_watermark
+        else:
+            self.seen_at_watermark = at_watermark
+        self.watermark = watermark
+
+    def cumulative(self) -> pd.DataFrame:
+        """Returns the number of units per day counted on the last day they sent a form, and the running total."""
+        df = (
+            pd.Series(self.latest, dtype="datetime64[ns]")
+            .value_counts()
+            .sort_index()
+            .rename_axis("dato_mottatt")
+            .reset_index(name="antall")
+        )
+        df["kumulativt_antall"] = df["antall"].cumsum()
+        return df
+
+
 class AltinnDataCapture(ABC):
     """Provides a layout and functionality for a modal that offers a graphical overview of the data capture from altinn3.
 
@@ -33,8 +110,15 @@ class AltinnDataCapture(ABC):
     """
 
     implemented_database_types: ClassVar[list[str]] = ["altinn_default"]
+    refresh_interval: ClassVar[float] = 30.0
+    """Seconds between each check for newly received forms."""
 
     _id_number: int = 0
+    # Full rebuilds every hour pick up forms that are changed or removed.
+    _capture_indexes: ClassVar[TTLCache[_CaptureIndex]] = TTLCache(
+        max_size=64, ttl=3600.0
+    )
+    _skjemas: ClassVar[TTLCache[list[str]]] = TTLCache(max_size=64, ttl=600.0)
 
     def __init__(
         self,
@@ -191,6 +275,116 @@ class AltinnDataCapture(ABC):
         """
         pass
 
+    def _partition_select(self, args: tuple[Any, ...]) -> dict[str, list[Any]]:
+        return {
+            column: [value]
+            for column, value in zip(self.time_units, args, strict=False)
+        }
+
+    def _index_key(self, *parts: Any) -> Hashable:
+        return (id(self.database), *parts)
+
+    def get_skjemas(self, *args: Any) -> list[str]:
+        """Returns the skjemas in enheter for the period, cached for a while.
+
+        Args:
+            *args: The values of the time units.
+
+        Returns:
+            The distinct skjemas, sorted.
+        """
+
+        def load() -> list[str]:
+            partition_select = self._partition_select(args)
+            if conn_is_ibis(self.database):
+                df = (
+                    self.database.table("enheter")
+                    .filter(ibis_filter_with_dict(partition_select))
+                    .select("skjema")
+                    .distinct()
+                    .to_pandas()
+                )
+            else:
+                df = self.database.query(
+                    "SELECT DISTINCT skjema FROM enheter",
+                    partition_select=partition_select,
+                )
+            skjemas = df["skjema"].dropna().str.split(",").explode().str.strip()
+            return sorted(set(skjemas) - {""})
+
+        return AltinnDataCapture._skjemas.get_or_load(
+            self._index_key("skjemas", args), load
+        )
+
+    def _get_received(
+        self,
+        partition_select: dict[str, list[Any]],
+        since: pd.Timestamp | None,
+    ) -> pd.DataFrame:
+        """Reads ident, refnr and dato_mottatt for forms received at or after since."""
+        if conn_is_ibis(self.database):
+            t = self.database.table("skjemamottak").filter(
+                ibis_filter_with_dict(partition_select)
+            )
+            t = t.filter(t.dato_mottatt.notnull())
+            if since is not None:
+                t = t.filter(t.dato_mottatt.cast("timestamp") >= since.to_pydatetime())
+            return t.select("ident", "refnr", "dato_mottatt").to_pandas()
+        since_filter = f"AND dato_mottatt >= '{since.isoformat()}'" if since else ""
+        return self.database.query(
+            f"""SELECT ident, refnr, dato_mottatt
+            FROM skjemamottak
+            WHERE dato_mottatt IS NOT NULL {since_filter}""",
+            partition_select=partition_select,
+        )
+
+    def _count_units(self, partition_select: dict[str, list[Any]]) -> int:
+        if conn_is_ibis(self.database):
+            return int(
+                self.database.table("enheter")
+                .filter(ibis_filter_with_dict(partition_select))
+                .count()
+                .to_pandas()
+            )
+        df = self.database.query(
+            "SELECT COUNT(*) AS antall_tot FROM enheter",
+            partition_select=partition_select,
+        )
+        return int(df["antall_tot"].iloc[0])
+
+    def get_capture_index(self, skjema: str | None, *args: Any) -> _CaptureIndex:
+        """Returns the daily counts of received forms, updated with new forms if it is time to check.
+
+        The first call for a period and skjema reads every received form. Later calls
+        only read forms received since the last one seen, at most once every
+        `refresh_interval` seconds.
+
+        Args:
+            skjema: The skjema to count, or None for all.
+            *args: The values of the time units.
+
+        Returns:
+            The counts for the period and skjema.
+        """
+        index = AltinnDataCapture._capture_indexes.get_or_load(
+            self._index_key("mottak", skjema, args), _CaptureIndex
+        )
+        with index.lock:
+            now = time.monotonic()
+            if index.watermark is not None and (
+                now - index.checked_at < AltinnDataCapture.refresh_interval
+            ):
+                return index
+            partition_select = self._partition_select(args)
+            if index.watermark is None:
+                index.antall_tot = self._count_units(partition_select)
+            if skjema:
+                partition_select["skjema"] = [skjema]
+            index.add(self._get_received(partition_select, index.watermark))
+            index.checked_at = now
+            logger.debug(f"Capture index for {skjema} {args} is at {index.watermark}")
+        return index
+
     def module_callbacks(self) -> None:
         """Defines the callbacks for the AltinnDataCapture module."""
         dynamic_states = [
@@ -214,15 +408,7 @@ class AltinnDataCapture(ABC):
             logger.debug(
                 "Args:\n" + "\n".join([f"arg{i}: {arg}" for i, arg in enumerate(args)])
             )
-            df = self.database.query(
-                "SELECT DISTINCT skjema FROM enheter",
-                partition_select={
-                    column: [value]
-                    for column, value in zip(self.time_units, args, strict=False)
-                },
-            )
-            all_skjemas = df["skjema"].dropna().str.split(",").sum()
-            distinct_skjemas = list(set(s.strip() for s in all_skjemas))
+            distinct_skjemas = self.get_skjemas(*args)
             default_value = distinct_skjemas[0]
             skjema_options = [
                 {"label": skjema, "value": skjema} for skjema in distinct_skjemas
@@ -245,30 +431,9 @@ class AltinnDataCapture(ABC):
                 f"skjema: {skjema}\n"
                 "\n".join([f"arg{i}: {arg}" for i, arg in enumerate(args)])
             )
-            partition_select = (
-                {
-                    column: [value]
-                    for column, value in zip(
-                        [skjema, *self.time_units], [skjema, *args], strict=False
-                    )
-                }
-                if skjema
-                else {
-                    column: [value]
-                    for column, value in zip(self.time_units, args, strict=False)
-                }
-            )
+            index = self.get_capture_index(skjema, *args)
             if graph_option == "antall":
-                df = self.database.query(
-                    """SELECT dato_mottatt, 1 AS antall
-                    FROM skjemamottak
-                    WHERE dato_mottatt is not NULL""",
-                    partition_select=partition_select,
-                )
-
-                df = (
-                    df.groupby(df["dato_mottatt"].dt.date)["antall"].sum().reset_index()
-                )
+                df = index.daily.rename_axis("dato_mottatt").reset_index(name="antall")
 
                 fig = px.bar(
                     data_frame=df,
@@ -279,35 +444,8 @@ class AltinnDataCapture(ABC):
                 return fig
 
             elif graph_option == "kumulativ":
-                df = self.database.query(
-                    """SELECT ranked.dato_mottatt,
-                        COUNT(DISTINCT ranked.ident) AS antall,
-                        subquery.antall_tot
-                    FROM (
-                        SELECT ident, dato_mottatt,
-                               ROW_NUMBER() OVER (
-                                   PARTITION BY ident ORDER BY dato_mottatt DESC
-                                   ) AS rn
-                        FROM skjemamottak
-                        WHERE dato_mottatt IS NOT NULL
-                    ) AS ranked
-                    JOIN (
-                        SELECT COUNT(*) AS antall_tot
-                        FROM enheter
-                    ) AS subquery ON true
-                    WHERE ranked.rn = 1
-                    GROUP BY ranked.dato_mottatt, subquery.antall_tot
-                    ORDER BY ranked.dato_mottatt;""",
-                    partition_select={
-                        "skjemamottak": partition_select,
-                        "enheter": {
-                            x: y for x, y in partition_select.items() if x != "skjema"
-                        },
-                    },
-                )
-
-                df["kumulativt_antall"] = df["antall"].cumsum()
-                antall_tot = df["antall_tot"].iloc[0]
+                df = index.cumulative()
+                antall_tot = index.antall_tot
                 df["percentage_filled"] = (df["kumulativt_antall"] / antall_tot) * 100
                 x_last = df["dato_mottatt"].iloc[-1]
                 y_last = df["kumulativt_antall"].iloc[-1]
@@ -3,6 +3,7 @@ from typing import Any
 
 import dash_ag_grid as dag
 import dash_bootstrap_components as dbc
+from dash import Patch
 from dash import callback
 from dash import dcc
 from dash import html
@@ -15,8 +16,10 @@ from ibis import _
 
 from ssb_dash_framework.utils import conn_is_ibis
 
+from ...utils import add_alerts
 from ...utils import create_alert
 from ...utils import get_connection
+from ...utils.unit_cache import evict_unit_table
 
 logger = logging.getLogger(__name__)
 
@@ -176,7 +179,6 @@ class AltinnEditorComment:
             State("altinnedit-kommentarmodal-table1", "selectedRows"),
             State("skjemadata-kommentarmodal-aar-kommentar", "value"),
             State("altinnedit-skjemaer", "value"),
-            State("alert_store", "data"),
             prevent_initial_call=True,
         )
         def update_kommentar(
@@ -184,15 +186,13 @@ class AltinnEditorComment:
             selected_row: list[dict[str, int | float | str]],
             kommentar: str,
             skjema: str,
-            alert_store: list[dict[str, Any]],
-        ) -> list[dict[str, Any]]:
+        ) -> Patch:
             logger.debug(
                 f"Args:\n"
                 f"n_clicks: {n_clicks}\n"
                 f"selected_row: {selected_row}\n"
                 f"kommentar: {kommentar}\n"
                 f"skjema: {skjema}\n"
-                f"alert_store: {alert_store}"
             )
             if n_clicks and n_clicks > 0 and selected_row:
                 if conn_is_ibis(self.conn):  # TODO make update logic
@@ -208,24 +208,19 @@ class AltinnEditorComment:
                             """,
                             partition_select={"skjema": [skjema]},
                         )
-                        alert_store = [
-                            create_alert(
-                                "Kommentarfeltet er oppdatert!",
-                                "success",
-                                ephemeral=True,
-                            ),
-                            *alert_store,
-                        ]
+                        evict_unit_table("skjemamottak")
+                        alert = create_alert(
+                            "Kommentarfeltet er oppdatert!",
+                            "success",
+                            ephemeral=True,
+                        )
                     except Exception as e:
-                        alert_store = [
-                            create_alert(
-                                f"Oppdatering av kommentarfeltet feilet. {str(e)[:60]}",
-                                "warning",
-                                ephemeral=True,
-                            ),
-                            *alert_store,
-                        ]
-                    return alert_store
+                        alert = create_alert(
+                            f"Oppdatering av kommentarfeltet feilet. {str(e)[:60]}",
+                            "warning",
+                            ephemeral=True,
+                        )
+                    return add_alerts(alert)
                 else:
                     raise TypeError("Connection object is invalid type.")
             logger.debug("Raised PreventUpdate")
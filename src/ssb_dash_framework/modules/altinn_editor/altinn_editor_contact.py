@@ -8,15 +8,20 @@ from dash.dependencies import Input
 from dash.dependencies import Output
 from dash.dependencies import State
 from dash.exceptions import PreventUpdate
-from ibis import _
 
 from ...setup.variableselector import VariableSelector
-from ...utils.config_tools.connection import get_connection
 from ...utils.core_query_functions import create_filter_dict
+from ...utils.prefetch import UnitPrefetcher
+from ...utils.unit_cache import get_unit_table
 
 logger = logging.getLogger(__name__)
 
 
+def _prefetch_kontaktinfo(unit: dict[str, Any]) -> None:
+    if unit.get("refnr") is not None:
+        get_unit_table("kontaktinfo", ttl=UnitPrefetcher.ttl, refnr=unit["refnr"])
+
+
 class AltinnEditorContact:
     """Module for displaying contact information in the Altinn Editor."""
 
@@ -45,6 +50,7 @@ class AltinnEditorContact:
         ]
         self.module_layout = self._create_layout()
         self.module_callbacks()
+        UnitPrefetcher.register_loader("kontaktinfo", _prefetch_kontaktinfo)
 
     def offcanvas_contact(self) -> html.Div:
         """Retuns an offcanvas component containing a table with contact information."""
@@ -189,30 +195,21 @@ class AltinnEditorContact:
             )
             filter_dict = create_filter_dict(self.time_units, args)
 
-            with get_connection(  # necessary_tables and partition_select are used for eimerdb connection.
-                necessary_tables=["kontaktinfo"],
-            ) as conn:
-
-                t = conn.table("kontaktinfo")
-                df_skjemainfo = (
-                    t.filter(_.refnr == refnr)
-                    .select(
-                        [
-                            "kontaktperson",
-                            "epost",
-                            "telefon",
-                            "kommentar_kontaktinfo",
-                            "kommentar_krevende",
-                        ]
-                    )
-                    .to_pandas()
-                )
-
-                if df_skjemainfo.empty:
-                    logger.info("Kontaktinfo table for ")
-                kontaktperson = df_skjemainfo["kontaktperson"][0]
-                epost = df_skjemainfo["epost"][0]
-                telefon = df_skjemainfo["telefon"][0]
-                kommentar1 = df_skjemainfo["kommentar_kontaktinfo"][0]
-                kommentar2 = df_skjemainfo["kommentar_krevende"][0]
-                return kontaktperson, epost, telefon, kommentar1, kommentar2
+            df_skjemainfo = get_unit_table("kontaktinfo", refnr=refnr)[
+                [
+                    "kontaktperson",
+                    "epost",
+                    "telefon",
+                    "kommentar_kontaktinfo",
+                    "kommentar_krevende",
+                ]
+            ].reset_index(drop=True)
+
+            if df_skjemainfo.empty:
+                logger.info("Kontaktinfo table for ")
+            kontaktperson = df_skjemainfo["kontaktperson"][0]
+            epost = df_skjemainfo["epost"][0]
+            telefon = df_skjemainfo["telefon"][0]
+            kommentar1 = df_skjemainfo["kommentar_kontaktinfo"][0]
+            kommentar2 = df_skjemainfo["kommentar_krevende"][0]
+            return kontaktperson, epost, telefon, kommentar1, kommentar2
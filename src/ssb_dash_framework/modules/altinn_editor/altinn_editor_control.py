@@ -3,20 +3,44 @@ from typing import Any
 
 import dash_ag_grid as dag
 import dash_bootstrap_components as dbc
+import pandas as pd
 from dash import callback
 from dash import html
 from dash.dependencies import Input
 from dash.dependencies import Output
 from dash.dependencies import State
 from dash.exceptions import PreventUpdate
-from ibis import _
 
 from ...setup.variableselector import VariableSelector
-from ...utils.config_tools.connection import get_connection
+from ...utils.prefetch import UnitPrefetcher
+from ...utils.unit_cache import get_unit_table
 
 logger = logging.getLogger(__name__)
 
 
+def get_kontrollutslag(refnr: str, ttl: float | None = None) -> pd.DataFrame:
+    """Returns the failed controls for a form, with their descriptions.
+
+    Args:
+        refnr: The refnr of the form.
+        ttl: Seconds to keep the rows if they are loaded by this call.
+
+    Returns:
+        A DataFrame with the columns 'kontrollid', 'beskrivelse' and 'utslag'.
+    """
+    utslag = get_unit_table("kontrollutslag", ttl=ttl, refnr=refnr)
+    utslag = utslag.loc[utslag["utslag"].eq(True), ["kontrollid", "utslag"]]
+    kontroller = get_unit_table("kontroller", ttl=ttl)
+    return utslag.merge(
+        kontroller[["kontrollid", "beskrivelse"]], on="kontrollid", how="left"
+    )[["kontrollid", "beskrivelse", "utslag"]]
+
+
+def _prefetch_kontrollutslag(unit: dict[str, Any]) -> None:
+    if unit.get("refnr") is not None:
+        get_kontrollutslag(unit["refnr"], ttl=UnitPrefetcher.ttl)
+
+
 class AltinnEditorControl:
     """Module for viewing control results for the selected observation in the Altinn Editor."""
 
@@ -45,6 +69,7 @@ class AltinnEditorControl:
         ]
         self.module_layout = self._create_layout()
         self.module_callbacks()
+        UnitPrefetcher.register_loader("kontrollutslag", _prefetch_kontrollutslag)
 
     def _create_layout(self) -> html.Div:
         """Creates the layout for the Altinn Editor Control module."""
@@ -142,32 +167,20 @@ class AltinnEditorControl:
             ):
                 return None, None, None, "Se kontrollutslag"
 
-            with get_connection(
-                necessary_tables=["kontroller", "kontrollutslag"]
-            ) as conn:
-                try:
-                    k = conn.table("kontroller")
-                    u = conn.table("kontrollutslag")
-                    refnr = selected_row[0]["refnr"]
-                    df = (
-                        u.filter(_.refnr == refnr)
-                        .filter(_.utslag == True)
-                        .join(k, "kontrollid", how="left")
-                        .select("kontrollid", "beskrivelse", "utslag")
-                        .to_pandas()
-                    )
-
-                    columns = [{"headerName": col, "field": col} for col in df.columns]
-                    antall_utslag = len(df)
-
-                    if antall_utslag > 0:
-                        style = {"color": "#dc3545", "background-color": "#343a40"}
-                        button_text = f"Se kontrollutslag ({antall_utslag})"
-                    else:
-                        style = None
-                        button_text = "Se kontrollutslag"
-
-                    return df.to_dict("records"), columns, style, button_text
-                except Exception as e:
-                    logger.error(f"Error in kontrollutslagstabell: {e}", exc_info=True)
-                    return None, None, None, "Se kontrollutslag"
+            try:
+                df = get_kontrollutslag(selected_row[0]["refnr"])
+
+                columns = [{"headerName": col, "field": col} for col in df.columns]
+                antall_utslag = len(df)
+
+                if antall_utslag > 0:
+                    style = {"color": "#dc3545", "background-color": "#343a40"}
+                    button_text = f"Se kontrollutslag ({antall_utslag})"
+                else:
+                    style = None
+                    button_text = "Se kontrollutslag"
+
+                return df.to_dict("records"), columns, style, button_text
+            except Exception as e:
+                logger.error(f"Error in kontrollutslagstabell: {e}", exc_info=True)
+                return None, None, None, "Se kontrollutslag"
@@ -2,6 +2,7 @@ import logging
 from typing import Any
 
 import dash_ag_grid as dag
+from dash import Patch
 from dash import callback
 from dash import html
 from dash.dependencies import Input
@@ -16,14 +17,47 @@ from ssb_dash_framework.utils import create_filter_dict
 from ssb_dash_framework.utils import ibis_filter_with_dict
 
 from ...setup.variableselector import VariableSelector
+from ...utils.alert_handler import add_alerts
 from ...utils.alert_handler import create_alert
 from ...utils.config_tools.connection import _get_connection_object
 from ...utils.config_tools.connection import get_connection
 from ...utils.eimerdb_helpers import create_partition_select
+from ...utils.skjema_metadata import _VALIDATORS
+from ...utils.skjema_metadata import check_datatype
+from ...utils.skjema_metadata import get_datatypes
+from ...utils.unit_cache import evict_unit_table
 
 logger = logging.getLogger(__name__)
 
 
+def _datatype_alert(
+    conn: Any, data: dict[str, Any], variable: str, value: Any
+) -> dict[str, Any] | None:
+    """Returns a warning if value does not fit the datatype of variable, else None.
+
+    Uses the cached datatypes of the year of the edited row, so no query is run
+    once they are loaded. Datatypes without a validator are logged and let through.
+    """
+    datatype = get_datatypes(conn, data.get("aar")).get(variable)
+    if datatype and datatype not in _VALIDATORS:
+        logger.warning(f"Unknown datatype '{datatype}' for variable '{variable}'")
+        return None
+    expected = check_datatype(datatype, variable, value)
+    if expected is None:
+        return None
+    if expected == "float":
+        message = (
+            f"Heltallsfelt kan ikke inneholde komma eller punktum (fikk '{value}')."
+        )
+    else:
+        message = f"Datatypen skal være {expected}."
+    return create_alert(
+        f"Feilet oppdatering av {variable} til '{value}': {message}",
+        "warning",
+        ephemeral=True,
+    )
+
+
 class AltinnEditorPrimaryTable:
     """Module creating the primary editing table for the Altinn Editor.
 
@@ -310,7 +344,6 @@ class AltinnEditorPrimaryTable:
             Input("altinnedit-table-skjemadata", "cellValueChanged"),
             State("altinnedit-option1", "value"),
             State("altinnedit-skjemaer", "value"),
-            State("alert_store", "data"),
             self.variableselector.get_all_states(),
             prevent_initial_call=True,
         )
@@ -318,15 +351,13 @@ class AltinnEditorPrimaryTable:
             edited: list[dict[str, dict[str, Any] | Any]],
             tabell: str,
             skjema: str,
-            alert_store: list[dict[str, Any]],
             *args: Any,
-        ) -> list[dict[str, Any]]:
+        ) -> Patch:
             logger.debug(
                 f"Args:\n"
                 f"edited: {edited}\n"
                 f"tabell: {tabell}\n"
                 f"skjema: {skjema}\n"
-                f"alert_store: {alert_store}\n"
                 f"args: {args}"
             )
             connection_object = _get_connection_object()
@@ -348,17 +379,19 @@ class AltinnEditorPrimaryTable:
                     if "variabel" in columns and "verdi" in columns:
                         # long format
                         if edited_column != "verdi":
-                            alert_store = [
-                                create_alert(
-                                    f"Kolonnen {edited_column} kan ikke editeres!",
-                                    "warning",
-                                    ephemeral=True,
-                                ),
-                                *alert_store,
-                            ]
-                            return alert_store
+                            alert = create_alert(
+                                f"Kolonnen {edited_column} kan ikke editeres!",
+                                "warning",
+                                ephemeral=True,
+                            )
+                            return add_alerts(alert)
+                        variable = edited[0]["data"]["variabel"]
                         try:
-                            variable = edited[0]["data"]["variabel"]
+                            alert = _datatype_alert(
+                                conn, edited[0]["data"], variable, value
+                            )
+                            if alert:
+                                return add_alerts(alert)
                             query = f"""
                                 UPDATE {tabell}
                                 SET verdi = '{value}'
@@ -366,45 +399,39 @@ class AltinnEditorPrimaryTable:
                             """
                             result = conn.raw_sql(query)
                             if result.rowcount == 0:
-                                alert_store = [
-                                    create_alert(
-                                        f"Oppdateringa gikk ikke gjennom (ingen rader påvirket).",
-                                        "warning",
-                                        ephemeral=True,
-                                    ),
-                                    *alert_store,
-                                ]
-                            else:
-                                alert_store = [
-                                    create_alert(
-                                        f"ident: {ident}, variabel: {variable} er oppdatert fra {old_value} til {value}!",
-                                        "success",
-                                        ephemeral=True,
-                                    ),
-                                    *alert_store,
-                                ]
-                        except Exception as e:
-                            alert_store = [
-                                create_alert(
-                                    f"Oppdateringa feilet: {str(e)[:120]}",
+                                alert = create_alert(
+                                    f"Oppdateringa gikk ikke gjennom (ingen rader påvirket).",
                                     "warning",
                                     ephemeral=True,
-                                ),
-                                *alert_store,
-                            ]
+                                )
+                            else:
+                                evict_unit_table(tabell)
+                                alert = create_alert(
+                                    f"ident: {ident}, variabel: {variable} er oppdatert fra {old_value} til {value}!",
+                                    "success",
+                                    ephemeral=True,
+                                )
+                        except Exception as e:
+                            alert = create_alert(
+                                f"Oppdateringa feilet: {str(e)[:120]}",
+                                "warning",
+                                ephemeral=True,
+                            )
                     else:
                         # wide format
                         if edited_column in ILLEGAL_COLUMNS:
-                            alert_store = [
-                                create_alert(
-                                    f"Kolonnen {edited_column} kan ikke editeres!",
-                                    "warning",
-                                    ephemeral=True,
-                                ),
-                                *alert_store,
-                            ]
-                            return alert_store
+                            alert = create_alert(
+                                f"Kolonnen {edited_column} kan ikke editeres!",
+                                "warning",
+                                ephemeral=True,
+                            )
+                            return add_alerts(alert)
                         try:
+                            alert = _datatype_alert(
+                                conn, edited[0]["data"], edited_column, value
+                            )
+                            if alert:
+                                return add_alerts(alert)
                             query = f"""
                                 UPDATE {tabell}
                                 SET {edited_column} = '{value}'
@@ -412,33 +439,25 @@ class AltinnEditorPrimaryTable:
                             """
                             result = conn.raw_sql(query)
                             if result.rowcount == 0:
-                                alert_store = [
-                                    create_alert(
-                                        f"Oppdateringa gikk ikke gjennom (ingen rader påvirket).",
-                                        "warning",
-                                        ephemeral=True,
-                                    ),
-                                    *alert_store,
-                                ]
-                            else:
-                                alert_store = [
-                                    create_alert(
-                                        f"ident: {ident}, {edited_column} er oppdatert fra {old_value} til {value}!",
-                                        "success",
-                                        ephemeral=True,
-                                    ),
-                                    *alert_store,
-                                ]
-                        except Exception as e:
-                            alert_store = [
-                                create_alert(
-                                    f"Oppdateringa feilet. {str(e)[:120]}",
+                                alert = create_alert(
+                                    f"Oppdateringa gikk ikke gjennom (ingen rader påvirket).",
                                     "warning",
                                     ephemeral=True,
-                                ),
-                                *alert_store,
-                            ]
-                    return alert_store
+                                )
+                            else:
+                                evict_unit_table(tabell)
+                                alert = create_alert(
+                                    f"ident: {ident}, {edited_column} er oppdatert fra {old_value} til {value}!",
+                                    "success",
+                                    ephemeral=True,
+                                )
+                        except Exception as e:
+                            alert = create_alert(
+                                f"Oppdateringa feilet. {str(e)[:120]}",
+                                "warning",
+                                ephemeral=True,
+                            )
+                    return add_alerts(alert)
 
             elif isinstance(connection_object, EimerDBInstance):
                 partition_args = dict(zip(self.time_units, args, strict=False))
@@ -481,45 +500,34 @@ class AltinnEditorPrimaryTable:
                                 **partition_args,
                             ),
                         )
+                        evict_unit_table(tabell)
                         if long_format:
                             variabel = edited[0]["data"]["variabel"]
-                            alert_store = [
-                                create_alert(
-                                    f"ident: {ident}, variabel: {variabel} er oppdatert fra {old_value} til {new_value}!",
-                                    "success",
-                                    ephemeral=True,
-                                ),
-                                *alert_store,
-                            ]
+                            alert = create_alert(
+                                f"ident: {ident}, variabel: {variabel} er oppdatert fra {old_value} til {new_value}!",
+                                "success",
+                                ephemeral=True,
+                            )
                         else:
-                            alert_store = [
-                                create_alert(
-                                    f"ident: {ident}, {edited_column} er oppdatert fra {old_value} til {new_value}!",
-                                    "success",
-                                    ephemeral=True,
-                                ),
-                                *alert_store,
-                            ]
-                    except Exception as e:
-                        alert_store = [
-                            create_alert(
-                                f"Oppdateringa feilet. {str(e)[:60]}",
-                                "warning",
+                            alert = create_alert(
+                                f"ident: {ident}, {edited_column} er oppdatert fra {old_value} til {new_value}!",
+                                "success",
                                 ephemeral=True,
-                            ),
-                            *alert_store,
-                        ]
-                    return alert_store
-                else:
-                    alert_store = [
-                        create_alert(
-                            f"Kolonnen {edited_column} kan ikke editeres!",
+                            )
+                    except Exception as e:
+                        alert = create_alert(
+                            f"Oppdateringa feilet. {str(e)[:60]}",
                             "warning",
                             ephemeral=True,
-                        ),
-                        *alert_store,
-                    ]
-                    return alert_store
+                        )
+                    return add_alerts(alert)
+                else:
+                    alert = create_alert(
+                        f"Kolonnen {edited_column} kan ikke editeres!",
+                        "warning",
+                        ephemeral=True,
+                    )
+                    return add_alerts(alert)
             else:
                 raise TypeError(
                     f"Conection set by set_connection() is not a valid connection object. Is type: {type(connection_object)}"
@@ -3,6 +3,7 @@ from typing import Any
 
 import dash_ag_grid as dag
 import dash_bootstrap_components as dbc
+from dash import Patch
 from dash import callback
 from dash import dcc
 from dash import html
@@ -21,9 +22,12 @@ from eimerdb import EimerDBInstance
 
 from ...setup.variableselector import VariableSelector
 from ...utils import _get_connection_object
+from ...utils import add_alerts
 from ...utils import create_alert
 from ...utils import get_connection
 from ...utils.eimerdb_helpers import create_partition_select
+from ...utils.prefetch import UnitPrefetcher
+from ...utils.unit_cache import evict_unit_table
 from .altinn_editor_utility import AltinnEditorStateTracker
 
 logger = logging.getLogger(__name__)
@@ -187,22 +191,19 @@ class AltinnEditorSubmittedForms:
             Output("alert_store", "data", allow_duplicate=True),
             Input("altinnedit-table-skjemaer", "cellValueChanged"),
             State("altinnedit-skjemaer", "value"),
-            State("alert_store", "data"),
             self.variableselector.get_all_states(),
             prevent_initial_call=True,
         )
         def set_skjema_to_edited(
             edited: list[dict[str, Any]],
             skjema: str,
-            alert_store: list[dict[str, Any]],
             *args: Any,
-        ) -> list[dict[str, Any]] | None:
+        ) -> Patch:
             logger.debug(
                 f"Args:\n"
                 f"edited: {edited}\n"
                 f"status: {status}\n"
                 f"skjema: {skjema}\n"
-                f"alert_store: {alert_store}\n"
                 f"args: {args}"
             )
             if edited is None or skjema is None or any(arg is None for arg in args):
@@ -239,25 +240,24 @@ class AltinnEditorSubmittedForms:
                             **partition_args,
                         ),
                     )
+                evict_unit_table("skjemamottak", refnr=refnr)
 
-                return [
+                return add_alerts(
                     create_alert(
                         f"Skjema {refnr} sin editeringsstatus er satt til {new_value}.",
                         "success",
                         ephemeral=True,
-                    ),
-                    *alert_store,
-                ]
+                    )
+                )
             except Exception as e:
                 logger.debug(e)
-                return [
+                return add_alerts(
                     create_alert(
                         "En feil skjedde under oppdatering av editeringsstatusen",
                         "danger",
                         ephemeral=True,
-                    ),
-                    *alert_store,
-                ]
+                    )
+                )
 
         @callback(  # type: ignore[misc]
             Output("altinnedit-table-skjemaer", "rowData"),
@@ -330,12 +330,26 @@ class AltinnEditorSubmittedForms:
         @callback(  # type: ignore[misc]
             Output("altinnedit-refnr", "value"),
             Input("altinnedit-table-skjemaer", "selectedRows"),
+            State("altinnedit-table-skjemaer", "virtualRowData"),
+            State("altinnedit-ident", "value"),
+            self.variableselector.get_all_states(),
         )
-        def selected_refnr(selected_row: list[dict[str, Any]]) -> str:
+        def selected_refnr(
+            selected_row: list[dict[str, Any]],
+            rows: list[dict[str, Any]] | None,
+            ident: str,
+            *args: Any,
+        ) -> str:
             logger.debug(f"Args:\nselected_row: {selected_row}")
             if not selected_row:
                 logger.debug("Raised PreventUpdate")
                 raise PreventUpdate
 
             refnr = selected_row[0]["refnr"]
+            UnitPrefetcher.prefetch(
+                rows,
+                current=selected_row[0],
+                ident=ident,
+                **dict(zip(self.variableselector.states, args, strict=False)),
+            )
             return str(refnr)
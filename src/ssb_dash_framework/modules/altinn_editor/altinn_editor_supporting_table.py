@@ -128,7 +128,9 @@ def add_year_diff_support_table(
     """Adds a table showing difference to previous year."""
 
     def year_diff_support_table_get_data_func(ident: str, year: str) -> pd.DataFrame:
-        with get_connection() as conn:
+        with get_connection(
+            read_only=True, necessary_tables=["skjemadata_hoved"]
+        ) as conn:
             try:
                 s = conn.table("skjemadata_hoved")
             except Exception:
@@ -3,22 +3,21 @@ from typing import Any
 
 import dash_ag_grid as dag
 import dash_bootstrap_components as dbc
+import pandas as pd
 from dash import callback
 from dash import html
 from dash.dependencies import Input
 from dash.dependencies import Output
 from dash.dependencies import State
 from dash.exceptions import PreventUpdate
-from ibis import _
 
 from ssb_dash_framework.utils import create_filter_dict
-from ssb_dash_framework.utils import get_connection
-from ssb_dash_framework.utils import ibis_filter_with_dict
 from eimerdb import EimerDBInstance
 
 from ...setup.variableselector import VariableSelector
 from ...utils.config_tools.connection import _get_connection_object
-from ...utils.config_tools.connection import get_connection
+from ...utils.prefetch import UnitPrefetcher
+from ...utils.unit_cache import get_unit_table
 
 logger = logging.getLogger(__name__)
 
@@ -54,6 +53,36 @@ class AltinnEditorUnitDetails:
         ]
         self.module_layout = self._create_layout()
         self.module_callbacks()
+        UnitPrefetcher.register_loader(
+            "enhetsinfo",
+            lambda unit: self.get_enhetsinfo(unit, ttl=UnitPrefetcher.ttl),
+        )
+
+    def get_enhetsinfo(
+        self, unit: dict[str, Any], ttl: float | None = None
+    ) -> pd.DataFrame | None:
+        """Returns the cached enhetsinfo rows for a unit.
+
+        Args:
+            unit: Dict with 'ident' and the time units.
+            ttl: Seconds to keep the rows if they are loaded by this call. Defaults to
+                the ttl of the helper-table cache.
+
+        Returns:
+            The rows, or None if the unit lacks ident or one of the time units.
+        """
+        values = [unit.get(time_unit) for time_unit in self.time_units]
+        if unit.get("ident") is None or any(value is None for value in values):
+            return None
+        if isinstance(_get_connection_object(), EimerDBInstance):
+            values = [int(value) for value in values]
+        filter_dict = create_filter_dict(self.time_units, values)
+        return get_unit_table(
+            "enhetsinfo",
+            ttl=ttl,
+            ident=unit["ident"],
+            **filter_dict,
+        )
 
     def unit_details_modal(self) -> dbc.Modal:
         """Returns a modal component containing a table with enhetsinfo."""
@@ -120,19 +149,12 @@ class AltinnEditorUnitDetails:
                 )
                 return None, None
             try:
-                if isinstance(_get_connection_object(), EimerDBInstance):
-                    args = tuple([int(x) for x in args])
-                filter_dict = create_filter_dict(self.time_units, args)
-                with get_connection(necessary_tables=["enhetsinfo"]) as conn:
-                    t = conn.table("enhetsinfo")
-                    df = (
-                        t.filter(_.ident == ident)
-                        .filter(ibis_filter_with_dict(filter_dict))
-                        .to_pandas()
-                    )
-                    df = df.drop(columns=["row_id", "id", "foretak"], errors="ignore")
-                    columns = [{"headerName": col, "field": col} for col in df.columns]
-                    return df.to_dict("records"), columns
+                df = self.get_enhetsinfo(
+                    {"ident": ident, **dict(zip(self.time_units, args, strict=False))}
+                )
+                df = df.drop(columns=["row_id", "id", "foretak"], errors="ignore")
+                columns = [{"headerName": col, "field": col} for col in df.columns]
+                return df.to_dict("records"), columns
 
             except Exception as e:
                 logger.error(f"Error in update_enhetsinfotabell: {e}", exc_info=True)
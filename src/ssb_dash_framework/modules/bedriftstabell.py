@@ -15,6 +15,7 @@ from dash import html
 from dash.exceptions import PreventUpdate
 
 from ..setup.variableselector import VariableSelector
+from ..utils.alert_handler import add_alerts
 from ..utils.alert_handler import create_alert
 from ..utils.core_query_functions import ibis_filter_with_dict
 from ..utils.functions import get_config_path
@@ -201,14 +202,13 @@ class Bedriftstabell(ABC):
         @callback(
             Output("alert_store", "data", allow_duplicate=True),
             Input(f"{self.module_number}-bedriftstabell-settings-save", "n_clicks"),
-            State("alert_store", "data"),
             State(f"{self.module_number}-bedriftstabell-columns-checklist", "value"),
             State(f"{self.module_number}-bedriftstabell-others-checklist", "value"),
             self.variableselector.get_state("altinnskjema"),
             prevent_initial_call=True,
         )
         def bedrift_save_settings(
-            click, alert_store, selected_columns, selected_options, skjemanummer
+            click, selected_columns, selected_options, skjemanummer
         ):
             if not click:
                 raise PreventUpdate
@@ -224,14 +224,13 @@ class Bedriftstabell(ABC):
                     f,
                     indent=4,
                 )
-            return [
+            return add_alerts(
                 create_alert(
                     f"Lagret innstillinger for {skjemanummer}.",
                     "info",
                     ephemeral=True,
-                ),
-                *alert_store,
-            ]
+                )
+            )
 
         @callback(
             Output(f"{self.module_number}-bedriftstabell", "rowData"),
@@ -8,14 +8,19 @@ import plotly.express as px
 import plotly.graph_objects as go
 from dash import Input
 from dash import Output
+from dash import Patch
+from dash import State
 from dash import callback
 from dash import dcc
 from dash import html
+from dash import no_update
 
 from ...setup.variableselector import VariableSelector
 from ...utils import TabImplementation
 from ...utils import WindowImplementation
+from ...utils import is_tab_or_window
 from ...utils.module_validation import module_validator
+from ...utils.unit_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +28,39 @@ logger.setLevel(logging.DEBUG)
 
 _DEFAULT_COLORSCALE = "YlGn"
 
+_GEOMETRY_FILES = {
+    "komm_nr": "N5000_kommune_flate_p{year}.parquet",
+    "fylke_nr": "N5000_fylke_flate_p{year}_v1.parquet",
+}
+# Reprojected and simplified geometries and their GeoJSON, by (map_type, year).
+_GEOMETRIES: TTLCache[tuple[gpd.GeoDataFrame, dict[str, Any]]] = TTLCache(
+    max_size=16, ttl=24 * 3600.0
+)
+
+
+def _get_geometry(
+    source: str, map_type: str, year: str, tolerance: float
+) -> tuple[gpd.GeoDataFrame, dict[str, Any]]:
+    """Returns the geometries for a map type and year, reading them only once.
+
+    The geometries are simplified in the crs of the file, keeping the borders shared
+    by neighbouring areas in the same place, and then reprojected to EPSG:4326.
+    """
+
+    def load() -> tuple[gpd.GeoDataFrame, dict[str, Any]]:
+        path = f"{source.rstrip('/')}/{year}/parquet/{_GEOMETRY_FILES[map_type].format(year=year)}"
+        logger.debug(f"Reading geometry from {path}")
+        shapes = gpd.read_parquet(path)[[map_type, "geometry"]]
+        if tolerance:
+            try:
+                shapes["geometry"] = shapes.geometry.simplify_coverage(tolerance)
+            except NotImplementedError:  # Needs shapely 2.1 and GEOS 3.12
+                shapes["geometry"] = shapes.geometry.simplify(tolerance)
+        shapes = shapes.to_crs(4326).set_index(map_type)
+        return shapes, shapes.__geo_interface__
+
+    return _GEOMETRIES.get_or_load((map_type, str(year), source, tolerance), load)
+
 
 def mapdisplay_default_clickdata(clickdata: dict[str, list[dict[str, Any]]]) -> str:
     """Default clickdata function. Returns the number for the clicked kommune / fylke."""
@@ -36,12 +74,21 @@ class MapDisplay:
     When supplied with a get_data_func that returns data grouped by a valid geography it creates a map figure with coloring showing the column 'value' on different geographical units.
     Important! If making a map for 'kommune', your variable needs to be named 'komm_nr' and for fylke it needs to be named 'fylke_nr'.
 
+    The geometry for each map type and year is read once, simplified and kept in
+    memory. The map figure is only sent in full when the map type or year changes,
+    later updates only send the new values.
+
     Note:
         You need read access to the bucket "areal-data-delt-kart-prod" in order to use this module as this is where it finds the shapefiles.
+        To use a local copy of the files instead, set `MapDisplay.geometry_source` to a directory with the same layout.
     """
 
     _id_number: ClassVar[int] = 0
     supported_map_types: ClassVar[list[str]] = ["kommune", "fylke"]
+    geometry_source: ClassVar[str] = (
+        "gs://ssb-areal-data-delt-kart-prod/visualisering_data/klargjorte-data"
+    )
+    simplify_tolerance: ClassVar[float] = 100.0  # In meters, 0 turns it off
 
     def __init__(
         self,
@@ -142,7 +189,10 @@ class MapDisplay:
             ) from e
 
     def get_data(self, *args: Any) -> None:
-        """Gets data for the map figure by using get_data_func."""
+        """Gets data for the map figure by using get_data_func.
+
+        Only the areas found in the geometry are kept.
+        """
         self.data = self.get_data_func(*args)
         if self.map_type == "komm_nr":
             required_columns = {"komm_nr", "value"}
@@ -153,23 +203,22 @@ class MapDisplay:
         missing = required_columns - set(self.data.columns)
         if missing:
             raise ValueError(f"Missing required columns in DataFrame: {missing}")
-        self.data = self.geoshape.merge(self.data).to_crs(4326).set_index(self.map_type)
+        self.data = self.data.set_index(self.map_type)
+        self.data = self.data[self.data.index.isin(self.geoshape.index)]
 
     def get_geoshape(self, year: str) -> None:
-        """Gets the parquet file with geometry from the shared bucket."""
-        if self.map_type == "komm_nr":
-            self.geoshape = gpd.read_parquet(
-                f"gs://ssb-areal-data-delt-kart-prod/visualisering_data/klargjorte-data/{year}/parquet/N5000_kommune_flate_p{year}.parquet"
-            )
-        if self.map_type == "fylke_nr":
-            self.geoshape = gpd.read_parquet(
-                f"gs://ssb-areal-data-delt-kart-prod/visualisering_data/klargjorte-data/{year}/parquet/N5000_fylke_flate_p{year}_v1.parquet"
-            )
+        """Gets the geometry for the year from the shared bucket, or from the cache if already read."""
+        self.geoshape, self.geojson = _get_geometry(
+            MapDisplay.geometry_source,
+            self.map_type,
+            year,
+            MapDisplay.simplify_tolerance,
+        )
 
     def create_map_figure(self) -> go.Figure:
         """Creates the map figure."""
         fig = px.choropleth_mapbox(
-            geojson=self.data["geometry"],
+            geojson=self.geojson,
             locations=self.data.index,
             color=self.data["value"],
             center={"lat": 65.0, "lon": 15},
@@ -181,13 +230,23 @@ class MapDisplay:
         logger.debug("Returning map figure")
         return fig
 
+    def update_map_values(self) -> Patch:
+        """Creates an update for the map figure that only replaces the values."""
+        patch = Patch()
+        patch["data"][0]["locations"] = self.data.index.tolist()
+        patch["data"][0]["z"] = self.data["value"].tolist()
+        return patch
+
     def _create_layout(self) -> html.Div:
         """Creates the layout for the module."""
         return html.Div(
-            dcc.Graph(
-                id="map-figure",
-                className="figuredisplay-graph",
-            ),
+            [
+                dcc.Graph(
+                    id="map-figure",
+                    className="figuredisplay-graph",
+                ),
+                dcc.Store(id="map-geometry"),
+            ],
             className="figuredisplay",
         )
 
@@ -205,17 +264,28 @@ class MapDisplay:
     def module_callbacks(self) -> None:
         """Registers module callbacks."""
         dynamic_states = [
-            self.variableselector.get_all_inputs(),
+            # Only redrawn while the tab or window is visible.
+            self.variableselector.get_all_inputs(deferred=is_tab_or_window(self)),
             self.variableselector.get_all_states(),
         ]
 
-        @callback(Output("map-figure", "figure"), *dynamic_states)  # type: ignore[misc]
-        def update_map(*args: Any) -> go.Figure:
-            print(f"update_map args: {args}")
+        @callback(  # type: ignore[misc]
+            Output("map-figure", "figure"),
+            Output("map-geometry", "data"),
+            *dynamic_states,
+            State("map-geometry", "data"),
+        )
+        def update_map(*args: Any) -> tuple[go.Figure | Patch, str | Any]:
+            *args, shown_geometry = args
+            logger.debug(f"update_map args: {args}")
             self.get_geoshape(year=args[0])
             self.get_data(*args)
+            geometry = f"{self.map_type}-{args[0]}"
+            if shown_geometry == geometry:
+                logger.debug("Updating map values")
+                return self.update_map_values(), no_update
             logger.debug("Creating map figure")
-            return self.create_map_figure()
+            return self.create_map_figure(), geometry
 
         if self.clickdata_func and self.output_var:
             output_var = self.output_var or self.map_type
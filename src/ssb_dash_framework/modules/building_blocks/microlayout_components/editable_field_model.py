@@ -4,6 +4,7 @@ from functools import cache
 import logging
 import time
 from typing import Any
+from typing import ClassVar
 
 from dash import Input
 from dash import Output
@@ -16,7 +17,7 @@ from ibis import Table
 import ibis
 from ibis.expr.types.relations import Table
 from ibis.expr.types.relations import Table
-from pandas.core.series import Series
+import pandas as pd
 from psycopg_pool import ConnectionPool
 from pydantic import BaseModel
 from pydantic import ConfigDict
@@ -28,10 +29,13 @@ from contextlib import contextmanager
 from ssb_dash_framework.setup import VariableSelector
 from ssb_dash_framework.utils.config_tools.set_variables import get_time_units
 
+from ....utils.alert_handler import add_alerts
 from ....utils.alert_handler import create_alert
 from ....utils.config_tools.connection import _get_connection_object
 from ....utils.config_tools.connection import get_connection
 from ....utils.core_models import UpdateSkjemadata, UpdateSkjemamottak
+from ....utils.prefetch import UnitPrefetcher
+from ....utils.unit_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -54,26 +58,35 @@ class CallbackSettings(BaseModel):
 @dataclass
 class CacheEntry:
     entry: Table
-    last_cache_hit: float
+    frame: pd.DataFrame
 
 
 class FormGetterCached:
-    data: dict[str, CacheEntry] = {}
+    """Process-wide cache of materialized forms, keyed by table and refnr.
+
+    All editable fields of a form read from the same cached table, so loading a form
+    costs one database query. Entries expire ``ttl`` seconds after they were loaded,
+    and the least recently used entry is dropped when more than ``max_size`` forms
+    are cached. Concurrent reads of a form that is not cached wait for a single load
+    instead of each querying the database.
+
+    Use :meth:`configure` to change the size and TTL, and :meth:`stats` to inspect
+    hits and misses. The forms of the next units in a list are loaded in advance by
+    :class:`UnitPrefetcher`, using the settings of every registered field group.
+    """
+
+    cache: TTLCache[CacheEntry] = TTLCache(max_size=10, ttl=5.0)
+    settings: ClassVar[dict[tuple[str, str], CallbackSettings]] = {}
 
     @staticmethod
-    def get_table(refnr: str, settings: CallbackSettings) -> Table:
-        """Materialize the whole refnr-filtered form in ONE query.
-
-        The per-field ``default_getter`` re-filters this result once per editable
-        field (~48 for RA-0255). Returning a *lazy* Postgres expression here means
-        each of those re-filters is a separate database round-trip on every refnr
-        change -- the dominant cost of loading the data editor.
-
-        Instead we execute a single query for the whole refnr-filtered form and
-        return an in-memory ``ibis.memtable``. The subsequent per-field
-        filter/select then run entirely in-process (DuckDB) with no further
-        database round-trips. ``get_form`` caches this materialized table; writes
-        evict it via :meth:`evict` so reads stay fresh.
+    def fetch_form(refnr: str, settings: CallbackSettings) -> pd.DataFrame:
+        """Reads the whole refnr-filtered form from the database in ONE query.
+
+        The per-field ``default_getter`` looks up its value in this result once per
+        editable field (~48 for RA-0255). Querying per field would mean a database
+        round-trip per field on every refnr change -- the dominant cost of loading
+        the data editor. ``get_form``/``get_frame`` cache the result; writes evict
+        it via :meth:`evict` so reads stay fresh.
         """
         with get_connection() as conn:
             t = conn.table(settings.form_data_table)
@@ -84,46 +97,95 @@ class FormGetterCached:
                     f"Column '{settings.form_reference_number_column}' not in table "
                     f"'{settings.form_data_table}'. Available: {t.columns}"
                 )
-            df = t.filter(
+            return t.filter(
                 t[settings.form_reference_number_column] == refnr,
             ).to_pandas()
-        # memtable preserves column names + dtypes; downstream filter/select run
-        # in DuckDB, so they never touch the database again.
-        return ibis.memtable(df)
 
     @classmethod
-    def clean_cache(cls):
-        max_size = 10
-        if len(cls.data.keys()) > max_size:
-            key, _ = min(cls.data.items(), key=lambda x: x[1].last_cache_hit)
-            cls.data.pop(key)
+    def get_table(cls, refnr: str, settings: CallbackSettings) -> Table:
+        """Materialize the whole refnr-filtered form in ONE query, uncached.
+
+        Returns an in-memory ``ibis.memtable``, so filters and selects on it run
+        in-process (DuckDB) without further database round-trips.
+        """
+        # memtable preserves column names + dtypes
+        return ibis.memtable(cls.fetch_form(refnr, settings))
+
+    @classmethod
+    def configure(cls, max_size: int | None = None, ttl: float | None = None) -> None:
+        """Changes the size and time-to-live of the cache.
+
+        Args:
+            max_size: Number of forms to keep cached.
+            ttl: Seconds a form is served from the cache after it was loaded.
+        """
+        cls.cache.configure(max_size=max_size, ttl=ttl)
+
+    @classmethod
+    def stats(cls) -> dict[str, int | float]:
+        """Returns the number of hits, misses and cached forms, and the hit rate."""
+        return cls.cache.stats()
+
+    @classmethod
+    def clear(cls) -> None:
+        """Empties the cache and resets the hit and miss counters."""
+        cls.cache.clear()
 
     @classmethod
     def evict(cls, refnr: str, table: str) -> None:
         """Drop the cached form for ``(table, refnr)`` so the next read is fresh.
 
-        Call this after a write: because :meth:`get_table` now returns a
-        materialized snapshot, an un-evicted entry would serve stale values for up
-        to the ``get_form`` TTL after an edit.
+        Call this after a write: because :meth:`get_table` returns a materialized
+        snapshot, an un-evicted entry would serve stale values until it expires. A
+        load of the same form that is still running when this is called is not
+        cached, since it may have read the form before the write.
         """
-        cls.data.pop(f"{table}::{refnr}", None)
+        cls.cache.evict(f"{table}::{refnr}")
+
+    @classmethod
+    def register_settings(cls, settings: CallbackSettings) -> None:
+        """Registers the settings of a field group so its forms can be prefetched."""
+        key = (settings.form_data_table, settings.form_reference_number_column)
+        cls.settings.setdefault(key, settings)
+
+    @classmethod
+    def prefetch(cls, unit: dict[str, Any]) -> None:
+        """Loads the forms of a unit for every registered field group.
+
+        Used as a :class:`UnitPrefetcher` loader.
+        """
+        for settings in list(cls.settings.values()):
+            refnr = unit.get(settings.form_reference_number_column)
+            if refnr is not None:
+                cls._get(refnr, settings, ttl=UnitPrefetcher.ttl)
 
     @classmethod
     def get_form(cls, refnr: str, settings: CallbackSettings) -> Table:
+        """Returns the cached form as an in-memory ibis table."""
+        return cls._get(refnr, settings).entry
+
+    @classmethod
+    def get_frame(cls, refnr: str, settings: CallbackSettings) -> pd.DataFrame:
+        """Returns the cached form as a pandas DataFrame. Do not modify it in place."""
+        return cls._get(refnr, settings).frame
+
+    @classmethod
+    def _get(
+        cls, refnr: str, settings: CallbackSettings, ttl: float | None = None
+    ) -> CacheEntry:
         cache_key = (
             f"{settings.form_data_table}::{refnr}"  # for tables not querying skjemadata
         )
-        entry = cls.data.get(cache_key)
 
-        if (entry is None) or ((time.perf_counter() - entry.last_cache_hit) > 5.0):
-            table = FormGetterCached.get_table(refnr, settings)
-            cls.data[cache_key] = CacheEntry(
-                entry=table, last_cache_hit=time.perf_counter()
-            )
-            cls.clean_cache()
-            return cls.data[cache_key].entry
-        cls.clean_cache()
-        return entry.entry
+        def load() -> CacheEntry:
+            logger.debug(f"Loading form {cache_key}")
+            frame = cls.fetch_form(refnr, settings)
+            return CacheEntry(entry=ibis.memtable(frame), frame=frame)
+
+        return cls.cache.get_or_load(cache_key, load, ttl=ttl)
+
+
+UnitPrefetcher.register_loader("forms", FormGetterCached.prefetch)
 
 
 def default_getter(
@@ -135,20 +197,17 @@ def default_getter(
 ) -> Any:
     logger.debug(f"Getting {field_path} for refnr: {refnr}")
 
-    t = FormGetterCached.get_form(refnr, settings)
-    filters = [
-        t[settings.form_reference_number_column] == refnr,
-        t[settings.formdata_fieldname_column] == field_path,
-    ]
+    # The cached frame only holds rows for this refnr. Looking the field up in pandas
+    # avoids a DuckDB query per field, and is safe to do from concurrent callbacks.
+    df = FormGetterCached.get_frame(refnr, settings)
+    mask = df[settings.formdata_fieldname_column] == field_path
     if (
         settings.form_reference_number_column != "refnr"
     ):  # apply time_units filter if refnr is not used
         for unit, value in time_units.items():
-            if value and unit in t.columns:
-                filters.append(t[unit] == value)
-    res: Series | Any = (
-        t.filter(filters).select(settings.formdata_field_value_column_name).execute()
-    )
+            if value and unit in df.columns:
+                mask &= df[unit] == value
+    res = df.loc[mask, [settings.formdata_field_value_column_name]]
     logger.debug(f"Returning:\n{res}")
 
     if res.empty:
@@ -240,16 +299,13 @@ def default_updater(
     return alerts, _NO_REVERT
 
 
-def _extend_alert_log(alert_log: list[Any] | None, alert: Any) -> list[Any]:
+def _flatten_alerts(alert: Any) -> list[Any]:
     """Returns a flat list of alert dicts."""
-    log = list(alert_log or [])
     if not alert:
-        return log
+        return []
     if isinstance(alert, list):
-        log.extend(a for a in alert if a)
-    else:
-        log.append(alert)
-    return log
+        return [a for a in alert if a]
+    return [alert]
 
 
 def _run_field(
@@ -413,6 +469,7 @@ def _register_group_callback(
     # table_selector_id / form_selector_id live on `settings`, which every
     # field in the group shares -- so one set of guard States covers all of them
     guard_states = fields[0]._build_guard_states(settings)
+    FormGetterCached.register_settings(settings)
  
     variableselector = VariableSelector(
         selected_inputs=[], selected_states=["ident", "altinnskjema"]
@@ -432,7 +489,6 @@ def _register_group_callback(
         *states,
         *getter_args,
         *guard_states,
-        State("alert_store", "data"),
         prevent_initial_call="initial_duplicate",
     )
     def populate_or_edit(
@@ -442,14 +498,12 @@ def _register_group_callback(
         field_values = args[:n]
         remainder = args[n:]
 
-        alert_log = remainder[-1]
-
         if g:
-            guard_values = remainder[-(g + 1):-1]
-            real_args = remainder[:-(g + 1)]
+            guard_values = remainder[-g:]
+            real_args = remainder[:-g]
         else:
             guard_values = ()
-            real_args = remainder[:-1]
+            real_args = remainder
 
         time_unit_values = real_args[:m]
         extra_state_values = real_args[m:m + s]
@@ -480,13 +534,17 @@ def _register_group_callback(
                 extra_args=extra_args,
             )
 
-            alert_log = _extend_alert_log(alert_log, alerts)
+            alerts = _flatten_alerts(alerts)
 
             field_outputs = [no_update] * n
             if revert_value is not _NO_REVERT:
                 field_outputs[idx] = revert_value
 
-            return (*field_outputs, alert_log, time.time())
+            return (
+                *field_outputs,
+                add_alerts(*alerts) if alerts else no_update,
+                time.time(),
+            )
 
         # fetch/getter
         results: list[Any] = []
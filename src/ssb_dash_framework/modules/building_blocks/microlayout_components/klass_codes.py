@@ -0,0 +1,187 @@
+"""Code lists from KLASS for the klass components of MicroLayout, cached in memory and on disk.
+
+Every KlassDropdown and KlassChecklist with the same klass_code shares one code list,
+read the first time a layout needs it. Code lists are written to a directory as
+JSON files named after the klass_code, and read from there until they are older than
+``max_age``. If KLASS can not be reached, an older file is used instead, so an app
+can start offline as long as the files exist. With ``offline=True`` only the files
+are used, which lets a directory of prepared files stand in for the KLASS API.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+
+from klass import get_classification
+
+from ....utils.unit_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT = 1
+"""Version of the file format. Files with another version are fetched again."""
+
+
+@dataclass
+class KlassCodeCache:
+    """Code lists of KLASS classifications, kept in memory and in a directory.
+
+    Attributes:
+        directory: Directory the code lists are stored in, as <klass_code>.json.
+        max_age: Seconds before a stored code list is fetched from KLASS again.
+        offline: Only use the stored code lists, never KLASS.
+    """
+
+    directory: str = field(
+        default_factory=lambda: os.path.join(
+            tempfile.gettempdir(), "ssb-dash-framework-klass"
+        )
+    )
+    max_age: float = 7 * 24 * 3600.0
+    offline: bool = False
+
+    def __post_init__(self) -> None:
+        """Creates the directory and the in-memory cache."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._codes: TTLCache[dict[str, str]] = TTLCache(max_size=256, ttl=self.max_age)
+
+    def path(self, klass_code: str) -> str:
+        """Returns the path of the stored code list of a classification."""
+        return os.path.join(self.directory, f"{klass_code}.json")
+
+    def get_codes(self, klass_code: str) -> dict[str, str]:
+        """Returns the codes of a classification and their names.
+
+        Concurrent calls for the same klass_code share one load.
+
+        Args:
+            klass_code: The id of the classification in KLASS.
+
+        Returns:
+            The names by code.
+
+        Raises:
+            FileNotFoundError: If offline and there is no stored code list.
+        """
+        return self._codes.get_or_load(str(klass_code), lambda: self._load(klass_code))
+
+    def refresh(self, klass_code: str) -> dict[str, str]:
+        """Fetches the codes of a classification from KLASS and stores them."""
+        self._codes.evict(str(klass_code))
+        stored = self._fetch(klass_code)
+        return self._codes.get_or_load(str(klass_code), lambda: stored["codes"])
+
+    def _load(self, klass_code: str) -> dict[str, str]:
+        stored = self._read(klass_code)
+        if stored is not None and (
+            self.offline or time.time() - stored["fetched_at"] <= self.max_age
+        ):
+            return stored["codes"]  # type: ignore[no-any-return]
+        if self.offline:
+            raise FileNotFoundError(
+                f"No stored code list for klass_code {klass_code} in {self.directory}"
+            )
+        try:
+            return self._fetch(klass_code)["codes"]  # type: ignore[no-any-return]
+        except Exception:
+            if stored is None:
+                raise
+            logger.warning(
+                f"Could not fetch klass_code {klass_code}, using the code list stored {time.ctime(stored['fetched_at'])}",
+                exc_info=True,
+            )
+            return stored["codes"]  # type: ignore[no-any-return]
+
+    def _read(self, klass_code: str) -> dict[str, Any] | None:
+        try:
+            with open(self.path(klass_code), encoding="utf-8") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.warning(
+                f"Ignoring unreadable {self.path(klass_code)}", exc_info=True
+            )
+            return None
+        if stored.get("format") != CACHE_FORMAT:
+            logger.debug(f"Ignoring {self.path(klass_code)} in an old format")
+            return None
+        return stored  # type: ignore[no-any-return]
+
+    def _fetch(self, klass_code: str) -> dict[str, Any]:
+        logger.info(f"Fetching klass_code {klass_code} from KLASS")
+        classification = get_classification(klass_code)
+        versions = sorted(classification.versions, key=lambda v: v["validFrom"])
+        stored = {
+            "format": CACHE_FORMAT,
+            "klass_code": str(klass_code),
+            "version_id": versions[-1]["version_id"] if versions else None,
+            "fetched_at": time.time(),
+            "codes": {
+                str(code): name
+                for code, name in classification.get_codes().to_dict().items()
+            },
+        }
+        # Written to a temporary file first, so readers never see half a file.
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(stored, f, ensure_ascii=False)
+        os.replace(tmp, self.path(klass_code))
+        return stored
+
+
+_CACHE: KlassCodeCache | None = None
+
+
+def get_klass_cache() -> KlassCodeCache:
+    """Returns the KlassCodeCache used by the klass components."""
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = KlassCodeCache()
+    return _CACHE
+
+
+def set_klass_cache(
+    directory: str | None = None,
+    max_age: float | None = None,
+    offline: bool | None = None,
+) -> KlassCodeCache:
+    """Configures where the klass code lists are stored and how long they are used.
+
+    Args:
+        directory: Directory to store the code lists in. Defaults to a folder in the
+            system temp directory. Point it to a folder in the project to keep the
+            code lists between sessions or ship them with the app.
+        max_age: Seconds before a code list is fetched from KLASS again. Defaults to
+            a week.
+        offline: Only use the stored code lists. Defaults to False.
+
+    Returns:
+        The new KlassCodeCache.
+
+    Example:
+        >>> set_klass_cache(directory="klass_codes", offline=True)  # doctest: +SKIP
+    """
+    global _CACHE
+    kwargs: dict[str, Any] = {}
+    if directory is not None:
+        kwargs["directory"] = directory
+    if max_age is not None:
+        kwargs["max_age"] = max_age
+    if offline is not None:
+        kwargs["offline"] = offline
+    _CACHE = KlassCodeCache(**kwargs)
+    return _CACHE
+
+
+def get_klass_options(klass_code: str) -> list[dict[str, str]]:
+    """Returns the codes of a classification as options for a dropdown or checklist."""
+    return [
+        {"label": name, "value": code}
+        for code, name in get_klass_cache().get_codes(klass_code).items()
+    ]
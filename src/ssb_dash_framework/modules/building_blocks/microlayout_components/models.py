@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import json
+import logging
+import math
 import uuid
 from typing import Annotated
 from typing import Literal
@@ -12,7 +15,7 @@ from dash import State
 from dash import Output
 from dash import html
 from dash import callback
-from klass import get_classification
+from dash import clientside_callback
 from pydantic import BaseModel
 from pydantic import ConfigDict
 from pydantic import Field
@@ -22,6 +25,9 @@ from pydantic import field_validator
 
 from .editable_field_model import CallbackSettings
 from .editable_field_model import EditableField
+from .klass_codes import get_klass_options
+
+logger = logging.getLogger(__name__)
 
 
 # ---------- Base + shared ----------
@@ -374,6 +380,63 @@ class CalculatedField(BaseNode):
 
         return result
 
+    def _evaluate(
+        self,
+        op_id_pairs: Sequence[tuple[str, str | float]],
+        values: Sequence[float | int | str | None],
+    ) -> str:
+        """Returns the formatted result from the values of the fields in op_id_pairs."""
+        try:
+            if all(v is None for v in values):
+                return f"{0:.{self.decimals}f}"
+
+            value_iter = iter(values)
+            resolved: Sequence[tuple[str, float | None]] = []
+            for op, id_ in op_id_pairs:
+                if isinstance(id_, float):
+                    resolved.append((op, id_))
+                else:
+                    resolved.append((op, next(value_iter)))
+            result = self._calculate(resolved, [v for _, v in resolved])
+            return f"{result:.{self.decimals}f}"
+        except Exception as e:
+            return f"Error: {e}"
+
+    def _compile(self) -> str | None:
+        """Compiles the formula to a clientside function running _evaluate in the browser.
+
+        The function calls calculate in assets/microlayout.js with the operations
+        and literals of the formula, which gives the same results as _evaluate.
+
+        Returns:
+            The function, or None if the formula has to be calculated on the server.
+            That is when it has no fields, a literal that is not a finite number or
+            more decimals than the browser can format.
+        """
+        op_id_pairs = self._get_all_ids()
+        literals = [id_ for _, id_ in op_id_pairs if isinstance(id_, float)]
+        if len(literals) == len(op_id_pairs):
+            return None
+        if not all(math.isfinite(literal) for literal in literals):
+            return None
+        if not 0 <= self.decimals <= 100:
+            return None
+
+        formula = json.dumps(
+            {
+                "ops": [
+                    [op, id_ if isinstance(id_, float) else None]
+                    for op, id_ in op_id_pairs
+                ],
+                "decimals": self.decimals,
+            }
+        )
+        return (
+            "function(...values) {\n"
+            f"    return window.dash_clientside.microlayout.calculate({formula}, values);\n"
+            "}"
+        )
+
     def create_callback(self) -> None:
         op_id_pairs = self._get_all_ids()
         if not op_id_pairs:
@@ -382,26 +445,19 @@ class CalculatedField(BaseNode):
         dynamic_pairs = [(op, id_) for op, id_ in op_id_pairs if isinstance(id_, str)]
         inputs = [Input(id_, "value") for _, id_ in dynamic_pairs]
 
+        function = self._compile()
+        if function is not None:
+            clientside_callback(function, Output(self._id, "value"), inputs)
+            return
+
+        logger.debug(f"Calculating '{self._id}' on the server")
+
         @callback(
             Output(self._id, "value"),
             inputs,
         )
         def calculated_callback(*values):
-            try:
-                if all(v is None for v in values):
-                    return f"{0:.{self.decimals}f}"
-
-                value_iter = iter(values)
-                resolved: Sequence[tuple[str, float | None]] = []
-                for op, id_ in op_id_pairs:
-                    if isinstance(id_, float):
-                        resolved.append((op, id_))
-                    else:
-                        resolved.append((op, next(value_iter)))
-                result = self._calculate(resolved, [v for _, v in resolved])
-                return f"{result:.{self.decimals}f}"
-            except Exception as e:
-                return f"Error: {e}"
+            return self._evaluate(op_id_pairs, values)
 
     def create(self, *args, **kwargs) -> html.Div:
         self.create_callback()
@@ -598,10 +654,7 @@ class KlassDropdown(BaseNode):
         getter_args: None | list = None,
     ) -> html.Div:
         """A method for creating the layout."""
-        codes_dict = get_classification(self.klass_code).get_codes().to_dict()
-        options = []
-        for key, value in codes_dict.items():
-            options.append({"label": value, "value": key})
+        options = get_klass_options(self.klass_code)
 
         return DropdownComponent(
             type="dropdown",
@@ -676,10 +729,7 @@ class KlassChecklist(BaseNode):
         getter_args: None | list = None,
     ) -> html.Div:
         """A method for creating the layout."""
-        codes_dict = get_classification(self.klass_code).get_codes().to_dict()
-        options = []
-        for key, value in codes_dict.items():
-            options.append({"label": value, "value": key})
+        options = get_klass_options(self.klass_code)
 
         if self.type == "klass-checklist":
             return ChecklistComponent(
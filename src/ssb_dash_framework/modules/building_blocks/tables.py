@@ -7,18 +7,20 @@ from pydantic import BaseModel, ConfigDict
 from typing import Callable, Any, Optional, Union
 import dash_ag_grid as dag
 import pandas as pd
+from dash import Patch
 from dash import callback
 from dash import html
 from dash.dependencies import Input
 from dash.dependencies import Output
-from dash.dependencies import State
 from dash.exceptions import PreventUpdate
 
 from ...setup.variableselector import VariableSelector
 from ...utils import TabImplementation
 from ...utils import WindowImplementation
+from ...utils.alert_handler import add_alerts
 from ...utils.alert_handler import create_alert
 from ...utils.module_validation import module_validator
+from ...utils.unit_cache import evict_unit_table
 
 logger = logging.getLogger(__name__)
 
@@ -53,6 +55,7 @@ class EditingTable:
         output: str | list[str] | None = None,
         output_varselector_name: str | list[str] | None = None,
         number_format: str | None = None,
+        edited_tables: list[str] | None = None,
         **kwargs: Any,
     ) -> None:
         """Initialize the EditingTable component.
@@ -69,6 +72,8 @@ class EditingTable:
                 If `output` is provided but `output_varselector_name` is not, it will default to the value of `output`.
             number_format: A d3 format string for formatting numeric values in the table. Defaults to None.
                 If None, it will default to "d3.format(',.1f')(params.value).replace(/,/g, ' ')".
+            edited_tables: The tables update_table_func writes to. Cached data read from them, such as aggregates and
+                read replica snapshots, is refreshed after each successful edit. Defaults to None.
             **kwargs: Additional keyword arguments for the Dash AgGrid component.
         """
         self.kwargs = kwargs
@@ -93,6 +98,7 @@ class EditingTable:
         self.get_data = get_data_func
         self.get_data_args = [x for x in self.variableselector.selected_variables]
         self.update_table_func = update_table_func
+        self.edited_tables = edited_tables or []
 
         self.module_layout = self._create_layout()
         self.module_callbacks()
@@ -280,18 +286,14 @@ class EditingTable:
         @callback(  # type: ignore[misc]
             Output("alert_store", "data", allow_duplicate=True),
             Input(f"{self.module_number}-tabelleditering-table1", "cellValueChanged"),
-            State("alert_store", "data"),
             *dynamic_states,
             prevent_initial_call=True,
         )
         def make_edit(
             edited: list[dict[str, Any]],
-            error_log: list[dict[str, Any]],
             *dynamic_states: Any,
-        ) -> list[dict[str, Any]]:
-            logger.debug(
-                f"Args:\nedited: {edited}\nerror_log: {error_log}\ndynamic_states: {dynamic_states}"
-            )
+        ) -> Patch:
+            logger.debug(f"Args:\nedited: {edited}\ndynamic_states: {dynamic_states}")
             if not edited:
                 raise PreventUpdate
             edit = edited[0]
@@ -300,34 +302,30 @@ class EditingTable:
             naive_timestamp = aware_timestamp.replace(tzinfo=None)  # drop tzinfo
             edit["timestamp"] = naive_timestamp
 
-            if self.update_table_func:
-                variable = edit["colId"]
-                old_value = edit["oldValue"]
-                new_value = edit["value"]
-                logger.info("Running update_table_func")
-                try:
-                    self.update_table_func(edit, *dynamic_states)
-                    error_log = [
-                        create_alert(
-                            f"{variable} oppdatert fra {old_value} til {new_value}",
-                            "info",
-                            ephemeral=True,
-                        ),
-                        *error_log,
-                    ]
-
-                except Exception:
-                    logger.error("Error updating table", exc_info=True)
-                    error_log = [
-                        create_alert(
-                            f"Oppdatering av {variable} fra {old_value} til {new_value} feilet!",
-                            "error",
-                            ephemeral=True,
-                        ),
-                        *error_log,
-                    ]
+            if not self.update_table_func:
+                raise PreventUpdate
+            variable = edit["colId"]
+            old_value = edit["oldValue"]
+            new_value = edit["value"]
+            logger.info("Running update_table_func")
+            try:
+                self.update_table_func(edit, *dynamic_states)
+                for table in self.edited_tables:
+                    evict_unit_table(table)
+                alert = create_alert(
+                    f"{variable} oppdatert fra {old_value} til {new_value}",
+                    "info",
+                    ephemeral=True,
+                )
+            except Exception:
+                logger.error("Error updating table", exc_info=True)
+                alert = create_alert(
+                    f"Oppdatering av {variable} fra {old_value} til {new_value} feilet!",
+                    "error",
+                    ephemeral=True,
+                )
             logger.debug("Finished update")
-            return error_log
+            return add_alerts(alert)
 
 
 class EditingTableTab(TabImplementation, EditingTable):
@@ -343,6 +341,7 @@ class EditingTableTab(TabImplementation, EditingTable):
         output: str | None = None,
         output_varselector_name: str | None = None,
         number_format: str | None = None,
+        edited_tables: list[str] | None = None,
         **kwargs: Any,
     ) -> None:
         """Initialize the EditingTableTab.
@@ -359,6 +358,8 @@ class EditingTableTab(TabImplementation, EditingTable):
                 If `output` is provided but `output_varselector_name` is not, it will default to the value of `output`.
             number_format: A d3 format string for formatting numeric values in the table. Defaults to None.
                 If None, it will default to "d3.format(',.1f')(params.value).replace(/,/g, ' ')".
+            edited_tables: The tables update_table_func writes to. Cached data read from them, such as aggregates and
+                read replica snapshots, is refreshed after each successful edit. Defaults to None.
             **kwargs: Additional keyword arguments for the Dash AgGrid component.
         """
         EditingTable.__init__(
@@ -371,6 +372,7 @@ class EditingTableTab(TabImplementation, EditingTable):
             output=output,
             output_varselector_name=output_varselector_name,
             number_format=number_format,
+            edited_tables=edited_tables,
             **kwargs,
         )
         TabImplementation.__init__(self)
@@ -389,6 +391,7 @@ class EditingTableWindow(WindowImplementation, EditingTable):
         output: str | None = None,
         output_varselector_name: str | None = None,
         number_format: str | None = None,
+        edited_tables: list[str] | None = None,
         **kwargs: Any,
     ) -> None:
         """Initialize the EditingTableWindow.
@@ -405,6 +408,8 @@ class EditingTableWindow(WindowImplementation, EditingTable):
                 If `output` is provided but `output_varselector_name` is not, it will default to the value of `output`.
             number_format: A d3 format string for formatting numeric values in the table. Defaults to None.
                 If None, it will default to "d3.format(',.1f')(params.value).replace(/,/g, ' ')".
+            edited_tables: The tables update_table_func writes to. Cached data read from them, such as aggregates and
+                read replica snapshots, is refreshed after each successful edit. Defaults to None.
             **kwargs: Additional keyword arguments for the Dash AgGrid component.
         """
         EditingTable.__init__(
@@ -417,6 +422,7 @@ class EditingTableWindow(WindowImplementation, EditingTable):
             output=output,
             output_varselector_name=output_varselector_name,
             number_format=number_format,
+            edited_tables=edited_tables,
             **kwargs,
         )
         WindowImplementation.__init__(self, **kwargs)
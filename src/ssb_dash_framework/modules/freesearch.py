@@ -7,6 +7,9 @@ from typing import Any
 import dash_ag_grid as dag
 import dash_bootstrap_components as dbc
 from dash import callback
+from dash import clientside_callback
+from dash import ctx
+from dash import dcc
 from dash import html
 from dash.dependencies import Input
 from dash.dependencies import Output
@@ -17,6 +20,15 @@ from dash_iconify import DashIconify
 from ..utils import TabImplementation
 from ..utils import WindowImplementation
 from ..utils import get_connection
+from ..utils.adhoc_query import PAGE_SIZE
+from ..utils.adhoc_query import WARN_ROWS
+from ..utils.adhoc_query import QueryCancelledError
+from ..utils.adhoc_query import cancel_adhoc_query
+from ..utils.adhoc_query import estimate_rows
+from ..utils.adhoc_query import query_tables
+from ..utils.adhoc_query import run_adhoc_query
+from ..utils.adhoc_query import to_duckdb
+from ..utils.config_tools import replica_staleness_text
 from ..utils.module_validation import module_validator
 
 logger = logging.getLogger(__name__)
@@ -29,16 +41,28 @@ class FreeSearch(ABC):
     - Enter SQL queries in a text area.
     - Optionally specify partition filters as a dictionary string.
     - Display query results in an editable Dash AgGrid table.
+
+    Only queries that read data can be run. The result is read one page of rows at a
+    time, queries that run for too long are stopped, and a running query can be
+    cancelled. If the database can estimate the size of the result, a warning is
+    shown for queries expected to return very many rows.
     """
 
     _id_number = 0
 
-    def __init__(self, conn=None, label: str = "Frisøk") -> None:
+    def __init__(
+        self, conn=None, label: str = "Frisøk", use_read_replica: bool = False
+    ) -> None:
         """Initialize the FreeSearch module.
 
         Args:
             database: Database connection or interface for executing SQL queries.
             label: Label for the module, defaults to "Frisøk".
+            use_read_replica: Run queries on the read replica set up with
+                'set_read_replica' when it has every table they read. Queries are
+                written for the main database, so they are translated from
+                PostgreSQL to DuckDB first. Defaults to False, which always uses the
+                main database.
 
         Raises:
             TypeError: If the connection object is not 'EimerDBInstance' or ibis connection.
@@ -49,6 +73,7 @@ class FreeSearch(ABC):
         self.icon = DashIconify(icon="feather:search", width=24)
         self.label = label
         self.conn = conn
+        self.use_read_replica = use_read_replica
 
         self.module_layout = self._create_layout()
         self.module_callbacks()
@@ -92,6 +117,33 @@ class FreeSearch(ABC):
                             ),
                             width="auto",
                         ),
+                        dbc.Col(
+                            dbc.Button(
+                                "Avbryt",
+                                id="tab-frisøk-cancel",
+                                className="ssb-btn secondary-btn",
+                                disabled=True,
+                            ),
+                            width="auto",
+                        ),
+                        dbc.Col(
+                            dbc.ButtonGroup(
+                                [
+                                    dbc.Button(
+                                        "Forrige side",
+                                        id="tab-frisøk-previous",
+                                        className="ssb-btn secondary-btn",
+                                    ),
+                                    dbc.Button(
+                                        "Neste side",
+                                        id="tab-frisøk-next",
+                                        className="ssb-btn secondary-btn",
+                                    ),
+                                ]
+                            ),
+                            width="auto",
+                        ),
+                        dbc.Col(html.Div(id="tab-frisøk-status"), width="auto"),
                     ],
                 ),
                 dag.AgGrid(
@@ -99,11 +151,27 @@ class FreeSearch(ABC):
                     id="tab-frisøk-table1",
                     className="ag-theme-alpine ag-theme-ssb mb-2 header-style-on-filter",
                 ),
+                dcc.Store(id="tab-frisøk-query-id"),
+                dcc.Store(id="tab-frisøk-page"),
             ],
         )
         logger.debug("Generated layout.")
         return layout
 
+    def _run_page(
+        self, conn: Any, page: dict[str, Any], query_id: str | None
+    ) -> tuple[Any, bool, int | None]:
+        """Runs a page of the query, estimating the size of the result on the first page."""
+        estimate = estimate_rows(conn, page["query"]) if page["offset"] == 0 else None
+        df, more = run_adhoc_query(
+            conn,
+            page["query"],
+            limit=PAGE_SIZE,
+            offset=page["offset"],
+            query_id=query_id,
+        )
+        return df, more, estimate
+
     @abstractmethod
     def layout(self) -> html.Div:
         """Define the layout for the FreeSearch module.
@@ -125,53 +193,123 @@ class FreeSearch(ABC):
             - The callback takes user inputs from the SQL query text area and partition filter input field.
             - The results are displayed in an editable table, with the "row_id" column hidden by default if present.
         """
+        # Gives each run an id in the browser, so it can be cancelled while it runs.
+        clientside_callback(
+            """function(n_clicks) {
+                return n_clicks ? `${Date.now()}-${Math.random()}` : window.dash_clientside.no_update;
+            }""",
+            Output("tab-frisøk-query-id", "data"),
+            Input("tab-frisøk-button1", "n_clicks"),
+        )
 
         @callback(  # type: ignore[misc]
             Output("tab-frisøk-table1", "rowData"),
             Output("tab-frisøk-table1", "columnDefs"),
-            Input("tab-frisøk-button1", "n_clicks"),
+            Output("tab-frisøk-status", "children"),
+            Output("tab-frisøk-page", "data"),
+            Input("tab-frisøk-query-id", "data"),
+            Input("tab-frisøk-previous", "n_clicks"),
+            Input("tab-frisøk-next", "n_clicks"),
             State("tab-frisøk-textarea1", "value"),
             State("tab-frisøk-input1", "value"),
+            State("tab-frisøk-page", "data"),
+            running=[
+                (Output("tab-frisøk-cancel", "disabled"), False, True),
+                (Output("tab-frisøk-button1", "disabled"), True, False),
+            ],
+            prevent_initial_call=True,
         )
         def table_free_search(
-            n_clicks: int, query: str, partition: str
-        ) -> tuple[list[dict[str, Any]], list[dict[str, str | bool]]]:
-            """Execute an SQL query and update the table with the results.
+            query_id: str | None,
+            previous_clicks: int | None,
+            next_clicks: int | None,
+            query: str,
+            partition: str,
+            page: dict[str, Any] | None,
+        ) -> tuple[
+            list[dict[str, Any]], list[dict[str, str | bool]], str, dict[str, Any]
+        ]:
+            """Execute an SQL query and update the table with a page of the results.
 
             Args:
-                n_clicks: Number of clicks on the "kjør" button.
+                query_id: Id of the run, set when the "kjør" button is clicked.
+                previous_clicks: Number of clicks on the previous page button.
+                next_clicks: Number of clicks on the next page button.
                 query: SQL query entered by the user in the text area.
                 partition: Partition filters entered as a dictionary string
                                  (e.g., "{'aar': [2023]}"). Can be None if no filters are provided.
+                page: The query, partition and offset of the page shown.
 
             Returns:
                 tuple:
                     - rowData (list[dict]): A list of records (rows) to display in the table.
                     - columnDefs (list[dict]): A list of column definitions for the table.
+                    - status (str): Which rows are shown, or why the query was not run.
+                    - page (dict): The query, partition and offset of the page shown.
 
             Raises:
-                PreventUpdate: If the button has not been clicked.
+                PreventUpdate: If there is no query to run or no page to move to.
 
             Notes:
                 - The `partition` string is parsed into a dictionary before being used in the query.
                 - Column definitions hide the "row_id" column by default, if present.
+                - Changing page runs the query that was run with the "kjør" button again.
             """
             logger.debug(
                 "Args:\n"
-                f"n_clicks: {n_clicks}\n"
+                f"query_id: {query_id}\n"
                 f"query: {query}\n"
-                f"partition: {partition}"
+                f"partition: {partition}\n"
+                f"page: {page}"
             )
-            if not n_clicks:
-                logger.debug("Raised PreventUpdate")
+            if ctx.triggered_id == "tab-frisøk-query-id":
+                if not query:
+                    logger.debug("Raised PreventUpdate")
+                    raise PreventUpdate
+                page = {"query": query, "partition": partition, "offset": 0}
+            elif page is None:
                 raise PreventUpdate
-            if partition is not None:
-                partition = ast.literal_eval(partition)
-            if not self.conn:
-                with get_connection(partition_select=partition) as conn:
-                    df = conn.raw_sql(query)
+            elif ctx.triggered_id == "tab-frisøk-next":
+                if not page.get("more"):
+                    raise PreventUpdate
+                page = {**page, "offset": page["offset"] + PAGE_SIZE}
             else:
-                df = self.conn.raw_sql(query)
+                if page["offset"] == 0:
+                    raise PreventUpdate
+                page = {**page, "offset": max(page["offset"] - PAGE_SIZE, 0)}
+
+            partition_select = (
+                ast.literal_eval(page["partition"]) if page["partition"] else None
+            )
+            warning = ""
+            tables = query_tables(page["query"]) if self.use_read_replica else None
+            try:
+                if not self.conn:
+                    with get_connection(
+                        read_only=bool(tables),
+                        necessary_tables=tables,
+                        partition_select=partition_select,
+                    ) as conn:
+                        on_replica = bool(tables) and conn.name == "duckdb"
+                        run = (
+                            {**page, "query": to_duckdb(page["query"])}
+                            if on_replica
+                            else page
+                        )
+                        df, more, estimate = self._run_page(conn, run, query_id)
+                    if on_replica:
+                        warning += (
+                            f" {replica_staleness_text(tables)}"
+                            " Spørringen er oversatt fra PostgreSQL til DuckDB."
+                        )
+                else:
+                    df, more, estimate = self._run_page(self.conn, page, query_id)
+            except (ValueError, QueryCancelledError) as e:
+                logger.info(f"Free search query not run: {e}")
+                return [], [], str(e), {**page, "more": False}
+            if estimate is not None and estimate > WARN_ROWS:
+                rows = f"{estimate:,}".replace(",", " ")
+                warning += f" Spørringen er beregnet å gi omtrent {rows} rader, vurder å avgrense den."
             columns = [
                 {
                     "headerName": col,
@@ -180,7 +318,28 @@ class FreeSearch(ABC):
                 }
                 for col in df.columns
             ]
-            return df.to_dict("records"), columns
+            first = page["offset"] + 1
+            status = (
+                f"Rad {first}-{page['offset'] + len(df)}"
+                f"{', flere rader finnes' if more else ''}.{warning}"
+                if len(df)
+                else f"Ingen rader.{warning}"
+            )
+            return df.to_dict("records"), columns, status, {**page, "more": more}
+
+        @callback(  # type: ignore[misc]
+            Output("tab-frisøk-cancel", "n_clicks"),
+            Input("tab-frisøk-cancel", "n_clicks"),
+            State("tab-frisøk-query-id", "data"),
+            prevent_initial_call=True,
+        )
+        def cancel_free_search(n_clicks: int | None, query_id: str | None) -> int:
+            """Cancels the running query."""
+            if not n_clicks or query_id is None:
+                raise PreventUpdate
+            logger.info(f"Cancelling free search query {query_id}")
+            cancel_adhoc_query(query_id)
+            return 0
 
         logger.debug("Generated callbacks")
 
@@ -192,24 +351,28 @@ class FreeSearchTab(TabImplementation, FreeSearch):
     specific to the tab interface.
     """
 
-    def __init__(self, conn: Any | None = None) -> None:
+    def __init__(self, conn: Any | None = None, use_read_replica: bool = False) -> None:
         """Initialize the FreeSearchTab with a database connection.
 
         Args:
             database: Database connection or interface used for executing SQL queries.
+            use_read_replica: Run queries on the read replica, translated to DuckDB.
         """
-        FreeSearch.__init__(self, conn=conn)
+        FreeSearch.__init__(self, conn=conn, use_read_replica=use_read_replica)
         TabImplementation.__init__(self)
 
 
 class FreeSearchWindow(WindowImplementation, FreeSearch):
     """FreeSearchWindow is a class that creates a modal based on the FreeSearch module."""
 
-    def __init__(self, conn: Any | None = None, **kwargs: Any) -> None:
+    def __init__(
+        self, conn: Any | None = None, use_read_replica: bool = False, **kwargs: Any
+    ) -> None:
         """Initialize the FreeSearchWindow class.
 
         Args:
             database: The database connection or object used for querying.
+            use_read_replica: Run queries on the read replica, translated to DuckDB.
         """
-        FreeSearch.__init__(self, conn=conn)
+        FreeSearch.__init__(self, conn=conn, use_read_replica=use_read_replica)
         WindowImplementation.__init__(self, **kwargs)
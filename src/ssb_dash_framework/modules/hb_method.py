@@ -6,7 +6,9 @@ from collections.abc import Callable
 from typing import Any
 from typing import ClassVar
 
+import dash_ag_grid as dag
 import dash_bootstrap_components as dbc
+import pandas as pd
 import plotly.graph_objects as go
 from dash import Input
 from dash import Output
@@ -17,11 +19,16 @@ from dash import html
 from dash.exceptions import PreventUpdate
 
 from ..setup.variableselector import VariableSelector
+from ..utils.figures import downsample
+from ..utils.figures import scatter_trace
 from ..utils.implementations import TabImplementation
 from ..utils.implementations import WindowImplementation
 from ..utils.module_validation import module_validator
-from ..utils.r_helpers import _get_kostra_r
-from ..utils.r_helpers import hb_method
+from ..utils.outlier_methods import hb_method
+from ..utils.outlier_methods import hb_method_grouped
+from ..utils.outlier_methods import hb_outlier_ranking
+from ..utils.unit_cache import TTLCache
+from ..utils.unit_cache import on_unit_table_evicted
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +38,7 @@ class HBMethod:
 
     _id_number: ClassVar[int] = 0
     _required_variables: ClassVar[list[str]] = ["ident"]
+    _batch_results: ClassVar[TTLCache[pd.DataFrame]] = TTLCache(max_size=16, ttl=900.0)
 
     def __init__(
         self,
@@ -38,6 +46,7 @@ class HBMethod:
         time_units: list[str],
         varselector_variable: str = "statistikkvariabel",
         output: str = "ident",
+        get_batch_data_func: Callable[..., Any] | None = None,
     ) -> None:
         """Initializes the HB method module.
 
@@ -46,6 +55,7 @@ class HBMethod:
             time_units: A list of time units for the dataset. Example: ['year']
             varselector_variable: The name of the variableselector field used for determining which variable to analyze.
             output: Which variableselector field to update based on clicks in the graph.
+            get_batch_data_func: A function that takes a time_variable as input and returns a dataframe for all variables, in the same format as get_data_func. If given, the module can run the HB method for every variable at once and rank the variables by number of outliers.
         """
         logger.warning(
             "This module is still in development and most likely has issues. If you notice something strange, please add it to Issues on the github repo."
@@ -66,6 +76,7 @@ class HBMethod:
         self.time_units = time_units
         self.varselector_variable = varselector_variable
         self.get_data_func = get_data_func
+        self.get_batch_data_func = get_batch_data_func
         self.get_default_parameter_values()
         self.ident = "ident"
         self.output = output
@@ -73,7 +84,6 @@ class HBMethod:
         self.module_layout = self._create_layout()
         self.module_callbacks()
         module_validator(self)
-        _get_kostra_r()
 
     def get_default_parameter_values(self) -> None:
         """Gets the default parameter values."""
@@ -82,49 +92,116 @@ class HBMethod:
         self.pu = 0.5
         self.pa = 0.05
 
-    def make_hb_figure(self, time_unit: str, *args: Any) -> go.Figure:
-        """Runs the HB method and creates the plot showing the results."""
-        data = self.get_data_func(self.variable, time_unit)
-
+    @staticmethod
+    def _time_columns(data: pd.DataFrame) -> tuple[str, str]:
         time_cols = sorted([x for x in data.columns if x not in ["ident", "variabel"]])
         if len(time_cols) > 2:
             raise ValueError(
                 f"Too many columns in dataframe from get_data_func. Should be only 'ident', 'variabel' and two periods as separate columns. Received: {data.columns}"
             )
-        _t_0 = time_cols[0]
-        _t_1 = time_cols[1]
-
-        data = hb_method(
-            data=data,
-            p_c=self.pc,
-            p_u=self.pu,
-            p_a=self.pa,
-            id_field_name=self.ident,
-            x_1_field_name=_t_0,
-            x_2_field_name=_t_1,
-        ).sort_values(by=["maxX"])
+        return time_cols[0], time_cols[1]
+
+    def _batch_key(self, time_unit: str) -> tuple[Any, ...]:
+        return (
+            self.module_name,
+            self.module_number,
+            time_unit,
+            self.pc,
+            self.pu,
+            self.pa,
+        )
+
+    def run_batch(self, time_unit: str) -> pd.DataFrame:
+        """Runs the HB method for every variable from get_batch_data_func.
+
+        The result is cached for each time unit and set of parameter values, and
+        used by make_hb_figure for the variables it contains. It is dropped when
+        any table is written to through the app, since get_batch_data_func can read
+        from any of them.
+
+        Args:
+            time_unit: The time unit to pass to get_batch_data_func.
+
+        Returns:
+            The result of the HB method for every variable, with the variable in the
+            'variabel' column.
+
+        Raises:
+            ValueError: If the module has no get_batch_data_func.
+        """
+        if self.get_batch_data_func is None:
+            raise ValueError("HBMethod needs a get_batch_data_func to run in batch.")
+        get_batch_data_func = self.get_batch_data_func
+
+        def load() -> pd.DataFrame:
+            data = get_batch_data_func(time_unit)
+            _t_0, _t_1 = self._time_columns(data)
+            return hb_method_grouped(
+                data=data,
+                p_c=self.pc,
+                p_u=self.pu,
+                p_a=self.pa,
+                group_field_name="variabel",
+                id_field_name=self.ident,
+                x_1_field_name=_t_0,
+                x_2_field_name=_t_1,
+            )
+
+        return HBMethod._batch_results.get_or_load(self._batch_key(time_unit), load)
+
+    def make_hb_figure(self, time_unit: str, *args: Any) -> go.Figure:
+        """Runs the HB method and creates the plot showing the results."""
+        batch = HBMethod._batch_results.get(self._batch_key(time_unit))
+        if batch is not None and self.variable in set(batch["variabel"]):
+            logger.debug("Using HB result from the batch run.")
+            data = batch[batch["variabel"] == self.variable].sort_values(by=["maxX"])
+        else:
+            data = self.get_data_func(self.variable, time_unit)
+            _t_0, _t_1 = self._time_columns(data)
+            data = hb_method(
+                data=data,
+                p_c=self.pc,
+                p_u=self.pu,
+                p_a=self.pa,
+                id_field_name=self.ident,
+                x_1_field_name=_t_0,
+                x_2_field_name=_t_1,
+            ).sort_values(by=["maxX"])
         logger.debug("HB calculation done successfully.")
-        x = data["maxX"]
-        y = data["ratio"]
-        z = data["upperLimit"]
-        k = data["lowerLimit"]
+        points = downsample(data, "maxX", "ratio", keep=data["outlier"] == 1)
+        upper = downsample(data, "maxX", "upperLimit")
+        lower = downsample(data, "maxX", "lowerLimit")
 
         fig = go.Figure()
         fig.add_trace(
-            go.Scatter(
-                x=x,
-                y=y,
+            scatter_trace(
+                x=points["maxX"],
+                y=points["ratio"],
                 mode="markers",
-                hovertext=data["id"],
+                hovertext=points["id"],
                 name="Observasjon",
                 marker={
-                    "color": data["outlier"],
+                    "color": points["outlier"],
                     "colorscale": [[0, "#3498DB"], [1, "yellow"]],
                 },
             )
         )
-        fig.add_trace(go.Scatter(x=x, y=z, name="Øvre grense", marker_color="red"))
-        fig.add_trace(go.Scatter(x=x, y=k, name="Nedre grense", marker_color="red"))
+        fig.add_trace(
+            scatter_trace(
+                x=upper["maxX"],
+                y=upper["upperLimit"],
+                name="Øvre grense",
+                marker_color="red",
+            )
+        )
+        fig.add_trace(
+            scatter_trace(
+                x=lower["maxX"],
+                y=lower["lowerLimit"],
+                name="Nedre grense",
+                marker_color="red",
+            )
+        )
         fig.update_layout(
             height=800,
             title_text="HB-metoden",
@@ -132,11 +209,37 @@ class HBMethod:
             paper_bgcolor="#1F2833",
             font_color="white",
         )
-        fig.update_xaxes(title=self.variable, range=[0, max(x) * 1.05])
+        fig.update_xaxes(title=self.variable, range=[0, data["maxX"].max() * 1.05])
         fig.update_yaxes(title="Forholdstallet")
         logger.debug("Done, returning fig")
         return fig
 
+    def _create_batch_layout(self) -> list[Any]:
+        if self.get_batch_data_func is None:
+            return []
+        return [
+            html.Hr(),
+            dbc.Row(
+                dbc.Col(
+                    dbc.Button(
+                        "Kjør HB-modell for alle variabler",
+                        id=f"{self.module_number}-hb_batch_button",
+                    )
+                )
+            ),
+            dbc.Row(
+                dcc.Loading(
+                    dag.AgGrid(
+                        id=f"{self.module_number}-hb_ranking",
+                        className="ag-theme-alpine ag-theme-ssb",
+                        columnSize="responsiveSizeToFit",
+                        dashGridOptions={"rowSelection": "single"},
+                        style={"height": "300px"},
+                    )
+                )
+            ),
+        ]
+
     def _create_layout(self) -> dbc.Container:
         infobox = html.Div(
             [
@@ -263,6 +366,7 @@ class HBMethod:
                 dbc.Row(
                     [*inputs],
                 ),
+                *self._create_batch_layout(),
                 html.Hr(),
                 dbc.Row(
                     dcc.Loading(dcc.Graph(id=f"{self.module_number}-hb_figure")),
@@ -277,14 +381,18 @@ class HBMethod:
     def module_callbacks(self) -> None:
         """Registers the callbacks for the module."""
 
-        @callback(  # type: ignore[misc]
-            Output(f"{self.module_number}-hb-selectedvariable", "children"),
-            self.variableselector.get_input(self.varselector_variable),
-        )
         def set_variable(varselector_variable_value: str) -> html.P:
             self.variable = varselector_variable_value
             return html.P(f"Selected variable: {varselector_variable_value}")
 
+        self.variableselector.subscribe(
+            f"{self.module_number}-hb-selectedvariable",
+            [Output(f"{self.module_number}-hb-selectedvariable", "children")],
+            set_variable,
+            inputs=[self.varselector_variable],
+            states=[],
+        )
+
         @callback(  # type: ignore[misc]
             Input(f"{self.module_number}-hb_pc", "value"),
         )
@@ -317,6 +425,34 @@ class HBMethod:
                 raise PreventUpdate
             return self.make_hb_figure(time_unit, *args)
 
+        if self.get_batch_data_func is not None:
+
+            @callback(  # type: ignore[misc]
+                Output(f"{self.module_number}-hb_ranking", "rowData"),
+                Output(f"{self.module_number}-hb_ranking", "columnDefs"),
+                Input(f"{self.module_number}-hb_batch_button", "n_clicks"),
+                State(f"{self.module_number}-hb-dropdown", "value"),
+            )
+            def calculate_hb_batch(
+                n_click: int | None, time_unit: str
+            ) -> tuple[list[dict[str, Any]], list[dict[str, str]]]:
+                if not n_click:
+                    raise PreventUpdate
+                ranking = hb_outlier_ranking(self.run_batch(time_unit))
+                return ranking.to_dict("records"), [
+                    {"field": x, "headerName": x} for x in ranking.columns
+                ]
+
+            @callback(  # type: ignore[misc]
+                self.variableselector.get_output_object(self.varselector_variable),
+                Input(f"{self.module_number}-hb_ranking", "selectedRows"),
+                prevent_initial_call=True,
+            )
+            def ranking_to_varselector(selected_rows: list[dict[str, Any]]) -> str:
+                if not selected_rows:
+                    raise PreventUpdate
+                return str(selected_rows[0]["variabel"])
+
         @callback(  # type: ignore[misc]
             self.variableselector.get_output_object(self.ident),
             Input(f"{self.module_number}-hb_figure", "clickData"),
@@ -361,6 +497,7 @@ class HBMethodTab(TabImplementation, HBMethod):
         time_units: list[str],
         varselector_variable: str = "statistikkvariabel",
         output: str = "ident",
+        get_batch_data_func: Callable[..., Any] | None = None,
     ) -> None:
         """Initializes the HB method module.
 
@@ -369,6 +506,7 @@ class HBMethodTab(TabImplementation, HBMethod):
             time_units: A list of time units for the dataset. Example: ['year']
             varselector_variable: The name of the variableselector field used for determining which variable to analyze.
             output: Which variableselector field to update based on clicks in the graph.
+            get_batch_data_func: A function that takes a time_variable as input and returns a dataframe for all variables, in the same format as get_data_func. If given, the module can run the HB method for every variable at once and rank the variables by number of outliers.
         """
         HBMethod.__init__(
             self,
@@ -376,6 +514,7 @@ class HBMethodTab(TabImplementation, HBMethod):
             time_units=time_units,
             varselector_variable=varselector_variable,
             output=output,
+            get_batch_data_func=get_batch_data_func,
         )
         TabImplementation.__init__(self)
 
@@ -389,6 +528,7 @@ class HBMethodWindow(WindowImplementation, HBMethod):
         time_units: list[str],
         varselector_variable: str = "statistikkvariabel",
         output: str = "ident",
+        get_batch_data_func: Callable[..., Any] | None = None,
         **kwargs: Any
     ) -> None:
         """Initializes the HB method module.
@@ -398,6 +538,7 @@ class HBMethodWindow(WindowImplementation, HBMethod):
             time_units: A list of time units for the dataset. Example: ['year']
             varselector_variable: The name of the variableselector field used for determining which variable to analyze.
             output: Which variableselector field to update based on clicks in the graph.
+            get_batch_data_func: A function that takes a time_variable as input and returns a dataframe for all variables, in the same format as get_data_func. If given, the module can run the HB method for every variable at once and rank the variables by number of outliers.
         """
         HBMethod.__init__(
             self,
@@ -405,8 +546,16 @@ class HBMethodWindow(WindowImplementation, HBMethod):
             time_units=time_units,
             varselector_variable=varselector_variable,
             output=output,
+            get_batch_data_func=get_batch_data_func,
         )
         WindowImplementation.__init__(
             self,
             **kwargs
         )
+
+
+def _evict_batch_results(table: str, filters: dict[str, Any]) -> None:
+    HBMethod._batch_results.clear()
+
+
+on_unit_table_evicted(_evict_batch_results)
@@ -3,6 +3,7 @@ from .nspek import NaeringsspesifikasjonTab
 from .nspek import NaeringsspesifikasjonWindow
 from .nspek_control_config import CONTROL_RULES
 from .nspek_control_config import get_controls_for_field
+from .nspek_control_config import get_controls_for_fields
 from .nspek_control_config import get_rule_by_id
 from .nspek_control_engine import run_all_controls_for_sekvensnummer
 from .nspek_control_engine import run_all_controls_for_year
@@ -22,6 +23,7 @@ __all__ = [
     "NspekControlViewWindow",
     "NspekControls",
     "get_controls_for_field",
+    "get_controls_for_fields",
     "get_nspek_connection",
     "get_rule_by_id",
     "run_all_controls_for_sekvensnummer",
@@ -2,12 +2,17 @@ import logging
 import os
 import re
 import time
+from dataclasses import dataclass
+from dataclasses import field
+from functools import cache
+from functools import partial
 from pathlib import Path
 from typing import Any
 from typing import ClassVar
 
 import dash_bootstrap_components as dbc
 import ibis
+import numpy as np
 import pandas as pd
 from dash import callback
 from dash import ctx
@@ -26,13 +31,21 @@ from pandas.core.frame import DataFrame
 from ...setup.variableselector import VariableSelector
 from ...utils import TabImplementation
 from ...utils import WindowImplementation
+from ...utils import is_tab_or_window
+from ...utils.alert_handler import add_alerts
 from ...utils.alert_handler import create_alert
 from ...utils.module_validation import module_validator
+from ...utils.unit_cache import TTLCache
 from .nspek_control_engine import run_all_controls_for_sekvensnummer
 from .nspek_control_engine import run_controls_changed_fields_for_sekvensnummer
+from .nspek_control_engine import sql_value
 from .nspek_controls import NspekControls
 from .nspek_utils import get_nspek_connection
 from .nspek_utils import set_nspek_connection
+from .nspek_versions import VERSION_COLUMNS
+from .nspek_versions import find_orgnr
+from .nspek_versions import get_version_index
+from .nspek_versions import refresh_update_counts
 
 ibis.options.interactive = True
 logger = logging.getLogger(__name__)
@@ -88,188 +101,159 @@ NEGATIVE_ACCOUNTS = {
 }
 
 
-def add_ui_sums(df: pd.DataFrame, structure: dict) -> pd.DataFrame:
-    """Adds UI sum rows used for display aggregation in AG Grid.
+# The UI sum rows are placed right after the row with this post.
+UI_SUM_ANCHORS = {
+    "UI_SUM_1000_1399": "sumBalanseverdiForAnleggsmiddel",
+    "UI_SUM_1400_1999": "sumBalanseverdiForOmloepsmiddel",
+    "UI_SUM_1000_1999": "sumBalanseverdiForEiendel",
+    "UI_SUM_2000_2099": "sumEgenkapital",
+    "UI_SUM_2100_2299": "sumLangsiktigGjeld",
+    "UI_SUM_2300_2999": "sumKortsiktigGjeld",
+    "UI_SUM_2000_2999": "sumGjeldOgEgenkapital",
+    "UI_SUM_3000_3399": "3300",
+    "UI_SUM_3400_3999": "3911",
+    "UI_SUM_4000_4999": "4995",
+    "UI_SUM_5000_5999": "5950",
+    "UI_SUM_6000_7999": "7913",
+    "UI_SUM_3000_3999": "sumDriftsinntekt",
+    "UI_SUM_4000_7999": "sumDriftskostnad",
+    "UI_SUM_8000_8099": "sumFinansinntekt",
+    "UI_SUM_8100_8299": "sumFinanskostnad",
+    "UI_SUM_8300_8999": "sumSkattekostnad",
+    "UI_SUM_8000_8999": "sumSkattekostnad",
+    "UI_SUM_3000_8999": "aarsresultat",
+}
 
-    Example use: add_ui_sums(df, RESULTAT_STRUCTURE)
-    """
-    df = df.copy()
 
-    if "post" not in df.columns or "verdi" not in df.columns:
-        return df
-
-    df["post"] = df["post"].astype(str)
+def _range_sums(df: pd.DataFrame, structure: dict) -> dict[tuple[int, int], float]:
+    """Returns the signed sum of verdi for every non-empty post range in structure.
 
+    The numeric posts are sorted once, and the rows of each range are found with a
+    binary search instead of filtering the frame per range.
+    """
     post_numeric = pd.to_numeric(df["post"], errors="coerce")
-    df_numeric = df.loc[post_numeric.notna()].copy()
-    df_numeric["post_int"] = post_numeric.loc[post_numeric.notna()].astype(int)
+    numeric = post_numeric.notna().to_numpy()
 
-    def apply_sign(row):
-        return -1 if row["post"] in NEGATIVE_ACCOUNTS else 1
+    posts = post_numeric.to_numpy()[numeric].astype(int)
+    sign = np.where(df["post"].isin(NEGATIVE_ACCOUNTS).to_numpy()[numeric], -1, 1)
+    signed = df["verdi"].fillna(0).to_numpy()[numeric] * sign
 
-    df_numeric["sign"] = df_numeric.apply(apply_sign, axis=1)
+    order = np.argsort(posts, kind="stable")
+    posts = posts[order]
+    signed = signed[order]
 
-    ui_sum_rows = {}
+    sums = {}
+    for subgroups in structure.values():
+        for start, end in subgroups.values():
+            lo = np.searchsorted(posts, start, side="left")
+            hi = np.searchsorted(posts, end, side="right")
+            if hi > lo:
+                sums[(start, end)] = signed[lo:hi].sum()
+    return sums
 
-    for _, subgroups in structure.items():
-        for label, (start, end) in subgroups.items():
-
-            subset = df_numeric[df_numeric["post_int"].between(start, end)]
 
-            if subset.empty:
-                continue
+def _ui_sum_row(label: str, start: int, end: int, value: float) -> dict[str, Any]:
+    return {
+        "beskrivelse": f"SUM forslag for {label}",
+        "post": f"UI_SUM_{start}_{end}",
+        "verdi": None if value == 0 else value,
+        "verdi_compare": None,
+        "diff": None,
+        "sekvensnummer": None,
+        "is_ui_sum": True,
+    }
 
-            value = (subset["verdi"].fillna(0) * subset["sign"]).sum()
 
-            ui_sum_rows[f"UI_SUM_{start}_{end}"] = {
-                "beskrivelse": f"SUM forslag for {label}",
-                "post": f"UI_SUM_{start}_{end}",
-                "verdi": value,
-                "verdi_compare": None,
-                "diff": None,
-                "sekvensnummer": None,
-                "is_ui_sum": True,
-            }
+def add_ui_sums(df: pd.DataFrame, structure: dict) -> pd.DataFrame:
+    """Adds UI sum rows used for display aggregation in AG Grid.
 
-    if structure is RESULTAT_STRUCTURE:
+    Example use: add_ui_sums(df, RESULTAT_STRUCTURE)
+    """
+    df = df.copy()
 
-        driftsinntekter = (
-            ui_sum_rows["UI_SUM_3000_3399"]["verdi"]
-            + ui_sum_rows["UI_SUM_3400_3999"]["verdi"]
-        )
+    if "post" not in df.columns or "verdi" not in df.columns:
+        return df
 
-        driftskostnader = (
-            ui_sum_rows["UI_SUM_4000_4999"]["verdi"]
-            + ui_sum_rows["UI_SUM_5000_5999"]["verdi"]
-            + ui_sum_rows["UI_SUM_6000_7999"]["verdi"]
-        )
+    df["post"] = df["post"].astype(str)
 
-        finansposter_og_skattekostnad = (
-            ui_sum_rows["UI_SUM_8000_8099"]["verdi"]
-            + ui_sum_rows["UI_SUM_8100_8299"]["verdi"]
-            + ui_sum_rows["UI_SUM_8300_8999"]["verdi"]
-        )
+    sums = _range_sums(df, structure)
 
-        ui_sum_rows["UI_SUM_3000_3999"] = {
-            "beskrivelse": "SUM forslag for driftsinntekter",
-            "post": "UI_SUM_3000_3999",
-            "verdi": driftsinntekter,
-            "verdi_compare": None,
-            "diff": None,
-            "sekvensnummer": None,
-            "is_ui_sum": True,
-        }
+    ui_sum_rows = {}
 
-        ui_sum_rows["UI_SUM_4000_7999"] = {
-            "beskrivelse": "SUM forslag for driftskostnader",
-            "post": "UI_SUM_4000_7999",
-            "verdi": driftskostnader,
-            "verdi_compare": None,
-            "diff": None,
-            "sekvensnummer": None,
-            "is_ui_sum": True,
-        }
+    for subgroups in structure.values():
+        for label, (start, end) in subgroups.items():
+            if (start, end) in sums:
+                ui_sum_rows[f"UI_SUM_{start}_{end}"] = _ui_sum_row(
+                    label, start, end, sums[(start, end)]
+                )
 
-        ui_sum_rows["UI_SUM_8000_8999"] = {
-            "beskrivelse": "SUM forslag for finansposter og skattekostnad",
-            "post": "UI_SUM_8000_8999",
-            "verdi": finansposter_og_skattekostnad,
-            "verdi_compare": None,
-            "diff": None,
-            "sekvensnummer": None,
-            "is_ui_sum": True,
-        }
+    def total(*ranges: tuple[int, int]) -> float:
+        return sum(sums.get(r, 0) for r in ranges)
 
+    if structure is RESULTAT_STRUCTURE:
+        driftsinntekter = total((3000, 3399), (3400, 3999))
+        driftskostnader = total((4000, 4999), (5000, 5999), (6000, 7999))
+        finansposter_og_skattekostnad = total((8000, 8099), (8100, 8299), (8300, 8999))
         årsresultat = (
-            ui_sum_rows["UI_SUM_3000_3999"]["verdi"]
-            - ui_sum_rows["UI_SUM_4000_7999"]["verdi"]
-            + ui_sum_rows["UI_SUM_8000_8099"]["verdi"]
-            - ui_sum_rows["UI_SUM_8100_8299"]["verdi"]
-            - ui_sum_rows["UI_SUM_8300_8999"]["verdi"]
+            driftsinntekter
+            - driftskostnader
+            + total((8000, 8099))
+            - total((8100, 8299))
+            - total((8300, 8999))
         )
 
-        ui_sum_rows["UI_SUM_3000_8999"] = {
-            "beskrivelse": "SUM forslag for årsresultat",
-            "post": "UI_SUM_3000_8999",
-            "verdi": årsresultat,
-            "verdi_compare": None,
-            "diff": None,
-            "sekvensnummer": None,
-            "is_ui_sum": True,
-        }
+        for label, start, end, value in [
+            ("driftsinntekter", 3000, 3999, driftsinntekter),
+            ("driftskostnader", 4000, 7999, driftskostnader),
+            (
+                "finansposter og skattekostnad",
+                8000,
+                8999,
+                finansposter_og_skattekostnad,
+            ),
+            ("årsresultat", 3000, 8999, årsresultat),
+        ]:
+            ui_sum_rows[f"UI_SUM_{start}_{end}"] = _ui_sum_row(label, start, end, value)
 
     if structure is BALANSE_STRUCTURE:
+        eiendeler = total((1000, 1399), (1400, 1999))
+        egenkapital_og_gjeld = total((2000, 2099), (2100, 2299), (2300, 2999))
 
-        eiendeler = (
-            ui_sum_rows["UI_SUM_1000_1399"]["verdi"]
-            + ui_sum_rows["UI_SUM_1400_1999"]["verdi"]
+        ui_sum_rows["UI_SUM_1000_1999"] = _ui_sum_row(
+            "eiendeler", 1000, 1999, eiendeler
         )
-
-        egenkapital_og_gjeld = (
-            ui_sum_rows["UI_SUM_2000_2099"]["verdi"]
-            + ui_sum_rows["UI_SUM_2100_2299"]["verdi"]
-            + ui_sum_rows["UI_SUM_2300_2999"]["verdi"]
+        ui_sum_rows["UI_SUM_2000_2999"] = _ui_sum_row(
+            "egenkapital og gjeld", 2000, 2999, egenkapital_og_gjeld
         )
 
-        ui_sum_rows["UI_SUM_1000_1999"] = {
-            "beskrivelse": "SUM forslag for eiendeler",
-            "post": "UI_SUM_1000_1999",
-            "verdi": eiendeler,
-            "verdi_compare": None,
-            "diff": None,
-            "sekvensnummer": None,
-            "is_ui_sum": True,
-        }
-
-        ui_sum_rows["UI_SUM_2000_2999"] = {
-            "beskrivelse": "SUM forslag for egenkapital og gjeld",
-            "post": "UI_SUM_2000_2999",
-            "verdi": egenkapital_og_gjeld,
-            "verdi_compare": None,
-            "diff": None,
-            "sekvensnummer": None,
-            "is_ui_sum": True,
-        }
-
-    insert_after_map = {
-        "UI_SUM_1000_1399": "sumBalanseverdiForAnleggsmiddel",
-        "UI_SUM_1400_1999": "sumBalanseverdiForOmloepsmiddel",
-        "UI_SUM_1000_1999": "sumBalanseverdiForEiendel",
-        "UI_SUM_2000_2099": "sumEgenkapital",
-        "UI_SUM_2100_2299": "sumLangsiktigGjeld",
-        "UI_SUM_2300_2999": "sumKortsiktigGjeld",
-        "UI_SUM_2000_2999": "sumGjeldOgEgenkapital",
-        "UI_SUM_3000_3399": "3300",
-        "UI_SUM_3400_3999": "3911",
-        "UI_SUM_4000_4999": "4995",
-        "UI_SUM_5000_5999": "5950",
-        "UI_SUM_6000_7999": "7913",
-        "UI_SUM_3000_3999": "sumDriftsinntekt",
-        "UI_SUM_4000_7999": "sumDriftskostnad",
-        "UI_SUM_8000_8099": "sumFinansinntekt",
-        "UI_SUM_8100_8299": "sumFinanskostnad",
-        "UI_SUM_8300_8999": "sumSkattekostnad",
-        "": "sumSkattekostnad",
-        "UI_SUM_8000_8999": "sumSkattekostnad",
-        "UI_SUM_3000_8999": "aarsresultat",
-    }
-
-    new_rows = []
+    # Each sum row gets a sort position between its anchor row and the next row,
+    # in the order of UI_SUM_ANCHORS when several sums share an anchor.
+    df = df.reset_index(drop=True)
+    posts = df["post"].to_numpy()
+    extra_rows = []
+    extra_positions = []
+    placed: dict[int, int] = {}
 
-    for _, row in df.iterrows():
-        new_rows.append(row.to_dict())
-
-        post = row["post"]
+    for ui_key, anchor_post in UI_SUM_ANCHORS.items():
+        if ui_key not in ui_sum_rows:
+            continue
+        for anchor in np.flatnonzero(posts == anchor_post):
+            placed[anchor] = placed.get(anchor, 0) + 1
+            extra_rows.append(ui_sum_rows[ui_key])
+            extra_positions.append(anchor + placed[anchor] / (len(UI_SUM_ANCHORS) + 1))
 
-        for ui_key, anchor_post in insert_after_map.items():
-            if post == anchor_post and ui_key in ui_sum_rows:
-                new_rows.append(ui_sum_rows[ui_key])
+    if not extra_rows:
+        return df
 
-    for row in new_rows:
-        if row.get("is_ui_sum") and row.get("verdi") == 0:
-            row["verdi"] = None
+    combined = pd.concat(
+        [df, pd.DataFrame(extra_rows)],
+        ignore_index=True,
+    )
+    order = np.argsort(
+        np.concatenate([np.arange(len(df)), extra_positions]), kind="stable"
+    )
 
-    return pd.DataFrame(new_rows)
+    return combined.iloc[order].reset_index(drop=True).infer_objects()
 
 
 PETROLEUM_ORGNR = {
@@ -418,6 +402,16 @@ def get_versions(conn, ident: str, aar: str) -> pd.DataFrame:
         .execute()
     )
 
+    return add_version_labels(df)
+
+
+def add_version_labels(df: pd.DataFrame) -> pd.DataFrame:
+    """Adds a label column with version number and date received to versions.
+
+    Example use: add_version_labels(get_version_index(conn, 2024).for_orgnr("979443137"))
+    """
+    df = df.copy()
+
     df["label"] = (
         "v"
         + df["versjon_nr"].astype(str)
@@ -565,11 +559,9 @@ def get_value(series) -> str:
     return "" if series.empty else str(series.iloc[0])
 
 
-def post_description_data(regnskapstype: str) -> DataFrame:
-    """Returns a pandas dataframe with the npspek posts and their names.
-
-    Example use: post_description_data("balanseregnskap")
-    """
+@cache
+def _post_catalogue(regnskapstype: str) -> DataFrame:
+    """Reads the posts of a regnskapstype from its CSV file once per process."""
     base_path = Path(__file__).parent
 
     if regnskapstype == "balanseregnskap":
@@ -582,8 +574,15 @@ def post_description_data(regnskapstype: str) -> DataFrame:
     df = pd.read_csv(
         f"{post_file_path}", dtype={"felt": "string"}, keep_default_na=False
     )
+    return df[["tekst", "felt"]].astype({"felt": str})
+
+
+def post_description_data(regnskapstype: str) -> DataFrame:
+    """Returns a pandas dataframe with the npspek posts and their names.
 
-    return df[["tekst", "felt"]]
+    Example use: post_description_data("balanseregnskap")
+    """
+    return _post_catalogue(regnskapstype).copy()
 
 
 def feltkommentar_ikon_column():
@@ -757,9 +756,9 @@ def build_column_defs(sekvens_compare=None):
     return column_defs
 
 
-def build_regnskap_dataframe(
+def _build_regnskap_values(
     regnskapstype: str,
-    structure,
+    structure: dict,
     aar: str,
     orgnr_foretak: str,
     toggle_blank: list[str],
@@ -767,47 +766,29 @@ def build_regnskap_dataframe(
     sekvens_compare: int | None,
     toggle_petroleum: list[str],
 ) -> pd.DataFrame:
-    """
-    Henter og bygger dataframe for balanseregnskap eller resultatregnskap.
-    """
-
-    post_descriptions = post_description_data(regnskapstype)
+    """Builds the values, UI sums and filters of a regnskap, without field comments."""
+    post_descriptions = _post_catalogue(regnskapstype)
 
-    with get_nspek_connection() as conn:
+    ident_data = get_regnskap_values(
+        regnskapstype,
+        orgnr_foretak,
+        aar,
+        sekvensnummer,
+    )
 
-        ident_data = fetch_data_by_orgnr(
-            conn,
+    if sekvens_compare:
+        df_compare = get_regnskap_values(
             regnskapstype,
             orgnr_foretak,
             aar,
-            sekvensnummer,
-        )
-
-        comments = get_latest_field_comments(
-            conn,
-            orgnr_foretak,
+            sekvens_compare,
         )
-
-        if sekvens_compare:
-            df_compare = fetch_data_by_orgnr(
-                conn,
-                regnskapstype,
-                orgnr_foretak,
-                aar,
-                sekvens_compare,
-            )
-        else:
-            df_compare = None
+    else:
+        df_compare = None
 
     # Sørg for samme datatype før merge
-    post_descriptions = post_descriptions.copy()
     ident_data = ident_data.copy()
 
-    post_descriptions["felt"] = (
-        post_descriptions["felt"]
-        .astype(str)
-    )
-
     ident_data["felt"] = (
         ident_data["felt"]
         .astype(str)
@@ -887,55 +868,35 @@ def build_regnskap_dataframe(
         toggle_petroleum,
     )
 
-    # --------------------------------------------------
-    # Feltkommentarer
-    # --------------------------------------------------
+    return df
+
 
+def _add_field_comments(df: pd.DataFrame, comments: dict) -> pd.DataFrame:
+    """Adds the field comment columns and hides the post of non-numeric rows."""
     valid_comment_row = (
-        df["post"]
-        .fillna("")
-        .astype(str)
-        .ne("")
-        &
-        ~df["is_ui_sum"]
-        .astype("boolean")
-        .fillna(False)
+        df["post"].fillna("").astype(str).ne("")
+        & ~df["is_ui_sum"].astype("boolean").fillna(False)
+    ).to_numpy(dtype=bool)
+
+    kommentarer = pd.Series(
+        {felt: comment["kommentar"] for felt, comment in comments.items()},
+        dtype=object,
     )
 
     # Ikon kun på gyldige kommentarrader
-    df["feltkommentar_ikon"] = valid_comment_row.map(
-        lambda x: "💬" if x else ""
-    )
+    df["feltkommentar_ikon"] = np.where(valid_comment_row, "💬", "")
 
     # Selve kommentaren
-    df["feltkommentar_tekst"] = df["post"].map(
-        lambda x: comments.get(
-            x,
-            {},
-        ).get(
-            "kommentar",
-            "",
-        )
-    )
+    df["feltkommentar_tekst"] = df["post"].map(kommentarer).fillna("")
 
     # Har raden en aktiv kommentar?
-    df["har_feltkommentar"] = (
-        valid_comment_row
-        & df["post"].isin(comments)
-    )
+    df["har_feltkommentar"] = valid_comment_row & df["post"].isin(comments)
 
     # Tooltip
-    df["feltkommentar_tooltip"] = df.apply(
-        lambda r: (
-            r["feltkommentar_tekst"]
-            if r["har_feltkommentar"]
-            else (
-                "Klikk for å legge til feltkommentar"
-                if valid_comment_row.loc[r.name]
-                else ""
-            )
-        ),
-        axis=1,
+    df["feltkommentar_tooltip"] = np.where(
+        df["har_feltkommentar"],
+        df["feltkommentar_tekst"],
+        np.where(valid_comment_row, "Klikk for å legge til feltkommentar", ""),
     )
 
     # Vis kun numeriske poster i gridet
@@ -949,6 +910,83 @@ def build_regnskap_dataframe(
     return df
 
 
+# felt and belop of a regnskapstype and sekvensnummer, as read by fetch_data_by_orgnr.
+_REGNSKAP_VALUES: TTLCache[pd.DataFrame] = TTLCache(max_size=128, ttl=300.0)
+
+
+def get_regnskap_values(
+    regnskapstype: str, orgnr: str, aar: str, sekvensnummer: int
+) -> pd.DataFrame:
+    """Returns the cached values of a regnskapstype and sekvensnummer, fetching them if needed.
+
+    Example use: get_regnskap_values("resultatregnskap", "932598957", "2024", 2291859)
+    """
+
+    def load() -> pd.DataFrame:
+        with get_nspek_connection() as conn:
+            return fetch_data_by_orgnr(conn, regnskapstype, orgnr, aar, sekvensnummer)
+
+    return _REGNSKAP_VALUES.get_or_load((regnskapstype, sekvensnummer), load)
+
+
+# Built regnskap frames without field comments, keyed on regnskapstype,
+# sekvensnummer, compared sekvensnummer and the toggles. Evicted when values of a
+# sekvensnummer are saved, see evict_regnskap_frames.
+_REGNSKAP_FRAMES: TTLCache[pd.DataFrame] = TTLCache(max_size=64, ttl=300.0)
+
+
+def evict_regnskap_frames(sekvensnummer: int) -> None:
+    """Drops the cached values of a sekvensnummer and the frames showing or comparing with it.
+
+    Example use: evict_regnskap_frames(2291859)
+    """
+    _REGNSKAP_VALUES.evict_where(lambda key: key[1] == sekvensnummer)
+    _REGNSKAP_FRAMES.evict_where(lambda key: sekvensnummer in (key[1], key[2]))
+
+
+def build_regnskap_dataframe(
+    regnskapstype: str,
+    structure,
+    aar: str,
+    orgnr_foretak: str,
+    toggle_blank: list[str],
+    sekvensnummer: int,
+    sekvens_compare: int | None,
+    toggle_petroleum: list[str],
+) -> pd.DataFrame:
+    """
+    Henter og bygger dataframe for balanseregnskap eller resultatregnskap.
+
+    Verdiene, UI-summene og filtrene hentes fra en cache per sekvensnummer,
+    sammenligning og valg i UI, og feltkommentarene fra get_nspek_comments.
+    """
+    key = (
+        regnskapstype,
+        sekvensnummer,
+        sekvens_compare or None,
+        tuple(sorted(toggle_blank or [])),
+        tuple(sorted(toggle_petroleum or [])),
+    )
+
+    df = _REGNSKAP_FRAMES.get_or_load(
+        key,
+        lambda: _build_regnskap_values(
+            regnskapstype,
+            structure,
+            aar,
+            orgnr_foretak,
+            toggle_blank,
+            sekvensnummer,
+            sekvens_compare,
+            toggle_petroleum,
+        ),
+    ).copy()
+
+    comments = latest_field_comments(get_nspek_comments(orgnr_foretak))
+
+    return _add_field_comments(df, comments)
+
+
 def fetch_data_by_orgnr(
     conn, regnskapstype: str, ident: str, aar: str, sekvensnummer: int
 ) -> pd.DataFrame:
@@ -1165,6 +1203,231 @@ def get_available_years(conn, ident: str) -> list[int]:
     return sorted(df["aar"].dropna().astype(int).unique().tolist())
 
 
+def version_options(df: pd.DataFrame) -> list[dict]:
+    """Returns dropdown options for versions with update counts, marking edited ones.
+
+    Example use: version_options(add_version_labels(index.for_orgnr("979443137")))
+    """
+    labels = df["label"] + np.where(df["antall_endringer"] > 0, " (editert)", "")
+
+    return [
+        {"label": label, "value": sekvensnummer}
+        for label, sekvensnummer in zip(labels, df["sekvensnummer"], strict=True)
+    ]
+
+
+def get_comments(conn, orgnr: str) -> pd.DataFrame:
+    """Returns every generell and variabel comment for an orgnr, newest first.
+
+    Example use: get_comments(conn, "932598957")
+    """
+    query = f"""
+        SELECT
+            id,
+            nivaa,
+            variabel,
+            kommentar,
+            opprettet_av,
+            opprettet,
+            aktiv
+        FROM nspek_core.kommentarfelt_test_2
+        WHERE orgnr = '{orgnr}'
+        AND nivaa IN ('generell', 'variabel')
+        ORDER BY opprettet DESC
+    """
+
+    cursor = conn.raw_sql(query)
+    rows = cursor.fetchall()
+    columns = [col[0] for col in cursor.description]
+
+    return pd.DataFrame(rows, columns=columns)
+
+
+def _format_opprettet(value) -> str:
+    return pd.to_datetime(value).strftime("%Y-%m-%d %H:%M") if pd.notna(value) else ""
+
+
+def latest_field_comments(comments: pd.DataFrame) -> dict:
+    """Returns the latest active comment of each variabel from get_comments.
+
+    Example use: latest_field_comments(get_nspek_comments("932598957"))
+    """
+    if comments.empty:
+        return {}
+
+    active = comments[
+        (comments["nivaa"] == "variabel") & comments["aktiv"].astype(bool)
+    ].drop_duplicates("variabel")
+
+    return {
+        str(row["variabel"]): {
+            "kommentar": row["kommentar"] or "",
+            "endret_dato": _format_opprettet(row["opprettet"]),
+            "opprettet_av": row["opprettet_av"] or "",
+        }
+        for row in active.to_dict("records")
+    }
+
+
+# Comments of an orgnr from get_comments, keyed on orgnr. Evicted by the callbacks
+# writing comments, see evict_nspek_comments.
+_NSPEK_COMMENTS: TTLCache[pd.DataFrame] = TTLCache(max_size=32, ttl=60.0)
+
+
+def get_nspek_comments(orgnr: str) -> pd.DataFrame:
+    """Returns the cached comments of an orgnr, fetching them if needed.
+
+    Example use: get_nspek_comments("932598957")
+    """
+
+    def load() -> pd.DataFrame:
+        with get_nspek_connection() as conn:
+            return get_comments(conn, orgnr)
+
+    return _NSPEK_COMMENTS.get_or_load(str(orgnr), load)
+
+
+def evict_nspek_comments(orgnr: str) -> None:
+    """Drops the cached comments of an orgnr. Called after its comments are changed.
+
+    Example use: evict_nspek_comments("932598957")
+    """
+    _NSPEK_COMMENTS.evict(str(orgnr))
+
+
+@dataclass
+class NspekUnit:
+    """What the Naeringsspesifikasjon module shows for one orgnr and year.
+
+    Attributes:
+        orgnr: The organisation number.
+        aar: The year.
+        versions: The versions of the year, with labels and update counts.
+        version_options: Dropdown options for the versions of the year.
+        default_sekvensnummer: The version shown when the unit is opened.
+        latest_sekvensnummer: The last received version.
+        compare_options: The versions of the year and the default version of
+            every other year, to compare with.
+        virksomhetsinfo: felt and char_verdi of the default version.
+        skjoennslignet: If the default version is skjønnslignet.
+    """
+
+    orgnr: str
+    aar: str
+    versions: pd.DataFrame
+    version_options: list[dict] = field(default_factory=list)
+    default_sekvensnummer: int | None = None
+    latest_sekvensnummer: int | None = None
+    compare_options: list[dict] = field(default_factory=list)
+    virksomhetsinfo: pd.DataFrame = field(default_factory=pd.DataFrame)
+    skjoennslignet: bool = False
+
+    @property
+    def has_data(self) -> bool:
+        """If NSPEK has any version for the orgnr and year."""
+        return not self.versions.empty
+
+
+def load_nspek_unit(orgnr: str, aar: str) -> NspekUnit:
+    """Loads everything shown for an orgnr and year in one visit to the database.
+
+    The versions and the active version of every year come from the shared version
+    index, see nspek_versions. The virksomhetsinfo and skjønnslignet of the active
+    version are read, and the comments of the orgnr and both regnskap types of the
+    active version are put in their caches on the same connection, so the grids and
+    comment fields do not have to fetch them.
+
+    Example use: load_nspek_unit("979443137", "2024")
+    """
+    with get_nspek_connection() as conn:
+        indexes = {
+            year: get_version_index(conn, year)
+            for year in get_available_years(conn, orgnr)
+        }
+
+        if int(aar) not in indexes:
+            return NspekUnit(
+                orgnr=orgnr, aar=aar, versions=pd.DataFrame(columns=VERSION_COLUMNS)
+            )
+
+        index = indexes[int(aar)]
+        versions = add_version_labels(index.for_orgnr(orgnr))
+
+        compare_options = version_options(versions)
+
+        for year, year_index in indexes.items():
+            active = year_index.active_sekvensnummer(orgnr)
+            if year != int(aar) and active is not None:
+                compare_options.append({"label": f"{year}", "value": active})
+
+        unit = NspekUnit(
+            orgnr=orgnr,
+            aar=aar,
+            versions=versions,
+            compare_options=compare_options,
+        )
+
+        _NSPEK_COMMENTS.get_or_load(orgnr, partial(get_comments, conn, orgnr))
+
+        if versions.empty:
+            return unit
+
+        unit.version_options = version_options(versions)
+        unit.default_sekvensnummer = index.active_sekvensnummer(orgnr)
+        unit.latest_sekvensnummer = int(
+            versions.sort_values(
+                by=["dato_mottatt", "sekvensnummer"], ascending=[False, False]
+            ).iloc[0]["sekvensnummer"]
+        )
+        unit.virksomhetsinfo = get_virksomhetsinfo(
+            conn=conn,
+            variables_to_fetch=virksomhetsinfo_variabler,
+            ident=orgnr,
+            aar=aar,
+            sekvensnummer=unit.default_sekvensnummer,
+        )
+        unit.skjoennslignet = not get_skjoennslignet(
+            conn, unit.default_sekvensnummer
+        ).empty
+
+        for regnskapstype in ("balanseregnskap", "resultatregnskap"):
+            _REGNSKAP_VALUES.get_or_load(
+                (regnskapstype, unit.default_sekvensnummer),
+                partial(
+                    fetch_data_by_orgnr,
+                    conn,
+                    regnskapstype,
+                    orgnr,
+                    aar,
+                    unit.default_sekvensnummer,
+                ),
+            )
+
+    return unit
+
+
+# Units loaded by load_nspek_unit, keyed on orgnr and year. The callbacks fired by
+# changing orgnr or year all read from here, and the cache lets them share one load.
+_NSPEK_UNITS: TTLCache[NspekUnit] = TTLCache(max_size=32, ttl=60.0)
+
+
+def get_nspek_unit(orgnr: str, aar: str) -> NspekUnit:
+    """Returns the cached NspekUnit for an orgnr and year, loading it if needed.
+
+    Example use: get_nspek_unit("979443137", "2024").has_data
+    """
+    orgnr, aar = str(orgnr), str(aar)
+    return _NSPEK_UNITS.get_or_load((orgnr, aar), lambda: load_nspek_unit(orgnr, aar))
+
+
+def evict_nspek_unit(orgnr: str) -> None:
+    """Drops the cached units of an orgnr, for every year.
+
+    Example use: evict_nspek_unit("979443137")
+    """
+    _NSPEK_UNITS.evict_where(lambda key: key[0] == str(orgnr))
+
+
 MAX_ALLOWED_VALUE = 999_999_999_999
 
 
@@ -1200,20 +1463,32 @@ def is_negative(value: str) -> bool:
         return False
 
 
-def save_regnskap_value(
-    conn, regnskapstype: str, sekvensnummer: int, post: str, value: str
-):
-    """Inserts or updates nspek regnskap values.
+def save_regnskap_values(conn, regnskapstype: str, values: list[dict]) -> None:
+    """Inserts or updates several nspek regnskap values in one statement.
+
+    The values are written in a single UPSERT, so either all or none of them are
+    saved. If a post of a sekvensnummer appears more than once, the last value wins.
 
     Example use:
-    save_regnskap_value(conn, "balanseregnskap", 123, "A1", "1000")
+    save_regnskap_values(conn, "balanseregnskap", [{"sekvensnummer": 123, "post": "1000", "value": "10"}])
     """
+    if not values:
+        return
+
     config = TYPE_REGNSKAP_TABLE[regnskapstype]
 
+    latest = {
+        (int(v["sekvensnummer"]), str(v["post"])): str(v["value"]) for v in values
+    }
+    values_sql = ",\n".join(
+        f"({sekvensnummer}, {sql_value(post)}, {sql_value(value)})"
+        for (sekvensnummer, post), value in latest.items()
+    )
+
     query = f"""
         INSERT INTO {config["database"]}.{config["table"]}
         (sekvensnummer, felt, belop)
-        VALUES ({sekvensnummer}, '{post}', '{value}')
+        VALUES {values_sql}
         ON CONFLICT (sekvensnummer, felt)
         DO UPDATE SET belop = EXCLUDED.belop
     """
@@ -1221,100 +1496,181 @@ def save_regnskap_value(
     conn.raw_sql(query)
 
 
-def handle_regnskap_edit(
-    edited, alert_store, refresh_data, regnskapstype: str, refresh_key: str
+def save_regnskap_value(
+    conn, regnskapstype: str, sekvensnummer: int, post: str, value: str
 ):
-    """Central handler for nspek grid edits (balanse + resultat).
+    """Inserts or updates nspek regnskap values.
 
     Example use:
-    handle_regnskap_edit(..., "balanseregnskap", "balanse")
+    save_regnskap_value(conn, "balanseregnskap", 123, "A1", "1000")
     """
-    alert_store = alert_store or []
+    save_regnskap_values(
+        conn,
+        regnskapstype,
+        [{"sekvensnummer": sekvensnummer, "post": post, "value": value}],
+    )
 
-    row = edited[0]["data"]
 
-    if row.get("is_ui_sum") or not str(row.get("post", "")).strip():
-        raise PreventUpdate
+def collect_regnskap_edits(edited: list[dict]) -> tuple[list[dict], list[dict]]:
+    """Turns the cellValueChanged events of a grid into edits to save.
 
-    ident = row["sekvensnummer"]
-    sekvensnummer = row["sekvensnummer"]
-    post = row["post"]
+    AG Grid sends every cell changed at once, for example by pasting a column, in
+    the same cellValueChanged list. Rows that are UI sums or have no post are
+    skipped, and values that are not valid numbers give a warning instead of an
+    edit.
 
-    value = clean_whitespace(edited[0]["value"])
-    old_value = edited[0]["oldValue"]
+    Example use: edits, alerts = collect_regnskap_edits(cellValueChanged)
 
-    ok, error = validate_numeric_input(value)
+    Returns:
+        The edits, as dicts with sekvensnummer, post, value and old_value, and the
+        alerts for invalid values.
+    """
+    edits = []
+    alerts = []
 
-    if not ok:
-        alert_store = [
-            create_alert(error, "warning", ephemeral=True),
-            *alert_store,
-        ]
-        return alert_store, refresh_data, False, None, no_update
+    for event in edited or []:
+        row = event["data"]
 
-    if is_negative(value):
+        if row.get("is_ui_sum") or not str(row.get("post", "")).strip():
+            continue
 
-        pending = {
-            "regnskapstype": regnskapstype,
-            "sekvensnummer": sekvensnummer,
-            "post": post,
-            "value": value,
-            "old_value": old_value,
-            "ident": ident,
-            "refresh_key": refresh_key,
-        }
+        value = clean_whitespace(event["value"])
+        ok, error = validate_numeric_input(value)
+
+        if not ok:
+            alerts.append(
+                create_alert(f"{row['post']}: {error}", "warning", ephemeral=True)
+            )
+            continue
 
-        message = (
-            f"Du forsøker å lagre en negativ verdi {value} for post {post}. "
-            f"Dette skal kun skje unntaksvis. Er du sikker?"
+        edits.append(
+            {
+                "sekvensnummer": row["sekvensnummer"],
+                "post": row["post"],
+                "value": value,
+                "old_value": event["oldValue"],
+            }
         )
 
-        return (
-            alert_store,
-            refresh_data,
-            True,
-            pending,
-            message,
+    return edits, alerts
+
+
+def save_regnskap_edits(regnskapstype: str, edits: list[dict]) -> dict[str, Any]:
+    """Saves a batch of grid edits and re-runs the controls they affect.
+
+    All values are written in one statement on one connection, and the controls of
+    the changed fields are run once per sekvensnummer.
+
+    Example use: save_regnskap_edits("balanseregnskap", edits)
+
+    Returns:
+        An alert telling if the edits were saved.
+    """
+    fields_per_sekvensnummer: dict[int, set[str]] = {}
+    for edit in edits:
+        fields_per_sekvensnummer.setdefault(int(edit["sekvensnummer"]), set()).add(
+            str(edit["post"])
         )
 
     try:
         with get_nspek_connection() as conn:
-
             user = os.getenv("DAPLA_USER", "")[:3]
 
             conn.raw_sql(f"SET nspek_app.user_id = '{user}'")
             conn.raw_sql("SET nspek_app.process_type = 'editering'")
 
-            save_regnskap_value(conn, regnskapstype, sekvensnummer, post, value)
+            save_regnskap_values(conn, regnskapstype, edits)
+
+            for sekvensnummer, fields in fields_per_sekvensnummer.items():
+                run_controls_changed_fields_for_sekvensnummer(
+                    conn, sekvensnummer, changed_fields=sorted(fields)
+                )
+
+            # The edited versions may now be the active ones of their units.
+            refresh_update_counts(conn, list(fields_per_sekvensnummer))
 
-            run_controls_changed_fields_for_sekvensnummer(
-                conn, sekvensnummer, changed_fields=[post]
+        if len(edits) == 1:
+            edit = edits[0]
+            message = (
+                f"{edit['post']} oppdatert fra {edit['old_value']} til {edit['value']}"
             )
+        else:
+            posts = ", ".join(str(edit["post"]) for edit in edits)
+            message = f"{len(edits)} poster oppdatert: {posts}"
 
-        alert_store = [
-            create_alert(
-                f"{post} oppdatert fra {old_value} til {value}",
-                "success",
-                ephemeral=True,
-            ),
-            *alert_store,
-        ]
+        alert = create_alert(message, "success", ephemeral=True)
 
     except Exception as e:
         logger.error(e, exc_info=True)
 
-        alert_store = [
-            create_alert(
-                f"Feil: {str(e)[:80]}",
-                "warning",
-                ephemeral=True,
-            ),
-            *alert_store,
-        ]
+        alert = create_alert(
+            f"Feil: {str(e)[:80]}",
+            "warning",
+            ephemeral=True,
+        )
+
+    for sekvensnummer in fields_per_sekvensnummer:
+        evict_regnskap_frames(sekvensnummer)
+
+        orgnr = find_orgnr(sekvensnummer)
+        if orgnr is not None:
+            evict_nspek_unit(orgnr)
+
+    return alert
+
+
+def handle_regnskap_edit(edited, refresh_data, regnskapstype: str, refresh_key: str):
+    """Central handler for nspek grid edits (balanse + resultat).
+
+    Handles every cell in the cellValueChanged list in one go. If any of the new
+    values is negative, the whole batch waits for confirmation in the modal.
+
+    Example use:
+    handle_regnskap_edit(..., "balanseregnskap", "balanse")
+    """
+    edits, alerts = collect_regnskap_edits(edited)
+
+    if not edits and not alerts:
+        raise PreventUpdate
+
+    if not edits:
+        return add_alerts(*alerts), refresh_data, False, None, no_update
+
+    negative = [edit for edit in edits if is_negative(edit["value"])]
+
+    if negative:
+        pending = {
+            "regnskapstype": regnskapstype,
+            "refresh_key": refresh_key,
+            "edits": edits,
+        }
+
+        if len(negative) == 1:
+            message = (
+                f"Du forsøker å lagre en negativ verdi {negative[0]['value']} "
+                f"for post {negative[0]['post']}. "
+                f"Dette skal kun skje unntaksvis. Er du sikker?"
+            )
+        else:
+            posts = ", ".join(f"{edit['post']} ({edit['value']})" for edit in negative)
+            message = (
+                f"Du forsøker å lagre negative verdier for postene {posts}. "
+                f"Dette skal kun skje unntaksvis. Er du sikker?"
+            )
+
+        return (
+            add_alerts(*alerts) if alerts else no_update,
+            refresh_data,
+            True,
+            pending,
+            message,
+        )
+
+    alert = save_regnskap_edits(regnskapstype, edits)
 
     refresh_data = trigger_refresh(refresh_data, refresh_key)
 
-    return alert_store, refresh_data, False, None, no_update
+    return add_alerts(alert, *alerts), refresh_data, False, None, no_update
 
 
 class Naeringsspesifikasjon:
@@ -2383,6 +2739,14 @@ class Naeringsspesifikasjon:
 
     def module_callbacks(self) -> None:
         """Defines the callbacks for the Naeringsspesifikasjon module."""
+        # The unit is only loaded while the tab or window is visible.
+        deferred = is_tab_or_window(self)
+        ident_input = self.variableselector.get_input(
+            "var-ident", search_target="id", deferred=deferred
+        )
+        aar_input = self.variableselector.get_input(
+            "var-aar", search_target="id", deferred=deferred
+        )
 
         @callback(
             Output(
@@ -2412,8 +2776,8 @@ class Naeringsspesifikasjon:
             Output(
                 component_id="bof-info-card-undersektorkode", component_property="value"
             ),
-            Input("var-ident", "value"),
-            Input("var-aar", "value"),
+            ident_input,
+            aar_input,
         )
         def create_info_cards_bof(
             orgnr_foretak: str, aar: str
@@ -2470,8 +2834,8 @@ class Naeringsspesifikasjon:
             ),
             Output(component_id="nspek-info-card-start", component_property="value"),
             Output(component_id="nspek-info-card-slutt", component_property="value"),
-            Input("var-aar", "value"),
-            Input("var-ident", "value"),
+            aar_input,
+            ident_input,
             Input("nspek-versjon-dropdown", "value"),
         )
         def create_info_cards_virksomhet(
@@ -2483,17 +2847,22 @@ class Naeringsspesifikasjon:
             if not aar or not orgnr_foretak or not sekvensnummer:
                 return "", "", "", "", ""
 
-            with get_nspek_connection() as conn:
-                if not has_data(conn, orgnr_foretak, aar):
-                    return "", "", "", "", ""
+            unit = get_nspek_unit(orgnr_foretak, aar)
 
-                df = get_virksomhetsinfo(
-                    conn=conn,
-                    variables_to_fetch=virksomhetsinfo_variabler,
-                    ident=orgnr_foretak,
-                    aar=aar,
-                    sekvensnummer=sekvensnummer,
-                )
+            if not unit.has_data:
+                return "", "", "", "", ""
+
+            if sekvensnummer == unit.default_sekvensnummer:
+                df = unit.virksomhetsinfo
+            else:
+                with get_nspek_connection() as conn:
+                    df = get_virksomhetsinfo(
+                        conn=conn,
+                        variables_to_fetch=virksomhetsinfo_variabler,
+                        ident=orgnr_foretak,
+                        aar=aar,
+                        sekvensnummer=sekvensnummer,
+                    )
 
             if df.empty:
                 return "", "", "", "", ""
@@ -2517,8 +2886,8 @@ class Naeringsspesifikasjon:
                 component_id="nspek-info-card-skjoennslignet",
                 component_property="value",
             ),
-            Input("var-aar", "value"),
-            Input("var-ident", "value"),
+            aar_input,
+            ident_input,
             Input("nspek-versjon-dropdown", "value"),
         )
         def create_info_cards_skjoennslignet(
@@ -2528,10 +2897,15 @@ class Naeringsspesifikasjon:
             if not aar or not orgnr_foretak or not sekvensnummer:
                 return ""
 
-            with get_nspek_connection() as conn:
-                if not has_data(conn, orgnr_foretak, aar):
-                    return ""
+            unit = get_nspek_unit(orgnr_foretak, aar)
 
+            if not unit.has_data:
+                return ""
+
+            if sekvensnummer == unit.default_sekvensnummer:
+                return "Ja" if unit.skjoennslignet else "Nei"
+
+            with get_nspek_connection() as conn:
                 df = get_skjoennslignet(
                     conn=conn,
                     sekvensnummer=sekvensnummer,
@@ -2549,8 +2923,8 @@ class Naeringsspesifikasjon:
             Output("nspek-balansedata-grid", "columnDefs"),
             Input("btn-hent-data", "n_clicks"),
             Input("refresh-manager", "data"),
-            Input("var-aar", "value"),
-            Input("var-ident", "value"),
+            aar_input,
+            ident_input,
             Input("toggle-show-blank-values-balanse", "value"),
             Input("nspek-versjon-dropdown", "value"),
             Input("nspek-versjon-dropdown-compare", "value"),
@@ -2576,6 +2950,9 @@ class Naeringsspesifikasjon:
             ):
                 return [], []
 
+            if ctx.triggered_id == "btn-hent-data":
+                evict_regnskap_frames(sekvensnummer)
+
             df = build_regnskap_dataframe(
                 regnskapstype="balanseregnskap",
                 structure=BALANSE_STRUCTURE,
@@ -2600,8 +2977,8 @@ class Naeringsspesifikasjon:
             Output("nspek-resultatdata-grid", "columnDefs"),
             Input("btn-hent-data", "n_clicks"),
             Input("refresh-manager", "data"),
-            Input("var-aar", "value"),
-            Input("var-ident", "value"),
+            aar_input,
+            ident_input,
             Input("toggle-show-blank-values-resultat", "value"),
             Input("nspek-versjon-dropdown", "value"),
             Input("nspek-versjon-dropdown-compare", "value"),
@@ -2627,6 +3004,9 @@ class Naeringsspesifikasjon:
             ):
                 return [], []
 
+            if ctx.triggered_id == "btn-hent-data":
+                evict_regnskap_frames(sekvensnummer)
+
             df = build_regnskap_dataframe(
                 regnskapstype="resultatregnskap",
                 structure=RESULTAT_STRUCTURE,
@@ -2653,14 +3033,12 @@ class Naeringsspesifikasjon:
             Output("pending-regnskap-edit", "data", allow_duplicate=True),
             Output("negative-value-modal-body", "children"),
             Input("nspek-balansedata-grid", "cellValueChanged"),
-            State("alert_store", "data"),
             State("refresh-manager", "data"),
             prevent_initial_call=True,
         )
-        def edit_balanseregnskap(edited, alert_store, refresh_data):
+        def edit_balanseregnskap(edited, refresh_data):
             return handle_regnskap_edit(
                 edited,
-                alert_store,
                 refresh_data,
                 regnskapstype="balanseregnskap",
                 refresh_key="balanse",
@@ -2673,14 +3051,12 @@ class Naeringsspesifikasjon:
             Output("pending-regnskap-edit", "data", allow_duplicate=True),
             Output("negative-value-modal-body", "children", allow_duplicate=True),
             Input("nspek-resultatdata-grid", "cellValueChanged"),
-            State("alert_store", "data"),
             State("refresh-manager", "data"),
             prevent_initial_call=True,
         )
-        def edit_resultatregnskap(edited, alert_store, refresh_data):
+        def edit_resultatregnskap(edited, refresh_data):
             return handle_regnskap_edit(
                 edited,
-                alert_store,
                 refresh_data,
                 regnskapstype="resultatregnskap",
                 refresh_key="resultat",
@@ -2693,54 +3069,18 @@ class Naeringsspesifikasjon:
             Output("refresh-manager", "data", allow_duplicate=True),
             Input("btn-confirm-negative-edit", "n_clicks"),
             State("pending-regnskap-edit", "data"),
-            State("alert_store", "data"),
             State("refresh-manager", "data"),
             prevent_initial_call=True,
         )
-        def confirm_negative(_, pending, alert_store, refresh_data):
+        def confirm_negative(_, pending, refresh_data):
             if not pending:
                 raise PreventUpdate
 
-            try:
-                with get_nspek_connection() as conn:
-
-                    user = os.getenv("DAPLA_USER", "")[:3]
-
-                    conn.raw_sql(f"SET nspek_app.user_id = '{user}'")
-                    conn.raw_sql("SET nspek_app.process_type = 'editering'")
-
-                    save_regnskap_value(
-                        conn,
-                        pending["regnskapstype"],
-                        pending["sekvensnummer"],
-                        pending["post"],
-                        pending["value"],
-                    )
-
-                alert_store = [
-                    create_alert(
-                        f"{pending['post']} oppdatert til {pending['value']}",
-                        "success",
-                        ephemeral=True,
-                    ),
-                    *alert_store,
-                ]
-
-            except Exception as e:
-                logger.error(e, exc_info=True)
-
-                alert_store = [
-                    create_alert(
-                        f"Feil: {str(e)[:80]}",
-                        "warning",
-                        ephemeral=True,
-                    ),
-                    *alert_store,
-                ]
+            alert = save_regnskap_edits(pending["regnskapstype"], pending["edits"])
 
             refresh_data = trigger_refresh(refresh_data, pending["refresh_key"])
 
-            return False, None, alert_store, refresh_data
+            return False, None, add_alerts(alert), refresh_data
 
         @callback(
             Output("modal-negative-value", "is_open", allow_duplicate=True),
@@ -2758,8 +3098,8 @@ class Naeringsspesifikasjon:
         @callback(
             Output("nspek-info-card-organisasjonsnummer", "value"),
             Output("nspek-info-card-aar", "value"),
-            Input("var-ident", "value"),
-            Input("var-aar", "value"),
+            ident_input,
+            aar_input,
         )
         def sync_ui_fields(orgnr, aar):
             if not orgnr or not aar:
@@ -2779,14 +3119,12 @@ class Naeringsspesifikasjon:
             State("nspek-info-card-organisasjonsnummer", "value"),
             State("nspek-info-card-aar", "value"),
             State("refresh-manager", "data"),
-            State("alert_store", "data"),
             prevent_initial_call=True,
         )
         def update_variableselector(
-            n_clicks, orgnr_submit, aar_submit, orgnr, aar, refresh_data, alert_store
+            n_clicks, orgnr_submit, aar_submit, orgnr, aar, refresh_data
         ):
 
-            alert_store = alert_store or []
 
             orgnr = clean_whitespace(orgnr)
 
@@ -2798,10 +3136,7 @@ class Naeringsspesifikasjon:
                     no_update,
                     no_update,
                     refresh_data,
-                    [
-                        create_alert(msg_org, "warning", ephemeral=True),
-                        *alert_store,
-                    ],
+                    add_alerts(create_alert(msg_org, "warning", ephemeral=True)),
                 )
 
             ok_aar, msg_aar = validate_aar(aar)
@@ -2812,10 +3147,7 @@ class Naeringsspesifikasjon:
                     no_update,
                     no_update,
                     refresh_data,
-                    [
-                        create_alert(msg_aar, "warning", ephemeral=True),
-                        *alert_store,
-                    ],
+                    add_alerts(create_alert(msg_aar, "warning", ephemeral=True)),
                 )
 
             if not orgnr_exists_in_bof(orgnr):
@@ -2825,84 +3157,63 @@ class Naeringsspesifikasjon:
                     no_update,
                     no_update,
                     refresh_data,
-                    [
+                    add_alerts(
                         create_alert(
                             f"Organisasjonsnummer {orgnr} finnes ikke i BOF",
                             "warning",
                             ephemeral=True,
-                        ),
-                        *alert_store,
-                    ],
+                        )
+                    ),
                 )
 
-            with get_nspek_connection() as conn:
-                nspek_has_data = has_data(conn, orgnr, aar)
+            # Hent data loads the unit again, with the latest versions and comments.
+            evict_nspek_unit(orgnr)
+            evict_nspek_comments(orgnr)
 
-            if not nspek_has_data:
+            if not get_nspek_unit(orgnr, aar).has_data:
                 refresh_data = trigger_refresh(refresh_data, "invalid_search")
                 return (
                     no_update,
                     no_update,
                     no_update,
                     refresh_data,
-                    [
+                    add_alerts(
                         create_alert(
                             f"Ingen data funnet for orgnr {orgnr} og årgang {aar} i NSPEK",
                             "warning",
                             ephemeral=True,
-                        ),
-                        *alert_store,
-                    ],
+                        )
+                    ),
                 )
 
             refresh_data = trigger_refresh(refresh_data, "valid_search")
 
-            return orgnr, aar, orgnr, refresh_data, alert_store
+            return orgnr, aar, orgnr, refresh_data, no_update
 
         @callback(
             Output("nspek-versjon-dropdown", "options"),
             Output("nspek-versjon-dropdown", "value"),
-            Input("var-ident", "value"),
-            Input("var-aar", "value"),
+            ident_input,
+            aar_input,
         )
         def load_versions(orgnr, aar):
             if not orgnr or not aar:
                 raise PreventUpdate
 
-            with get_nspek_connection() as conn:
-
-                if not has_data(conn, orgnr, aar):
-                    return [], None
+            unit = get_nspek_unit(orgnr, aar)
 
-                df = get_versions(conn, orgnr, aar)
+            if not unit.has_data:
+                return [], None
 
-                if df.empty:
-                    return [], None
-
-                df = add_update_counts(conn, df)
-
-            df["label"] = df.apply(
-                lambda row: row["label"]
-                + (" (editert)" if row["antall_endringer"] > 0 else ""),
-                axis=1,
-            )
-
-            options = [
-                {"label": row["label"], "value": row["sekvensnummer"]}
-                for _, row in df.iterrows()
-            ]
-
-            default_value = get_default_version(df)
-
-            return options, default_value
+            return unit.version_options, unit.default_sekvensnummer
 
         @callback(
             Output("nspek-version-warning", "style"),
             Output("nspek-version-warning", "children"),
             Output("nspek-version-warning-closed", "data"),
             Input("nspek-versjon-dropdown", "value"),
-            Input("var-ident", "value"),
-            Input("var-aar", "value"),
+            ident_input,
+            aar_input,
             Input("close-version-warning", "n_clicks"),
             State("nspek-version-warning-closed", "data"),
         )
@@ -2913,20 +3224,12 @@ class Naeringsspesifikasjon:
             if not selected_sekvens or not orgnr or not aar:
                 return {"display": "none"}, "", False
 
-            with get_nspek_connection() as conn:
-                if not has_data(conn, orgnr, aar):
-                    return {"display": "none"}, "", False
-
-                df = get_versions(conn, orgnr, aar)
+            unit = get_nspek_unit(orgnr, aar)
 
-            if df.empty:
+            if not unit.has_data:
                 return {"display": "none"}, "", False
 
-            latest_sekvens = df.sort_values(
-                by=["dato_mottatt", "sekvensnummer"], ascending=[False, False]
-            ).iloc[0]["sekvensnummer"]
-
-            if selected_sekvens != latest_sekvens:
+            if selected_sekvens != unit.latest_sekvensnummer:
                 return (
                     {"display": "flex"},
                     self.create_dialog(
@@ -2942,85 +3245,15 @@ class Naeringsspesifikasjon:
         @callback(
             Output("nspek-versjon-dropdown-compare", "options"),
             Output("nspek-versjon-dropdown-compare", "value"),
-            Input("var-ident", "value"),
-            Input("var-aar", "value"),
+            ident_input,
+            aar_input,
         )
         def load_compare_options(orgnr, aar):
 
             if not orgnr or not aar:
                 raise PreventUpdate
 
-            options = []
-
-            with get_nspek_connection() as conn:
-
-                # 1. Legg inn alle versjoner for valgt år
-                df_current = get_versions(
-                    conn,
-                    orgnr,
-                    aar,
-                )
-
-                if not df_current.empty:
-
-                    df_current = add_update_counts(
-                        conn,
-                        df_current,
-                    )
-
-                    df_current["label"] = df_current.apply(
-                        lambda row: row["label"]
-                        + (" (editert)" if row["antall_endringer"] > 0 else ""),
-                        axis=1,
-                    )
-
-                    options.extend(
-                        [
-                            {
-                                "label": row["label"],
-                                "value": row["sekvensnummer"],
-                            }
-                            for _, row in df_current.iterrows()
-                        ]
-                    )
-
-                # 2. Legg til én default-versjon fra andre år
-                available_years = get_available_years(
-                    conn,
-                    orgnr,
-                )
-
-                for year in available_years:
-
-                    year_str = str(year)
-
-                    if year_str == str(aar):
-                        continue
-
-                    df_year = get_versions(
-                        conn,
-                        orgnr,
-                        year_str,
-                    )
-
-                    if df_year.empty:
-                        continue
-
-                    df_year = add_update_counts(
-                        conn,
-                        df_year,
-                    )
-
-                    default_seq = get_default_version(
-                        df_year,
-                    )
-
-                    options.append(
-                        {
-                            "label": f"{year_str}",
-                            "value": default_seq,
-                        }
-                    )
+            options = get_nspek_unit(orgnr, aar).compare_options
 
             return options, None
 
@@ -3095,32 +3328,17 @@ class Naeringsspesifikasjon:
             Output("kommentar-text", "value"),
             Output("nspek-info-card-endret-av", "value"),
             Output("nspek-info-card-endret-dato", "value"),
-            Input("var-ident", "value"),
-            Input("alert_store", "data"),
+            ident_input,
+            Input("refresh-manager", "data"),
         )
-        def load_kommentar(orgnr, alert_store):
+        def load_kommentar(orgnr, refresh_data):
             if not orgnr:
                 raise PreventUpdate
 
-            query = f"""
-                SELECT
-                    kommentar,
-                    opprettet_av,
-                    opprettet
-                FROM nspek_core.kommentarfelt_test_2
-                WHERE orgnr = '{orgnr}'
-                AND nivaa = 'generell'
-                AND aktiv = true
-                ORDER BY opprettet DESC
-                LIMIT 1
-            """
-
-            with get_nspek_connection() as conn:
-                cursor = conn.raw_sql(query)
-                rows = cursor.fetchall()
-                columns = [col[0] for col in cursor.description]
+            df = get_nspek_comments(orgnr)
 
-            df = pd.DataFrame(rows, columns=columns)
+            if not df.empty:
+                df = df[(df["nivaa"] == "generell") & df["aktiv"].astype(bool)]
 
             if df.empty:
                 return "", "", ""
@@ -3139,13 +3357,14 @@ class Naeringsspesifikasjon:
 
         @callback(
             Output("alert_store", "data", allow_duplicate=True),
+            Output("refresh-manager", "data", allow_duplicate=True),
             Input("btn-save-kommentar", "n_clicks"),
             State("var-ident", "value"),
             State("kommentar-text", "value"),
-            State("alert_store", "data"),
+            State("refresh-manager", "data"),
             prevent_initial_call=True,
         )
-        def save_kommentar(n_clicks, orgnr, kommentar, alert_store):
+        def save_kommentar(n_clicks, orgnr, kommentar, refresh_data):
 
             if not orgnr:
                 raise PreventUpdate
@@ -3190,22 +3409,19 @@ class Naeringsspesifikasjon:
                     conn.raw_sql(query_deactivate)
                     conn.raw_sql(query_insert)
 
-                alert_store = [
-                    create_alert("Kommentar lagret", "success", ephemeral=True),
-                    *alert_store,
-                ]
+                alert = create_alert("Kommentar lagret", "success", ephemeral=True)
 
             except Exception as e:
-                alert_store = [
-                    create_alert(
-                        f"Feil ved lagring: {str(e)[:100]}",
-                        "warning",
-                        ephemeral=True,
-                    ),
-                    *alert_store,
-                ]
+                alert = create_alert(
+                    f"Feil ved lagring: {str(e)[:100]}",
+                    "warning",
+                    ephemeral=True,
+                )
 
-            return alert_store
+            evict_nspek_comments(orgnr)
+            refresh_data = trigger_refresh(refresh_data, "comments")
+
+            return add_alerts(alert), refresh_data
 
         @callback(
             Output("alert_store", "data", allow_duplicate=True),
@@ -3216,12 +3432,11 @@ class Naeringsspesifikasjon:
             State("var-ident", "value"),
             State("input-felt", "value"),
             State("input-felt-kommentar", "value"),
-            State("alert_store", "data"),
             State("refresh-manager", "data"),
             prevent_initial_call=True,
         )
         def save_feltkommentar(
-            n_clicks, orgnr, felt, kommentar, alert_store, refresh_data
+            n_clicks, orgnr, felt, kommentar, refresh_data
         ):
 
             if not orgnr:
@@ -3229,24 +3444,24 @@ class Naeringsspesifikasjon:
 
             if felt is None:
                 return (
-                    [
-                        create_alert("Felt må fylles ut", "warning", ephemeral=True),
-                        *alert_store,
-                    ],
+                    add_alerts(
+                        create_alert("Felt må fylles ut", "warning", ephemeral=True)
+                    ),
                     None,
                     "",
+                    no_update,
                 )
 
             try:
                 felt = int(felt)
             except ValueError:
                 return (
-                    [
-                        create_alert("Felt må være tall", "warning", ephemeral=True),
-                        *alert_store,
-                    ],
+                    add_alerts(
+                        create_alert("Felt må være tall", "warning", ephemeral=True)
+                    ),
                     None,
                     "",
+                    no_update,
                 )
 
             kommentar = kommentar or ""
@@ -3292,24 +3507,19 @@ class Naeringsspesifikasjon:
                     conn.raw_sql(query_deactivate)
                     conn.raw_sql(query_insert)
 
-                alert_store = [
-                    create_alert("Feltkommentar lagret", "success", ephemeral=True),
-                    *alert_store,
-                ]
+                alert = create_alert("Feltkommentar lagret", "success", ephemeral=True)
 
             except Exception as e:
-                alert_store = [
-                    create_alert(f"Feil: {str(e)[:100]}", "warning", ephemeral=True),
-                    *alert_store,
-                ]
+                alert = create_alert(f"Feil: {str(e)[:100]}", "warning", ephemeral=True)
 
+            evict_nspek_comments(orgnr)
             refresh_data = trigger_refresh(refresh_data, "comments")
 
-            return alert_store, None, "", refresh_data
+            return add_alerts(alert), None, "", refresh_data
 
         @callback(
             Output("nspek-feltkommentar-grid", "rowData"),
-            Input("var-ident", "value"),
+            ident_input,
             Input("btn-save-feltkommentar", "n_clicks"),
             Input("refresh-manager", "data"),
             Input("toggle-show-inactive", "value"),
@@ -3319,26 +3529,14 @@ class Naeringsspesifikasjon:
             if not orgnr:
                 raise PreventUpdate
 
-            query = f"""
-                SELECT
-                    id,
-                    variabel AS felt,
-                    kommentar,
-                    opprettet_av,
-                    opprettet,
-                    aktiv
-                FROM nspek_core.kommentarfelt_test_2
-                WHERE orgnr = '{orgnr}'
-                AND nivaa = 'variabel'
-                ORDER BY opprettet DESC
-            """
+            df = get_nspek_comments(orgnr)
 
-            with get_nspek_connection() as conn:
-                cursor = conn.raw_sql(query)
-                rows = cursor.fetchall()
-                columns = [col[0] for col in cursor.description]
+            if df.empty:
+                return []
 
-            df = pd.DataFrame(rows, columns=columns)
+            df = df[df["nivaa"] == "variabel"].rename(columns={"variabel": "felt"})[
+                ["id", "felt", "kommentar", "opprettet_av", "opprettet", "aktiv"]
+            ]
 
             if df.empty:
                 return []
@@ -3358,13 +3556,12 @@ class Naeringsspesifikasjon:
             Output("refresh-manager", "data", allow_duplicate=True),
             Input("nspek-feltkommentar-grid", "cellValueChanged"),
             State("var-ident", "value"),
-            State("alert_store", "data"),
             State("toggle-show-inactive", "value"),
             State("refresh-manager", "data"),
             prevent_initial_call=True,
         )
         def toggle_feltkommentar_aktiv(
-            edited, orgnr, alert_store, toggle_inactive, refresh_data
+            edited, orgnr, toggle_inactive, refresh_data
         ):
 
             logger.debug(f"edited: {edited}\norgnr: {orgnr}\n")
@@ -3415,16 +3612,14 @@ class Naeringsspesifikasjon:
 
                     msg = f"Deaktivert kommentar for felt {felt}"
 
-                alert_store = [
-                    create_alert(msg, "success", ephemeral=True),
-                    *(alert_store or []),
-                ]
+                alert = create_alert(msg, "success", ephemeral=True)
 
+                evict_nspek_comments(orgnr)
                 refresh_data = trigger_refresh(refresh_data, "comments")
 
                 return (
                     load_feltkommentarer(orgnr, None, edited, toggle_inactive),
-                    alert_store,
+                    add_alerts(alert),
                     refresh_data,
                 )
 
@@ -3432,25 +3627,22 @@ class Naeringsspesifikasjon:
 
                 logger.error(e, exc_info=True)
 
-                alert_store = [
-                    create_alert(
-                        f"Oppdatering feilet: {str(e)[:80]}",
-                        "warning",
-                        ephemeral=True,
-                    ),
-                    *(alert_store or []),
-                ]
+                alert = create_alert(
+                    f"Oppdatering feilet: {str(e)[:80]}",
+                    "warning",
+                    ephemeral=True,
+                )
 
                 return (
                     load_feltkommentarer(orgnr, None, edited, toggle_inactive),
-                    alert_store,
+                    add_alerts(alert),
                     refresh_data,
                 )
 
         @callback(
             Output("toggle-show-petroleum-fields-balanse", "value"),
             Output("toggle-show-petroleum-fields-resultat", "value"),
-            Input("var-ident", "value"),
+            ident_input,
         )
         def set_default_petroleum_toggle(orgnr):
             if not orgnr:
@@ -3522,10 +3714,9 @@ class Naeringsspesifikasjon:
             Output("alert_store", "data", allow_duplicate=True),
             Input("generell-kommentar-historikk-grid", "cellValueChanged"),
             State("var-ident", "value"),
-            State("alert_store", "data"),
             prevent_initial_call=True,
         )
-        def toggle_kommentar_aktiv(edited, orgnr, alert_store):
+        def toggle_kommentar_aktiv(edited, orgnr):
 
             if not edited or not orgnr:
                 raise PreventUpdate
@@ -3569,6 +3760,8 @@ class Naeringsspesifikasjon:
                     with get_nspek_connection() as conn:
                         conn.raw_sql(query)
 
+                evict_nspek_comments(orgnr)
+
                 query_reload = f"""
                     SELECT
                         id,
@@ -3592,27 +3785,21 @@ class Naeringsspesifikasjon:
                     "%Y-%m-%d %H:%M"
                 )
 
-                alert_store = [
-                    create_alert(msg, "success", ephemeral=True),
-                    *(alert_store or []),
-                ]
+                alert = create_alert(msg, "success", ephemeral=True)
 
-                return df.to_dict("records"), alert_store
+                return df.to_dict("records"), add_alerts(alert)
 
             except Exception as e:
 
                 logger.error(e, exc_info=True)
 
-                alert_store = [
-                    create_alert(
-                        f"Oppdatering feilet: {str(e)[:80]}",
-                        "warning",
-                        ephemeral=True,
-                    ),
-                    *(alert_store or []),
-                ]
+                alert = create_alert(
+                    f"Oppdatering feilet: {str(e)[:80]}",
+                    "warning",
+                    ephemeral=True,
+                )
 
-                return no_update, alert_store
+                return no_update, add_alerts(alert)
 
         @callback(
             Output("nspek-kontrollutslag-grid", "rowData"),
@@ -3672,46 +3859,38 @@ class Naeringsspesifikasjon:
         @callback(
             Output("alert_store", "data", allow_duplicate=True),
             Output("refresh-manager", "data", allow_duplicate=True),
-            Input("var-ident", "value"),
-            Input("var-aar", "value"),
-            State("alert_store", "data"),
+            ident_input,
+            aar_input,
             State("refresh-manager", "data"),
             prevent_initial_call=True,
         )
-        def validate_nspek_data_exists(orgnr, aar, alert_store, refresh_data):
+        def validate_nspek_data_exists(orgnr, aar, refresh_data):
             """Validates that orgnr/year exists in NSPEK registrering table.
 
             Example use: triggered when variable selector updates.
             """
-            alert_store = alert_store or []
 
             if not orgnr or not aar:
                 raise PreventUpdate
 
-            with get_nspek_connection() as conn:
-                nspek_has_data = has_data(conn, orgnr, aar)
-
-            if not nspek_has_data:
+            if not get_nspek_unit(orgnr, aar).has_data:
 
                 refresh_data = trigger_refresh(refresh_data, "invalid_search")
 
-                alert_store = [
-                    create_alert(
-                        (
-                            f"Ingen data funnet for "
-                            f"orgnr {orgnr} og år {aar} i NSPEK"
-                        ),
-                        "warning",
-                        ephemeral=True,
+                alert = create_alert(
+                    (
+                        f"Ingen data funnet for "
+                        f"orgnr {orgnr} og år {aar} i NSPEK"
                     ),
-                    *alert_store,
-                ]
+                    "warning",
+                    ephemeral=True,
+                )
 
-                return alert_store, refresh_data
+                return add_alerts(alert), refresh_data
 
             refresh_data = trigger_refresh(refresh_data, "valid_search")
 
-            return alert_store, refresh_data
+            return no_update, refresh_data
 
         @callback(
             Output("feltkommentar-store", "data"),
@@ -3823,7 +4002,6 @@ class Naeringsspesifikasjon:
             State("feltkommentar-modal-textarea", "value"),
             State("feltkommentar-store", "data"),
             State("var-ident", "value"),
-            State("alert_store", "data"),
             State("refresh-manager", "data"),
             prevent_initial_call=True,
         )
@@ -3832,7 +4010,6 @@ class Naeringsspesifikasjon:
             kommentar,
             store,
             orgnr,
-            alert_store,
             refresh_data,
         ):
 
@@ -3887,15 +4064,13 @@ class Naeringsspesifikasjon:
                     conn.raw_sql(query_deactivate)
                     conn.raw_sql(query_insert)
 
-                alert_store = [
-                    create_alert(
-                        "Feltkommentar lagret",
-                        "success",
-                        ephemeral=True,
-                    ),
-                    *(alert_store or []),
-                ]
+                alert = create_alert(
+                    "Feltkommentar lagret",
+                    "success",
+                    ephemeral=True,
+                )
 
+                evict_nspek_comments(orgnr)
                 refresh_data = trigger_refresh(
                     refresh_data or {},
                     "comments",
@@ -3908,16 +4083,13 @@ class Naeringsspesifikasjon:
                     exc_info=True,
                 )
 
-                alert_store = [
-                    create_alert(
-                        f"Feil ved lagring: {str(e)[:100]}",
-                        "danger",
-                        ephemeral=True,
-                    ),
-                    *(alert_store or []),
-                ]
+                alert = create_alert(
+                    f"Feil ved lagring: {str(e)[:100]}",
+                    "danger",
+                    ephemeral=True,
+                )
 
-            return refresh_data, alert_store
+            return refresh_data, add_alerts(alert)
 
         @callback(
             Output("refresh-manager", "data", allow_duplicate=True),
@@ -3926,7 +4098,6 @@ class Naeringsspesifikasjon:
             Input("feltkommentar-modal-delete", "n_clicks"),
             State("feltkommentar-store", "data"),
             State("var-ident", "value"),
-            State("alert_store", "data"),
             State("refresh-manager", "data"),
             prevent_initial_call=True,
         )
@@ -3934,7 +4105,6 @@ class Naeringsspesifikasjon:
             n_clicks,
             store,
             orgnr,
-            alert_store,
             refresh_data,
         ):
 
@@ -3960,15 +4130,13 @@ class Naeringsspesifikasjon:
                 with get_nspek_connection() as conn:
                     conn.raw_sql(query)
 
-                alert_store = [
-                    create_alert(
-                        "Feltkommentar slettet",
-                        "success",
-                        ephemeral=True,
-                    ),
-                    *(alert_store or []),
-                ]
+                alert = create_alert(
+                    "Feltkommentar slettet",
+                    "success",
+                    ephemeral=True,
+                )
 
+                evict_nspek_comments(orgnr)
                 refresh_data = trigger_refresh(
                     refresh_data or {},
                     "comments",
@@ -3976,7 +4144,7 @@ class Naeringsspesifikasjon:
 
                 return (
                     refresh_data,
-                    alert_store,
+                    add_alerts(alert),
                     False,
                 )
 
@@ -3984,18 +4152,15 @@ class Naeringsspesifikasjon:
 
                 logger.error(e, exc_info=True)
 
-                alert_store = [
-                    create_alert(
-                        f"Feil ved sletting: {str(e)[:100]}",
-                        "danger",
-                        ephemeral=True,
-                    ),
-                    *(alert_store or []),
-                ]
+                alert = create_alert(
+                    f"Feil ved sletting: {str(e)[:100]}",
+                    "danger",
+                    ephemeral=True,
+                )
 
                 return (
                     refresh_data,
-                    alert_store,
+                    add_alerts(alert),
                     True,
                 )
 
@@ -1,4 +1,6 @@
 from collections import defaultdict
+from dataclasses import dataclass
+from graphlib import TopologicalSorter
 
 CONTROL_RULES = [
     # =========================
@@ -433,15 +435,106 @@ def build_field_to_controls(rules: list[dict]) -> dict[str, list[str]]:
 FIELD_TO_CONTROLS: dict[str, list[str]] = build_field_to_controls(CONTROL_RULES)
 
 
+@dataclass
+class RuleGraph:
+    """CONTROL_RULES compiled for lookups by kontrollid and by changed fields.
+
+    A rule reads its lhs and its terms. A term feeds the sum in the lhs, so a change
+    in a term also concerns the rules reading that sum, for example
+    kontroll_gjeld_og_egenkapital when a post in sumEgenkapital changes.
+
+    Attributes:
+        rules_by_id: The rules by kontrollid.
+        order: The position of each kontrollid in an order where a rule comes after
+            the rules that check the sums among its terms.
+        field_to_controls: For each field, every kontrollid the field concerns,
+            directly or through the sums it feeds, in order.
+    """
+
+    rules_by_id: dict[str, dict]
+    order: dict[str, int]
+    field_to_controls: dict[str, list[str]]
+
+    def rule(self, kontrollid: str) -> dict | None:
+        """Returns the rule with kontrollid, if there is one."""
+        return self.rules_by_id.get(kontrollid)
+
+    def controls_for_fields(self, fields: list[str]) -> list[str]:
+        """Returns the kontrollid concerned by any of the fields, in order."""
+        kontrollids = {
+            kontrollid
+            for field in fields
+            for kontrollid in self.field_to_controls.get(field, [])
+        }
+        return sorted(kontrollids, key=self.order.__getitem__)
+
+
+def compile_rules(rules: list[dict]) -> RuleGraph:
+    """Compiles rules into a RuleGraph.
+
+    Raises:
+        ValueError: If two rules have the same kontrollid.
+        graphlib.CycleError: If sums depend on each other in a cycle.
+    """
+    rules_by_id: dict[str, dict] = {}
+    for rule in rules:
+        if rule["kontrollid"] in rules_by_id:
+            raise ValueError(f"Kontrollid {rule['kontrollid']} er brukt flere ganger")
+        rules_by_id[rule["kontrollid"]] = rule
+
+    checked_by: dict[str, list[str]] = defaultdict(list)
+    for rule in rules:
+        if rule.get("lhs"):
+            checked_by[rule["lhs"]].append(rule["kontrollid"])
+
+    sorter: TopologicalSorter = TopologicalSorter()
+    for rule in rules:
+        sorter.add(
+            rule["kontrollid"],
+            *(
+                kontrollid
+                for field, _sign in rule.get("terms", [])
+                for kontrollid in checked_by.get(field, [])
+            ),
+        )
+    order = {kontrollid: i for i, kontrollid in enumerate(sorter.static_order())}
+
+    feeds: dict[str, set[str]] = defaultdict(set)
+    for rule in rules:
+        for field, _sign in rule.get("terms", []):
+            if rule.get("lhs"):
+                feeds[field].add(rule["lhs"])
+
+    direct = build_field_to_controls(rules)
+    field_to_controls = {}
+    for field in direct:
+        reached = {field}
+        pending = [field]
+        while pending:
+            for sum_field in feeds.get(pending.pop(), ()):
+                if sum_field not in reached:
+                    reached.add(sum_field)
+                    pending.append(sum_field)
+        kontrollids = {k for f in reached for k in direct.get(f, [])}
+        field_to_controls[field] = sorted(kontrollids, key=order.__getitem__)
+
+    return RuleGraph(rules_by_id, order, field_to_controls)
+
+
+RULE_GRAPH = compile_rules(CONTROL_RULES)
+
+
 def get_controls_for_field(field: str) -> list[str]:
-    return FIELD_TO_CONTROLS.get(field, [])
+    """Returns the kontrollid a change in field concerns, including through sums."""
+    return RULE_GRAPH.field_to_controls.get(field, [])
+
+
+def get_controls_for_fields(fields: list[str]) -> list[str]:
+    """Returns the kontrollid a change in any of the fields concerns, in order."""
+    return RULE_GRAPH.controls_for_fields(fields)
 
 
 def get_rule_by_id(
     kontrollid: str,
 ) -> dict | None:
-    for rule in CONTROL_RULES:
-        if rule["kontrollid"] == kontrollid:
-            return rule
-
-    return None
+    return RULE_GRAPH.rule(kontrollid)
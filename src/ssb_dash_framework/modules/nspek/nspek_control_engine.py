@@ -1,16 +1,20 @@
+import logging
 from datetime import UTC
 from datetime import datetime
 from pathlib import Path
-from typing import Any
 
 import ibis
+import numpy as np
 import pandas as pd
 from ibis import _
 from ibis.backends import BaseBackend
 
 from .nspek_control_config import CONTROL_RULES
-from .nspek_control_config import get_controls_for_field
+from .nspek_control_config import get_controls_for_fields
 from .nspek_control_config import get_rule_by_id
+from .nspek_versions import get_version_index
+
+logger = logging.getLogger(__name__)
 
 TYPE_REGNSKAP_TABLE = {
     "registrering": {
@@ -53,44 +57,10 @@ KONTROLLUTSLAG_COLUMNS = [
 def get_active_versions(conn, aar: int) -> pd.DataFrame:
     print("Henter aktive versjoner")
 
-    config = TYPE_REGNSKAP_TABLE["v_registrering_versjon"]
-
-    t_versions = conn.table(config["table"], database=config["database"])
-
-    df_versions = (
-        t_versions.filter(_.aar == aar)
-        .order_by(_.versjon_nr)
-        .select(
-            _.orgnr,
-            _.aar,
-            _.sekvensnummer,
-            _.versjon_nr,
-            _.antall_versjoner,
-            _.dato_mottatt,
-        )
-        .execute()
-    )
-
-    config = TYPE_REGNSKAP_TABLE["v_update_counts"]
-
-    t_updates: Any = conn.table(config["table"], database=config["database"])
-
-    df_updates = t_updates.filter(
-        _.sekvensnummer.isin(df_versions["sekvensnummer"].tolist())
-    ).execute()
-
-    df_versions = df_versions.merge(df_updates, on="sekvensnummer", how="left")
-
-    df_versions["antall_endringer"] = df_versions["antall_endringer"].fillna(0)
-    df_versions["har_endringer"] = df_versions["antall_endringer"] > 0
-
-    df_active = (
-        df_versions.sort_values(
-            ["orgnr", "aar", "har_endringer", "dato_mottatt"],
-            ascending=[True, True, False, False],
-        )
-        .groupby(["orgnr", "aar"])
-        .head(1)
+    # Always look for versions received since the index was last checked, so a
+    # control run covers every version that has arrived.
+    df_active = get_version_index(conn, aar, max_staleness=0).active.reset_index(
+        drop=True
     )
 
     print(f"Fant {len(df_active)} aktive versjoner")
@@ -457,58 +427,66 @@ def save_incremental_control_db(
 
 
 def evaluate_sum_rule(df: pd.DataFrame, rule: dict) -> pd.DataFrame:
-    print(f"Kjører regler for {rule['kontrollid']}:")
-    lhs = pd.to_numeric(
-        df.get(rule["lhs"], pd.Series(0, index=df.index)),
-        errors="coerce",
-    ).fillna(0)
+    return evaluate_sum_rules(df, [rule])
 
-    rhs = pd.Series(0, index=df.index, dtype="float64")
 
-    for col, sign in rule["terms"]:
+def evaluate_sum_rules(df: pd.DataFrame, rules: list[dict]) -> pd.DataFrame:
+    """Runs several sum rules on df at once.
 
-        term = pd.to_numeric(
-            df.get(col, pd.Series(0, index=df.index)),
-            errors="coerce",
-        ).fillna(0)
+    The fields of the rules are converted to numbers once, and the difference
+    between lhs and terms of every rule is one matrix product.
 
-        rhs = rhs + sign * term
-
-    diff = lhs - rhs
-    threshold = rule.get("threshold", 0)
+    Returns:
+        The rows with utslag, rule by rule in the order of rules.
+    """
+    logger.debug(f"Kjører regler for {[rule['kontrollid'] for rule in rules]}")
+    fields = sorted(
+        {rule["lhs"] for rule in rules}
+        | {col for rule in rules for col, _sign in rule["terms"]}
+    )
+    position = {field: i for i, field in enumerate(fields)}
+
+    weights = np.zeros((len(fields), len(rules)))
+    for j, rule in enumerate(rules):
+        weights[position[rule["lhs"]], j] += 1
+        for col, sign in rule["terms"]:
+            weights[position[col], j] -= sign
+
+    values = (
+        df.reindex(columns=fields)
+        .apply(pd.to_numeric, errors="coerce")
+        .fillna(0)
+        .to_numpy(dtype="float64")
+    )
+    diff = values @ weights
+    thresholds = np.array([rule.get("threshold", 0) for rule in rules])
 
-    result = pd.DataFrame(
+    rule_idx, row_idx = np.nonzero((np.abs(diff) > thresholds).T)
+    resultat_df = pd.DataFrame(
         {
-            "aar": df["aar"],
-            "kontrollid": rule["kontrollid"],
-            "sekvensnummer": df["sekvensnummer"],
-            "orgnr": df["orgnr"],
-            "utslag": abs(diff) > threshold,
-            "verdi": diff,
+            "aar": df["aar"].to_numpy()[row_idx],
+            "kontrollid": np.array(
+                [rule["kontrollid"] for rule in rules], dtype=object
+            )[rule_idx],
+            "sekvensnummer": df["sekvensnummer"].to_numpy()[row_idx],
+            "orgnr": df["orgnr"].to_numpy()[row_idx],
+            "utslag": True,
+            "verdi": diff[row_idx, rule_idx],
         }
     )
-
-    resultat_df = result[result["utslag"]].reset_index(drop=True)
-    print(f"Fant {len(resultat_df)} utslag for {rule['kontrollid']}")
+    logger.debug(f"Fant {len(resultat_df)} utslag")
     return resultat_df
 
 
-def run_all_controls(
-    df_resultat: pd.DataFrame, df_balanse: pd.DataFrame
+def _run_rules(
+    rules: list[dict], df_resultat: pd.DataFrame, df_balanse: pd.DataFrame
 ) -> pd.DataFrame:
     all_results = []
 
-    for rule in CONTROL_RULES:
-        if rule["tema"] == "Resultat":
-            df = df_resultat
-        elif rule["tema"] == "Balanse":
-            df = df_balanse
-        else:
-            continue
-
-        result = evaluate_sum_rule(df, rule)
-
-        all_results.append(result)
+    for tema, df in (("Resultat", df_resultat), ("Balanse", df_balanse)):
+        tema_rules = [rule for rule in rules if rule["tema"] == tema]
+        if tema_rules:
+            all_results.append(evaluate_sum_rules(df, tema_rules))
 
     if not all_results:
         return pd.DataFrame()
@@ -516,44 +494,24 @@ def run_all_controls(
     return pd.concat(all_results, ignore_index=True)
 
 
-def run_controls_for_changed_fields(
-    changed_fields: list[str], df_resultat: pd.DataFrame, df_balanse: pd.DataFrame
+def run_all_controls(
+    df_resultat: pd.DataFrame, df_balanse: pd.DataFrame
 ) -> pd.DataFrame:
-    kontrollids = set()
+    return _run_rules(CONTROL_RULES, df_resultat, df_balanse)
 
-    for field in changed_fields:
-        kontroller = get_controls_for_field(field)
-        kontrollids.update(kontroller)
 
-    kontrollids = sorted(kontrollids)
+def run_controls_for_changed_fields(
+    changed_fields: list[str], df_resultat: pd.DataFrame, df_balanse: pd.DataFrame
+) -> pd.DataFrame:
+    kontrollids = get_controls_for_fields(changed_fields)
 
     print(f"Trigget kontroller: {kontrollids}")
 
-    all_results = []
-
-    for kontrollid in kontrollids:
-
-        rule = get_rule_by_id(kontrollid)
+    rules = [get_rule_by_id(kontrollid) for kontrollid in kontrollids]
 
-        if rule is None:
-            print(f"Fant ikke kontroll: {kontrollid}")
-            continue
-
-        if rule["tema"] == "Resultat":
-            df = df_resultat
-        elif rule["tema"] == "Balanse":
-            df = df_balanse
-        else:
-            continue
-
-        result = evaluate_sum_rule(df, rule)
-
-        all_results.append(result)
-
-    if not all_results:
-        return pd.DataFrame()
-
-    return pd.concat(all_results, ignore_index=True)
+    return _run_rules(
+        [rule for rule in rules if rule is not None], df_resultat, df_balanse
+    )
 
 
 def run_all_controls_for_year(conn: BaseBackend, aar: int) -> None:
@@ -603,11 +561,6 @@ def run_controls_changed_fields_for_sekvensnummer(
         changed_fields, df_resultat, df_balanse
     )
 
-    kontrollids = set()
-
-    for field in changed_fields:
-        kontrollids.update(get_controls_for_field(field))
-
     save_incremental_control_db(
-        conn, sekvensnummer, sorted(kontrollids), df_kontrollutslag
+        conn, sekvensnummer, get_controls_for_fields(changed_fields), df_kontrollutslag
     )
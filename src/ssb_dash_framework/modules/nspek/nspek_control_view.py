@@ -8,9 +8,11 @@ import dash_bootstrap_components as dbc
 from dash_iconify import DashIconify
 
 # import ibis
+from dash import Patch
 from dash import callback
 from dash import callback_context as ctx
 from dash import html
+from dash import no_update
 from dash.dependencies import Input
 from dash.dependencies import Output
 from dash.dependencies import State
@@ -22,6 +24,7 @@ from ssb_dash_framework import ControlFrameworkBase
 from ...setup.variableselector import VariableSelector
 from ...utils import TabImplementation
 from ...utils import WindowImplementation
+from ...utils.alert_handler import add_alerts
 from ...utils.alert_handler import create_alert
 from ...utils.module_validation import module_validator
 
@@ -238,30 +241,28 @@ class NspekControlView(ABC):
 
     def module_callbacks(self) -> None:
 
-        @callback(
-            Output(f"{self.module_number}-kontroll-var", "children"),
-            *self.variableselector.get_all_inputs(),
-        )
         def show_vars(*args):
             return f"valgte variabler: {dict(zip(self.time_units, args, strict=False))}"
 
+        self.variableselector.subscribe(
+            f"{self.module_number}-kontroll-var",
+            [Output(f"{self.module_number}-kontroll-var", "children")],
+            show_vars,
+        )
+
         @callback(
             Output("alert_store", "data", allow_duplicate=True),
             Input(f"{self.module_number}-kontroll-run-button", "n_clicks"),
-            State("alert_store", "data"),
             prevent_initial_call=True,
         )
-        def alert_user_of_controls(
-            click: int | None, alert_store: list[dict[str, Any]]
-        ) -> list[dict[str, Any]]:
-            return [
+        def alert_user_of_controls(click: int | None) -> Patch:
+            return add_alerts(
                 create_alert(
                     "Kjører kontroller, dette kan ta litt tid, du får beskjed når den er ferdig. Ikke klikk på knappen igjen.",
                     "info",
                     ephemeral=True,
-                ),
-                *alert_store,
-            ]
+                )
+            )
 
         @callback(
             Output(f"{self.module_number}-kontroller", "rowData"),
@@ -271,11 +272,10 @@ class NspekControlView(ABC):
             Input(f"{self.module_number}-kontroll-refresh", "n_clicks"),
             Input(f"{self.module_number}-kontroll-run-button", "n_clicks"),
             State(f"{self.module_number}-kontroller", "selectedRows"),
-            State("alert_store", "data"),
             *self.variableselector.get_all_inputs(),
             prevent_initial_call="initial_duplicate",
         )
-        def get_kontroller_overview(refresh, run, selected_rows, store, *args):
+        def get_kontroller_overview(refresh, run, selected_rows, *args):
 
             control_class = self.control_class
 
@@ -294,7 +294,7 @@ class NspekControlView(ABC):
             df = instance.get_current_kontroller()
 
             if df is None or df.empty:
-                return [], [], [], store
+                return [], [], [], no_update
 
             columns = self._create_column_defs(df)
 
@@ -307,7 +307,7 @@ class NspekControlView(ABC):
                 df.to_dict("records"),
                 columns,
                 selected,
-                [create_alert("Oppdatert", "info", ephemeral=True), *store],
+                add_alerts(create_alert("Oppdatert", "info", ephemeral=True)),
             )
 
         @callback(
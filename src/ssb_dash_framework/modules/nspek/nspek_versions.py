@@ -0,0 +1,248 @@
+"""A year-keyed index of the nspek versions, shared by the module and the control engine.
+
+Every filing of a unit is a version with its own sekvensnummer. The active version
+of a unit and year is the last received version that has been edited, or the last
+received version if none are edited. The index holds every version of a year with
+its number of edits, read with one query joining v_registrering_versjon and
+v_update_counts.
+
+After that the index is only updated with the versions received since the latest
+dato_mottatt it has seen, and the update counts of the sekvensnummer edited in this
+app are read again with :func:`refresh_update_counts`. Edits made elsewhere are
+picked up when the index is rebuilt, once an hour.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from dataclasses import field
+
+import pandas as pd
+from ibis import _
+
+from ...utils.unit_cache import TTLCache
+
+VERSIONS_TABLE = {"database": "nspek_core", "table": "v_registrering_versjon"}
+UPDATE_COUNTS_TABLE = {"database": "nspek_core", "table": "v_update_counts"}
+
+VERSION_COLUMNS = [
+    "orgnr",
+    "aar",
+    "sekvensnummer",
+    "versjon_nr",
+    "antall_versjoner",
+    "dato_mottatt",
+    "antall_endringer",
+]
+
+REFRESH_INTERVAL = 30.0
+"""Seconds between each check for newly received versions."""
+
+
+def fetch_versions(conn, aar: int, since: pd.Timestamp | None = None) -> pd.DataFrame:
+    """Returns the versions of a year with their update counts.
+
+    Example use: fetch_versions(conn, 2024)
+
+    Args:
+        conn: An ibis connection to the nspek database.
+        aar: The year.
+        since: Only return versions received at or after this time.
+
+    Returns:
+        The versions, with the columns in VERSION_COLUMNS.
+    """
+    versions = conn.table(VERSIONS_TABLE["table"], database=VERSIONS_TABLE["database"])
+    updates = conn.table(
+        UPDATE_COUNTS_TABLE["table"], database=UPDATE_COUNTS_TABLE["database"]
+    )
+
+    versions = versions.filter(versions.aar == int(aar))
+    if since is not None:
+        versions = versions.filter(versions.dato_mottatt >= since)
+
+    df = (
+        versions.left_join(updates, versions.sekvensnummer == updates.sekvensnummer)
+        .select(
+            versions.orgnr,
+            versions.aar,
+            versions.sekvensnummer,
+            versions.versjon_nr,
+            versions.antall_versjoner,
+            versions.dato_mottatt,
+            updates.antall_endringer,
+        )
+        .execute()
+    )
+    df["antall_endringer"] = df["antall_endringer"].fillna(0).astype(int)
+
+    return df
+
+
+def select_active(df: pd.DataFrame) -> pd.DataFrame:
+    """Returns the active version of each orgnr and year in df.
+
+    Example use: select_active(index.versions)
+    """
+    df = df.assign(har_endringer=df["antall_endringer"] > 0)
+
+    return (
+        df.sort_values(
+            ["orgnr", "aar", "har_endringer", "dato_mottatt", "sekvensnummer"],
+            ascending=[True, True, False, False, False],
+        )
+        .groupby(["orgnr", "aar"])
+        .head(1)
+    )
+
+
+@dataclass
+class VersionIndex:
+    """Every version of one year, and the active version of each orgnr.
+
+    The frames are replaced, never changed in place, so a frame read from the index
+    stays consistent while the index is updated.
+
+    Attributes:
+        aar: The year.
+        versions: Every version, sorted on and indexed by orgnr.
+        active: The active version of each orgnr, indexed by orgnr.
+        watermark: The latest dato_mottatt seen.
+        checked_at: When the index last looked for new versions, from
+            time.monotonic().
+    """
+
+    aar: int
+    versions: pd.DataFrame = field(
+        default_factory=lambda: pd.DataFrame(columns=VERSION_COLUMNS)
+    )
+    active: pd.DataFrame = field(
+        default_factory=lambda: pd.DataFrame(columns=VERSION_COLUMNS)
+    )
+    watermark: pd.Timestamp | None = None
+    checked_at: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def set_versions(self, df: pd.DataFrame) -> None:
+        """Replaces the versions and works out the active version of each orgnr."""
+        df = df.copy()
+        df["antall_versjoner"] = df.groupby("orgnr")["sekvensnummer"].transform("size")
+        self.versions = df.set_index("orgnr", drop=False).sort_index()
+        self.active = select_active(df).set_index("orgnr", drop=False)
+        if not df.empty:
+            self.watermark = pd.Timestamp(df["dato_mottatt"].max())
+
+    def add(self, rows: pd.DataFrame) -> None:
+        """Adds versions, replacing the ones with the same sekvensnummer."""
+        if rows.empty:
+            return
+        kept = self.versions[
+            ~self.versions["sekvensnummer"].isin(rows["sekvensnummer"])
+        ]
+        self.set_versions(pd.concat([kept, rows], ignore_index=True))
+
+    def set_update_counts(self, counts: pd.DataFrame) -> None:
+        """Sets antall_endringer for the sekvensnummer in counts."""
+        known = counts[counts["sekvensnummer"].isin(self.versions["sekvensnummer"])]
+        if known.empty:
+            return
+        df = self.versions.reset_index(drop=True)
+        new_counts = df["sekvensnummer"].map(
+            known.set_index("sekvensnummer")["antall_endringer"]
+        )
+        df["antall_endringer"] = new_counts.fillna(df["antall_endringer"]).astype(int)
+        self.set_versions(df)
+
+    def for_orgnr(self, orgnr: str) -> pd.DataFrame:
+        """Returns the versions of an orgnr, oldest version first."""
+        df = self.versions.loc[str(orgnr) : str(orgnr)]
+        return df.sort_values("versjon_nr").reset_index(drop=True)
+
+    def active_sekvensnummer(self, orgnr: str) -> int | None:
+        """Returns the sekvensnummer of the active version of an orgnr, if it has one."""
+        if str(orgnr) not in self.active.index:
+            return None
+        return int(self.active.loc[str(orgnr), "sekvensnummer"])
+
+
+# Rebuilt from scratch every hour, to pick up edits made outside this app.
+_VERSION_INDEXES: TTLCache[VersionIndex] = TTLCache(max_size=16, ttl=3600.0)
+
+
+def _build(conn, aar: int) -> VersionIndex:
+    index = VersionIndex(aar=aar)
+    index.set_versions(fetch_versions(conn, aar))
+    index.checked_at = time.monotonic()
+    return index
+
+
+def get_version_index(
+    conn, aar: int, max_staleness: float = REFRESH_INTERVAL
+) -> VersionIndex:
+    """Returns the version index of a year, adding newly received versions first.
+
+    Example use: get_version_index(conn, 2024).active_sekvensnummer("979443137")
+
+    Args:
+        conn: An ibis connection to the nspek database, used if the index has to be
+            built or updated.
+        aar: The year.
+        max_staleness: Look for new versions if the index last did so more than
+            this many seconds ago. 0 always looks.
+
+    Returns:
+        The index.
+    """
+    aar = int(aar)
+    index = _VERSION_INDEXES.get_or_load(aar, lambda: _build(conn, aar))
+
+    with index.lock:
+        if time.monotonic() - index.checked_at > max_staleness:
+            index.add(fetch_versions(conn, aar, since=index.watermark))
+            index.checked_at = time.monotonic()
+
+    return index
+
+
+def refresh_update_counts(conn, sekvensnummer: list[int]) -> None:
+    """Reads the update counts of edited sekvensnummer into the loaded indexes.
+
+    Example use: refresh_update_counts(conn, [2291859])
+    """
+    if not sekvensnummer:
+        return
+
+    updates = conn.table(
+        UPDATE_COUNTS_TABLE["table"], database=UPDATE_COUNTS_TABLE["database"]
+    )
+    counts = (
+        updates.filter(updates.sekvensnummer.isin([int(s) for s in sekvensnummer]))
+        .select(_.sekvensnummer, _.antall_endringer)
+        .execute()
+    )
+
+    for aar in _VERSION_INDEXES.keys():
+        index = _VERSION_INDEXES.get(aar)
+        if index is not None:
+            with index.lock:
+                index.set_update_counts(counts)
+
+
+def find_orgnr(sekvensnummer: int) -> str | None:
+    """Returns the orgnr of a sekvensnummer from the loaded indexes, if any has it.
+
+    Example use: find_orgnr(2291859)
+    """
+    for aar in _VERSION_INDEXES.keys():
+        index = _VERSION_INDEXES.get(aar)
+        if index is None:
+            continue
+        match = index.versions[index.versions["sekvensnummer"] == int(sekvensnummer)]
+        if not match.empty:
+            return str(match["orgnr"].iloc[0])
+    return None
+
+
+def clear_version_indexes() -> None:
+    """Drops every version index, so the next use rebuilds them."""
+    _VERSION_INDEXES.clear()
@@ -12,6 +12,7 @@ from typing import Any
 import dash_ag_grid as dag
 import dash_bootstrap_components as dbc
 import pandas as pd
+from dash import Patch
 from dash import callback
 from dash import callback_context as ctx
 from dash import dcc
@@ -23,6 +24,7 @@ from dash.exceptions import PreventUpdate
 from ssb_poc_statlog_model.change_data_log import ChangeDataLog
 
 from ..setup.variableselector import VariableSelector
+from ..utils.alert_handler import add_alerts
 from ..utils.alert_handler import create_alert
 from ..utils.module_validation import module_validator
 from ..config.models import register_module
@@ -360,7 +362,6 @@ class ParquetEditor:
             State(f"{self.module_number}-pending-edit", "data"),
             State(f"{self.module_number}-edit-reason", "value"),
             State(f"{self.module_number}-edit-comment", "value"),
-            State("alert_store", "data"),
             State(f"{self.module_number}-parqueteditor-table-data-store", "data"),
             *self.variableselector.get_all_inputs(),
             prevent_initial_call=True,
@@ -371,10 +372,9 @@ class ParquetEditor:
             pending_edit: dict[str, Any],
             reason: str,
             comment: str,
-            error_log: list[dict[str, Any]],
             table_data: list[dict[str, Any]],
             *dynamic_states: Any,
-        ) -> tuple[bool, list[dict[str, Any]], list[dict[str, Any]]]:
+        ) -> tuple[bool, Patch, list[dict[str, Any]]]:
             if not (n_clicks or n_submit):
                 logger.debug("Raising PreventUpdate")
                 raise PreventUpdate
@@ -391,19 +391,13 @@ class ParquetEditor:
                 raise PreventUpdate
 
             if not pending_edit:
-                error_log = [
-                    create_alert("Ingen pending edit funnet", "error", ephemeral=True),
-                    *error_log,
-                ]
-                return False, error_log, table_data
+                alert = create_alert("Ingen pending edit funnet", "error", ephemeral=True)
+                return False, add_alerts(alert), table_data
             if not comment or str(comment).strip() == "":
-                error_log = [
-                    create_alert(
-                        "Årsak for endring er påkrevd", "warning", ephemeral=True
-                    ),
-                    *error_log,
-                ]
-                return True, error_log, table_data
+                alert = create_alert(
+                    "Årsak for endring er påkrevd", "warning", ephemeral=True
+                )
+                return True, add_alerts(alert), table_data
 
             pending_edit["reason"] = reason
             pending_edit["comment"] = comment
@@ -418,15 +412,12 @@ class ParquetEditor:
                     json.dumps(change_to_log, ensure_ascii=False, default=str) + "\n"
                 )
                 logger.debug("Change written.")
-            error_log = [
-                create_alert(
-                    "Prosesslogg oppdatert!",
-                    "info",
-                    ephemeral=True,
-                ),
-                *error_log,
-            ]
-            return False, error_log, table_data
+            alert = create_alert(
+                "Prosesslogg oppdatert!",
+                "info",
+                ephemeral=True,
+            )
+            return False, add_alerts(alert), table_data
 
         if self.output and self.output_varselector_name:
             logger.debug(
@@ -591,10 +582,6 @@ class ParquetEditorChangelog:
     def module_callbacks(self) -> None:
         """Sets up the callbacks for the module."""
 
-        @callback(
-            Output(f"{self.module_number}-parqueteditor-changelog", "value"),
-            *self.variable_selector.get_all_inputs(),
-        )
         def load_data_to_table(
             *args: Any,
         ) -> str:
@@ -602,6 +589,12 @@ class ParquetEditorChangelog:
 
             return str(data)
 
+        self.variable_selector.subscribe(
+            f"{self.module_number}-parqueteditor-changelog",
+            [Output(f"{self.module_number}-parqueteditor-changelog", "value")],
+            load_data_to_table,
+        )
+
     def layout(self) -> html.Div:
         """Creates the layout for the module."""
         return html.Div(self.module_layout)
@@ -1,19 +1,19 @@
-import base64
 import logging
 from abc import ABC
 from abc import abstractmethod
 from typing import Any
+from typing import ClassVar
 
 import dash_bootstrap_components as dbc
-from dash import callback
 from dash import html
 from dash.dependencies import Output
 from dash.exceptions import PreventUpdate
-import gcsfs
 
 from ..setup.variableselector import VariableSelector
 from ..utils import TabImplementation
 from ..utils import WindowImplementation
+from ..utils.document_server import document_url
+from ..utils.document_server import register_document_source
 from ..utils.module_validation import module_validator
 
 logger = logging.getLogger(__name__)
@@ -22,6 +22,8 @@ logger = logging.getLogger(__name__)
 class SkjemapdfViewer(ABC):
     """Module for displaying PDF forms in a tab."""
 
+    _id_number: ClassVar[int] = 0
+
     def __init__(
         self,
         form_identifier: str,
@@ -31,14 +33,22 @@ class SkjemapdfViewer(ABC):
 
         Args:
             form_identifier: The identifier for the form. This should match the VariableSelector value.
-            pdf_folder_path: The path to the folder containing the PDF files.
+            pdf_folder_path: The path to the folder containing the PDF files. Can be a bucket path
+                (``gs://...``) or a local directory.
         """
+        self.module_number = SkjemapdfViewer._id_number
+        self.module_name = self.__class__.__name__
+        SkjemapdfViewer._id_number += 1
         self.label = "🗎 Skjema"
         self.variableselector = VariableSelector([form_identifier], [])
         self.pdf_folder_path = pdf_folder_path
         self.module_layout = self._create_layout()
         self.module_callbacks()
         self.is_valid(form_identifier)
+        self.source_name = f"skjemapdf-{self.module_number}"
+        self.document_source = register_document_source(
+            self.source_name, self.pdf_folder_path
+        )
         module_validator(self)
 
     def is_valid(self, form_identifier: str) -> None:
@@ -110,18 +120,11 @@ class SkjemapdfViewer(ABC):
         """Register Dash callbacks for the SkjemapdfViewer module.
 
         Notes:
-            - The first callback updates the form identifier input field.
-            - The second callback fetches and encodes the PDF file as a data URI for display in the iframe.
+            - The first handler updates the form identifier input field.
+            - The second handler points the iframe to the URL the PDF file is served from.
+            - Both are subscribed to the variable selector, so they run in the same request as other modules.
         """
-        dynamic_states = [
-            self.variableselector.get_all_inputs(),
-            self.variableselector.get_all_states(),
-        ]
-
-        @callback(  # type: ignore[misc]
-            Output("skjemapdf-input", "value"),
-            *dynamic_states,
-        )
+
         def update_form(orgnr: str) -> str:
             """Update the form identifier input field.
 
@@ -134,18 +137,14 @@ class SkjemapdfViewer(ABC):
             logger.debug("Args:\n" + f"orgnr: {orgnr}")
             return orgnr
 
-        @callback(  # type: ignore[misc]
-            Output("skjemapdf-iframe1", "src"),
-            *dynamic_states,
-        )
         def update_pdfskjema_source(form_identifier: str) -> str | None:
-            """Fetch and encode the PDF source based on the form identifier.
+            """Get the URL the PDF is served from based on the form identifier.
 
             Args:
                 form_identifier: The form identifier input value.
 
             Returns:
-                str | None: A data URI for the PDF file, encoded in base64, or None if the file is not found.
+                str | None: The URL of the PDF file, or None if the file is not found.
 
             Raises:
                 PreventUpdate: If the form identifier is not provided.
@@ -154,25 +153,22 @@ class SkjemapdfViewer(ABC):
             if not form_identifier:
                 logger.debug("Raised PreventUpdate")
                 raise PreventUpdate
-            path_to_file = f"{self.pdf_folder_path}/{form_identifier}.pdf"
-            logger.debug(f"Trying to open file: {path_to_file}")
-            try:
-                fs = gcsfs.GCSFileSystem()
-                with fs.open(
-                    f"{self.pdf_folder_path}/{form_identifier}.pdf",
-                    "rb",
-                ) as f:
-                    pdf_bytes = f.read()
-
-                pdf_base64 = base64.b64encode(pdf_bytes).decode("utf-8")
-                pdf_data_uri = f"data:application/pdf;base64,{pdf_base64}"
-            except FileNotFoundError:
-                logger.debug(f"Returning None. Could not open file: {path_to_file}")
+            file_name = f"{form_identifier}.pdf"
+            if not self.document_source.exists(file_name):
+                logger.debug(
+                    f"Returning None. Could not find file: {self.pdf_folder_path}/{file_name}"
+                )
                 return None
-            pdf_base64 = base64.b64encode(pdf_bytes).decode("utf-8")
-            pdf_data_uri = f"data:application/pdf;base64,{pdf_base64}"
-            return pdf_data_uri
+            return document_url(self.source_name, file_name)
 
+        self.variableselector.subscribe(
+            "skjemapdf-input", [Output("skjemapdf-input", "value")], update_form
+        )
+        self.variableselector.subscribe(
+            "skjemapdf-iframe1",
+            [Output("skjemapdf-iframe1", "src")],
+            update_pdfskjema_source,
+        )
         logger.debug("Generated callbacks")
 
 
@@ -194,7 +190,9 @@ class SkjemapdfViewerTab(TabImplementation, SkjemapdfViewer):
 class SkjemapdfViewerWindow(WindowImplementation, SkjemapdfViewer):
     """Implementation of the SkjemapdfViewer as a window."""
 
-    def __init__(self, pdf_folder_path: str, form_identifier: str = "refnr", **kwargs: Any) -> None:
+    def __init__(
+        self, pdf_folder_path: str, form_identifier: str = "refnr", **kwargs: Any
+    ) -> None:
         """Initialize the SkjemapdfViewerWindow class.
 
         This class is a subclass of SkjemapdfViewer and is used to create a window for viewing PDF files.
@@ -204,7 +202,4 @@ class SkjemapdfViewerWindow(WindowImplementation, SkjemapdfViewer):
             form_identifier: The identifier for the form. Defaults to "refnr".
         """
         SkjemapdfViewer.__init__(self, form_identifier, pdf_folder_path)
-        WindowImplementation.__init__(
-            self,
-            **kwargs
-        )
+        WindowImplementation.__init__(self, **kwargs)
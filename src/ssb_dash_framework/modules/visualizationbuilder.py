@@ -16,10 +16,17 @@ from dash.dependencies import Output
 from dash.dependencies import State
 from dash.exceptions import PreventUpdate
 
+from ..utils.adhoc_query import QueryCancelledError
+from ..utils.adhoc_query import run_adhoc_query
+from ..utils.figures import MAX_POINTS
+from ..utils.figures import downsample
+from ..utils.figures import summary_box
 from ..utils.functions import sidebar_button
 
 logger = logging.getLogger(__name__)
 
+MAX_ROWS = 100_000
+
 
 class VisualizationBuilder:
     """A module for creating and visualizing data queries and graphs interactively."""
@@ -64,18 +71,21 @@ class VisualizationBuilder:
                                     },
                                     children=[
                                         html.Div(
-                                            dbc.Button(
-                                                "Kjør spørring",
-                                                id="sql-button",
-                                                style={
-                                                    "display": "flex",
-                                                    "flex-direction": "column",
-                                                    "align-items": "center",
-                                                    "word-break": "break-all",
-                                                    "margin-bottom": "5%",
-                                                    "width": "100%",
-                                                },
-                                            )
+                                            [
+                                                dbc.Button(
+                                                    "Kjør spørring",
+                                                    id="sql-button",
+                                                    style={
+                                                        "display": "flex",
+                                                        "flex-direction": "column",
+                                                        "align-items": "center",
+                                                        "word-break": "break-all",
+                                                        "margin-bottom": "5%",
+                                                        "width": "100%",
+                                                    },
+                                                ),
+                                                html.Small(id="sql-status"),
+                                            ]
                                         ),
                                         html.Div(
                                             dcc.Textarea(
@@ -219,6 +229,7 @@ class VisualizationBuilder:
             Output("sql-x", "options"),
             Output("sql-y", "options"),
             Output("sql-hover", "options"),
+            Output("sql-status", "children"),
             Input("sql-button", "n_clicks"),
             State("sqlmodal-textarea", "value"),
         )
@@ -228,9 +239,13 @@ class VisualizationBuilder:
             list[dict[str, str]],
             list[dict[str, str]],
             list[dict[str, str]],
+            str,
         ]:
             """Executes an SQL query and updates table data and dropdown options.
 
+            At most MAX_ROWS rows are read, and the query is stopped if it runs for too
+            long.
+
             Args:
                 n_clicks: The number of clicks on the query execution button.
                 value: The SQL query string entered in the text area.
@@ -240,16 +255,22 @@ class VisualizationBuilder:
                     - rowData (list[dict]): The table data.
                     - columnDefs (list[dict]): The column definitions for the table.
                     - x, y, hover options (list[dict]): Dropdown options for graph axes and hover data.
+                    - status (str): A message if the query was not run or the result was cut off.
 
             Raises:
                 PreventUpdate: If n_clicks is None.
             """
             if not n_clicks:
                 raise PreventUpdate
-            df = self.database.query(f"""{value}""")
+            try:
+                df, more = run_adhoc_query(self.database, value, limit=MAX_ROWS)
+            except (ValueError, QueryCancelledError) as e:
+                logger.info(f"Query not run: {e}")
+                return [], [], [], [], [], str(e)
             options = [{"label": col, "value": col} for col in df.columns]
             columns = [{"headerName": col, "field": col} for col in df.columns]
-            return df.to_dict("records"), columns, options, options, options
+            status = f"Viser de første {MAX_ROWS} radene." if more else ""
+            return df.to_dict("records"), columns, options, options, options, status
 
         @callback(  # type: ignore[misc]
             Output("sql-graph1", "figure"),
@@ -297,16 +318,24 @@ class VisualizationBuilder:
                 columns = [col["field"] for col in columndefs]
                 df.columns = pd.Index(columns)
                 df.fillna(0)
+                # Large results are reduced before drawing, as a figure with every
+                # row can be too big for the browser.
+                single_axes = isinstance(x_axis, str) and isinstance(y_axis, str)
+                large = single_axes and len(df) > MAX_POINTS
                 if graph_type == "scatter":
                     fig = px.scatter(
-                        df,
+                        downsample(df, x_axis, y_axis) if single_axes else df,
                         x=x_axis,
                         y=y_axis,
                         hover_data=[hover_data] if hover_data else None,
                     )
                 elif graph_type == "line":
                     fig = px.line(
-                        df,
+                        (
+                            downsample(df, x_axis, y_axis, method="minmax")
+                            if single_axes
+                            else df
+                        ),
                         x=x_axis,
                         y=y_axis,
                         hover_data=[hover_data] if hover_data else None,
@@ -318,10 +347,19 @@ class VisualizationBuilder:
                         y=y_axis,
                         hover_data=[hover_data] if hover_data else None,
                     )
+                elif graph_type == "box" and large:
+                    fig = go.Figure(summary_box(df, x_axis, y_axis, name=y_axis))
+                    fig.update_layout(xaxis_title=x_axis, yaxis_title=y_axis)
                 elif graph_type == "box":
                     fig = px.box(df, x=x_axis, y=y_axis, points="all")
                 elif graph_type == "violin":
-                    fig = px.violin(df, x=x_axis, y=y_axis, box=True, points="all")
+                    fig = px.violin(
+                        df.sample(n=MAX_POINTS, random_state=0) if large else df,
+                        x=x_axis,
+                        y=y_axis,
+                        box=True,
+                        points="all",
+                    )
                 elif graph_type == "histogram":
                     fig = px.histogram(
                         df,
@@ -10,6 +10,7 @@ from dash.exceptions import PreventUpdate
 from dash_bootstrap_templates import load_figure_template
 
 from ..utils.app_logger import enable_app_logging
+from ..utils.document_server import register_document_routes
 
 logger = logging.getLogger(__name__)
 
@@ -68,6 +69,7 @@ def app_setup(
         - The function maps the `stylesheet` parameter to a Bootstrap theme using `theme_map`.
         - A callback is registered within the app to toggle the visibility of an element
           with the ID `main-varvelger` based on the number of clicks on `sidebar-varvelger-button`.
+        - The route serving documents for modules like SkjemapdfViewer and Aarsregnskap is added to the app's server.
 
     Examples:
         >>> import os
@@ -95,6 +97,7 @@ def app_setup(
         external_stylesheets=[theme_map[stylesheet], dbc_css, dbc.icons.BOOTSTRAP],
         assets_folder="../assets",
     )
+    register_document_routes(app.server)
 
     @callback(  # type: ignore[misc]
         Output("variable-selector-offcanvas", "is_open"),
@@ -8,8 +8,10 @@ from dash_iconify import DashIconify
 
 from ..utils.alert_handler import AlertHandler
 from ..utils.functions import sidebar_button
+from ..utils.implementations import TabImplementation
 from ..utils.implementations import TabModule
 from ..utils.implementations import WindowModule
+from .variable_dispatch import VariableDispatcher
 from .variableselector import VariableSelector
 
 logger = logging.getLogger(__name__)
@@ -20,6 +22,7 @@ def main_layout(
     tab_list: list[dbc.Tab | TabModule],
     variable_list: list[str] | None = None,
     default_values: dict[str, Any] | None = None,
+    max_alerts: int = 200,
 ) -> dbc.Container:
     """Generates the main layout for the Dash application.
 
@@ -28,6 +31,7 @@ def main_layout(
         tab_list: A list of tab objects, each containing a `layout` method and a `label` attribute.
         variable_list: A list of variable selection components to be included in the main layout. Defaults to all existing VariableSelectorOptions.
         default_values: Default values for the variable selector. Defaults to None.
+        max_alerts: The number of alerts kept in the browser. Older alerts are still shown in the alert modal. Defaults to 200.
 
     Returns:
         A Dash Container component representing the app's main layout.
@@ -35,6 +39,7 @@ def main_layout(
     Notes:
         - The function includes an alert handler modal and a toggle button for the variable selector.
         - Each tab in `tab_list` must implement a `layout()` method and have a `label` attribute.
+        - Registers the callback running the modules subscribed to the variable selector, so call it after creating the modules.
     """
     # for window in window_list:
     #     if not hasattr(window, "layout"):
@@ -60,7 +65,7 @@ def main_layout(
     )  # Because inputs and states don't matter in main_layout, everything is put into the VariableSelector as states. Every module defines its own VariableSelector that sets up interactions. This is to simplify it for the user while maintaining flexibility.
 
     window_modules = [module.layout() for module in window_list]
-    alerthandler = AlertHandler()
+    alerthandler = AlertHandler(max_alerts=max_alerts)
     window_modules_list = [alerthandler.layout(), *window_modules]
 
     varvelger_toggle = [
@@ -85,10 +90,14 @@ def main_layout(
         style={"marginTop": "auto"},
     )
     window_modules_list = varvelger_toggle + window_modules_list + [theme_toggle]
-    selected_tab_list = [
-        (tab if isinstance(tab, dbc.Tab) else dbc.Tab(tab.layout(), label=tab.label))
-        for tab in tab_list
-    ]
+    selected_tab_list = []
+    for i, tab in enumerate(tab_list):
+        if isinstance(tab, dbc.Tab):
+            selected_tab_list.append(tab)
+            continue
+        if isinstance(tab, TabImplementation):
+            tab.tab_value = f"tab-{i + 1}"  # The value dcc.Tabs gives the tab
+        selected_tab_list.append(dbc.Tab(tab.layout(), label=tab.label))
     layout = dbc.Container(
         [
             html.Div(
@@ -132,6 +141,7 @@ def main_layout(
                                 className="main-layout-tab-container",
                                 children=dcc.Tabs(
                                     id="main-layout-tab-list",
+                                    value="tab-1",
                                     children=selected_tab_list,
                                     className="ssb-tabs mb-4",
                                 ),
@@ -144,5 +154,6 @@ def main_layout(
         fluid=True,
         className="dbc dbc-ag-grid",
     )
+    VariableDispatcher.register_callbacks(layout)
     logger.debug("Generated layout.")
     return layout
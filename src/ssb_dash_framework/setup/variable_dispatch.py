@@ -0,0 +1,290 @@
+"""One server request for every module that reacts to the variable selector.
+
+Modules typically register a callback per output group on the 'var-*' inputs, so
+changing the ident fires one request per module and many of them read the same
+data. Modules can instead subscribe a handler with
+:meth:`VariableSelector.subscribe`. When the layout is built, :func:`main_layout`
+registers the subscribers as one callback that takes every variable they listen to.
+On a change it runs the subscribers of the changed variables concurrently and
+returns all their outputs in one response.
+
+Subscribers that read the same data can share the load with :func:`shared_load`,
+so a query several modules need is run once per change.
+
+Subscribers with an output that is not in the main layout, for example in content
+created by another callback, get a callback of their own, since Dash does not run a
+callback when one of its outputs is missing.
+"""
+
+import contextvars
+import logging
+import threading
+from collections.abc import Callable
+from collections.abc import Hashable
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+from typing import ClassVar
+
+from dash import Input
+from dash import Output
+from dash import State
+from dash import callback
+from dash import ctx
+from dash import no_update
+from dash.development.base_component import Component
+from dash.exceptions import PreventUpdate
+
+from ..utils.alert_handler import add_alerts
+from ..utils.alert_handler import create_alert
+
+logger = logging.getLogger(__name__)
+
+_shared_loads: contextvars.ContextVar[
+    tuple[threading.Lock, dict[Hashable, Future[Any]]] | None
+] = contextvars.ContextVar("variable_dispatch_shared_loads", default=None)
+
+
+def shared_load[V](key: Hashable, loader: Callable[[], V]) -> V:
+    """Runs loader once for all subscribers asking for key during the same change.
+
+    Outside a dispatched change the loader is just called.
+
+    Args:
+        key: Identifies the data, for example ("enhetsinfo", ident, aar).
+        loader: Reads the data.
+
+    Returns:
+        The result of the loader.
+
+    Example:
+        >>> shared_load(("kontaktinfo", "123"), lambda: 1)
+        1
+    """
+    shared = _shared_loads.get()
+    if shared is None:
+        return loader()
+    lock, futures = shared
+    with lock:
+        future = futures.get(key)
+        owner = future is None
+        if owner:
+            future = Future()
+            futures[key] = future
+    assert future is not None
+    if owner:
+        try:
+            future.set_result(loader())
+        except BaseException as e:
+            future.set_exception(e)
+    return future.result()
+
+
+@dataclass
+class Subscriber:
+    """A handler the dispatcher runs when one of its variables changes.
+
+    Attributes:
+        name: Name used in logs and for the callback of the subscriber.
+        outputs: The outputs the handler returns values for.
+        inputs: Ids of the variables that run the handler, like 'var-ident'.
+        states: Ids of the variables the handler reads without reacting to them.
+        handler: Called with the values of inputs and then states. Returns the
+            value of the output, or a tuple with one value per output.
+        prevent_initial_call: Skip the handler when the page loads.
+    """
+
+    name: str
+    outputs: list[Output]
+    inputs: list[str]
+    states: list[str]
+    handler: Callable[..., Any]
+    prevent_initial_call: bool = False
+
+    def run(self, values: dict[str, Any]) -> list[Any]:
+        """Runs the handler and returns one value per output."""
+        result = self.handler(*(values[_id] for _id in [*self.inputs, *self.states]))
+        if len(self.outputs) == 1:
+            return [result]
+        return list(result)
+
+
+class VariableDispatcher:
+    """Keeps the subscribers and registers the callbacks running them.
+
+    Attributes:
+        max_workers: Number of subscribers run at the same time.
+    """
+
+    max_workers: ClassVar[int] = 8
+    _subscribers: ClassVar[list[Subscriber]] = []
+    _registered: ClassVar[set[str]] = set()
+    _executor: ClassVar[ThreadPoolExecutor | None] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def subscribe(cls, subscriber: Subscriber) -> None:
+        """Adds a subscriber.
+
+        Subscribers added after the callbacks are registered get their own callback
+        straight away.
+        """
+        if cls._registered:
+            logger.debug(
+                f"Dispatch callbacks already registered, '{subscriber.name}' gets its own callback"
+            )
+            cls._register_single(subscriber)
+            return
+        cls._subscribers.append(subscriber)
+
+    @classmethod
+    def register_callbacks(cls, layout: Component) -> None:
+        """Registers the callbacks for the subscribers not registered yet.
+
+        Args:
+            layout: The main layout, used to find the subscribers whose outputs are
+                all in it.
+        """
+        ids = {
+            component.id
+            for component in layout._traverse()
+            if getattr(component, "id", None) is not None
+        }
+        if getattr(layout, "id", None) is not None:
+            ids.add(layout.id)
+
+        grouped: list[Subscriber] = []
+        claimed: set[tuple[Any, str]] = set()
+        for subscriber in cls._subscribers:
+            if subscriber.name in cls._registered:
+                continue
+            outputs = {
+                (o.component_id, o.component_property) for o in subscriber.outputs
+            }
+            if all(o[0] in ids for o in outputs) and not outputs & claimed:
+                grouped.append(subscriber)
+                claimed |= outputs
+            else:
+                cls._register_single(subscriber)
+
+        if grouped:
+            cls._register_group(grouped)
+        cls._subscribers = []
+
+    @classmethod
+    def _register_single(cls, subscriber: Subscriber) -> None:
+        @callback(  # type: ignore[misc]
+            *subscriber.outputs,
+            *[Input(_id, "value") for _id in subscriber.inputs],
+            *[State(_id, "value") for _id in subscriber.states],
+            prevent_initial_call=subscriber.prevent_initial_call,
+        )
+        def run_subscriber(*args: Any) -> Any:
+            ids = [*subscriber.inputs, *subscriber.states]
+            values = subscriber.run(dict(zip(ids, args, strict=True)))
+            return values[0] if len(values) == 1 else tuple(values)
+
+        run_subscriber.__name__ = f"variable_subscriber_{subscriber.name}"
+        cls._registered.add(subscriber.name)
+
+    @classmethod
+    def _register_group(cls, subscribers: list[Subscriber]) -> None:
+        inputs = list(dict.fromkeys(_id for s in subscribers for _id in s.inputs))
+        states = [
+            _id
+            for _id in dict.fromkeys(_id for s in subscribers for _id in s.states)
+            if _id not in inputs
+        ]
+        outputs = [o for s in subscribers for o in s.outputs]
+        logger.debug(
+            f"Dispatching {inputs} to {[s.name for s in subscribers]} in one callback"
+        )
+
+        @callback(  # type: ignore[misc]
+            Output("alert_store", "data", allow_duplicate=True),
+            *outputs,
+            *[Input(_id, "value") for _id in inputs],
+            *[State(_id, "value") for _id in states],
+            # The alert output is shared with other callbacks, and the subscribers
+            # that skip the first call are left out in dispatch.
+            prevent_initial_call="initial_duplicate",
+        )
+        def dispatch_variables(*args: Any) -> list[Any]:
+            values = dict(zip([*inputs, *states], args, strict=True))
+            changed = {prop_id.rsplit(".", 1)[0] for prop_id in ctx.triggered_prop_ids}
+            return cls.dispatch(subscribers, values, changed)
+
+        for subscriber in subscribers:
+            cls._registered.add(subscriber.name)
+
+    @classmethod
+    def dispatch(
+        cls,
+        subscribers: list[Subscriber],
+        values: dict[str, Any],
+        changed: set[str],
+    ) -> list[Any]:
+        """Runs the subscribers of the changed variables concurrently.
+
+        Args:
+            subscribers: Every subscriber of the callback, in output order.
+            values: The value of each variable id.
+            changed: The ids of the variables that changed. Empty when the page
+                loads, which runs every subscriber without prevent_initial_call.
+
+        Returns:
+            A patch of alerts about failed subscribers (or no_update), followed by
+            the outputs of every subscriber. Subscribers that did not run, raised
+            PreventUpdate or failed leave their outputs unchanged.
+        """
+        if changed:
+            selected = [s for s in subscribers if changed & set(s.inputs)]
+        else:
+            selected = [s for s in subscribers if not s.prevent_initial_call]
+        if not selected:
+            raise PreventUpdate
+
+        shared = _shared_loads.set((threading.Lock(), {}))
+        try:
+            executor = cls._get_executor()
+            futures = {
+                s.name: executor.submit(contextvars.copy_context().run, s.run, values)
+                for s in selected
+            }
+        finally:
+            _shared_loads.reset(shared)
+
+        result: list[Any] = [no_update]
+        alerts = []
+        for subscriber in subscribers:
+            unchanged = [no_update] * len(subscriber.outputs)
+            future = futures.get(subscriber.name)
+            if future is None:
+                result.extend(unchanged)
+                continue
+            try:
+                result.extend(future.result())
+            except PreventUpdate:
+                result.extend(unchanged)
+            except Exception as e:
+                logger.error(f"Subscriber '{subscriber.name}' failed", exc_info=True)
+                alerts.append(
+                    create_alert(
+                        f"Feil ved oppdatering av {subscriber.name}: {e}", "danger"
+                    )
+                )
+                result.extend(unchanged)
+        if alerts:
+            result[0] = add_alerts(*alerts)
+        return result
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=cls.max_workers,
+                    thread_name_prefix="ssb-variable-dispatch",
+                )
+            return cls._executor
@@ -1,16 +1,23 @@
 import logging
+from collections.abc import Callable
 from typing import Any
 from typing import ClassVar
 
 import dash_bootstrap_components as dbc
+from dash import ClientsideFunction
 from dash import Input
 from dash import Output
+from dash import Patch
 from dash import State
 from dash import callback
+from dash import clientside_callback
+from dash import dcc
 from dash import html
-from dash.exceptions import PreventUpdate
 
+from ..utils.alert_handler import add_alerts
 from ..utils.alert_handler import create_alert
+from .variable_dispatch import Subscriber
+from .variable_dispatch import VariableDispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +55,7 @@ class VariableSelector:
     """
 
     _variableselectoroptions: ClassVar[list["VariableSelectorOption"]] = []
+    _instance_number: ClassVar[int] = 0
 
     def __init__(
         self,
@@ -75,6 +83,9 @@ class VariableSelector:
         self.states = selected_states
         self.selected_variables = [*selected_inputs, *selected_states]
         self.default_values = default_values
+        self.deferred: list[str] = []
+        self._deferred_prefix = f"variableselector-{VariableSelector._instance_number}"
+        VariableSelector._instance_number += 1
 
         self._is_valid()
         if default_values:
@@ -165,17 +176,33 @@ class VariableSelector:
                 "No idea how you ended up here, please create an issue on our GitHub repository."
             )
 
-    def get_input(self, requested: str, search_target: str = "title") -> Input:
-        """Retrieves a Input object for the selected variable."""
+    def get_input(
+        self, requested: str, search_target: str = "title", deferred: bool = False
+    ) -> Input:
+        """Retrieves a Input object for the selected variable.
+
+        Args:
+            requested: The title or id of the variable.
+            search_target: Whether requested is a 'title' or an 'id'.
+            deferred: Return an input that only changes while the module is visible,
+                see :meth:`deferred_layout`.
+        """
         retrieved_option = self.get_option(
             search_term=requested, search_target=search_target
         )
+        if deferred:
+            return self._deferred_input(retrieved_option)
         return Input(retrieved_option.id, "value")
 
-    def get_all_inputs(self) -> list[Input]:
-        """Retrieves a list of Dash Input objects for selected inputs."""
+    def get_all_inputs(self, deferred: bool = False) -> list[Input]:
+        """Retrieves a list of Dash Input objects for selected inputs.
+
+        Args:
+            deferred: Return inputs that only change while the module is visible,
+                see :meth:`deferred_layout`.
+        """
         to_be_returned = [
-            Input(option.id, "value")
+            self._deferred_input(option) if deferred else Input(option.id, "value")
             for input_title in self.inputs
             for option in self._variableselectoroptions
             if option.title == input_title
@@ -187,6 +214,57 @@ class VariableSelector:
             )
         return to_be_returned
 
+    def _deferred_input(self, option: "VariableSelectorOption") -> Input:
+        if option.id not in self.deferred:
+            self.deferred.append(option.id)
+        return Input(f"{self._deferred_prefix}-{option.id}", "data")
+
+    def deferred_layout(
+        self, visible: Input | None = None, visible_when: Any = True
+    ) -> list[dcc.Store]:
+        """Creates the stores behind the deferred inputs and connects them.
+
+        Deferred inputs are stores that get the value of their variable in the
+        browser, but only while the module is visible and only if the value changed
+        since the module was last visible. Callbacks on them are not run for hidden
+        tabs and closed windows, and run once when the module is shown after the
+        variables changed. TabImplementation and WindowImplementation add the stores
+        to their layout, so modules can use deferred inputs when they are shown
+        through one of them.
+
+        Args:
+            visible: The property telling whether the module is visible, like the
+                value of the tabs or is_open of a modal. Defaults to None, which
+                treats the module as always visible.
+            visible_when: The value of visible when the module is visible.
+
+        Returns:
+            The stores, to put in the layout of the module. Empty if no deferred
+            inputs are used.
+        """
+        if not self.deferred:
+            return []
+        stores = [
+            dcc.Store(id=f"{self._deferred_prefix}-{_id}") for _id in self.deferred
+        ]
+        if visible is None:
+            stores.append(
+                dcc.Store(id=f"{self._deferred_prefix}-visible", data=visible_when)
+            )
+            visible = Input(f"{self._deferred_prefix}-visible", "data")
+        clientside_callback(
+            ClientsideFunction(namespace="visibility", function_name="gate"),
+            [Output(f"{self._deferred_prefix}-{_id}", "data") for _id in self.deferred],
+            visible,
+            *[Input(_id, "value") for _id in self.deferred],
+            State(f"{self._deferred_prefix}-visible-when", "data"),
+            *[State(f"{self._deferred_prefix}-{_id}", "data") for _id in self.deferred],
+        )
+        return [
+            *stores,
+            dcc.Store(id=f"{self._deferred_prefix}-visible-when", data=visible_when),
+        ]
+
     def get_state(self, requested: str, search_target: str = "title") -> State:
         """Retrieves a State object for the selected variable."""
         retrieved_option = self.get_option(
@@ -219,6 +297,55 @@ class VariableSelector:
             )
         return to_be_returned
 
+    def subscribe(
+        self,
+        name: str,
+        outputs: list[Output],
+        handler: Callable[..., Any],
+        inputs: list[str] | None = None,
+        states: list[str] | None = None,
+        prevent_initial_call: bool = False,
+    ) -> None:
+        """Runs handler when the variables change, in one request with other modules.
+
+        Use this instead of a callback for outputs that only depend on the variable
+        selector. The subscribers of all modules are run concurrently by one callback
+        registered by main_layout, see :mod:`ssb_dash_framework.setup.variable_dispatch`.
+
+        Args:
+            name: Unique name of the subscriber, like f"{module_number}-bofregistry".
+            outputs: The outputs the handler returns values for.
+            handler: Called with the values of the inputs and then the states, like a
+                callback. Returns the value of the output, or a tuple with one value
+                per output. It may raise PreventUpdate.
+            inputs: Titles of the variables that run the handler. Defaults to the
+                selected inputs.
+            states: Titles of the variables the handler reads. Defaults to the
+                selected states.
+            prevent_initial_call: Skip the handler when the page loads.
+
+        Examples:
+            >>> selector.subscribe(
+            ...     "skjemapdf-input", [Output("skjemapdf-input", "value")], lambda ident: ident
+            ... )  # doctest: +SKIP
+        """
+        VariableDispatcher.subscribe(
+            Subscriber(
+                name=name,
+                outputs=outputs,
+                inputs=[
+                    self.get_option(title).id
+                    for title in (self.inputs if inputs is None else inputs)
+                ],
+                states=[
+                    self.get_option(title).id
+                    for title in (self.states if states is None else states)
+                ],
+                handler=handler,
+                prevent_initial_call=prevent_initial_call,
+            )
+        )
+
     def get_output_object(self, variable: str) -> Output:
         """Creates a Dash Output object for a given variable.
 
@@ -292,40 +419,28 @@ class VariableSelector:
         @callback(  # type: ignore[misc]
             Output("alert_store", "data", allow_duplicate=True),
             Input(component_id, "value"),
-            State("alert_store", "data"),
             prevent_initial_call=True,
         )
-        def alert_connection(
-            value: Any, error_log: list[dict[str, Any]]
-        ) -> list[dict[str, Any]]:
+        def alert_connection(value: Any) -> Patch:
             """Alert callback connecting variable picker card to the alert handler."""
-            logger.debug(f"Args:\nvalue: {value}\nerror_log: {error_log}")
+            logger.debug(f"Args:\nvalue: {value}")
             logger.info(
                 f"Attempting to update variable selector: {component_name} to {value}"
             )
             if isinstance(value, str):
-                error_log = [
-                    create_alert(
-                        f"Oppdatering av variabelvelger: {component_name} til {value}",
-                        "info",
-                        ephemeral=True,
-                    ),
-                    *error_log,
-                ]
-                # avoid triggering identical alerts
-                if len(error_log) >= 2 and error_log[0].get("message") == error_log[1].get("message"):
-                    raise PreventUpdate
-                return error_log
+                alert = create_alert(
+                    f"Oppdatering av variabelvelger: {component_name} til {value}",
+                    "info",
+                    ephemeral=True,
+                )
+                return add_alerts(alert)
             else:
-                error_log = [
-                    create_alert(
-                        f"Problem med oppdatering av {component_name} til {value}. Sjekk datatype, burde være string men mottok {type(value)}",
-                        "warning",
-                        ephemeral=True,
-                    ),
-                    *error_log,
-                ]
-                return error_log
+                alert = create_alert(
+                    f"Problem med oppdatering av {component_name} til {value}. Sjekk datatype, burde være string men mottok {type(value)}",
+                    "warning",
+                    ephemeral=True,
+                )
+                return add_alerts(alert)
 
         alert_connection.__name__ = f"alert_connection_{component_id}"
         return alert_connection
@@ -1,6 +1,7 @@
 """Module containing utility and helper functions shared between components in the framework."""
 
 from .alert_handler import AlertHandler
+from .alert_handler import add_alerts
 from .alert_handler import create_alert
 from .app_logger import enable_app_logging
 from .config_tools import _get_connection_callable
@@ -9,6 +10,7 @@ from .config_tools import get_connection
 from .config_tools import set_connection
 from .config_tools import set_eimerdb_connection
 from .config_tools import set_postgres_connection
+from .config_tools import set_read_replica
 from .config_tools import set_sqlite_connection
 from .core_query_functions import active_no_duplicates_refnr_list
 from .core_query_functions import conn_is_ibis
@@ -19,14 +21,17 @@ from .datahelper import DemoDataCreator
 from .datahelper import create_database
 from .datahelper import create_database_engine
 from .debugger_modal import DebugInspector
-
-# from .r_helpers import th_error
+from .document_server import document_url
+from .document_server import register_document_source
+from .document_server import set_document_cache
 from .functions import sidebar_button
 from .implementations import TabImplementation
 from .implementations import WindowImplementation
+from .implementations import is_tab_or_window
 from .module_validation import module_validator
+from .outlier_methods import hb_method
+from .outlier_methods import th_error
 from .r_helpers import _get_kostra_r
-from .r_helpers import hb_method
 
 __all__ = [
     "AlertHandler",
@@ -39,20 +44,26 @@ __all__ = [
     "_get_connection_object",
     "_get_kostra_r",
     "active_no_duplicates_refnr_list",
+    "add_alerts",
     "conn_is_ibis",
     "create_alert",
     "create_database",
     "create_database_engine",
     "create_filter_dict",
+    "document_url",
     "enable_app_logging",
     "get_connection",
     "hb_method",
     "ibis_filter_with_dict",
+    "is_tab_or_window",
     "module_validator",
+    "register_document_source",
     "set_connection",
+    "set_document_cache",
     "set_eimerdb_connection",
     "set_postgres_connection",
+    "set_read_replica",
     "set_sqlite_connection",
     "sidebar_button",
-    # "th_error",
+    "th_error",
 ]
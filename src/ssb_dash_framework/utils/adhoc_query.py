@@ -0,0 +1,276 @@
+"""Guarded execution of ad-hoc SQL typed in by users.
+
+Modules that let users write their own queries, such as FreeSearch and
+VisualizationBuilder, run them through :func:`run_adhoc_query`. It only accepts
+read queries, reads one page of rows at a time, stops queries that run for too long
+and lets users cancel a running query with :func:`cancel_adhoc_query`.
+"""
+
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import pandas as pd
+import sqlglot
+from sqlglot import exp
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 500
+TIMEOUT = 60.0
+WARN_ROWS = 1_000_000
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+# Statements a read query can consist of, and nodes that write or lock anywhere in
+# it, such as SELECT ... INTO or a DELETE inside a common table expression.
+_READ_STATEMENTS = (exp.Select, exp.SetOperation, exp.Values)
+_WRITE_NODES = (
+    exp.Into,
+    exp.Insert,
+    exp.Update,
+    exp.Delete,
+    exp.Merge,
+    exp.DDL,
+    exp.DML,
+    exp.Drop,
+    exp.Alter,
+    exp.TruncateTable,
+    exp.Copy,
+    exp.Command,
+    exp.Lock,
+)
+_DIALECTS = ("postgres", "duckdb")
+_ESTIMATES = (
+    re.compile(r"\brows=(\d+)"),  # PostgreSQL
+    re.compile(r"~(\d[\d,]*)\s+rows?", re.IGNORECASE),  # DuckDB
+    re.compile(r"\bEC:\s*(\d+)"),  # Older DuckDB
+)
+
+# Queries run on a few threads of their own, so a runaway query can not use up the
+# threads that serve the app.
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="adhoc-query")
+_RUNNING: dict[str, threading.Event] = {}
+_LOCK = threading.Lock()
+
+
+class QueryCancelledError(RuntimeError):
+    """Raised when an ad-hoc query is cancelled or runs for longer than its timeout."""
+
+
+def clean_query(query: str) -> str:
+    """Removes comments, surrounding whitespace and a trailing semicolon from a query."""
+    return _COMMENTS.sub(" ", query).strip().rstrip(";").strip()
+
+
+def is_read_query(query: str) -> bool:
+    """Checks if a query is a single statement that only reads data.
+
+    The query is parsed as PostgreSQL, or as DuckDB if that fails.
+
+    Args:
+        query: The query to check.
+
+    Returns:
+        True if the query is one SELECT, set operation or VALUES statement without
+        anything that writes, changes the schema or locks rows anywhere in it.
+    """
+    cleaned = clean_query(query)
+    for dialect in _DIALECTS:
+        try:
+            statements = sqlglot.parse(cleaned, read=dialect)
+        except sqlglot.errors.ParseError:
+            continue
+        if len(statements) != 1 or not isinstance(statements[0], _READ_STATEMENTS):
+            return False
+        return statements[0].find(*_WRITE_NODES) is None
+    logger.debug(f"Could not parse query: {cleaned}")
+    return False
+
+
+def query_tables(query: str) -> list[str] | None:
+    """Finds the tables a query reads from.
+
+    Args:
+        query: The query.
+
+    Returns:
+        The names of the tables, not counting common table expressions, or None if
+        the query could not be parsed.
+    """
+    try:
+        parsed = sqlglot.parse_one(clean_query(query))
+    except sqlglot.errors.ParseError:
+        return None
+    ctes = {cte.alias_or_name for cte in parsed.find_all(exp.CTE)}
+    names = {table.name for table in parsed.find_all(exp.Table)}
+    return sorted(names - ctes) or None
+
+
+def to_duckdb(query: str) -> str:
+    """Translates a query written for PostgreSQL to DuckDB.
+
+    Used when a query written for the main database is run on the read replica.
+
+    Args:
+        query: The query.
+
+    Returns:
+        The query in DuckDB SQL.
+
+    Raises:
+        ValueError: If the query could not be translated.
+    """
+    try:
+        return sqlglot.transpile(
+            clean_query(query),
+            read="postgres",
+            write="duckdb",
+            unsupported_level=sqlglot.ErrorLevel.RAISE,
+        )[0]
+    except sqlglot.errors.SqlglotError as e:
+        raise ValueError(f"Kunne ikke oversette spørringen til DuckDB: {e}") from e
+
+
+def estimate_rows(conn: Any, query: str) -> int | None:
+    """Asks the database for the number of rows it expects a query to return, using EXPLAIN.
+
+    Args:
+        conn: An ibis connection.
+        query: The query to estimate.
+
+    Returns:
+        The estimated number of rows, or None if the database could not tell.
+    """
+    try:
+        cursor = conn.raw_sql(f"EXPLAIN {clean_query(query)}")
+        try:
+            plan = "\n".join(str(row) for row in cursor.fetchall())
+        finally:
+            # DuckDB returns the connection itself, which must stay open.
+            if cursor is not getattr(conn, "con", None) and hasattr(cursor, "close"):
+                cursor.close()
+    except Exception as e:
+        logger.debug(f"Could not run EXPLAIN: {e}")
+        return None
+    for pattern in _ESTIMATES:
+        match = pattern.search(plan)
+        if match:
+            return int(match.group(1).replace(",", ""))
+    return None
+
+
+def _interrupt(conn: Any) -> bool:
+    """Asks the database to stop the query running on a connection, if it supports it."""
+    raw = getattr(conn, "con", conn)
+    for name in ("cancel_safe", "cancel", "interrupt"):
+        method = getattr(raw, name, None)
+        if callable(method):
+            try:
+                method()
+                return True
+            except Exception as e:
+                logger.warning(f"Could not interrupt query with {name}: {e}")
+    return False
+
+
+def cancel_adhoc_query(query_id: str) -> bool:
+    """Cancels a query started by :func:`run_adhoc_query`.
+
+    Args:
+        query_id: The id the query was started with.
+
+    Returns:
+        True if the query was running.
+    """
+    with _LOCK:
+        cancelled = _RUNNING.get(query_id)
+    if cancelled is None:
+        return False
+    cancelled.set()
+    return True
+
+
+def _wait(
+    future: "Future[pd.DataFrame]",
+    conn: Any,
+    cancelled: threading.Event,
+    timeout: float,
+) -> pd.DataFrame:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return future.result(timeout=0.1)
+        except TimeoutError:
+            timed_out = time.monotonic() > deadline
+            if not (timed_out or cancelled.is_set()):
+                continue
+        future.cancel()
+        if _interrupt(conn):
+            try:  # Let the connection finish before it is given back.
+                future.exception(timeout=5)
+            except TimeoutError:
+                logger.warning("Interrupted query did not stop within 5 seconds.")
+        reason = f"ran for more than {timeout:g} seconds" if timed_out else "cancelled"
+        raise QueryCancelledError(f"The query was stopped because it was {reason}.")
+
+
+def run_adhoc_query(
+    conn: Any,
+    query: str,
+    limit: int = PAGE_SIZE,
+    offset: int = 0,
+    timeout: float = TIMEOUT,
+    query_id: str | None = None,
+) -> tuple[pd.DataFrame, bool]:
+    """Runs a user written read query, returning one page of the result.
+
+    Args:
+        conn: An ibis connection, or an object with a 'query' method taking SQL such
+            as an EimerDBInstance.
+        query: The query to run.
+        limit: The number of rows to return.
+        offset: The number of rows to skip.
+        timeout: Seconds before the query is stopped.
+        query_id: An id :func:`cancel_adhoc_query` can cancel the query with.
+
+    Returns:
+        The rows of the page, and whether there are more rows after it.
+
+    Raises:
+        ValueError: If the query does not only read data.
+        QueryCancelledError: If the query is cancelled or runs past the timeout.
+
+    Example:
+        >>> with get_connection() as conn:  # doctest: +SKIP
+        ...     page, more = run_adhoc_query(conn, "SELECT * FROM enheter", limit=100)
+    """
+    if not is_read_query(query):
+        raise ValueError("Only single SELECT queries can be run here.")
+    query = clean_query(query)
+    if hasattr(conn, "sql"):
+        future = _EXECUTOR.submit(
+            lambda: conn.sql(query).limit(limit + 1, offset=offset).to_pandas()
+        )
+    else:
+        future = _EXECUTOR.submit(
+            conn.query,
+            f"SELECT * FROM ({query}) AS adhoc LIMIT {limit + 1} OFFSET {offset}",
+        )
+
+    cancelled = threading.Event()
+    if query_id is not None:
+        with _LOCK:
+            _RUNNING[query_id] = cancelled
+    try:
+        df = _wait(future, conn, cancelled, timeout)
+    finally:
+        if query_id is not None:
+            with _LOCK:
+                if _RUNNING.get(query_id) is cancelled:
+                    del _RUNNING[query_id]
+    logger.debug(f"Ad-hoc query returned {len(df)} rows from offset {offset}")
+    return df.iloc[:limit].reset_index(drop=True), len(df) > limit
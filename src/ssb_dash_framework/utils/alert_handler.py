@@ -1,20 +1,28 @@
 import datetime
 import logging
 import time
+import uuid
 from typing import Any
 
 import dash_bootstrap_components as dbc
 from dash import ALL
+from dash import ClientsideFunction
 from dash import Input
 from dash import Output
+from dash import Patch
 from dash import State
 from dash import callback
+from dash import clientside_callback
 from dash import ctx
 from dash import dcc
 from dash import html
+from dash import no_update
 from dash_iconify import DashIconify
 
 from ..utils.functions import sidebar_button
+from .alert_log import current_session
+from .alert_log import get_alert_log
+from .alert_log import log_alerts
 
 logger = logging.getLogger(__name__)
 
@@ -49,9 +57,10 @@ def create_alert(
         icon: Defines the alert icon on the notification. Defaults to the icons listed in DashIconify ('Feather' icons) according to color.
 
     Returns:
-        A dictionary containing the alert details, including timestamp, message, color, ephemeral status, and alert position.
+        A dictionary containing the alert details, including a unique id, timestamp, message, color, ephemeral status, and alert position.
     """
     return {
+        "id": uuid.uuid4().hex,
         "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "message": message,
         "color": color,
@@ -64,6 +73,34 @@ def create_alert(
     }
 
 
+def _alert_key(alert: dict[str, Any]) -> str:
+    """Returns the id of an alert, also for alerts made before alerts had ids."""
+    return alert.get("id") or f"{alert.get('created_at')}:{alert.get('message')}"
+
+
+def add_alerts(*alerts: dict[str, Any]) -> Patch:
+    """Adds alerts to the alert store and the alert log of the session.
+
+    Return the result from a callback with
+    ``Output("alert_store", "data", allow_duplicate=True)``. Only the new alerts are
+    sent to the browser, so the callback does not need the store as State.
+
+    Args:
+        *alerts: Alerts made with create_alert, newest first.
+
+    Returns:
+        A Patch putting the alerts first in the store.
+
+    Example:
+        >>> add_alerts(create_alert("Lagret", "success", ephemeral=True))  # doctest: +SKIP
+    """
+    patch = Patch()
+    for alert in reversed(alerts):
+        patch.prepend(alert)
+    log_alerts(list(alerts))
+    return patch
+
+
 class AlertHandler:
     """Manages alerts for the application.
 
@@ -71,29 +108,45 @@ class AlertHandler:
     - Displaying a modal with all alerts, which can be filtered and dismissed.
     - Showing ephemeral alerts at the top-middle of the screen for 5 seconds without removing them from the store.
 
-    In order to add alerts to the AlertHandler, you need to modify your callback to include an extra State and Output and append your alert to the list of existing alerts.
+    The alert store in the browser is a ring buffer of the latest max_alerts alerts,
+    where repeats of the same alert are merged. Showing and dismissing ephemeral alerts
+    happens in the browser (see assets/alerts.js). The full history of each session is
+    kept in the alert log on the server (see alert_log.py), and read when the modal
+    is opened.
+
+    In order to add alerts to the AlertHandler, you need to modify your callback to include an extra Output and return your alerts through add_alerts.
 
     Example:
         @callback(
             Output("alert_store", "data", allow_duplicate=True),
-            State("alert_store", "data"),
+            Input("button", "n_clicks"),
+            prevent_initial_call=True,
         )
-        def callback_function_with_alert(alert_log):
-            alert_log.append(
+        def callback_function_with_alert(n_clicks):
+            return add_alerts(
                 create_alert(
                     f"Your message",
                     "info", # The type of alert
                     ephemeral=True, # If true, pops up as a notification
                 )
             )
-            return alert_log
     """
 
-    def __init__(self) -> None:
+    def __init__(self, max_alerts: int = 200) -> None:
         """Initializes the AlertHandler instance.
 
         This method sets up the necessary callbacks for managing alerts.
+
+        Args:
+            max_alerts: The number of alerts to keep in the store. The oldest are
+                dropped when there are more. Defaults to 200.
+
+        Raises:
+            ValueError: If max_alerts is less than 1.
         """
+        if max_alerts < 1:
+            raise ValueError(f"max_alerts must be at least 1, got {max_alerts}")
+        self.max_alerts = max_alerts
         self.callbacks()
 
     def layout(self) -> html.Div:
@@ -102,7 +155,7 @@ class AlertHandler:
         The layout includes:
         - `dcc.Store` components for storing all alerts and the current filter.
         - A fixed container for displaying ephemeral alerts.
-        - An interval component to drive ephemeral updates.
+        - An interval component to fade out ephemeral alerts.
         - A modal with filter buttons and a dismissable alert container.
         - A button to open the modal.
 
@@ -115,6 +168,7 @@ class AlertHandler:
                     id="alert_store", data=[create_alert("Application started", "info")]
                 ),
                 dcc.Store(id="alert_filter", data="all"),
+                dcc.Store(id="alert_settings", data={"max_alerts": self.max_alerts}),
                 html.Div(
                     id="alert-container-bottom-left",
                     className="alert-container bottom-left",
@@ -126,9 +180,10 @@ class AlertHandler:
                     id="alert-container-top-right",
                     className="alert-container top-right",
                 ),
+                # Runs in the browser, and only while an ephemeral alert is showing.
                 dcc.Interval(
-                    id="alert_ephemeral_interval", interval=1000, n_intervals=0
-                ),  # Unsure of performance, check if maybe it should update less often.
+                    id="alert_ephemeral_interval", interval=1000, disabled=True
+                ),
                 dbc.Modal(
                     [
                         dbc.ModalHeader(dbc.ModalTitle("Varsler")),
@@ -193,8 +248,9 @@ class AlertHandler:
         This method defines callbacks for:
         - Toggling the alert modal.
         - Setting the alert filter based on user input.
-        - Displaying alerts in the modal, filtered by type.
-        - Removing dismissed alerts from the store.
+        - Merging repeated alerts and capping the size of the store.
+        - Displaying the alert log in the modal, filtered by type.
+        - Removing dismissed alerts from the store and the alert log.
         - Displaying ephemeral alerts.
 
         Notes:
@@ -257,34 +313,60 @@ class AlertHandler:
             else:
                 return "all"
 
+        clientside_callback(
+            ClientsideFunction(namespace="alerts", function_name="compact"),
+            Output("alert_store", "data", allow_duplicate=True),
+            Input("alert_store", "data"),
+            State("alert_settings", "data"),
+            prevent_initial_call=True,
+        )
+
         @callback(  # type: ignore[misc]
             Output("alert_modal_container", "children"),
-            Input("alert_store", "data"),
+            Input("alerts_modal", "is_open"),
             Input("alert_filter", "data"),
+            State("alert_store", "data"),
         )
         def show_modal_alerts(
-            alerts: list[dict[str, Any]], current_filter: str
+            is_open: bool, current_filter: str, alerts: list[dict[str, Any]] | None
         ) -> list[dbc.Alert]:
-            """Displays alerts in the modal, filtered by type.
+            """Displays the alert history of the session in the modal, filtered by type.
 
+            The history is read from the alert log. Alerts in the store that are not
+            in the log, such as alerts added without add_alerts, are shown too.
             Each alert is dismissable using a pattern-matching ID.
 
             Args:
-                alerts: A list of all alerts stored in the application.
+                is_open: Whether the modal is open. Nothing is read while it is closed.
                 current_filter: The current filter type ('all', 'info' or 'warning').
+                alerts: The alerts in the store.
 
             Returns:
                 A list of Dash Bootstrap Components alerts to display in the modal.
             """
-            if not alerts:
-                return []
-
-            if current_filter != "all":
-                alerts = [a for a in alerts if a["color"] == current_filter]
+            if not is_open:
+                return no_update
+            color = None if current_filter == "all" else current_filter
+            session = current_session()
+            history = (
+                get_alert_log().read(session, color=color)
+                if session is not None
+                else []
+            )
+            logged = {a["id"] for a in history}
+            unlogged = [
+                a
+                for a in alerts or []
+                if _alert_key(a) not in logged and color in (None, a.get("color"))
+            ]
+            history = sorted(
+                [*history, *unlogged],
+                key=lambda a: a.get("created_at", 0),
+                reverse=True,
+            )
 
             components = []
-            for i, alert_data in enumerate(alerts):
-                variant = alert_data["color"]
+            for alert_data in history:
                 components.append(
                     dbc.Alert(
                         [
@@ -312,7 +394,7 @@ class AlertHandler:
                         ],
                         dismissable=True,
                         is_open=True,
-                        id={"type": "modal_alert", "index": i},
+                        id={"type": "modal_alert", "index": _alert_key(alert_data)},
                         className=f"ssb-dialog {alert_data['color']} mb-2",
                     )
                 )
@@ -326,114 +408,40 @@ class AlertHandler:
             }.get(variant, "feather:info")
 
         @callback(  # type: ignore[misc]
-            Output("alert_store", "data", allow_duplicate=True),
             Input({"type": "modal_alert", "index": ALL}, "is_open"),
-            State("alert_store", "data"),
-            State("alert_filter", "data"),
             prevent_initial_call=True,
         )
-        def remove_dismissed_alerts(
-            is_open_list: list[dbc.Alert],
-            current_alerts: list[dict[str, Any]],
-            current_filter,
-        ) -> list[dict[str, Any]]:
-            """Removes alerts that have been dismissed by the user.
-
-            If the user dismisses an alert in the modal (by clicking 'x'), this callback removes the alert from the store.
+        def dismiss_logged_alerts(is_open_list: list[bool]) -> None:
+            """Marks alerts dismissed in the modal as dismissed in the alert log.
 
             Args:
-                is_open_list: A list indicating the open/closed state of each alert in the modal.
-                current_alerts: The current list of alerts stored in the application.
-
-            Returns:
-                The updated list of alerts with dismissed alerts removed.
+                is_open_list: The open/closed state of each alert in the modal.
             """
-            if not current_alerts or not is_open_list:
-                return current_alerts
-
-            # Reproduce the same filtered view the modal used
-            filtered = [
-                (i, a)
-                for i, a in enumerate(current_alerts)
-                if current_filter == "all" or a["color"] == current_filter
+            session = current_session()
+            if session is None:
+                return
+            closed = [
+                item["id"]["index"]
+                for item in ctx.inputs_list[0]
+                if item.get("value") is False
             ]
+            if closed:
+                get_alert_log().dismiss(session, closed)
 
-            to_remove = set()
-            for display_index, (original_index, _) in enumerate(filtered):
-                if (
-                    display_index < len(is_open_list)
-                    and not is_open_list[display_index]
-                ):
-                    to_remove.add(original_index)
-
-            return [a for i, a in enumerate(current_alerts) if i not in to_remove]
+        clientside_callback(
+            ClientsideFunction(namespace="alerts", function_name="dismiss"),
+            Output("alert_store", "data", allow_duplicate=True),
+            Input({"type": "modal_alert", "index": ALL}, "is_open"),
+            State("alert_store", "data"),
+            prevent_initial_call=True,
+        )
 
-        @callback(  # type: ignore[misc]
+        clientside_callback(
+            ClientsideFunction(namespace="alerts", function_name="toasts"),
             Output("alert-container-bottom-left", "children"),
             Output("alert-container-center", "children"),
             Output("alert-container-top-right", "children"),
+            Output("alert_ephemeral_interval", "disabled"),
+            Input("alert_store", "data"),
             Input("alert_ephemeral_interval", "n_intervals"),
-            State("alert_store", "data"),
         )
-        def display_ephemeral_alerts(
-            _: int, alerts: list[dict[str, Any]]
-        ) -> tuple[list, list, list]:
-            """Displays ephemeral alerts for 5 seconds.
-
-            Ephemeral alerts are not removed from the store, so they remain visible in the modal.
-            Determines the location of the alert based on the input, where default is "bottom-left".
-
-            Args:
-                _: The number of intervals elapsed since the application started.
-                alerts: The current list of alerts stored in the application.
-
-            Returns:
-                A list of Dash Bootstrap Components alerts to display as ephemeral alerts.
-            """  # noqa: DOC102, DOC103
-            if not alerts:
-                return [], [], []
-
-            now = time.time()
-            ephemeral_alerts = [
-                a
-                for a in alerts
-                if a.get("ephemeral", False)
-                and (now - a["created_at"] < a.get("duration", 5))
-            ]
-
-            def make_alert(a):
-                now = time.time()
-                dying = (now - a["created_at"]) > (a.get("duration", 6) - 0.8)
-                icon = DashIconify(icon=a["icon"]) if a.get("icon") else None
-
-                return dbc.Alert(
-                    [
-                        html.Div(icon, className="icon-panel"),
-                        html.Div(
-                            dcc.Markdown(
-                                a["message"],
-                                style={"font-size": "16px"},
-                                className="content",
-                            ),
-                            className="dialog-content",
-                        ),
-                    ],
-                    dismissable=False,
-                    className=f"ssb-dialog {a['color']} alert-toast {'alert-dying' if dying else ''}",
-                )
-
-            bottom_left = [
-                make_alert(a)
-                for a in ephemeral_alerts
-                if a.get("position", "bottom-left") == "bottom-left"
-            ]
-            center = [
-                make_alert(a) for a in ephemeral_alerts if a.get("position") == "center"
-            ]
-            top_right = [
-                make_alert(a)
-                for a in ephemeral_alerts
-                if a.get("position") == "top-right"
-            ]
-
-            return bottom_left, center, top_right
@@ -0,0 +1,182 @@
+"""A server-side log of every alert, kept per browser session.
+
+The alert store in the browser only holds the latest alerts. Alerts added with
+:func:`~ssb_dash_framework.utils.alert_handler.add_alerts` are also written here,
+and the alert modal reads the full history from this log when it is opened.
+
+Browser sessions are told apart by a cookie set in assets/alerts.js. The log is a
+SQLite file, by default in the temporary directory, and can be moved with
+:func:`set_alert_log`.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any
+
+import flask
+
+logger = logging.getLogger(__name__)
+
+SESSION_COOKIE = "ssb_alert_session"
+
+
+class AlertLog:
+    """Alerts stored in a SQLite file, per session.
+
+    Attributes:
+        path: The SQLite file.
+        max_age_days: Alerts older than this are deleted when the log is opened.
+    """
+
+    def __init__(self, path: str, max_age_days: float = 7.0) -> None:
+        """Opens the log, creating the file and table if needed.
+
+        Args:
+            path: The SQLite file.
+            max_age_days: Days to keep alerts. Defaults to 7.
+        """
+        self.path = path
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS alerts (
+                    session TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    color TEXT,
+                    dismissed INTEGER NOT NULL DEFAULT 0,
+                    alert TEXT NOT NULL,
+                    PRIMARY KEY (session, id)
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS alerts_by_session "
+                "ON alerts (session, created_at)"
+            )
+            self._conn.execute(
+                "DELETE FROM alerts WHERE created_at < ?",
+                (time.time() - max_age_days * 86400,),
+            )
+
+    def write(self, session: str, alerts: list[dict[str, Any]]) -> None:
+        """Adds alerts to the log of a session."""
+        rows = [
+            (
+                session,
+                alert["id"],
+                alert.get("created_at", time.time()),
+                alert.get("color"),
+                json.dumps(alert, default=str),
+            )
+            for alert in alerts
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO alerts (session, id, created_at, color, alert) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def read(
+        self, session: str, color: str | None = None, limit: int = 500
+    ) -> list[dict[str, Any]]:
+        """Returns the newest alerts of a session that are not dismissed.
+
+        Args:
+            session: The session id.
+            color: Only return alerts of this color. Defaults to every color.
+            limit: The number of alerts to return.
+
+        Returns:
+            The alerts, newest first.
+        """
+        query = "SELECT alert FROM alerts WHERE session = ? AND dismissed = 0"
+        params: list[Any] = [session]
+        if color is not None:
+            query += " AND color = ?"
+            params.append(color)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def dismiss(self, session: str, ids: list[str]) -> None:
+        """Hides alerts of a session from :meth:`read`."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE alerts SET dismissed = 1 WHERE session = ? AND id = ?",
+                [(session, alert_id) for alert_id in ids],
+            )
+
+    def close(self) -> None:
+        """Closes the SQLite connection."""
+        with self._lock:
+            self._conn.close()
+
+
+_LOG: AlertLog | None = None
+_LOG_LOCK = threading.Lock()
+
+
+def set_alert_log(path: str, max_age_days: float = 7.0) -> AlertLog:
+    """Sets the file the alert history is kept in.
+
+    Args:
+        path: The SQLite file. Created if missing.
+        max_age_days: Days to keep alerts. Defaults to 7.
+
+    Returns:
+        The log.
+
+    Example:
+        >>> set_alert_log("/home/onyxia/work/alerts.sqlite")  # doctest: +SKIP
+    """
+    global _LOG
+    with _LOG_LOCK:
+        if _LOG is not None:
+            _LOG.close()
+        _LOG = AlertLog(path, max_age_days=max_age_days)
+    return _LOG
+
+
+def get_alert_log() -> AlertLog:
+    """Returns the alert log, opening the default one in the temporary directory if none is set."""
+    global _LOG
+    with _LOG_LOCK:
+        if _LOG is None:
+            _LOG = AlertLog(
+                os.path.join(tempfile.gettempdir(), "ssb_dash_framework_alerts.sqlite")
+            )
+        return _LOG
+
+
+def current_session() -> str | None:
+    """Returns the session id of the browser making the current request, if any."""
+    if not flask.has_request_context():
+        return None
+    return flask.request.cookies.get(SESSION_COOKIE)
+
+
+def log_alerts(alerts: list[dict[str, Any]]) -> None:
+    """Writes alerts to the log of the current session.
+
+    Does nothing outside a request from a browser with a session cookie, and never
+    raises, since losing log entries must not break the callback adding the alerts.
+    """
+    session = current_session()
+    if session is None or not alerts:
+        return
+    try:
+        get_alert_log().write(session, alerts)
+    except Exception:
+        logger.exception("Could not write alerts to the alert log")
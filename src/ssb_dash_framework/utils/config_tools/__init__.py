@@ -7,13 +7,23 @@ from .connection import set_connection
 from .connection import set_eimerdb_connection
 from .connection import set_postgres_connection
 from .connection import set_sqlite_connection
+from .replica import get_read_replica
+from .replica import on_replica_refreshed
+from .replica import remove_read_replica
+from .replica import replica_staleness_text
+from .replica import set_read_replica
 
 __all__ = [
     "_get_connection_callable",
     "_get_connection_object",
     "get_connection",
+    "get_read_replica",
+    "on_replica_refreshed",
+    "remove_read_replica",
+    "replica_staleness_text",
     "set_connection",
     "set_eimerdb_connection",
     "set_postgres_connection",
+    "set_read_replica",
     "set_sqlite_connection",
 ]
@@ -15,6 +15,8 @@ from psycopg_pool import ConnectionPool
 _IS_POOLED: bool | None = None
 _CONNECTION: ConnectionPool | None = None
 _CONNECTION_CALLABLE: Callable[..., Any] | None = None
+# Set by 'set_read_replica', returns a replica connection or None.
+_READ_REPLICA: Callable[..., AbstractContextManager[BaseBackend] | None] | None = None
 
 
 def _get_connection_object() -> object | None:
@@ -36,10 +38,13 @@ def _get_connection_callable() -> Callable[..., Any] | None:
 
 
 @contextmanager
-def get_connection(**kwargs: Any) -> Iterator[BaseBackend]:
+def get_connection(read_only: bool = False, **kwargs: Any) -> Iterator[BaseBackend]:
     """Getter function to get the ibis connection object.
 
     Args:
+        read_only: Set to True if the connection is only used for reading. Then the
+            read replica set up with 'set_read_replica' is used if it has every table
+            in 'necessary_tables'.
         **kwargs: Leaves room for connections that require keyword arguments.
 
     Yields:
@@ -54,6 +59,12 @@ def get_connection(**kwargs: Any) -> Iterator[BaseBackend]:
         ValueError: If no connection has been set using 'set_connection()'.
     """
     global _IS_POOLED, _CONNECTION_CALLABLE
+    if read_only and _READ_REPLICA is not None:
+        replica = _READ_REPLICA(**kwargs)
+        if replica is not None:
+            with replica as conn:
+                yield conn
+            return
     if not _CONNECTION_CALLABLE:
         raise ValueError("No connection has been set.")
     with _CONNECTION_CALLABLE(**kwargs) as conn:
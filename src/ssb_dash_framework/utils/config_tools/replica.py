@@ -0,0 +1,360 @@
+"""A local read replica of chosen tables, used by modules that only read data.
+
+:func:`set_read_replica` snapshots tables from the connection set with
+:func:`set_connection` into Parquet files in a local directory, and keeps them up to
+date in a background thread. Code that only reads asks for a connection with
+``get_connection(read_only=True, necessary_tables=[...])``, and gets an in-memory
+DuckDB connection reading the snapshots if every table it needs has one. Everything
+else still goes to the main database.
+"""
+
+import datetime
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Iterator
+from contextlib import AbstractContextManager
+from contextlib import contextmanager
+from typing import Any
+
+import ibis
+import pyarrow.parquet as pq
+from ibis.backends import BaseBackend
+
+from ..unit_cache import on_unit_table_evicted
+from . import connection
+
+logger = logging.getLogger(__name__)
+
+
+def _sql_literal(value: Any) -> str:
+    if isinstance(value, int | float) and not isinstance(value, bool):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+_REFRESH_HOOKS: list[Callable[[str, dict[str, Any]], None]] = []
+
+
+def on_replica_refreshed(hook: Callable[[str, dict[str, Any]], None]) -> None:
+    """Registers a function to call every time a snapshot is replaced.
+
+    Lets caches of data computed from the replica, such as aggregates, be dropped
+    when the snapshot they were computed from is replaced.
+
+    Args:
+        hook: Called with the table name and an empty dict of filters, like the
+            hooks of :func:`on_unit_table_evicted`.
+    """
+    if hook not in _REFRESH_HOOKS:
+        _REFRESH_HOOKS.append(hook)
+
+
+class ReadReplica:
+    """Parquet snapshots of tables from the main database.
+
+    Attributes:
+        tables: The tables that are copied.
+        path: The directory the snapshots are kept in.
+        refresh_interval: Seconds between each full refresh.
+        refresh_delay: Seconds to wait after a table is written to through the app
+            before refreshing it, so several writes only cause one refresh.
+        refreshed_at: When each table was last copied.
+    """
+
+    def __init__(
+        self,
+        tables: list[str],
+        path: str,
+        refresh_interval: float = 900.0,
+        refresh_delay: float | None = 10.0,
+    ) -> None:
+        """Creates the replica, using snapshots already in path.
+
+        Args:
+            tables: The tables to copy.
+            path: The directory to keep the snapshots in. Created if missing.
+            refresh_interval: Seconds between each full refresh.
+            refresh_delay: Seconds to wait before refreshing a table written to
+                through the app. None turns off these extra refreshes.
+        """
+        self.tables = list(tables)
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.refresh_delay = refresh_delay
+        self.refreshed_at: dict[str, datetime.datetime] = {}
+        self._columns: dict[str, set[str]] = {}
+        self._changed: dict[str, float] = {}
+        # Tables written to through the app since their snapshot was taken, with the
+        # time of the last write. They are read from the main database until then.
+        self._stale: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        os.makedirs(path, exist_ok=True)
+        for table in self.tables:
+            if os.path.exists(self._file(table)):
+                self._register(table)
+
+    def _file(self, table: str) -> str:
+        return os.path.join(self.path, f"{table}.parquet")
+
+    def _register(self, table: str) -> None:
+        file = self._file(table)
+        columns = set(pq.read_schema(file).names)
+        refreshed_at = datetime.datetime.fromtimestamp(os.path.getmtime(file))
+        with self._lock:
+            self._columns[table] = columns
+            self.refreshed_at[table] = refreshed_at
+
+    def refresh(self, tables: list[str] | None = None) -> None:
+        """Copies tables from the main database.
+
+        The new snapshot replaces the old one when it is complete, so readers never
+        see a partly written table.
+
+        Args:
+            tables: The tables to copy. Defaults to every table of the replica.
+        """
+        for table in tables or self.tables:
+            started = time.monotonic()
+            with connection.get_connection(necessary_tables=[table]) as conn:
+                data = conn.table(table).to_pyarrow()
+            handle, temporary = tempfile.mkstemp(dir=self.path, suffix=".parquet")
+            os.close(handle)
+            try:
+                pq.write_table(data, temporary)
+                os.replace(temporary, self._file(table))
+            except BaseException:
+                os.remove(temporary)
+                raise
+            self._register(table)
+            with self._lock:
+                if self._stale.get(table, started) < started:
+                    del self._stale[table]
+            for hook in list(_REFRESH_HOOKS):
+                hook(table, {})
+            logger.info(
+                f"Copied {data.num_rows} rows of {table} to the read replica in {time.monotonic() - started:.1f}s"
+            )
+
+    def covers(self, tables: list[str]) -> bool:
+        """Checks if the replica has an up to date snapshot of every table.
+
+        Tables written to through the app are not covered until their snapshot has
+        been replaced.
+        """
+        with self._lock:
+            return all(
+                table in self._columns and table not in self._stale for table in tables
+            )
+
+    @contextmanager
+    def connect(
+        self, partition_select: dict[str, list[Any]] | None = None
+    ) -> Iterator[BaseBackend]:
+        """Opens an in-memory DuckDB connection with a view of each snapshot.
+
+        Args:
+            partition_select: Values to filter on, for the tables that have the
+                columns. Matches what EimerDB connections do with it.
+
+        Yields:
+            The connection.
+        """
+        conn = ibis.duckdb.connect()
+        try:
+            with self._lock:
+                columns = dict(self._columns)
+            for table, table_columns in columns.items():
+                filters = [
+                    f'"{column}" IN ({", ".join(_sql_literal(v) for v in values)})'
+                    for column, values in (partition_select or {}).items()
+                    if column in table_columns and values
+                ]
+                where = f" WHERE {' AND '.join(filters)}" if filters else ""
+                file = self._file(table).replace("'", "''")
+                conn.raw_sql(
+                    f"CREATE VIEW \"{table}\" AS SELECT * FROM read_parquet('{file}'){where}"
+                )
+            yield conn
+        finally:
+            conn.disconnect()
+
+    def staleness(self, tables: list[str] | None = None) -> datetime.timedelta | None:
+        """Returns how old the oldest snapshot of the tables is, or None if one is missing."""
+        with self._lock:
+            times = [self.refreshed_at.get(table) for table in tables or self.tables]
+        if not times or any(t is None for t in times):
+            return None
+        return datetime.datetime.now() - min(times)  # type: ignore[type-var]
+
+    def table_changed(self, table: str, filters: dict[str, Any]) -> None:
+        """Marks a table as changed, so it is refreshed after refresh_delay seconds.
+
+        Until the snapshot is replaced the table is read from the main database.
+        """
+        if table not in self.tables:
+            return
+        with self._lock:
+            self._stale[table] = time.monotonic()
+            if self.refresh_delay is None:
+                return
+            self._changed.setdefault(table, time.monotonic())
+        self._wake.set()
+
+    def start(self) -> None:
+        """Starts refreshing the replica in a background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="read-replica", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the background refreshing."""
+        self._stopped.set()
+        self._wake.set()
+
+    def _due(self) -> tuple[list[str], float]:
+        """Returns the tables to refresh now, and seconds until the next is due."""
+        now = time.monotonic()
+        wait = self.refresh_interval
+        due = []
+        with self._lock:
+            for table in self.tables:
+                age = (
+                    (datetime.datetime.now() - self.refreshed_at[table]).total_seconds()
+                    if table in self.refreshed_at
+                    else self.refresh_interval
+                )
+                changed = self._changed.get(table)
+                until = self.refresh_interval - age
+                if changed is not None and self.refresh_delay is not None:
+                    until = min(until, changed + self.refresh_delay - now)
+                if until <= 0:
+                    due.append(table)
+                    self._changed.pop(table, None)
+                else:
+                    wait = min(wait, until)
+        return due, wait
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            due, wait = self._due()
+            for table in due:
+                try:
+                    self.refresh([table])
+                except Exception:
+                    logger.exception(f"Could not refresh {table} in the read replica")
+                    with self._lock:  # Try again at the next interval
+                        self.refreshed_at[table] = datetime.datetime.now()
+            if not due:
+                self._wake.wait(timeout=wait)
+                self._wake.clear()
+
+
+_REPLICA: ReadReplica | None = None
+
+
+def _replica_connection(
+    necessary_tables: list[str] | None = None,
+    partition_select: dict[str, list[Any]] | None = None,
+    **kwargs: Any,
+) -> AbstractContextManager[BaseBackend] | None:
+    if _REPLICA is None or not necessary_tables:
+        return None
+    if not _REPLICA.covers(necessary_tables):
+        return None
+    logger.debug(f"Reading {necessary_tables} from the read replica")
+    return _REPLICA.connect(partition_select)
+
+
+def set_read_replica(
+    tables: list[str],
+    path: str | None = None,
+    refresh_interval: float = 900.0,
+    refresh_delay: float | None = 10.0,
+    refresh_now: bool = False,
+) -> ReadReplica:
+    """Sets up a local read replica of tables for modules that only read data.
+
+    Call this after the main connection is set. Tables are copied in a background
+    thread, and reads go to the main database until a table has been copied.
+
+    Args:
+        tables: The tables to copy.
+        path: Directory to keep the snapshots in. Snapshots already there are used
+            until they are refreshed. Defaults to a new temporary directory.
+        refresh_interval: Seconds between each full refresh. Defaults to 15 minutes.
+        refresh_delay: Seconds to wait before refreshing a table after it is
+            written to through the app. None turns this off. Defaults to 10.
+        refresh_now: Copy the tables before returning instead of in the background.
+
+    Returns:
+        The replica.
+
+    Example:
+        >>> set_postgres_connection("postgresql://...")  # doctest: +SKIP
+        >>> set_read_replica(["enheter", "skjemamottak", "skjemadata_hoved"])  # doctest: +SKIP
+    """
+    global _REPLICA
+    if _REPLICA is not None:
+        _REPLICA.stop()
+    replica = ReadReplica(
+        tables,
+        path or tempfile.mkdtemp(prefix="read-replica-"),
+        refresh_interval=refresh_interval,
+        refresh_delay=refresh_delay,
+    )
+    if refresh_now:
+        replica.refresh()
+    _REPLICA = replica
+    connection._READ_REPLICA = _replica_connection
+    on_unit_table_evicted(_table_changed)
+    replica.start()
+    return replica
+
+
+def remove_read_replica() -> None:
+    """Stops the read replica and sends all reads to the main database again."""
+    global _REPLICA
+    if _REPLICA is not None:
+        _REPLICA.stop()
+    _REPLICA = None
+    connection._READ_REPLICA = None
+
+
+def get_read_replica() -> ReadReplica | None:
+    """Returns the read replica, or None if there is none."""
+    return _REPLICA
+
+
+def replica_staleness_text(tables: list[str]) -> str:
+    """Describes how old the replica data for the tables is, for showing in modules.
+
+    Args:
+        tables: The tables that are read.
+
+    Returns:
+        A short text, or an empty string if the tables are read from the main
+        database.
+    """
+    if _REPLICA is None or not _REPLICA.covers(tables):
+        return ""
+    age = _REPLICA.staleness(tables)
+    if age is None:
+        return ""
+    minutes = int(age.total_seconds() // 60)
+    return f"Data fra lokal kopi, oppdatert for {minutes} min siden."
+
+
+def _table_changed(table: str, filters: dict[str, Any]) -> None:
+    if _REPLICA is not None:
+        _REPLICA.table_changed(table, filters)
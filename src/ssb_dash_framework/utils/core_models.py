@@ -1,4 +1,3 @@
-from collections.abc import Callable
 import logging
 from typing import Any
 from typing import Literal
@@ -15,32 +14,14 @@ from ssb_dash_framework.setup.variableselector import VariableSelectorOption
 from .alert_handler import create_alert
 from .config_tools.connection import _get_connection_object
 from .config_tools.connection import get_connection
+from .skjema_metadata import check_datatype
+from .skjema_metadata import get_datatypes
+from .skjema_metadata import get_feltsti_mapping
+from .unit_cache import evict_unit_table
 
 logger = logging.getLogger(__name__)
 
 
-def _is_valid_int(v: Any) -> bool | str:
-    """Valid only if the string content is a whole number with no decimal separator."""
-    s = str(v).strip()
-    if "." in s or "," in s:
-        return "float"
-    if s.lstrip("-").isdigit() and s not in ("", "-"):
-        return True
-    return False
-
-def _is_valid_bool(v: Any) -> bool:
-    """Accepts 'true'/'false' (any case), and '1'/'0'."""
-    s = str(v).strip().lower()
-    return s in {"true", "false", "1", "0"}
-
-_VALIDATORS: dict[str, Callable[[Any], str | None]] = {
-    "string": lambda v: True,
-    "integer": _is_valid_int,
-    "number": _is_valid_int,
-    "bool": _is_valid_bool,
-}
-
-
 class UpdateSkjemamottak(BaseModel):
     """
     Class to update editing status in table 'skjemamottak' for a refnr, runs after user edits 'status'.
@@ -86,6 +67,7 @@ class UpdateSkjemamottak(BaseModel):
         logger.debug(f"Running query: {query}")
         try:
             _get_connection_object().query(query)
+            evict_unit_table("skjemamottak", refnr=self.refnr)
             logger.info(f"Oppdaterte {self.column} for {self.refnr}")
             alert = self.to_alert(success=True)
         except Exception as e:
@@ -128,6 +110,7 @@ class UpdateSkjemamottak(BaseModel):
         try:
             with get_connection() as conn:
                 conn.raw_sql(query)
+            evict_unit_table("skjemamottak", refnr=self.refnr)
             logger.info(f"Oppdaterte  '{self.column}' til '{self.value}'")
             return self.to_alert(success=True)
         except Exception as e:
@@ -256,6 +239,7 @@ class UpdateSkjemadata(BaseModel):
             """
         try:
             _get_connection_object().query(query)
+            self._evict_cached()
             logger.info(
                 f"Successfully updated '{self.column}' from '{self.old_value}' to '{self.value}'"
             )
@@ -267,37 +251,45 @@ class UpdateSkjemadata(BaseModel):
             )
             return self.to_alert(long, success=False)
 
+    def _evict_cached(self) -> None:
+        """Drops cached data the update made outdated."""
+        evict_unit_table(self.table)
+        if self.identifier_column == "refnr":
+            evict_unit_table("skjemadataendringshistorikk", refnr=self.refnr)
+
     def _get_feltsti(self, conn) -> str:
         """Looks up the long variable name from the mapping table.
 
         Reads ``mapping_table`` / ``mapping_match_column`` / ``mapping_result_column``
         so projects whose lookup table uses different column names than the default
         ``mapping_variabelnavn`` (``variabel`` -> ``feltsti``) can configure them
-        instead of overriding this method.
+        instead of overriding this method. The mapping of the year and skjema is
+        read once and cached, see :func:`get_feltsti_mapping`.
         """
-        df = conn.table(self.mapping_table)
-        result = (
-            df.filter(_.aar == (self.time_units or {}).get("aar"))
-            .filter(_[self.mapping_match_column] == self.variable)
-            .filter(_.skjema == self.skjema)
-            .select([self.mapping_result_column])
-            .limit(1)
-            .execute()
-        )
-        if result.empty:
+        aar = (self.time_units or {}).get("aar")
+        feltsti = get_feltsti_mapping(
+            conn,
+            aar,
+            self.skjema,
+            mapping_table=self.mapping_table,
+            mapping_match_column=self.mapping_match_column,
+            mapping_result_column=self.mapping_result_column,
+        ).get(self.variable)
+        if feltsti is None:
             logger.warning(
                 f"No {self.mapping_result_column} found for "
                 f"{self.mapping_match_column}='{self.variable}', "
-                f"aar='{(self.time_units or {}).get('aar')}'. Falling back to kortnavn."
+                f"aar='{aar}'. Falling back to kortnavn."
             )
             return self.variable
-        return result[self.mapping_result_column].iloc[0]
+        return feltsti
 
     def _check_datatype(self, conn) -> str | None:
         """
-        Fetches the expected datatype for `self.variable` and checks whether
-        `self.value` could legitimately represent that datatype. Does not modify
-        `self.value`. `None` is always considered valid (treated as "no value").
+        Checks whether `self.value` could legitimately represent the expected
+        datatype of `self.variable`. Does not modify `self.value`. `None` is always
+        considered valid (treated as "no value"). The datatypes of the year are read
+        once and cached, see :func:`get_datatypes`.
 
         Returns:
             None if the value is valid for the expected datatype (or is None),
@@ -306,28 +298,10 @@ class UpdateSkjemadata(BaseModel):
         if self.value is None or self.value == "":
             return None
 
-        t = conn.table("datatyper")
-        datatype = (
-            t.filter(_.aar == (self.time_units or {}).get("aar"))
-            .filter(_.variabel == self.variable)
-            .select(["datatype"])
-            .execute()
+        datatype = get_datatypes(conn, (self.time_units or {}).get("aar")).get(
+            self.variable
         )
-        datatype = datatype["datatype"].item() if len(datatype) > 0 else None
-        if not datatype:
-            return None
-
-        validator = _VALIDATORS.get(datatype)
-        if validator is None:
-            logger.warning(f"Unknown datatype '{datatype}' for variable '{self.variable}'")
-            return datatype
-
-        result = validator(self.value)
-        if result is True:
-            return None
-        if result == "float":
-            return "float"
-        return datatype
+        return check_datatype(datatype, self.variable, self.value)
 
     def _insert_ibis(self, conn, long):
         """
@@ -378,6 +352,7 @@ class UpdateSkjemadata(BaseModel):
 
         try:
             conn.raw_sql(insert_query)
+            self._evict_cached()
             logger.info(
                 f"Inserted new row with variabel='{self.variable}' and value='{self.value}' into {self.table}."
             )
@@ -387,12 +362,6 @@ class UpdateSkjemadata(BaseModel):
             return self.to_alert(long, success=False)
 
     def update_ibis(self, long):
-
-        with get_connection() as conn:
-            datatype_check = self._check_datatype(conn)
-            if datatype_check:
-                return self.to_alert(long, success=False, datatype=datatype_check)
-
         update_query = f"""
             UPDATE {self.table}
             SET {self.column} = '{self.value}'
@@ -414,6 +383,11 @@ class UpdateSkjemadata(BaseModel):
 
         try:
             with get_connection() as conn:
+                # Reads cached datatypes, so the update is the only query.
+                datatype_check = self._check_datatype(conn)
+                if datatype_check:
+                    return self.to_alert(long, success=False, datatype=datatype_check)
+
                 result = conn.raw_sql(update_query)
                 if result.rowcount == 0:
                     if self.table.startswith(("skjemadata", "saldoskjema")):
@@ -424,6 +398,7 @@ class UpdateSkjemadata(BaseModel):
                         return self._insert_ibis(conn, long)
                     else:
                         return self.to_alert(long, success=False)
+                self._evict_cached()
                 logger.info(
                     f"Successfully updated '{self.column}' from '{self.old_value}' to '{self.value}'"
                 )
@@ -0,0 +1,780 @@
+"""Serves PDF and TIF documents from fsspec filesystems through a Flask route.
+
+Modules such as ``SkjemapdfViewer`` and ``Aarsregnskap`` used to read the whole
+document inside a callback and push it to the browser as a base64 data URI. Here
+the documents are instead served as binary from a route on the Dash server, so
+callbacks only need to return a URL. The route supports HTTP range requests and
+caching headers, and every file fetched from the bucket is kept in a bounded
+on-disk LRU cache so switching back and forth between units is cheap.
+
+Single pages can be requested as PNG with ``?page=N`` (and optionally ``&dpi=D``).
+They are rasterised lazily on a worker pool by the PageRenderer and cached on disk,
+which is used to show TIF files and very large PDFs page by page.
+
+Example:
+    >>> register_document_source("skjemapdf", "gs://my-bucket/pdf") # doctest: +SKIP
+    >>> document_url("skjemapdf", "12345.pdf") # doctest: +SKIP
+    '/_documents/skjemapdf/12345.pdf'
+"""
+
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from urllib.parse import urlencode
+
+import fsspec
+from dash import get_relative_path
+from flask import Flask
+from flask import abort
+from flask import request
+from flask import send_file
+from fsspec import AbstractFileSystem
+from PIL import Image
+from PIL import UnidentifiedImageError
+from werkzeug.wrappers import Response
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_ROUTE = "/_documents"
+
+DEFAULT_DPI = 72
+THUMBNAIL_DPI = 24
+ALLOWED_DPI = (THUMBNAIL_DPI, DEFAULT_DPI, 150)
+
+_PYMUPDF_LOCK = threading.Lock()
+
+_MIMETYPES = {
+    ".pdf": "application/pdf",
+    ".tif": "image/tiff",
+    ".tiff": "image/tiff",
+    ".png": "image/png",
+}
+
+
+@dataclass
+class DocumentSource:
+    """A named location documents can be served from.
+
+    Attributes:
+        name: Name used in the URL to refer to this source.
+        root: Root path or URL of the documents, for example ``gs://bucket/folder``.
+        filesystem: The fsspec filesystem the documents are read from. Inferred from the
+            protocol of ``root`` on first use when not given, and reused for every request.
+    """
+
+    name: str
+    root: str
+    filesystem: AbstractFileSystem | None = None
+
+    def get_filesystem(self) -> AbstractFileSystem:
+        """Returns the filesystem of the source, creating it on first use."""
+        if self.filesystem is None:
+            self.filesystem, _ = fsspec.core.url_to_fs(self.root)
+        return self.filesystem
+
+    def full_path(self, path: str) -> str:
+        """Returns the path of a document inside the filesystem.
+
+        Args:
+            path: Path of the document relative to the root of the source.
+
+        Returns:
+            The full path of the document.
+
+        Raises:
+            FileNotFoundError: If the path tries to escape the root of the source.
+        """
+        parts = [p for p in path.replace("\\", "/").split("/") if p]
+        if not parts or any(p == ".." for p in parts):
+            raise FileNotFoundError(path)
+        root = self.get_filesystem()._strip_protocol(self.root)
+        return "/".join([root.rstrip("/"), *parts])
+
+    def exists(self, path: str) -> bool:
+        """Checks if a document exists in the source.
+
+        Args:
+            path: Path of the document relative to the root of the source.
+
+        Returns:
+            True if the document exists.
+        """
+        try:
+            return bool(self.get_filesystem().exists(self.full_path(path)))
+        except FileNotFoundError:
+            return False
+
+    def size(self, path: str) -> int:
+        """Returns the size in bytes of a document, without downloading it.
+
+        Args:
+            path: Path of the document relative to the root of the source.
+
+        Returns:
+            The size of the document.
+        """
+        return int(self.get_filesystem().size(self.full_path(path)))
+
+
+@dataclass
+class _CacheEntry:
+    path: str
+    size: int
+    fetched_at: float
+
+
+@dataclass
+class DocumentCache:
+    """Bounded on-disk LRU cache for documents fetched from a DocumentSource.
+
+    Entries are evicted least recently used first when the total size of the cache
+    exceeds ``max_bytes``, and are fetched again when older than ``ttl`` seconds.
+    Concurrent requests for the same document only trigger one download.
+
+    Attributes:
+        directory: Directory the cached files are written to.
+        max_bytes: Upper bound for the total size of the cached files.
+        ttl: Seconds before a cached file is considered stale and fetched again.
+    """
+
+    directory: str = field(
+        default_factory=lambda: os.path.join(
+            tempfile.gettempdir(), "ssb-dash-framework-documents"
+        )
+    )
+    max_bytes: int = 512 * 1024 * 1024
+    ttl: float = 3600.0
+
+    def __post_init__(self) -> None:
+        """Creates the cache directory and sets up the index."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Creates a cache key from the given parts.
+
+        Args:
+            *parts: Values identifying the cached content.
+
+        Returns:
+            A key safe to use as a file name.
+        """
+        return hashlib.sha256("::".join(str(p) for p in parts).encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """Returns the path of a cached file, or None if missing or stale.
+
+        Args:
+            key: Key of the cached file.
+
+        Returns:
+            The path to the cached file, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry.fetched_at > self.ttl or not os.path.exists(
+                entry.path
+            ):
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry.path
+
+    def put(self, key: str, data: bytes) -> str:
+        """Writes bytes to the cache.
+
+        Args:
+            key: Key of the cached file.
+            data: Content to write.
+
+        Returns:
+            The path to the cached file.
+        """
+        return self.put_stream(key, io.BytesIO(data))
+
+    def put_stream(self, key: str, stream: Any) -> str:
+        """Copies a binary file-like object into the cache.
+
+        The content is written to a temporary file first and then moved in place,
+        so readers never see a partially written file.
+
+        Args:
+            key: Key of the cached file.
+            stream: Binary file-like object to read from.
+
+        Returns:
+            The path to the cached file.
+        """
+        path = os.path.join(self.directory, key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while chunk := stream.read(1024 * 1024):
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        size = os.path.getsize(path)
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key).size
+            self._entries[key] = _CacheEntry(
+                path=path, size=size, fetched_at=time.time()
+            )
+            self._size += size
+            self._evict()
+        return path
+
+    def get_or_create(self, key: str, create: Any) -> str:
+        """Returns the cached file for ``key``, creating it if needed.
+
+        Args:
+            key: Key of the cached file.
+            create: Callable taking ``(cache, key)`` that writes the entry using
+                :meth:`put` or :meth:`put_stream` and returns its path.
+
+        Returns:
+            The path to the cached file.
+        """
+        path = self.get(key)
+        if path is not None:
+            return path
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            path = self.get(key)
+            if path is None:
+                path = create(self, key)
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return str(path)
+
+    def invalidate(self, key: str) -> None:
+        """Removes an entry from the cache.
+
+        Args:
+            key: Key of the cached file.
+        """
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        """Removes every entry from the cache."""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    @property
+    def size(self) -> int:
+        """Total size in bytes of the cached files."""
+        return self._size
+
+    def __contains__(self, key: str) -> bool:
+        """Checks if a key is cached, without updating its recency."""
+        return key in self._entries
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._size -= entry.size
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> None:
+        # Always keep the most recent entry, even if it alone exceeds the bound.
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            logger.debug(f"Evicting {key} from document cache")
+            self._remove(key)
+
+
+_SOURCES: dict[str, DocumentSource] = {}
+_CACHE: DocumentCache | None = None
+
+
+def register_document_source(
+    name: str, root: str, filesystem: AbstractFileSystem | None = None
+) -> DocumentSource:
+    """Registers a location documents can be served from.
+
+    The filesystem is inferred from the protocol of ``root`` when not given, so
+    ``"gs://bucket/folder"`` uses GCS while a plain directory uses the local
+    filesystem. It is created on first use and then shared by all requests.
+    Registering the same name again replaces the previous source.
+
+    Args:
+        name: Name used in the URL to refer to the source.
+        root: Root path or URL of the documents.
+        filesystem: Optional fsspec filesystem to read from.
+
+    Returns:
+        The registered DocumentSource.
+    """
+    source = DocumentSource(name=name, root=root, filesystem=filesystem)
+    _SOURCES[name] = source
+    logger.debug(f"Registered document source '{name}' at '{root}'")
+    return source
+
+
+def get_document_source(name: str) -> DocumentSource:
+    """Returns a registered document source.
+
+    Args:
+        name: Name of the source.
+
+    Returns:
+        The DocumentSource.
+
+    Raises:
+        KeyError: If no source with that name is registered.
+    """
+    if name not in _SOURCES:
+        raise KeyError(f"No document source named '{name}' is registered.")
+    return _SOURCES[name]
+
+
+def get_document_cache() -> DocumentCache:
+    """Returns the document cache, creating it with default settings if needed."""
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = DocumentCache()
+    return _CACHE
+
+
+def set_document_cache(
+    directory: str | None = None, max_bytes: int | None = None, ttl: float | None = None
+) -> DocumentCache:
+    """Configures the on-disk cache used for served documents.
+
+    Args:
+        directory: Directory to store cached files in. Defaults to a folder in the system temp directory.
+        max_bytes: Upper bound for the total size of cached files. Defaults to 512 MB.
+        ttl: Seconds before a cached file is fetched again. Defaults to one hour.
+
+    Returns:
+        The new DocumentCache.
+    """
+    global _CACHE
+    kwargs: dict[str, Any] = {}
+    if directory is not None:
+        kwargs["directory"] = directory
+    if max_bytes is not None:
+        kwargs["max_bytes"] = max_bytes
+    if ttl is not None:
+        kwargs["ttl"] = ttl
+    _CACHE = DocumentCache(**kwargs)
+    return _CACHE
+
+
+def fetch_document(source_name: str, path: str) -> str:
+    """Returns a local path to a document, downloading it into the cache if needed.
+
+    Args:
+        source_name: Name of the registered source.
+        path: Path of the document relative to the root of the source.
+
+    Returns:
+        Path to the cached copy of the document.
+    """
+    source = get_document_source(source_name)
+    full_path = source.full_path(path)
+
+    def _download(cache: DocumentCache, key: str) -> str:
+        logger.debug(f"Fetching {full_path} into document cache")
+        with source.get_filesystem().open(full_path, "rb") as f:
+            return cache.put_stream(key, f)
+
+    cache = get_document_cache()
+    return cache.get_or_create(cache.make_key(source_name, full_path), _download)
+
+
+class UnreadableDocumentError(ValueError):
+    """Raised when a document exists but cannot be read as a PDF or TIF."""
+
+
+def _is_tif(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in (".tif", ".tiff")
+
+
+def _rasterise(document_path: str, is_tif: bool, page: int, dpi: int | None) -> bytes:
+    """Renders one page of a local PDF or TIF file to PNG bytes."""
+    buffer = io.BytesIO()
+    if is_tif:
+        try:
+            with Image.open(document_path) as image:
+                try:
+                    image.seek(page)
+                except EOFError as e:
+                    raise FileNotFoundError(
+                        f"{document_path} has no page {page}"
+                    ) from e
+                frame = image.convert("RGB")
+                native_dpi = float(
+                    image.info.get("dpi", (DEFAULT_DPI,))[0] or DEFAULT_DPI
+                )
+        except (UnidentifiedImageError, OSError) as e:
+            if isinstance(e, FileNotFoundError):
+                raise
+            raise UnreadableDocumentError(f"Could not read {document_path}") from e
+        if dpi is not None and dpi < native_dpi:
+            scale = dpi / native_dpi
+            frame = frame.resize(
+                (max(1, int(frame.width * scale)), max(1, int(frame.height * scale)))
+            )
+        frame.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    import pymupdf
+
+    # PyMuPDF is not thread safe, so only one worker renders a PDF page at a time.
+    with _PYMUPDF_LOCK:
+        try:
+            doc = pymupdf.open(document_path, filetype="pdf")
+        except (pymupdf.FileDataError, RuntimeError) as e:
+            raise UnreadableDocumentError(f"Could not read {document_path}") from e
+        with doc:
+            if not 0 <= page < doc.page_count:
+                raise FileNotFoundError(f"{document_path} has no page {page}")
+            pix = doc.load_page(page).get_pixmap(dpi=dpi or DEFAULT_DPI)
+            return bytes(pix.tobytes("png"))
+
+
+class PageRenderer:
+    """Rasterises pages of PDF and TIF documents to PNG on a worker pool.
+
+    Rendered pages are stored in the document cache keyed by source, document path,
+    page and dpi. For the årsregnskap source the document path contains orgnr and
+    aar, so pages are effectively cached per (orgnr, aar, page, dpi). Requests for a
+    page that is already being rendered wait for the same job instead of starting
+    a new one.
+
+    Pages requested by the browser run on their own pool. Prefetching runs on a
+    separate, smaller pool, so warming the next units never delays the pages the
+    user is looking at. A prefetched page that has not started yet when the
+    browser asks for it is moved to the foreground pool.
+
+    Attributes:
+        max_workers: Number of worker threads rendering requested pages.
+        prefetch_workers: Number of worker threads used for prefetching.
+    """
+
+    def __init__(self, max_workers: int = 4, prefetch_workers: int = 1) -> None:
+        """Initializes the PageRenderer.
+
+        Args:
+            max_workers: Number of worker threads rendering requested pages. Defaults to 4.
+            prefetch_workers: Number of worker threads used for prefetching. Defaults to 1.
+        """
+        self.max_workers = max_workers
+        self.prefetch_workers = prefetch_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="page-renderer"
+        )
+        self._prefetch_executor = ThreadPoolExecutor(
+            max_workers=prefetch_workers, thread_name_prefix="page-prefetch"
+        )
+        self._jobs: dict[str, Future[str]] = {}
+        self._background_jobs: set[Future[str]] = set()
+        self._lock = threading.Lock()
+
+    def page_count(self, source_name: str, path: str) -> int:
+        """Returns the number of pages in a PDF or TIF document.
+
+        TIF page counts are read from the image headers without downloading the
+        whole file, unless it is already cached. PDFs are downloaded into the cache.
+
+        Args:
+            source_name: Name of the registered source.
+            path: Path of the document relative to the root of the source.
+
+        Returns:
+            The number of pages.
+
+        Raises:
+            UnreadableDocumentError: If the document is not a readable PDF or TIF.
+        """
+        if _is_tif(path):
+            source = get_document_source(source_name)
+            cache = get_document_cache()
+            full_path = source.full_path(path)
+            cached = cache.get(cache.make_key(source_name, full_path))
+            try:
+                with (
+                    (
+                        open(cached, "rb")
+                        if cached is not None
+                        else source.get_filesystem().open(full_path, "rb")
+                    ) as f,
+                    Image.open(f) as image,
+                ):
+                    return int(getattr(image, "n_frames", 1))
+            except UnidentifiedImageError as e:
+                raise UnreadableDocumentError(f"Could not read {path}") from e
+
+        import pymupdf
+
+        document_path = fetch_document(source_name, path)
+        with _PYMUPDF_LOCK:
+            try:
+                doc = pymupdf.open(document_path, filetype="pdf")
+            except (pymupdf.FileDataError, RuntimeError) as e:
+                raise UnreadableDocumentError(f"Could not read {path}") from e
+            with doc:
+                return int(doc.page_count)
+
+    def submit(
+        self,
+        source_name: str,
+        path: str,
+        page: int,
+        dpi: int | None = None,
+        background: bool = False,
+    ) -> Future[str]:
+        """Schedules rendering of a page, returning a future with the path to the PNG.
+
+        Args:
+            source_name: Name of the registered source.
+            path: Path of the document relative to the root of the source.
+            page: Zero-based page number.
+            dpi: Resolution to render at. None renders PDFs at DEFAULT_DPI and TIFs at their native resolution.
+            background: Run on the prefetch pool instead of the pool for requested pages.
+
+        Returns:
+            A future resolving to the path of the cached PNG.
+        """
+        cache = get_document_cache()
+        key = cache.make_key(source_name, path, "page", page, dpi or "native")
+        cached = cache.get(key)
+        if cached is not None:
+            done: Future[str] = Future()
+            done.set_result(cached)
+            return done
+
+        def _job() -> str:
+            document_path = fetch_document(source_name, path)
+            return cache.get_or_create(
+                key,
+                lambda c, k: c.put(
+                    k, _rasterise(document_path, _is_tif(path), page, dpi)
+                ),
+            )
+
+        with self._lock:
+            job = self._jobs.get(key)
+            if (
+                job is not None
+                and not background
+                and job in self._background_jobs
+                and job.cancel()
+            ):
+                job = None
+            is_new = job is None
+            if job is None:
+                executor = self._prefetch_executor if background else self._executor
+                job = executor.submit(_job)
+                self._jobs[key] = job
+                if background:
+                    self._background_jobs.add(job)
+        # Registered outside the lock: if the job is already done the callback runs
+        # right away on this thread, and _forget needs the lock.
+        if is_new:
+            job.add_done_callback(lambda finished: self._forget(key, finished))
+        return job
+
+    def render(
+        self,
+        source_name: str,
+        path: str,
+        page: int,
+        dpi: int | None = None,
+        timeout: float | None = 60,
+    ) -> str:
+        """Renders a page on the worker pool and waits for the result.
+
+        Args:
+            source_name: Name of the registered source.
+            path: Path of the document relative to the root of the source.
+            page: Zero-based page number.
+            dpi: Resolution to render at, see :meth:`submit`.
+            timeout: Seconds to wait for the page. Defaults to 60.
+
+        Returns:
+            Path to the cached PNG.
+        """
+        return self.submit(source_name, path, page, dpi).result(timeout=timeout)
+
+    def prefetch(
+        self,
+        source_name: str,
+        path: str,
+        pages: int = 3,
+        dpi: int | None = None,
+    ) -> Future[None]:
+        """Downloads a document and renders its first pages on the prefetch pool.
+
+        Args:
+            source_name: Name of the registered source.
+            path: Path of the document relative to the root of the source.
+            pages: Number of pages from the start of the document to render. Defaults to 3.
+            dpi: Resolution to render at, see :meth:`submit`.
+
+        Returns:
+            A future that is done when the pages have been scheduled.
+        """
+
+        def _warm() -> None:
+            try:
+                fetch_document(source_name, path)
+                for page in range(min(pages, self.page_count(source_name, path))):
+                    self.submit(source_name, path, page, dpi, background=True)
+            except (FileNotFoundError, UnreadableDocumentError):
+                logger.debug(f"Nothing to prefetch for {source_name}/{path}")
+
+        return self.run_in_background(_warm)
+
+    def run_in_background(self, func: Callable[..., Any], *args: Any) -> Future[Any]:
+        """Runs a function on the prefetch pool, logging exceptions instead of raising them.
+
+        Args:
+            func: The function to run.
+            *args: Arguments passed to the function.
+
+        Returns:
+            A future for the result of the function.
+        """
+
+        def _run() -> Any:
+            try:
+                return func(*args)
+            except Exception:
+                logger.exception(f"Background task {func} failed")
+                return None
+
+        return self._prefetch_executor.submit(_run)
+
+    def _forget(self, key: str, job: Future[str]) -> None:
+        with self._lock:
+            self._background_jobs.discard(job)
+            if self._jobs.get(key) is job:
+                del self._jobs[key]
+
+
+_RENDERER: PageRenderer | None = None
+
+
+def get_page_renderer() -> PageRenderer:
+    """Returns the shared PageRenderer, creating it if needed."""
+    global _RENDERER
+    if _RENDERER is None:
+        _RENDERER = PageRenderer()
+    return _RENDERER
+
+
+def page_count(source_name: str, path: str) -> int:
+    """Returns the number of pages in a PDF or TIF document.
+
+    Args:
+        source_name: Name of the registered source.
+        path: Path of the document relative to the root of the source.
+
+    Returns:
+        The number of pages.
+    """
+    return get_page_renderer().page_count(source_name, path)
+
+
+def document_url(source_name: str, path: str, **params: Any) -> str:
+    """Returns the URL a registered document is served from.
+
+    Must be called while the Dash app exists, typically inside a callback, as the
+    URL includes the app's ``requests_pathname_prefix``.
+
+    Args:
+        source_name: Name of the registered source.
+        path: Path of the document relative to the root of the source.
+        **params: Extra query parameters, ``page`` to get a single page as PNG and ``dpi`` for its resolution.
+
+    Returns:
+        The relative URL for the document.
+    """
+    url = get_relative_path(f"{DOCUMENT_ROUTE}/{source_name}/{path.lstrip('/')}")
+    query = {k: v for k, v in params.items() if v is not None}
+    return f"{url}?{urlencode(query)}" if query else str(url)
+
+
+def register_document_routes(server: Flask, max_age: int = 3600) -> None:
+    """Adds the route serving registered documents to a Flask server.
+
+    ``app_setup`` calls this for the app it creates. Calling it again for the same
+    server has no effect.
+
+    Args:
+        server: The Flask server, ``app.server`` for a Dash app.
+        max_age: Seconds the browser may cache a served document. Defaults to one hour.
+    """
+    if "ssb_documents" in server.view_functions:
+        return
+
+    def serve_document(source_name: str, path: str) -> Response:
+        if source_name not in _SOURCES:
+            abort(404)
+        page = request.args.get("page", type=int)
+        dpi = request.args.get("dpi", type=int)
+        if dpi is not None and dpi not in ALLOWED_DPI:
+            abort(400)
+        extension = os.path.splitext(path)[1].lower()
+        try:
+            if page is not None:
+                local_path = get_page_renderer().render(source_name, path, page, dpi)
+                mimetype = "image/png"
+            else:
+                local_path = fetch_document(source_name, path)
+                mimetype = _MIMETYPES.get(extension, "application/octet-stream")
+        except FileNotFoundError:
+            abort(404)
+        except UnreadableDocumentError:
+            logger.warning(f"Could not read {source_name}/{path}", exc_info=True)
+            abort(415)
+        except TimeoutError:
+            logger.warning(f"Timed out rendering page {page} of {source_name}/{path}")
+            abort(503)
+        response = send_file(
+            local_path,
+            mimetype=mimetype,
+            download_name=os.path.basename(path),
+            conditional=True,
+            etag=True,
+            max_age=max_age,
+        )
+        # send_file marks the response public; documents are per-user data.
+        response.cache_control.public = False
+        response.cache_control.private = True
+        return response
+
+    server.add_url_rule(
+        f"{DOCUMENT_ROUTE}/<source_name>/<path:path>",
+        endpoint="ssb_documents",
+        view_func=serve_document,
+    )
@@ -0,0 +1,197 @@
+"""Helpers for keeping Plotly figures with many points small and fast to draw.
+
+Figures built from every row of a large table can become many megabytes, which
+freezes the browser. These helpers reduce the points that are sent while keeping
+the shape of the data and the rows that matter, such as outliers, and switch to
+WebGL rendering for the points that remain.
+"""
+
+import logging
+from collections.abc import Sequence
+from typing import Any
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+logger = logging.getLogger(__name__)
+
+WEBGL_THRESHOLD = 1000
+MAX_POINTS = 5000
+
+
+def lttb_indices(x: Sequence[float], y: Sequence[float], n_out: int) -> np.ndarray:
+    """Selects points with the Largest-Triangle-Three-Buckets algorithm.
+
+    The points are split into n_out - 2 buckets between the first and last point,
+    and from each bucket the point forming the largest triangle with the point
+    selected before it and the average of the next bucket is kept.
+
+    Args:
+        x: The x values, sorted ascending.
+        y: The y values.
+        n_out: The number of points to select.
+
+    Returns:
+        The positions of the selected points, ascending.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(int) + 1
+    edges[-1] = n - 1
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[a] - next_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y: Sequence[float], n_out: int) -> np.ndarray:
+    """Selects the smallest and largest value in each of n_out / 2 buckets.
+
+    Args:
+        y: The values, in the order they are plotted.
+        n_out: The number of points to select.
+
+    Returns:
+        The positions of the selected points, ascending.
+    """
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    values = pd.Series(np.asarray(y, dtype=float))
+    buckets = np.arange(n) * max(n_out // 2, 1) // n
+    grouped = values.groupby(buckets)
+    return np.union1d(grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy())
+
+
+def downsample(
+    data: pd.DataFrame,
+    x: str,
+    y: str,
+    max_points: int = MAX_POINTS,
+    method: Literal["lttb", "minmax"] = "lttb",
+    keep: pd.Series | np.ndarray | None = None,
+) -> pd.DataFrame:
+    """Reduces a DataFrame to about max_points rows that keep the shape of y against x.
+
+    Rows where x or y is missing can not be drawn and are dropped when the data is
+    reduced.
+
+    Args:
+        data: The data to reduce.
+        x: The column on the x-axis. If it is numeric, the rows are ordered by it.
+        y: The column on the y-axis. Must be numeric.
+        max_points: The number of rows to reduce to, not counting the kept rows.
+        method: 'lttb' keeps the points that shape the curve, 'minmax' keeps the
+            smallest and largest value in evenly sized buckets.
+        keep: A boolean mask of rows to always keep, such as outliers or selected
+            units.
+
+    Returns:
+        The data if it has at most max_points rows, otherwise the selected rows in
+        the order of x.
+
+    Raises:
+        ValueError: If method is not 'lttb' or 'minmax'.
+    """
+    if len(data) <= max_points:
+        return data
+    if method not in ("lttb", "minmax"):
+        raise ValueError(f"method must be 'lttb' or 'minmax', got '{method}'")
+    keep_mask = (
+        np.zeros(len(data), dtype=bool)
+        if keep is None
+        else np.asarray(keep, dtype=bool)
+    )
+    y_values = pd.to_numeric(data[y], errors="coerce").to_numpy(dtype=float)
+    x_numeric = pd.api.types.is_numeric_dtype(data[x])
+    x_values = (
+        data[x].to_numpy(dtype=float)
+        if x_numeric
+        else np.arange(len(data), dtype=float)
+    )
+    drawable = np.flatnonzero(np.isfinite(x_values) & np.isfinite(y_values))
+    if x_numeric:
+        drawable = drawable[np.argsort(x_values[drawable], kind="stable")]
+
+    if method == "lttb":
+        chosen = lttb_indices(x_values[drawable], y_values[drawable], max_points)
+    else:
+        chosen = minmax_indices(y_values[drawable], max_points)
+    positions = np.union1d(drawable[chosen], np.flatnonzero(keep_mask))
+    if x_numeric:
+        positions = positions[np.argsort(x_values[positions], kind="stable")]
+    logger.debug(f"Downsampled {len(data)} rows to {len(positions)}")
+    return data.iloc[positions]
+
+
+def scatter_trace(
+    x: Sequence[Any], y: Sequence[Any], **kwargs: Any
+) -> go.Scatter | go.Scattergl:
+    """Creates a scatter trace, using WebGL when there are many points.
+
+    Args:
+        x: The x values.
+        y: The y values.
+        **kwargs: Passed on to go.Scatter or go.Scattergl.
+
+    Returns:
+        A go.Scattergl trace if there are more than WEBGL_THRESHOLD points,
+        otherwise a go.Scatter trace.
+    """
+    if len(x) > WEBGL_THRESHOLD:
+        return go.Scattergl(x=x, y=y, **kwargs)
+    return go.Scatter(x=x, y=y, **kwargs)
+
+
+def summary_box(data: pd.DataFrame, x: str | None, y: str, **kwargs: Any) -> go.Box:
+    """Creates a box trace from statistics computed here instead of in the browser.
+
+    Only the quartiles, mean and whisker ends are sent, not the values. The whiskers
+    end at the most extreme values within 1.5 IQR of the box, as when plotly
+    computes them.
+
+    Args:
+        data: The data to summarize.
+        x: The column to group by, or None for a single box.
+        y: The numeric column to summarize.
+        **kwargs: Passed on to go.Box.
+
+    Returns:
+        A go.Box trace with one box per group.
+    """
+    values = pd.to_numeric(data[y], errors="coerce")
+    groups = data[x] if x is not None else pd.Series(y, index=data.index)
+    grouped = values.groupby(groups, sort=True)
+    q1 = grouped.quantile(0.25)
+    q3 = grouped.quantile(0.75)
+    iqr = q3 - q1
+    within = values.between(groups.map(q1 - 1.5 * iqr), groups.map(q3 + 1.5 * iqr))
+    fences = values[within].groupby(groups[within], sort=True)
+    return go.Box(
+        x=list(q1.index),
+        q1=q1.to_list(),
+        median=grouped.median().to_list(),
+        q3=q3.to_list(),
+        mean=grouped.mean().to_list(),
+        lowerfence=fences.min().reindex(q1.index).to_list(),
+        upperfence=fences.max().reindex(q1.index).to_list(),
+        **kwargs,
+    )
@@ -1,4 +1,5 @@
 import logging
+from typing import Any
 from typing import Protocol
 
 import dash_bootstrap_components as dbc
@@ -14,6 +15,29 @@ from ..utils.functions import sidebar_button
 logger = logging.getLogger(__name__)
 
 
+def is_tab_or_window(module: object) -> bool:
+    """Returns True if the module is shown through TabImplementation or WindowImplementation.
+
+    Modules use it to decide whether their callbacks can use deferred inputs from
+    their VariableSelector, which only change while the tab or window is visible.
+    It works in the __init__ of the module, before the implementation is initialized.
+
+    Example:
+        >>> self.variableselector.get_all_inputs(deferred=is_tab_or_window(self))  # doctest: +SKIP
+    """
+    return isinstance(module, TabImplementation | WindowImplementation)
+
+
+def _deferred_layout(module: Any, visible: Input | None, visible_when: Any) -> list:
+    """Returns the stores behind the deferred inputs of the module, if it uses any."""
+    selector = getattr(module, "variableselector", None) or getattr(
+        module, "variable_selector", None
+    )
+    if selector is None or not hasattr(selector, "deferred_layout"):
+        return []
+    return selector.deferred_layout(visible, visible_when)
+
+
 class TabModule(Protocol):
     """A protocol that defines the expected interface for a module to be used in a tab.
 
@@ -49,6 +73,8 @@ class TabImplementation:
     label: str
     module_name: str
     module_layout: html.Div
+    # Set by main_layout to the value the tabs have when this tab is selected.
+    tab_value: str | None = None
 
     def __init__(self) -> None:
         """Initialize the tab implementation.
@@ -81,10 +107,16 @@ class TabImplementation:
             )
         else:
             label_content = self.label
+        visible = (
+            None if self.tab_value is None else Input("main-layout-tab-list", "value")
+        )
         layout = dbc.Tab(
             html.Div(
                 className="tab-implementation",
-                children=self.get_module_layout(),
+                children=[
+                    self.get_module_layout(),
+                    *_deferred_layout(self, visible, self.tab_value),
+                ],
             ),
             label=label_content,
         )
@@ -231,6 +263,11 @@ class WindowImplementation:
                     self.label,
                     f"sidebar-{self._window_n}-{self.module_name}-modal-button",
                 ),
+                *_deferred_layout(
+                    self,
+                    Input(f"{self._window_n}-{self.module_name}-modal", "is_open"),
+                    True,
+                ),
             ]
         )
         logger.debug("Generated layout")
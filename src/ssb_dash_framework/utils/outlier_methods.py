@@ -0,0 +1,274 @@
+"""NumPy implementations of the outlier methods from the R package Kostra.
+
+The functions take and return the same data as the wrappers around Kostra in
+:mod:`.r_helpers`, so they can be used as drop-in replacements without needing R.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _as_float(values: Any) -> np.ndarray:
+    return pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+
+
+def _hb_arrays(
+    x1: np.ndarray, x2: np.ndarray, p_c: float, p_u: float, p_a: float
+) -> dict[str, np.ndarray]:
+    """Runs the HB method on two value arrays of equal length.
+
+    Units where x1 or x2 are missing or not positive are not used. Units where
+    x1 == x2 are only used if they are less than half of the remaining units. As in
+    Kostra, the limits are missing for the units that are not used.
+    """
+    n = len(x1)
+    valid = np.isfinite(x1) & np.isfinite(x2) & (x1 > 0) & (x2 > 0)
+    equal = valid & (x1 == x2)
+    used = valid & ~equal if equal.sum() >= 0.5 * valid.sum() else valid
+
+    ratio = np.full(n, np.nan)
+    ratio[valid] = x2[valid] / x1[valid]
+    max_x = np.fmax(x1, x2)
+
+    nan = np.full(n, np.nan)
+    result = {
+        "maxX": max_x,
+        "ratio": ratio,
+        "medRatio": nan.copy(),
+        "sizeRatio": nan.copy(),
+        "E": nan.copy(),
+        "Q1": nan.copy(),
+        "medE": nan.copy(),
+        "Q3": nan.copy(),
+        "lowerE": nan.copy(),
+        "upperE": nan.copy(),
+        "lowerLimit": nan.copy(),
+        "upperLimit": nan.copy(),
+        "outlier": np.zeros(n, dtype=int),
+    }
+    if not used.any():
+        return result
+
+    med_ratio = np.median(ratio[used])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        size_ratio = np.where(
+            ratio < med_ratio, 1 - med_ratio / ratio, ratio / med_ratio - 1
+        )
+        scale = max_x**p_u
+    e = size_ratio * scale
+
+    q1, med_e, q3 = np.percentile(e[used], [25, 50, 75])
+    d_q1 = max(med_e - q1, abs(p_a * med_e))
+    d_q3 = max(q3 - med_e, abs(p_a * med_e))
+    lower_e = med_e - p_c * d_q1
+    upper_e = med_e + p_c * d_q3
+
+    def to_ratio(limit: float) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            s = limit / scale
+            return np.where(s < 0, med_ratio / (1 - s), med_ratio * (1 + s))
+
+    result.update(
+        medRatio=np.full(n, med_ratio),
+        sizeRatio=np.where(valid, size_ratio, np.nan),
+        E=np.where(valid, e, np.nan),
+        Q1=np.full(n, q1),
+        medE=np.full(n, med_e),
+        Q3=np.full(n, q3),
+        lowerE=np.full(n, lower_e),
+        upperE=np.full(n, upper_e),
+        lowerLimit=np.where(used, to_ratio(lower_e), np.nan),
+        upperLimit=np.where(used, to_ratio(upper_e), np.nan),
+        outlier=(used & ((e < lower_e) | (e > upper_e))).astype(int),
+    )
+    return result
+
+
+def hb_method(
+    data: pd.DataFrame,
+    p_c: int,
+    p_u: float,
+    p_a: float,
+    id_field_name: str = "id",
+    x_1_field_name: str = "x1",
+    x_2_field_name: str = "x2",
+) -> pd.DataFrame:
+    """Runs the Hidiroglou-Berthelot method for finding outliers.
+
+    All units are returned, but the method is only performed on units where both x1
+    and x2 are present and greater than zero. Of these, units with x1 = x2 are only
+    included if they are less than 50 per cent of the units.
+
+    Args:
+        data: The data to run the method on.
+        p_c: The value of pC, which controls the length of the confidence interval.
+        p_u: The value of pU, which adjusts for different levels of the variables.
+        p_a: The value of pA, which adjusts for small differences between the
+            median and the 1st or 3rd quartile.
+        id_field_name: The name of the id field.
+        x_1_field_name: The name of the first x field.
+        x_2_field_name: The name of the second x field.
+
+    Returns:
+        A DataFrame with one row per unit and the columns 'id', 'x1', 'x2', 'maxX',
+        'ratio', 'medRatio', 'sizeRatio', 'E', 'Q1', 'medE', 'Q3', 'lowerE',
+        'upperE', 'lowerLimit', 'upperLimit' and 'outlier'. The limits are given on
+        the scale of the ratio for the maxX of each unit, and are missing for units
+        the method is not performed on. 'outlier' is 1 for outliers and 0 otherwise.
+
+    Example:
+        >>> data = pd.DataFrame(
+        ...     {"id": list("abcde"), "x1": [10, 20, 30, 40, 50], "x2": [11, 22, 33, 44, 500]}
+        ... )
+        >>> hb_method(data, p_c=4, p_u=0.5, p_a=0.05)["outlier"].tolist()
+        [0, 0, 0, 0, 1]
+    """
+    x1 = _as_float(data[x_1_field_name])
+    x2 = _as_float(data[x_2_field_name])
+    result = pd.DataFrame(
+        {
+            "id": data[id_field_name].to_numpy(),
+            "x1": x1,
+            "x2": x2,
+            **_hb_arrays(x1, x2, p_c, p_u, p_a),
+        }
+    )
+    logger.debug(f"HB method found {result['outlier'].sum()} outliers")
+    return result
+
+
+def hb_method_grouped(
+    data: pd.DataFrame,
+    p_c: int,
+    p_u: float,
+    p_a: float,
+    group_field_name: str = "variabel",
+    id_field_name: str = "id",
+    x_1_field_name: str = "x1",
+    x_2_field_name: str = "x2",
+    max_workers: int | None = None,
+) -> pd.DataFrame:
+    """Runs the HB method separately for each group in the data, such as each variable.
+
+    The groups are computed in parallel on a thread pool.
+
+    Args:
+        data: The data to run the method on, in long format with one row per unit
+            and group.
+        p_c: The value of pC.
+        p_u: The value of pU.
+        p_a: The value of pA.
+        group_field_name: The name of the field to group by.
+        id_field_name: The name of the id field.
+        x_1_field_name: The name of the first x field.
+        x_2_field_name: The name of the second x field.
+        max_workers: Number of threads to use. Defaults to the default of
+            ThreadPoolExecutor.
+
+    Returns:
+        The result of :func:`hb_method` for every group, with the group in the first
+        column.
+    """
+
+    def run(item: tuple[Any, pd.DataFrame]) -> pd.DataFrame:
+        name, group = item
+        result = hb_method(
+            group,
+            p_c=p_c,
+            p_u=p_u,
+            p_a=p_a,
+            id_field_name=id_field_name,
+            x_1_field_name=x_1_field_name,
+            x_2_field_name=x_2_field_name,
+        )
+        result.insert(0, group_field_name, name)
+        return result
+
+    groups = list(data.groupby(group_field_name, sort=False))
+    if not groups:
+        empty = hb_method(
+            data, p_c, p_u, p_a, id_field_name, x_1_field_name, x_2_field_name
+        )
+        empty.insert(0, group_field_name, data[group_field_name])
+        return empty
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return pd.concat(pool.map(run, groups), ignore_index=True)
+
+
+def hb_outlier_ranking(
+    result: pd.DataFrame, group_field_name: str = "variabel"
+) -> pd.DataFrame:
+    """Counts the units and outliers per group in a result from :func:`hb_method_grouped`.
+
+    Groups without any units the method could use, such as non-numeric variables,
+    are left out.
+
+    Args:
+        result: The result of :func:`hb_method_grouped`.
+        group_field_name: The name of the field the result is grouped by.
+
+    Returns:
+        A DataFrame with the columns group_field_name, 'enheter', 'utliggere' and
+        'andel_utliggere', with the groups with the most outliers first.
+    """
+    ranking = (
+        result.groupby(group_field_name, sort=False)
+        .agg(enheter=("E", "count"), utliggere=("outlier", "sum"))
+        .reset_index()
+    )
+    ranking = ranking[ranking["enheter"] > 0].assign(
+        andel_utliggere=lambda df: df["utliggere"] / df["enheter"]
+    )
+    return ranking.sort_values(
+        ["utliggere", "andel_utliggere"], ascending=False, ignore_index=True
+    )
+
+
+def th_error(
+    data: pd.DataFrame,
+    id_field_name: str,
+    x_1_field_name: str,
+    x_2_field_name: str,
+    lower: float = 300,
+    upper: float = 3000,
+) -> pd.DataFrame:
+    """Finds thousand errors, where a value is reported in the wrong unit.
+
+    A unit has a thousand error if x2 / x1 is between lower and upper, or between
+    1 / upper and 1 / lower.
+
+    Args:
+        data: The data to run the method on.
+        id_field_name: The name of the id field.
+        x_1_field_name: The name of the first x field.
+        x_2_field_name: The name of the second x field.
+        lower: The smallest ratio counted as a thousand error. Defaults to 300.
+        upper: The largest ratio counted as a thousand error. Defaults to 3000.
+
+    Returns:
+        The units without thousand errors, with the columns 'id', 'x1', 'x2',
+        'ratio' and 'outlier'.
+    """
+    x1 = _as_float(data[x_1_field_name])
+    x2 = _as_float(data[x_2_field_name])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where((x1 > 0) & (x2 > 0), x2 / x1, np.nan)
+    outlier = ((ratio >= lower) & (ratio <= upper)) | (
+        (ratio >= 1 / upper) & (ratio <= 1 / lower)
+    )
+    result = pd.DataFrame(
+        {
+            "id": data[id_field_name].to_numpy(),
+            "x1": x1,
+            "x2": x2,
+            "ratio": ratio,
+            "outlier": outlier.astype(int),
+        }
+    )
+    return result[result.outlier == 0]
@@ -0,0 +1,182 @@
+"""Background warming of caches for the units an editor is likely to open next.
+
+Editors work through lists of units in order: the rows of the control view, the
+submitted forms of a unit, and so on. When such a list is known, the module showing
+it calls :meth:`UnitPrefetcher.prefetch` with the rows and the row that is currently
+selected. The prefetcher then runs every registered loader for the following rows on
+a background thread, so the caches the editor reads from are warm when the user
+moves on.
+
+Modules that read per-unit data through a cache register a loader that reads the
+same data for a given unit, see :meth:`UnitPrefetcher.register_loader`.
+"""
+
+import logging
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from typing import ClassVar
+
+logger = logging.getLogger(__name__)
+
+
+class UnitPrefetcher:
+    """Runs registered cache loaders for the next units in a list on a background thread.
+
+    A unit is a dict of the values identifying it, typically the row of a table with
+    'refnr' and/or 'ident', plus the time units. Loaders receive the unit and should
+    skip it if a value they need is missing.
+
+    Only the latest call to :meth:`prefetch` is worked on. Units queued by earlier
+    calls are skipped when the user has moved on.
+
+    Example:
+        >>> UnitPrefetcher.register_loader(
+        ...     "kontaktinfo",
+        ...     lambda unit: get_unit_table("kontaktinfo", refnr=unit["refnr"]),
+        ... )  # doctest: +SKIP
+        >>> UnitPrefetcher.prefetch(rows, current={"refnr": "123"})  # doctest: +SKIP
+    """
+
+    count: ClassVar[int] = 3
+    ttl: ClassVar[float] = 300.0
+    enabled: ClassVar[bool] = True
+    _loaders: ClassVar[dict[str, Callable[[dict[str, Any]], Any]]] = {}
+    _executor: ClassVar[ThreadPoolExecutor | None] = None
+    _generation: ClassVar[int] = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(
+        cls,
+        count: int | None = None,
+        ttl: float | None = None,
+        enabled: bool | None = None,
+    ) -> None:
+        """Changes how many units are prefetched and how long the results are kept.
+
+        Args:
+            count: Number of units after the current one to prefetch. Defaults to 3.
+            ttl: Seconds prefetched data is kept in the caches. It needs to cover the
+                time spent on the units before it, so it is longer than the ttl of
+                data loaded on demand. Defaults to 300.
+            enabled: Turns prefetching on or off.
+
+        Raises:
+            ValueError: If count or ttl is negative.
+        """
+        if count is not None and count < 0:
+            raise ValueError(f"count can not be negative, got {count}")
+        if ttl is not None and ttl < 0:
+            raise ValueError(f"ttl can not be negative, got {ttl}")
+        if count is not None:
+            cls.count = count
+        if ttl is not None:
+            cls.ttl = ttl
+        if enabled is not None:
+            cls.enabled = enabled
+
+    @classmethod
+    def register_loader(
+        cls, name: str, loader: Callable[[dict[str, Any]], Any]
+    ) -> None:
+        """Registers a function that warms a cache for one unit.
+
+        Registering a loader under a name that is already used replaces it, so
+        modules can register their loader every time they are initialized.
+
+        Args:
+            name: Name of the loader, used in logs.
+            loader: Called with a unit dict on the prefetch thread.
+        """
+        cls._loaders[name] = loader
+
+    @staticmethod
+    def next_units(
+        units: list[dict[str, Any]],
+        current: dict[str, Any] | None = None,
+        key: str = "refnr",
+        count: int = 3,
+    ) -> list[dict[str, Any]]:
+        """Returns the units following the current one.
+
+        Args:
+            units: The units in the order the user works through them.
+            current: The selected unit. Defaults to None, which means the first units
+                are returned.
+            key: The column identifying a unit.
+            count: Maximum number of units to return.
+
+        Returns:
+            Up to count units after the current one.
+        """
+        start = 0
+        if current is not None and current.get(key) is not None:
+            for i, unit in enumerate(units):
+                if unit.get(key) == current[key]:
+                    start = i + 1
+                    break
+        return units[start : start + count]
+
+    @classmethod
+    def prefetch(
+        cls,
+        units: list[dict[str, Any]] | None,
+        current: dict[str, Any] | None = None,
+        key: str = "refnr",
+        count: int | None = None,
+        **context: Any,
+    ) -> Future[None] | None:
+        """Warms the caches for the units following the current one in the background.
+
+        Args:
+            units: The units in the order the user works through them, typically the
+                rowData of a table.
+            current: The selected unit. Defaults to None, which prefetches the first
+                units in the list.
+            key: The column identifying a unit in the list.
+            count: Number of units to prefetch. Defaults to UnitPrefetcher.count.
+            **context: Values added to every unit that the rows do not have, for
+                example the selected time units.
+
+        Returns:
+            A Future that is done when the units are prefetched, or None if there is
+            nothing to prefetch.
+        """
+        if not cls.enabled or not units or not cls._loaders:
+            return None
+        upcoming = cls.next_units(
+            units, current, key, cls.count if count is None else count
+        )
+        if current is not None:
+            upcoming = [unit for unit in upcoming if unit.get(key) != current.get(key)]
+        if not upcoming:
+            return None
+        upcoming = [{**context, **unit} for unit in upcoming]
+        with cls._lock:
+            cls._generation += 1
+            generation = cls._generation
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="ssb-unit-prefetch"
+                )
+            executor = cls._executor
+        logger.debug(f"Prefetching {len(upcoming)} units")
+        return executor.submit(cls._run, generation, upcoming)
+
+    @classmethod
+    def _run(cls, generation: int, units: list[dict[str, Any]]) -> None:
+        for unit in units:
+            for name, loader in list(cls._loaders.items()):
+                if cls._generation != generation:
+                    logger.debug("Skipping outdated prefetch")
+                    return
+                try:
+                    loader(unit)
+                except Exception as e:
+                    logger.warning(
+                        f"Prefetch loader '{name}' failed for {unit}: {e}",
+                        exc_info=True,
+                    )
@@ -1,6 +1,8 @@
 """TERMPORARILY DISABLED UNTIL A SERVICE IN DAPLA LAB WITH R AND PYTHON FOR VSCODE EXISTS.
 
 This module contains utility functions for R-related tasks in the SSB Dash Framework.
+The outlier methods are also implemented without R in outlier_methods, which is what
+the framework uses.
 """
 
 import logging
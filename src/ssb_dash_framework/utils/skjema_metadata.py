@@ -0,0 +1,154 @@
+"""Datatypes and feltsti of the skjemadata variables, read in bulk and shared by the editors.
+
+Before writing an edit, the editors check the new value against the datatype of the
+variable in 'datatyper', and when a skjemadata row is missing it is inserted with
+the feltsti of the variable from the mapping table. Instead of a query per edit,
+the datatypes of a year and the feltsti of a year and skjema are read once and kept
+for an hour. The checks then run in memory, so an edit is one query to the database.
+"""
+
+import logging
+from collections.abc import Callable
+from typing import Any
+
+from ibis import _
+
+from .unit_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def _is_valid_int(v: Any) -> bool | str:
+    """Valid only if the string content is a whole number with no decimal separator."""
+    s = str(v).strip()
+    if "." in s or "," in s:
+        return "float"
+    if s.lstrip("-").isdigit() and s not in ("", "-"):
+        return True
+    return False
+
+
+def _is_valid_bool(v: Any) -> bool:
+    """Accepts 'true'/'false' (any case), and '1'/'0'."""
+    s = str(v).strip().lower()
+    return s in {"true", "false", "1", "0"}
+
+
+_VALIDATORS: dict[str, Callable[[Any], bool | str]] = {
+    "string": lambda v: True,
+    "integer": _is_valid_int,
+    "number": _is_valid_int,
+    "bool": _is_valid_bool,
+}
+
+_DATATYPES: TTLCache[dict[str, str]] = TTLCache(max_size=16, ttl=3600.0)
+_FELTSTI: TTLCache[dict[str, str]] = TTLCache(max_size=64, ttl=3600.0)
+
+
+def get_datatypes(conn: Any, aar: Any) -> dict[str, str]:
+    """Returns the datatype of every variable in 'datatyper' for a year.
+
+    Example use: get_datatypes(conn, 2024)["fjor_omsetning"]
+
+    Args:
+        conn: An ibis connection, used if the datatypes are not cached.
+        aar: The year.
+
+    Returns:
+        The datatype by variabel.
+    """
+
+    def load() -> dict[str, str]:
+        if aar is None:
+            return {}
+        logger.debug(f"Loading datatypes for aar={aar}")
+        t = conn.table("datatyper")
+        df = (
+            t.filter(_.aar == aar)
+            .select(["variabel", "datatype"])
+            .execute()
+            .drop_duplicates("variabel")
+        )
+        return dict(zip(df["variabel"], df["datatype"], strict=True))
+
+    return _DATATYPES.get_or_load(("datatyper", aar), load)
+
+
+def get_feltsti_mapping(
+    conn: Any,
+    aar: Any,
+    skjema: str | None,
+    mapping_table: str = "mapping_variabelnavn",
+    mapping_match_column: str = "variabel",
+    mapping_result_column: str = "feltsti",
+) -> dict[str, str]:
+    """Returns the long name (feltsti) of every variable of a skjema and year.
+
+    Example use: get_feltsti_mapping(conn, 2024, "RA-1234")["fjor_omsetning"]
+
+    Args:
+        conn: An ibis connection, used if the mapping is not cached.
+        aar: The year.
+        skjema: The skjema.
+        mapping_table: Table mapping the short names to the long names.
+        mapping_match_column: Column in mapping_table with the short names.
+        mapping_result_column: Column in mapping_table with the long names.
+
+    Returns:
+        The long name by short name.
+    """
+
+    def load() -> dict[str, str]:
+        if aar is None or skjema is None:
+            return {}
+        logger.debug(f"Loading {mapping_table} for aar={aar}, skjema={skjema}")
+        t = conn.table(mapping_table)
+        df = (
+            t.filter(_.aar == aar)
+            .filter(_.skjema == skjema)
+            .select([mapping_match_column, mapping_result_column])
+            .execute()
+            .drop_duplicates(mapping_match_column)
+        )
+        return dict(
+            zip(df[mapping_match_column], df[mapping_result_column], strict=True)
+        )
+
+    key = (mapping_table, mapping_match_column, mapping_result_column, aar, skjema)
+    return _FELTSTI.get_or_load(key, load)
+
+
+def check_datatype(datatype: str | None, variable: str, value: Any) -> str | None:
+    """Checks whether value could legitimately represent a datatype.
+
+    Empty values and variables without a datatype are always valid.
+
+    Args:
+        datatype: The datatype of the variable, from :func:`get_datatypes`.
+        variable: The variable, used in the log.
+        value: The value to check.
+
+    Returns:
+        None if the value is valid, otherwise the expected datatype, or "float" if
+        a whole number was expected and the value has decimals.
+    """
+    if value is None or value == "" or not datatype:
+        return None
+
+    validator = _VALIDATORS.get(datatype)
+    if validator is None:
+        logger.warning(f"Unknown datatype '{datatype}' for variable '{variable}'")
+        return datatype
+
+    result = validator(value)
+    if result is True:
+        return None
+    if result == "float":
+        return "float"
+    return datatype
+
+
+def clear_skjema_metadata() -> None:
+    """Drops the cached datatypes and feltsti, so they are read again on next use."""
+    _DATATYPES.clear()
+    _FELTSTI.clear()
@@ -0,0 +1,350 @@
+"""Caches for the per-unit data editors read every time they switch unit.
+
+``TTLCache`` is a small thread-safe LRU cache where entries expire a fixed time
+after they were loaded, and concurrent requests for a key that is not cached share
+one load. The form cache behind editable fields and the helper-table cache in this
+module are both built on it.
+
+The helper-table cache holds small slices of tables such as 'kontaktinfo',
+'enhetsinfo' and 'kontrollutslag', filtered on the unit being viewed. Modules read
+them through :func:`get_unit_table`, and code that writes to one of the tables
+calls :func:`evict_unit_table` afterwards.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from collections.abc import Hashable
+from concurrent.futures import Future
+from contextlib import ExitStack
+from functools import partial
+from typing import Any
+
+import pandas as pd
+
+from .config_tools.connection import get_connection
+from .core_query_functions import ibis_filter_with_dict
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache[V]:
+    """Thread-safe LRU cache whose entries expire a while after they are loaded.
+
+    Example:
+        >>> cache = TTLCache(max_size=2, ttl=30)
+        >>> cache.get_or_load("a", lambda: 1)
+        1
+        >>> cache.get_or_load("a", lambda: 2)
+        1
+    """
+
+    def __init__(self, max_size: int = 128, ttl: float = 60.0) -> None:
+        """Initializes an empty cache.
+
+        Args:
+            max_size: Number of entries to keep. The least recently used entry is
+                dropped when there are more.
+            ttl: Seconds an entry is served after it was loaded.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # value, load time and the ttl given when loading it (None uses self.ttl)
+        self._data: OrderedDict[Hashable, tuple[V, float, float | None]] = OrderedDict()
+        self._pending: dict[Hashable, Future[V]] = {}
+        self._lock = threading.Lock()
+        self.configure(max_size, ttl)
+
+    def configure(self, max_size: int | None = None, ttl: float | None = None) -> None:
+        """Changes the size and time-to-live of the cache.
+
+        Args:
+            max_size: Number of entries to keep.
+            ttl: Seconds an entry is served after it was loaded. Does not apply to
+                entries loaded with their own ttl.
+
+        Raises:
+            ValueError: If max_size is less than 1 or ttl is negative.
+        """
+        if max_size is not None and max_size < 1:
+            raise ValueError(f"max_size must be at least 1, got {max_size}")
+        if ttl is not None and ttl < 0:
+            raise ValueError(f"ttl can not be negative, got {ttl}")
+        with self._lock:
+            if max_size is not None:
+                self.max_size = max_size
+            if ttl is not None:
+                self.ttl = ttl
+            self._clean()
+
+    def get(self, key: Hashable) -> V | None:
+        """Returns the cached value for key, or None if it is missing or expired."""
+        with self._lock:
+            return self._lookup(key)
+
+    def get_or_load(
+        self, key: Hashable, load: Callable[[], V], ttl: float | None = None
+    ) -> V:
+        """Returns the cached value for key, loading it if needed.
+
+        If another thread is already loading the key, this waits for that load
+        instead of starting a new one.
+
+        Args:
+            key: The cache key.
+            load: Called without arguments to load the value on a miss.
+            ttl: Seconds to keep a value loaded by this call. Defaults to the ttl of
+                the cache.
+
+        Returns:
+            The cached or loaded value.
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            pending = self._pending.get(key)
+            if pending is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                loading: Future[V] = Future()
+                self._pending[key] = loading
+        if pending is not None:
+            return pending.result()
+
+        try:
+            value = load()
+        except BaseException as e:
+            with self._lock:
+                if self._pending.get(key) is loading:
+                    del self._pending[key]
+            loading.set_exception(e)
+            raise
+        with self._lock:
+            if self._pending.get(key) is loading:  # not evicted while loading
+                del self._pending[key]
+                self._data[key] = (value, time.monotonic(), ttl)
+                self._clean()
+        loading.set_result(value)
+        return value
+
+    def evict(self, key: Hashable) -> None:
+        """Drops the entry for key.
+
+        A load of the key that is still running is not cached when it finishes,
+        since it may have read data from before the change that caused the eviction.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+            self._pending.pop(key, None)
+
+    def evict_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Drops every entry, and detaches every running load, whose key matches."""
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+            for key in [key for key in self._pending if predicate(key)]:
+                del self._pending[key]
+
+    def clear(self) -> None:
+        """Empties the cache and resets the hit and miss counters."""
+        with self._lock:
+            self._data.clear()
+            self._pending.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, int | float]:
+        """Returns the number of hits, misses and cached entries, and the hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def keys(self) -> list[Hashable]:
+        """Returns the keys of the entries that have not expired."""
+        with self._lock:
+            now = time.monotonic()
+            return [
+                key
+                for key, (_, loaded_at, ttl) in self._data.items()
+                if now - loaded_at <= (self.ttl if ttl is None else ttl)
+            ]
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Checks if a key is cached and not expired."""
+        with self._lock:
+            return self._lookup(key) is not None
+
+    def __len__(self) -> int:
+        """Returns the number of cached entries, including expired ones not yet dropped."""
+        return len(self._data)
+
+    def _lookup(self, key: Hashable) -> V | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, loaded_at, ttl = entry
+        if time.monotonic() - loaded_at > (self.ttl if ttl is None else ttl):
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def _clean(self) -> None:
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+
+_UNIT_TABLES: TTLCache[pd.DataFrame] = TTLCache(max_size=256, ttl=60.0)
+_EVICTION_HOOKS: list[Callable[[str, dict[str, Any]], None]] = []
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, list | tuple | set):
+        return tuple(value)
+    return value
+
+
+def _slice_key(table: str, filters: dict[str, Any]) -> Hashable:
+    return (table, tuple(sorted((col, _freeze(val)) for col, val in filters.items())))
+
+
+def _load_slice(conn: Any, table: str, filters: dict[str, Any]) -> pd.DataFrame:
+    logger.debug(f"Loading {table} for {filters}")
+    t = conn.table(table)
+    if filters:
+        t = t.filter(ibis_filter_with_dict(filters))
+    return t.to_pandas()
+
+
+def get_unit_table(
+    table: str, ttl: float | None = None, **filters: Any
+) -> pd.DataFrame:
+    """Returns the rows of a table matching the filters, cached per table and filters.
+
+    Meant for the small slices of helper tables that are shown for one unit at a
+    time. The returned DataFrame is shared between callers and must not be modified
+    in place.
+
+    Args:
+        table: Name of the table.
+        ttl: Seconds to keep the result if it is loaded by this call. Defaults to the
+            ttl of the cache.
+        **filters: Column values to filter on, see :func:`ibis_filter_with_dict`.
+
+    Returns:
+        The matching rows.
+
+    Example:
+        >>> get_unit_table("kontaktinfo", refnr="123")  # doctest: +SKIP
+    """
+
+    def load() -> pd.DataFrame:
+        with get_connection(necessary_tables=[table]) as conn:
+            return _load_slice(conn, table, filters)
+
+    return _UNIT_TABLES.get_or_load(_slice_key(table, filters), load, ttl=ttl)
+
+
+def get_unit_tables(
+    slices: dict[str, dict[str, Any]], ttl: float | None = None
+) -> dict[str, pd.DataFrame]:
+    """Returns slices of several tables, reading the ones not cached over one connection.
+
+    Works like calling :func:`get_unit_table` for each table, but only opens a
+    connection if something has to be read, and reuses it for every read.
+
+    Args:
+        slices: The filters to use for each table.
+        ttl: Seconds to keep the slices loaded by this call. Defaults to the ttl of
+            the cache.
+
+    Returns:
+        The matching rows for each table.
+
+    Example:
+        >>> get_unit_tables(
+        ...     {"kontaktinfo": {"refnr": "123"}, "enhetsinfo": {"ident": "1", "aar": 2024}}
+        ... )  # doctest: +SKIP
+    """
+    with ExitStack() as stack:
+        conn = None
+
+        def load(table: str, filters: dict[str, Any]) -> pd.DataFrame:
+            nonlocal conn
+            if conn is None:
+                conn = stack.enter_context(
+                    get_connection(necessary_tables=list(slices))
+                )
+            return _load_slice(conn, table, filters)
+
+        return {
+            table: _UNIT_TABLES.get_or_load(
+                _slice_key(table, filters), partial(load, table, filters), ttl=ttl
+            )
+            for table, filters in slices.items()
+        }
+
+
+def evict_unit_table(table: str, **filters: Any) -> None:
+    """Drops cached slices of a table so the next read is fresh.
+
+    Call this after writing to a table that is read with :func:`get_unit_table`.
+
+    Args:
+        table: Name of the table.
+        **filters: Only drop slices that were filtered on these values. Without
+            filters every cached slice of the table is dropped.
+    """
+    wanted = {col: _freeze(val) for col, val in filters.items()}
+
+    def matches(key: Hashable) -> bool:
+        cached_table, cached_filters = key  # type: ignore[misc]
+        if cached_table != table:
+            return False
+        cached = dict(cached_filters)
+        return all(cached.get(col, val) == val for col, val in wanted.items())
+
+    _UNIT_TABLES.evict_where(matches)
+    for hook in list(_EVICTION_HOOKS):
+        hook(table, filters)
+
+
+def on_unit_table_evicted(hook: Callable[[str, dict[str, Any]], None]) -> None:
+    """Registers a function to call every time :func:`evict_unit_table` is called.
+
+    Lets other caches of data derived from a table, such as aggregates, be dropped
+    when the table is written to.
+
+    Args:
+        hook: Called with the table name and the filters given to
+            :func:`evict_unit_table`.
+    """
+    if hook not in _EVICTION_HOOKS:
+        _EVICTION_HOOKS.append(hook)
+
+
+def configure_unit_cache(max_size: int | None = None, ttl: float | None = None) -> None:
+    """Changes the size and default time-to-live of the helper-table cache.
+
+    Args:
+        max_size: Number of table slices to keep. Defaults to 256.
+        ttl: Seconds a slice is served after it was loaded. Defaults to 60.
+    """
+    _UNIT_TABLES.configure(max_size=max_size, ttl=ttl)
+
+
+def unit_cache_stats() -> dict[str, int | float]:
+    """Returns hit and miss counts for the helper-table cache."""
+    return _UNIT_TABLES.stats()
@@ -54,4 +54,22 @@ def test_dataeditor_yaml_based():
     instance = DataEditor.from_yaml("dataeditor_test.yaml")
 
     assert instance is not None
-    assert type(instance, DataEditor)
\ No newline at end of file
+    assert type(instance, DataEditor)
+
+def test_unit_context_loads_registered_sources(monkeypatch):
+    from ssb_dash_framework.experimental.modules.data_editor.registry import (
+        DataEditorRegistry,
+    )
+
+    monkeypatch.setattr(DataEditorRegistry, "unit_sources", {})
+    DataEditorRegistry.register_unit_source("kontaktinfo")
+    DataEditorRegistry.register_unit_source("enhetsinfo", key="ident")
+    with pytest.raises(ValueError):
+        DataEditorRegistry.register_unit_source("enhetsinfo", key="refnr")
+
+    context = DataEditorRegistry.get_unit_context(1, "1001", {"aar": 2024})
+    assert len(context["kontaktinfo"]) == 3
+    assert context["enhetsinfo"]["variabel"].tolist() == ["naring", "ansatte"]
+
+    context = DataEditorRegistry.get_unit_context(1, "1001", {"aar": None})
+    assert list(context) == ["kontaktinfo"]
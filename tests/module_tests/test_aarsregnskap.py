@@ -1,9 +1,21 @@
 from ssb_dash_framework import Aarsregnskap
 from ssb_dash_framework import AarsregnskapTab
 from ssb_dash_framework import AarsregnskapWindow
+from ssb_dash_framework import VariableSelectorOption
+from ssb_dash_framework.utils.document_server import get_document_source
 
 
 def test_import() -> None:
     assert Aarsregnskap is not None
     assert AarsregnskapTab is not None
     assert AarsregnskapWindow is not None
+
+
+def test_instances_serve_separate_document_roots(tmp_path) -> None:
+    VariableSelectorOption("aar")
+    VariableSelectorOption("foretak")
+    first = AarsregnskapTab(document_root=str(tmp_path / "first"))
+    second = AarsregnskapTab(document_root=str(tmp_path / "second"))
+    assert first.source_name != second.source_name
+    assert get_document_source(first.source_name).root == str(tmp_path / "first")
+    assert get_document_source(second.source_name).root == str(tmp_path / "second")
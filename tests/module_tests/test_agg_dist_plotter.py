@@ -22,3 +22,51 @@ def test_instantiation() -> None:
     )
     AggDistPlotterTab(time_units=["aar", "maaned"])
     AggDistPlotterWindow(time_units=["aar", "maaned"])
+
+
+def test_distribution_summary_is_aggregated_and_cached(
+    testing_connection, monkeypatch
+) -> None:
+    import numpy as np
+    import pandas as pd
+
+    from ssb_dash_framework.modules import agg_dist_plotter
+    from ssb_dash_framework.utils.unit_cache import evict_unit_table
+
+    values = np.arange(1, 5001)
+    testing_connection.create_table(
+        "skjemadata_agg",
+        pd.DataFrame(
+            {
+                "refnr": [str(i) for i in values] + ["1"],
+                "ident": [str(i) for i in values] + ["1"],
+                "variabel": ["omsetning"] * len(values) + ["ansatte"],
+                "verdi": [str(i) for i in values] + ["7"],
+            }
+        ),
+        overwrite=True,
+    )
+    monkeypatch.setattr(
+        agg_dist_plotter,
+        "active_no_duplicates_refnr_list",
+        lambda conn, skjema: [str(i) for i in values],
+    )
+    monkeypatch.setattr(agg_dist_plotter.AggDistPlotter, "sample_size", 500)
+    set_variables(["aar", "maaned", "ident", "valgt_tabell", "altinnskjema"])
+    module = AggDistPlotterTab(time_units=["aar"], main_table_name="skjemadata_agg")
+
+    summary = module.get_distribution_summary("omsetning", "all", {"aar": [2024]})
+    stats = summary["stats"].iloc[0]
+    assert stats["antall"] == 5000
+    assert stats["sum"] == values.sum()
+    assert stats["median"] == np.median(values)
+    assert (stats["lowerfence"], stats["upperfence"]) == (1, 5000)
+    assert summary["top"]["verdi"].tolist() == [5000, 4999, 4998, 4997, 4996]
+    assert summary["bidrag"]["ident"].iloc[0] == "5000"
+    assert 0 < len(summary["sample"]) < 1000
+
+    again = module.get_distribution_summary("omsetning", "all", {"aar": [2024]})
+    assert again is summary
+    evict_unit_table("skjemadata_agg")
+    fresh = module.get_distribution_summary("omsetning", "all", {"aar": [2024]})
+    assert fresh is not summary
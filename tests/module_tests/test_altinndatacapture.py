@@ -1,3 +1,5 @@
+import pandas as pd
+
 from ssb_dash_framework import AltinnDataCapture
 from ssb_dash_framework import AltinnDataCaptureTab
 from ssb_dash_framework import AltinnDataCaptureWindow
@@ -58,3 +60,61 @@ def test_window_instantiation(ibis_polars_conn) -> None:
 #             database_type="altinn_default",
 #             database=DummyDatabase(),
 #         )
+
+
+def test_capture_index_is_updated_from_new_rows(monkeypatch) -> None:
+    import ibis
+    import polars as pl
+
+    def mottak(rows: list[tuple[str, str, str]]) -> pl.DataFrame:
+        return pl.DataFrame(
+            {
+                "aar": [2024] * len(rows),
+                "ident": [ident for ident, _, _ in rows],
+                "refnr": [refnr for _, refnr, _ in rows],
+                "skjema": ["RA-001"] * len(rows),
+                "dato_mottatt": [dato for _, _, dato in rows],
+            }
+        )
+
+    rows = [
+        ("1001", "a", "2024-01-15 10:00:00"),
+        ("1002", "b", "2024-01-16 09:00:00"),
+    ]
+    conn = ibis.polars.connect()
+    conn.create_table(
+        "enheter",
+        pl.DataFrame(
+            {
+                "aar": [2024] * 3,
+                "ident": ["1001", "1002", "1003"],
+                "skjema": ["RA-001", "RA-001, RA-002", None],
+            }
+        ),
+    )
+    conn.create_table("skjemamottak", mottak(rows))
+    set_variables(["aar"])
+    module = AltinnDataCaptureTab(time_units=["aar"], database=conn)
+    monkeypatch.setattr(AltinnDataCapture, "refresh_interval", 0)
+    since = []
+    get_received = module._get_received
+    monkeypatch.setattr(
+        module,
+        "_get_received",
+        lambda partition, watermark: (
+            since.append(watermark) or get_received(partition, watermark)
+        ),
+    )
+
+    index = module.get_capture_index("RA-001", 2024)
+    assert index.daily.tolist() == [1, 1]
+    assert index.antall_tot == 3
+
+    rows += [("1001", "c", "2024-01-17 08:00:00"), ("1003", "d", "2024-01-17 08:00:00")]
+    conn.create_table("skjemamottak", mottak(rows), overwrite=True)
+    index = module.get_capture_index("RA-001", 2024)
+    assert since == [None, pd.Timestamp("2024-01-16 09:00:00")]
+    assert index.daily.tolist() == [1, 1, 2]
+    assert module.get_capture_index("RA-001", 2024).daily.tolist() == [1, 1, 2]
+    assert index.cumulative()["kumulativt_antall"].tolist() == [1, 3]
+    assert module.get_skjemas(2024) == ["RA-001", "RA-002"]
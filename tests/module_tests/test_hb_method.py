@@ -2,3 +2,47 @@
 
 # def test_import() -> None:
 #     assert HBMethod is not None
+
+
+def test_batch_ranks_variables_and_feeds_the_figure() -> None:
+    import pandas as pd
+
+    from ssb_dash_framework import HBMethodWindow
+    from ssb_dash_framework import set_variables
+
+    set_variables(["aar", "ident", "statistikkvariabel"])
+    data = pd.DataFrame(
+        {
+            "ident": [str(i) for i in range(6)] * 2,
+            "variabel": ["omsetning"] * 6 + ["ansatte"] * 6,
+            "2023": [10, 20, 30, 40, 50, 60, 1, 2, 3, 4, 5, 6],
+            "2024": [11, 22, 33, 44, 55, 66, 1, 2, 3, 4, 50, 6],
+        }
+    )
+    calls = []
+
+    def get_batch_data(time_unit):
+        calls.append(time_unit)
+        return data
+
+    module = HBMethodWindow(
+        get_data_func=lambda variable, time_unit: data[data.variabel == variable],
+        time_units=["aar"],
+        get_batch_data_func=get_batch_data,
+    )
+    result = module.run_batch("aar")
+    assert module.run_batch("aar") is result
+    assert calls == ["aar"]
+
+    module.variable = "ansatte"
+    figure = module.make_hb_figure("aar")
+    assert calls == ["aar"]
+    assert list(figure.data[0].hovertext) == list(
+        result[result.variabel == "ansatte"].sort_values("maxX")["id"]
+    )
+
+    from ssb_dash_framework.utils.unit_cache import evict_unit_table
+
+    evict_unit_table("skjemadata_hoved")
+    module.run_batch("aar")
+    assert calls == ["aar", "aar"]
@@ -7,3 +7,39 @@ def test_import() -> None:
     assert MapDisplay is not None
     assert MapDisplayTab is not None
     assert MapDisplayWindow is not None
+
+
+def test_geometry_is_read_once_from_local_source(tmp_path, monkeypatch) -> None:
+    import geopandas as gpd
+    from shapely.geometry import box
+
+    from ssb_dash_framework.modules.building_blocks import map_display
+
+    folder = tmp_path / "2024" / "parquet"
+    folder.mkdir(parents=True)
+    gpd.GeoDataFrame(
+        {"fylke_nr": ["03", "46"]},
+        geometry=[
+            box(250000, 6640000, 270000, 6660000),
+            box(270000, 6640000, 290000, 6660000),
+        ],
+        crs=25833,
+    ).to_parquet(folder / "N5000_fylke_flate_p2024_v1.parquet")
+
+    reads = []
+    read_parquet = gpd.read_parquet
+    monkeypatch.setattr(
+        map_display.gpd,
+        "read_parquet",
+        lambda path: reads.append(path) or read_parquet(path),
+    )
+    shapes, geojson = map_display._get_geometry(
+        str(tmp_path), "fylke_nr", "2024", 100.0
+    )
+    assert (
+        map_display._get_geometry(str(tmp_path), "fylke_nr", "2024", 100.0)[1]
+        is geojson
+    )
+    assert len(reads) == 1
+    assert shapes.crs.to_epsg() == 4326
+    assert [feature["id"] for feature in geojson["features"]] == ["03", "46"]
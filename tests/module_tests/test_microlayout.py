@@ -1,8 +1,17 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pandas as pd
 import pytest
 from dash import html
 
+import ssb_dash_framework
 from ssb_dash_framework import MicroLayoutAIO
 
+MICROLAYOUT_JS = Path(ssb_dash_framework.__file__).parent / "assets" / "microlayout.js"
+
 
 def test_import_freesearch() -> None:
     assert MicroLayoutAIO is not None, "MicroLayoutAIO is not importable"
@@ -160,3 +169,214 @@ def test_layout_str():
     result = str(layout)
     assert "LAYOUT:" in result
     assert "HEADER" in result
+
+
+# ---------------------------------------------------------------------------
+# FormGetterCached
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def form_cache(monkeypatch):
+    import threading
+    import time
+
+    import pandas as pd
+
+    from ssb_dash_framework.modules.building_blocks.microlayout_components.editable_field_model import (
+        FormGetterCached,
+    )
+
+    reads = []
+    lock = threading.Lock()
+
+    def fetch_form(refnr, settings):
+        with lock:
+            reads.append(refnr)
+        time.sleep(0.05)
+        return pd.DataFrame(
+            {
+                "refnr": [refnr] * 48,
+                "feltnavn": [f"felt{i}" for i in range(48)],
+                "verdi": [str(i) for i in range(48)],
+            }
+        )
+
+    monkeypatch.setattr(FormGetterCached, "fetch_form", staticmethod(fetch_form))
+    FormGetterCached.clear()
+    FormGetterCached.configure(max_size=10, ttl=5.0)
+    yield FormGetterCached, reads
+    FormGetterCached.clear()
+    FormGetterCached.configure(max_size=10, ttl=5.0)
+
+
+def test_form_is_read_once_for_concurrent_fields(form_cache, callback_settings):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from ssb_dash_framework.modules.building_blocks.microlayout_components.editable_field_model import (
+        default_getter,
+    )
+
+    cache, reads = form_cache
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        values = list(
+            pool.map(
+                lambda i: default_getter("1", callback_settings, f"felt{i}", {}),
+                range(48),
+            )
+        )
+    assert values == [str(i) for i in range(48)]
+    assert reads == ["1"]
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 47
+
+
+def test_form_cache_evicts_least_recently_used(form_cache, callback_settings):
+    cache, reads = form_cache
+    cache.configure(max_size=2)
+    cache.get_form("1", callback_settings)
+    cache.get_form("2", callback_settings)
+    cache.get_form("1", callback_settings)
+    cache.get_form("3", callback_settings)
+    cache.get_form("1", callback_settings)
+    cache.get_form("2", callback_settings)
+    assert reads == ["1", "2", "3", "2"]
+
+
+def test_form_cache_expires_and_evicts(form_cache, callback_settings):
+    cache, reads = form_cache
+    assert cache.get_form("1", callback_settings).count().execute() == 48
+    cache.evict("1", callback_settings.form_data_table)
+    cache.get_form("1", callback_settings)
+    cache.configure(ttl=0)
+    cache.get_form("1", callback_settings)
+    assert reads == ["1", "1", "1"]
+
+
+class _Classification:
+    def __init__(self) -> None:
+        self.versions = [
+            {"version_id": 2, "validFrom": "2024-01-01"},
+            {"version_id": 1, "validFrom": "2020-01-01"},
+        ]
+
+    def get_codes(self):
+        return pd.Series({"01": "Jordbruk", "02": "Skogbruk"})
+
+
+@pytest.fixture
+def klass_cache(monkeypatch, tmp_path):
+    from ssb_dash_framework.modules.building_blocks.microlayout_components import (
+        klass_codes,
+    )
+
+    fetches = []
+
+    def get_classification(klass_code):
+        fetches.append(klass_code)
+        return _Classification()
+
+    monkeypatch.setattr(klass_codes, "get_classification", get_classification)
+    monkeypatch.setattr(klass_codes, "_CACHE", None)
+    klass_codes.set_klass_cache(directory=str(tmp_path))
+    return klass_codes, fetches
+
+
+def test_klass_codes_are_shared_and_stored(klass_cache, tmp_path):
+    klass_codes, fetches = klass_cache
+    options = [klass_codes.get_klass_options("6") for _ in range(3)]
+
+    assert fetches == ["6"]
+    assert options[0] == [
+        {"label": "Jordbruk", "value": "01"},
+        {"label": "Skogbruk", "value": "02"},
+    ]
+    stored = json.loads((tmp_path / "6.json").read_text())
+    assert stored["version_id"] == 2
+
+    offline = klass_codes.set_klass_cache(directory=str(tmp_path), offline=True)
+    assert offline.get_codes("6") == {"01": "Jordbruk", "02": "Skogbruk"}
+    assert fetches == ["6"]
+    with pytest.raises(FileNotFoundError):
+        offline.get_codes("7")
+
+
+def test_klass_codes_are_refetched_when_old(klass_cache, monkeypatch, tmp_path):
+    klass_codes, fetches = klass_cache
+    klass_codes.get_klass_options("6")
+
+    stale = klass_codes.set_klass_cache(directory=str(tmp_path), max_age=0)
+    stale.get_codes("6")
+    assert fetches == ["6", "6"]
+
+    def unavailable(klass_code):
+        raise ConnectionError("KLASS is down")
+
+    monkeypatch.setattr(klass_codes, "get_classification", unavailable)
+    stale = klass_codes.set_klass_cache(directory=str(tmp_path), max_age=0)
+    assert stale.get_codes("6") == {"01": "Jordbruk", "02": "Skogbruk"}
+
+
+def _calculated_field(**kwargs):
+    from ssb_dash_framework.modules.building_blocks.microlayout_components.models import (
+        CalculatedField,
+    )
+
+    return CalculatedField(type="calculated-field", label="Sum", **kwargs)
+
+
+CALCULATED_FIELDS = [
+    {"addition": ["a", "b", 2.5], "subtraction": ["c"]},
+    {"multiplication": ["a", "b"], "division": ["c"], "addition": [1]},
+    {"exponents": ["a"], "addition": ["b"], "decimals": 0},
+    {"addition": ["a"], "subtraction": ["b", "c"], "decimals": 3},
+]
+
+CALCULATED_VALUES = [
+    [None, None, None],
+    ["1", "2", "3"],
+    [" 1.25 ", "", None],
+    ["0.125", "0.5", "0"],
+    ["2.5", "-0.5", "1e3"],
+    ["-0.0", "0", "0"],
+    ["1_000", "inf", "nan"],
+    ["1e300", "1e300", "1e-300"],
+    ["0x10", "1", "1"],
+    ["ti", "1", "1"],
+]
+
+
+def test_calculated_field_compiles_to_clientside():
+    assert _calculated_field(addition=["a"])._compile() is not None
+    assert _calculated_field(addition=[1, 2])._compile() is None
+    assert _calculated_field(addition=["a", float("inf")])._compile() is None
+    assert _calculated_field(addition=["a"], decimals=-1)._compile() is None
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+@pytest.mark.parametrize("formula", CALCULATED_FIELDS)
+def test_calculated_field_clientside_matches_server(formula):
+    field = _calculated_field(**formula)
+    op_id_pairs = field._get_all_ids()
+    cases = [
+        values[: sum(isinstance(id_, str) for _, id_ in op_id_pairs)]
+        for values in CALCULATED_VALUES
+    ]
+    script = (
+        "global.window = {};"
+        f"require({json.dumps(str(MICROLAYOUT_JS))});"
+        "const input = JSON.parse(require('fs').readFileSync(0, 'utf8'));"
+        "const f = eval('(' + input.function + ')');"
+        "console.log(JSON.stringify(input.cases.map((values) => f(...values))));"
+    )
+    clientside = subprocess.run(
+        ["node", "-e", script],
+        input=json.dumps({"function": field._compile(), "cases": cases}),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert json.loads(clientside.stdout) == [
+        field._evaluate(op_id_pairs, values) for values in cases
+    ]
@@ -0,0 +1,309 @@
+from contextlib import nullcontext
+
+import ibis
+import pandas as pd
+
+from ssb_dash_framework.modules.nspek import nspek
+from ssb_dash_framework.modules.nspek import nspek_control_config
+from ssb_dash_framework.modules.nspek import nspek_control_engine
+from ssb_dash_framework.modules.nspek import nspek_versions
+
+
+def test_add_ui_sums_signs_and_places_sums() -> None:
+    df = pd.DataFrame(
+        {
+            "beskrivelse": ["Salg", "Særavgifter", "Annen inntekt", "SUM"],
+            "post": ["3000", "3300", "3911", "sumDriftsinntekt"],
+            "verdi": [100.0, 30.0, 10.0, None],
+        }
+    )
+
+    result = nspek.add_ui_sums(df, nspek.RESULTAT_STRUCTURE)
+
+    assert result["post"].tolist() == [
+        "3000",
+        "3300",
+        "UI_SUM_3000_3399",
+        "3911",
+        "UI_SUM_3400_3999",
+        "sumDriftsinntekt",
+        "UI_SUM_3000_3999",
+    ]
+    sums = result.set_index("post")["verdi"]
+    assert sums["UI_SUM_3000_3399"] == 70
+    assert sums["UI_SUM_3000_3999"] == 80
+
+
+def _comments(*rows: tuple) -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {
+                "id": i,
+                "nivaa": nivaa,
+                "variabel": variabel,
+                "kommentar": kommentar,
+                "opprettet_av": "abc",
+                "opprettet": pd.Timestamp("2025-01-01") - pd.Timedelta(days=i),
+                "aktiv": aktiv,
+            }
+            for i, (nivaa, variabel, kommentar, aktiv) in enumerate(rows)
+        ]
+    )
+
+
+def test_latest_field_comments_keeps_newest_active_per_variabel() -> None:
+    comments = _comments(
+        ("variabel", "1000", "Ny", True),
+        ("variabel", "1000", "Gammel", True),
+        ("variabel", "1020", "Slettet", False),
+        ("generell", None, "Generell", True),
+    )
+
+    latest = nspek.latest_field_comments(comments)
+
+    assert list(latest) == ["1000"]
+    assert latest["1000"]["kommentar"] == "Ny"
+
+
+def test_build_regnskap_dataframe_is_cached_until_evicted(monkeypatch) -> None:
+    fetches = []
+
+    def fetch(conn, regnskapstype, ident, aar, sekvensnummer):
+        fetches.append(sekvensnummer)
+        return pd.DataFrame({"felt": ["1000"], "belop": [5.0]})
+
+    monkeypatch.setattr(nspek, "fetch_data_by_orgnr", fetch)
+    monkeypatch.setattr(nspek, "get_nspek_connection", nullcontext)
+    monkeypatch.setattr(
+        nspek,
+        "get_comments",
+        lambda conn, orgnr: _comments(("variabel", "1000", "Sjekket", True)),
+    )
+    nspek._REGNSKAP_VALUES.clear()
+    nspek._REGNSKAP_FRAMES.clear()
+    nspek._NSPEK_COMMENTS.clear()
+
+    def build():
+        return nspek.build_regnskap_dataframe(
+            "balanseregnskap",
+            nspek.BALANSE_STRUCTURE,
+            "2024",
+            "123456789",
+            [],
+            7,
+            None,
+            [],
+        )
+
+    first = build()
+    build()
+    assert fetches == [7]
+
+    row = first.set_index("post").loc["1000"]
+    assert row["feltkommentar_tooltip"] == "Sjekket"
+
+    nspek.evict_regnskap_frames(7)
+    build()
+    assert fetches == [7, 7]
+
+
+class _RecordingConnection:
+    def __init__(self) -> None:
+        self.queries: list[str] = []
+
+    def raw_sql(self, query: str) -> None:
+        self.queries.append(query)
+
+
+def _event(post: str, value: str, sekvensnummer: int = 7) -> dict:
+    return {
+        "data": {"post": post, "sekvensnummer": sekvensnummer},
+        "value": value,
+        "oldValue": None,
+    }
+
+
+def test_collect_regnskap_edits_skips_sums_and_invalid_values() -> None:
+    edits, alerts = nspek.collect_regnskap_edits(
+        [
+            _event("1000", " 10 "),
+            _event("1020", "ti"),
+            {"data": {"post": "UI_SUM_1000_1399", "is_ui_sum": True}, "value": "1"},
+        ]
+    )
+
+    assert [(e["post"], e["value"]) for e in edits] == [("1000", "10")]
+    assert len(alerts) == 1
+    assert alerts[0]["color"] == "warning"
+
+
+def test_save_regnskap_edits_writes_once_and_runs_controls_per_sekvensnummer(
+    monkeypatch,
+) -> None:
+    conn = _RecordingConnection()
+    control_runs = []
+
+    monkeypatch.setattr(nspek, "get_nspek_connection", lambda: nullcontext(conn))
+    monkeypatch.setattr(
+        nspek,
+        "run_controls_changed_fields_for_sekvensnummer",
+        lambda conn, sekvensnummer, changed_fields: control_runs.append(
+            (sekvensnummer, changed_fields)
+        ),
+    )
+    refreshed = []
+    monkeypatch.setattr(
+        nspek,
+        "refresh_update_counts",
+        lambda conn, sekvensnummer: refreshed.append(sorted(sekvensnummer)),
+    )
+
+    edits, _ = nspek.collect_regnskap_edits(
+        [_event("1020", "5"), _event("1000", "10"), _event("1000", "3", 8)]
+    )
+    alert = nspek.save_regnskap_edits("balanseregnskap", edits)
+
+    upserts = [q for q in conn.queries if "INSERT INTO" in q]
+    assert len(upserts) == 1
+    assert "(7, '1020', '5')" in upserts[0]
+    assert "(8, '1000', '3')" in upserts[0]
+    assert control_runs == [(7, ["1000", "1020"]), (8, ["1000"])]
+    assert refreshed == [[7, 8]]
+    assert alert["color"] == "success"
+
+
+def _versions_db() -> ibis.BaseBackend:
+    conn = ibis.duckdb.connect()
+    conn.raw_sql("CREATE SCHEMA nspek_core")
+    conn.raw_sql(
+        """
+        CREATE TABLE nspek_core.v_registrering_versjon AS SELECT * FROM (VALUES
+            ('123456789', 2023, 1, 1, 1, TIMESTAMP '2024-05-01'),
+            ('123456789', 2024, 2, 1, 2, TIMESTAMP '2025-05-01'),
+            ('123456789', 2024, 3, 2, 2, TIMESTAMP '2025-06-01'),
+            ('987654321', 2024, 4, 1, 1, TIMESTAMP '2025-05-02')
+        ) t(orgnr, aar, sekvensnummer, versjon_nr, antall_versjoner, dato_mottatt)
+        """
+    )
+    conn.raw_sql(
+        """
+        CREATE TABLE nspek_core.v_update_counts AS
+        SELECT * FROM (VALUES (2, 1)) t(sekvensnummer, antall_endringer)
+        """
+    )
+    return conn
+
+
+def test_version_index_resolves_active_versions_and_updates() -> None:
+    conn = _versions_db()
+    nspek_versions.clear_version_indexes()
+
+    index = nspek_versions.get_version_index(conn, 2024)
+
+    assert index.active_sekvensnummer("123456789") == 2
+    assert index.for_orgnr("123456789")["sekvensnummer"].tolist() == [2, 3]
+    assert index.active_sekvensnummer("000000000") is None
+
+    conn.raw_sql(
+        "INSERT INTO nspek_core.v_registrering_versjon VALUES "
+        "('123456789', 2024, 5, 3, 3, TIMESTAMP '2025-07-01')"
+    )
+    conn.raw_sql("INSERT INTO nspek_core.v_update_counts VALUES (5, 2)")
+    index = nspek_versions.get_version_index(conn, 2024, max_staleness=0)
+
+    assert index.active_sekvensnummer("123456789") == 5
+    assert index.versions.loc["123456789", "antall_versjoner"].tolist() == [3, 3, 3]
+
+    conn.raw_sql("UPDATE nspek_core.v_update_counts SET antall_endringer = 0")
+    nspek_versions.refresh_update_counts(conn, [2, 5])
+
+    assert index.active_sekvensnummer("123456789") == 5
+    assert nspek_versions.find_orgnr(4) == "987654321"
+    active = nspek_control_engine.get_active_versions(conn, 2024)
+    assert sorted(active["sekvensnummer"]) == [4, 5]
+
+
+def test_get_nspek_unit_loads_everything_on_one_connection(monkeypatch) -> None:
+    connections = []
+    conn = _versions_db()
+
+    def connect():
+        connections.append(conn)
+        return nullcontext(conn)
+
+    monkeypatch.setattr(nspek, "get_nspek_connection", connect)
+    monkeypatch.setattr(nspek, "get_virksomhetsinfo", lambda **kwargs: pd.DataFrame())
+    monkeypatch.setattr(
+        nspek, "get_skjoennslignet", lambda conn, sekvensnummer: pd.DataFrame([1])
+    )
+    monkeypatch.setattr(
+        nspek,
+        "get_comments",
+        lambda conn, orgnr: _comments(("generell", None, "Ok", True)),
+    )
+    monkeypatch.setattr(
+        nspek,
+        "fetch_data_by_orgnr",
+        lambda conn, regnskapstype, ident, aar, sekvensnummer: pd.DataFrame(
+            {"felt": ["1000"], "belop": [1.0]}
+        ),
+    )
+    for cache in (nspek._NSPEK_UNITS, nspek._NSPEK_COMMENTS, nspek._REGNSKAP_VALUES):
+        cache.clear()
+    nspek_versions.clear_version_indexes()
+
+    unit = nspek.get_nspek_unit("123456789", "2024")
+
+    assert unit.has_data
+    assert unit.default_sekvensnummer == 2
+    assert unit.latest_sekvensnummer == 3
+    assert unit.skjoennslignet
+    assert [o["label"] for o in unit.version_options] == [
+        "v1 – 2025-05-01 00:00 (editert)",
+        "v2 – 2025-06-01 00:00",
+    ]
+    assert unit.compare_options[-1] == {"label": "2023", "value": 1}
+
+    nspek.get_nspek_unit("123456789", "2024")
+    nspek.get_nspek_comments("123456789")
+    nspek.get_regnskap_values("resultatregnskap", "123456789", "2024", 2)
+    assert len(connections) == 1
+
+
+def test_rule_graph_follows_sums_and_orders_controls() -> None:
+    kontrollids = nspek_control_config.get_controls_for_fields(["2000"])
+
+    assert kontrollids == [
+        "kontroll_egenkapital",
+        "kontroll_gjeld_og_egenkapital",
+        "kontroll_ubalanse",
+    ]
+    assert nspek_control_config.get_rule_by_id("kontroll_ubalanse")["lhs"] == (
+        "sumGjeldOgEgenkapital"
+    )
+    assert nspek_control_config.get_rule_by_id("finnes_ikke") is None
+
+
+def test_run_controls_for_changed_fields_runs_rules_in_batch() -> None:
+    df_balanse = pd.DataFrame(
+        {
+            "sekvensnummer": [7],
+            "orgnr": ["123456789"],
+            "aar": [2024],
+            "sumEgenkapital": [5000.0],
+            "sumLangsiktigGjeld": [0.0],
+            "sumKortsiktigGjeld": ["0"],
+            "sumGjeldOgEgenkapital": [1000.0],
+            "sumBalanseverdiForEiendel": [1000.0],
+        }
+    )
+
+    result = nspek_control_engine.run_controls_for_changed_fields(
+        ["sumEgenkapital"], pd.DataFrame(), df_balanse
+    )
+
+    assert result["kontrollid"].tolist() == [
+        "kontroll_egenkapital",
+        "kontroll_gjeld_og_egenkapital",
+    ]
+    assert result["verdi"].tolist() == [5000.0, -4000.0]
@@ -1,16 +1,74 @@
+import flask
+import pytest
+from dash import Patch
 from dash import html
 
 from ssb_dash_framework.utils.alert_handler import AlertHandler
+from ssb_dash_framework.utils.alert_handler import add_alerts
 from ssb_dash_framework.utils.alert_handler import create_alert
+from ssb_dash_framework.utils.alert_log import SESSION_COOKIE
+from ssb_dash_framework.utils.alert_log import AlertLog
+from ssb_dash_framework.utils.alert_log import get_alert_log
+from ssb_dash_framework.utils.alert_log import set_alert_log
 
 
 def test_create_alert() -> None:
     alert = create_alert("Test message", "info", True)
     assert isinstance(alert, dict)
-    assert len(alert.keys()) == 8
+    assert len(alert.keys()) == 9
+    assert alert["id"] != create_alert("Test message", "info", True)["id"]
 
 
 def test_alerthandler() -> None:
     handler = AlertHandler()
     handler_layout = handler.layout()
     assert isinstance(handler_layout, html.Div)
+
+
+def test_alerthandler_max_alerts() -> None:
+    handler = AlertHandler(max_alerts=10)
+    settings = [
+        c
+        for c in handler.layout().children
+        if getattr(c, "id", None) == "alert_settings"
+    ]
+    assert settings[0].data == {"max_alerts": 10}
+    with pytest.raises(ValueError):
+        AlertHandler(max_alerts=0)
+
+
+def test_add_alerts_prepends_and_logs(tmp_path) -> None:
+    set_alert_log(str(tmp_path / "alerts.sqlite"))
+    first = create_alert("Første", "info")
+    second = create_alert("Andre", "warning")
+    app = flask.Flask(__name__)
+    with app.test_request_context(headers={"Cookie": f"{SESSION_COOKIE}=abc"}):
+        patch = add_alerts(second, first)
+
+    assert isinstance(patch, Patch)
+    operations = patch.to_plotly_json()["operations"]
+    assert [op["params"]["value"]["message"] for op in operations] == [
+        "Første",
+        "Andre",
+    ]
+    assert [a["message"] for a in get_alert_log().read("abc")] == ["Andre", "Første"]
+
+
+def test_alert_log_filters_and_dismisses(tmp_path) -> None:
+    log = AlertLog(str(tmp_path / "alerts.sqlite"))
+    info = create_alert("Info", "info")
+    warning = create_alert("Advarsel", "warning")
+    log.write("a", [info, warning])
+    log.write("b", [create_alert("Annen økt", "info")])
+
+    assert [a["message"] for a in log.read("a", color="warning")] == ["Advarsel"]
+    log.dismiss("a", [warning["id"]])
+    assert [a["message"] for a in log.read("a")] == ["Info"]
+    assert [a["message"] for a in log.read("b")] == ["Annen økt"]
+    log.close()
+
+
+def test_add_alerts_without_session_is_not_logged(tmp_path) -> None:
+    set_alert_log(str(tmp_path / "alerts.sqlite"))
+    add_alerts(create_alert("Uten økt", "info"))
+    assert get_alert_log().read("abc") == []
@@ -2,10 +2,19 @@
 
 import ibis
 import pandas as pd
+import pytest
 
+from ssb_dash_framework.utils import skjema_metadata
 from ssb_dash_framework.utils.core_models import UpdateSkjemadata
 
 
+@pytest.fixture(autouse=True)
+def _clear_skjema_metadata():
+    skjema_metadata.clear_skjema_metadata()
+    yield
+    skjema_metadata.clear_skjema_metadata()
+
+
 def _make_update(**overrides: object) -> UpdateSkjemadata:
     base: dict[str, object] = dict(
         table="skjemadata_foretak",
@@ -102,3 +111,37 @@ def test_get_feltsti_falls_back_to_short_name_when_missing() -> None:
     )
     update = _make_update(variable="omsetning")
     assert update._get_feltsti(conn) == "omsetning"
+
+
+def test_metadata_is_read_once_per_aar_and_skjema() -> None:
+    """Datatypes and feltsti are read in bulk and then checked in memory."""
+    conn = _conn_with_mapping(
+        {
+            "aar": ["2024", "2024"],
+            "skjema": ["RA-0255", "RA-0255"],
+            "variabel": ["omsetning", "ansatte"],
+            "feltsti": ["sum.omsetning.total", "ansatte.antall"],
+        }
+    )
+    conn.create_table(
+        "datatyper",
+        pd.DataFrame(
+            {
+                "aar": ["2024", "2024"],
+                "variabel": ["omsetning", "aktiv"],
+                "datatype": ["number", "bool"],
+            }
+        ),
+    )
+
+    assert _make_update(value="100")._check_datatype(conn) is None
+    assert _make_update(value="1,5")._check_datatype(conn) == "float"
+    assert (
+        _make_update(variable="aktiv", value="kanskje")._check_datatype(conn) == "bool"
+    )
+    assert _make_update(variable="ansatte")._get_feltsti(conn) == "ansatte.antall"
+
+    conn.drop_table("datatyper")
+    conn.drop_table("mapping_variabelnavn")
+    assert _make_update(value="tusen")._check_datatype(conn) == "number"
+    assert _make_update()._get_feltsti(conn) == "sum.omsetning.total"
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+from ssb_dash_framework import get_connection
+from ssb_dash_framework import set_read_replica
+from ssb_dash_framework.utils.adhoc_query import query_tables
+from ssb_dash_framework.utils.config_tools import on_replica_refreshed
+from ssb_dash_framework.utils.config_tools import remove_read_replica
+from ssb_dash_framework.utils.config_tools import replica as replica_module
+from ssb_dash_framework.utils.config_tools import replica_staleness_text
+from ssb_dash_framework.utils.unit_cache import evict_unit_table
+
+
+@pytest.fixture
+def replica(tmp_path):
+    replica = set_read_replica(
+        ["enheter", "skjemamottak"],
+        path=str(tmp_path),
+        refresh_interval=3600,
+        refresh_delay=0,
+        refresh_now=True,
+    )
+    yield replica
+    remove_read_replica()
+
+
+def test_read_only_connections_use_replica(replica) -> None:
+    with get_connection(
+        read_only=True,
+        necessary_tables=["enheter"],
+        partition_select={"aar": [2024], "ident": ["1001", "1003"]},
+    ) as conn:
+        assert conn.name == "duckdb"
+        assert sorted(conn.table("enheter").to_pandas()["ident"]) == ["1001", "1003"]
+    with get_connection(read_only=True, necessary_tables=["kontaktinfo"]) as conn:
+        assert conn.name == "polars"
+    with get_connection(necessary_tables=["enheter"]) as conn:
+        assert conn.name == "polars"
+    assert replica_staleness_text(["enheter"]).startswith("Data fra lokal kopi")
+    assert replica_staleness_text(["kontaktinfo"]) == ""
+
+
+def test_replica_refreshes_tables_written_through_the_app(replica) -> None:
+    before = replica.refreshed_at["skjemamottak"]
+    time.sleep(0.01)
+    evict_unit_table("skjemamottak", refnr="1")
+    for _ in range(100):
+        if replica.refreshed_at["skjemamottak"] > before:
+            break
+        time.sleep(0.05)
+    assert replica.refreshed_at["skjemamottak"] > before
+
+
+def test_changed_tables_bypass_the_replica_until_refreshed(
+    tmp_path, monkeypatch
+) -> None:
+    monkeypatch.setattr(replica_module, "_REFRESH_HOOKS", [])
+    replica = set_read_replica(
+        ["enheter"],
+        path=str(tmp_path),
+        refresh_delay=None,
+        refresh_now=True,
+    )
+    refreshed = []
+    on_replica_refreshed(lambda table, filters: refreshed.append(table))
+    try:
+        evict_unit_table("enheter")
+        with get_connection(read_only=True, necessary_tables=["enheter"]) as conn:
+            assert conn.name == "polars"
+        assert replica_staleness_text(["enheter"]) == ""
+
+        replica.refresh(["enheter"])
+        with get_connection(read_only=True, necessary_tables=["enheter"]) as conn:
+            assert conn.name == "duckdb"
+        assert refreshed == ["enheter"]
+    finally:
+        remove_read_replica()
+
+
+def test_query_tables() -> None:
+    assert query_tables(
+        "WITH a AS (SELECT * FROM enheter) SELECT * FROM a JOIN skjemamottak USING (ident)"
+    ) == ["enheter", "skjemamottak"]
+    assert query_tables("SELECT 1") is None
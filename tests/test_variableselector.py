@@ -1,7 +1,17 @@
+import threading
+
 from dash import Input
+from dash import Output
 from dash import State
+from dash import html
+from dash import no_update
+from dash._callback import GLOBAL_CALLBACK_LIST
+from dash.exceptions import PreventUpdate
 
 from ssb_dash_framework import set_variables
+from ssb_dash_framework.setup.variable_dispatch import Subscriber
+from ssb_dash_framework.setup.variable_dispatch import VariableDispatcher
+from ssb_dash_framework.setup.variable_dispatch import shared_load
 from ssb_dash_framework.setup.variableselector import VariableSelector
 from ssb_dash_framework.setup.variableselector import VariableSelectorOption
 
@@ -146,3 +156,84 @@ def test_time_units_implementation() -> None:
     assert [
         variableselector.get_option(x).id.removeprefix("var-") for x in time_units
     ] == ["aar"], "Congratulations, you might have broken a couple of modules! "
+
+
+def test_dispatch_runs_subscribers_of_changed_variables_with_shared_loads() -> None:
+    loads = []
+    barrier = threading.Barrier(2, timeout=5)
+
+    def load() -> str:
+        loads.append(1)
+        return "data"
+
+    def handler(ident: str, aar: str) -> tuple[str, str]:
+        barrier.wait()  # both subscribers run at the same time
+        return ident, shared_load(("data", ident), load)
+
+    def other_handler(ident: str) -> str:
+        barrier.wait()
+        return shared_load(("data", ident), load)
+
+    subscribers = [
+        Subscriber(
+            "a",
+            [Output("a", "children"), Output("a2", "children")],
+            ["var-ident"],
+            ["var-aar"],
+            handler,
+        ),
+        Subscriber("b", [Output("b", "children")], ["var-ident"], [], other_handler),
+        Subscriber("c", [Output("c", "children")], ["var-aar"], [], str),
+    ]
+
+    result = VariableDispatcher.dispatch(
+        subscribers, {"var-ident": "123", "var-aar": "2024"}, {"var-ident"}
+    )
+
+    assert result[0] is no_update
+    assert result[1:3] == ["123", "data"]
+    assert result[3] == "data"
+    assert result[4] is no_update
+    assert loads == [1]
+
+
+def test_dispatch_keeps_outputs_of_failing_subscribers() -> None:
+    def prevent(ident: str) -> str:
+        raise PreventUpdate
+
+    def fail(ident: str) -> str:
+        raise ValueError("ingen data")
+
+    subscribers = [
+        Subscriber("a", [Output("a", "children")], ["var-ident"], [], prevent),
+        Subscriber("b", [Output("b", "children")], ["var-ident"], [], fail),
+        Subscriber("c", [Output("c", "children")], ["var-ident"], [], str.upper),
+    ]
+
+    result = VariableDispatcher.dispatch(subscribers, {"var-ident": "abc"}, set())
+
+    assert result[1:] == [no_update, no_update, "ABC"]
+    assert result[0] is not no_update
+
+
+def test_subscribers_with_outputs_in_the_layout_share_one_callback(
+    monkeypatch,
+) -> None:
+    monkeypatch.setattr(VariableDispatcher, "_subscribers", [])
+    monkeypatch.setattr(VariableDispatcher, "_registered", set())
+    set_variables(["ident"])
+    selector = VariableSelector(["ident"], [])
+    selector.subscribe("in-layout-1", [Output("in-layout-1", "children")], str)
+    selector.subscribe("in-layout-2", [Output("in-layout-2", "children")], str)
+    selector.subscribe("not-in-layout", [Output("not-in-layout", "children")], str)
+    before = len(GLOBAL_CALLBACK_LIST)
+
+    VariableDispatcher.register_callbacks(
+        html.Div([html.P(id="in-layout-1"), html.P(id="in-layout-2")])
+    )
+
+    added = GLOBAL_CALLBACK_LIST[before:]
+    assert len(added) == 2
+    assert "in-layout-1.children" in added[1]["output"]
+    assert "in-layout-2.children" in added[1]["output"]
+    assert added[0]["output"] == "not-in-layout.children"
@@ -0,0 +1,72 @@
+import threading
+import time
+
+import ibis
+import pytest
+
+from ssb_dash_framework.utils.adhoc_query import QueryCancelledError
+from ssb_dash_framework.utils.adhoc_query import cancel_adhoc_query
+from ssb_dash_framework.utils.adhoc_query import estimate_rows
+from ssb_dash_framework.utils.adhoc_query import is_read_query
+from ssb_dash_framework.utils.adhoc_query import run_adhoc_query
+from ssb_dash_framework.utils.adhoc_query import to_duckdb
+
+
+class SlowDatabase:
+    """Stands in for a database where every query takes a second."""
+
+    def __init__(self) -> None:
+        """Creates the database."""
+        self.started = threading.Event()
+
+    def query(self, sql: str):
+        self.started.set()
+        time.sleep(1)
+
+
+def test_is_read_query() -> None:
+    assert is_read_query("-- kommentar\nSELECT * FROM enheter;")
+    assert is_read_query("with a as (select 1) select * from a")
+    assert not is_read_query("DELETE FROM enheter")
+    assert not is_read_query("SELECT 1; DROP TABLE enheter")
+    assert not is_read_query("SELECT * INTO backup FROM skjemadata")
+    assert not is_read_query(
+        "WITH d AS (DELETE FROM skjemadata RETURNING *) SELECT * FROM d"
+    )
+
+
+def test_to_duckdb() -> None:
+    assert to_duckdb("SELECT aar::int FROM enheter;") == (
+        "SELECT CAST(aar AS INT) FROM enheter"
+    )
+
+
+def test_run_adhoc_query_pages(testing_connection) -> None:
+    query = "SELECT ident FROM enheter ORDER BY ident"
+    page, more = run_adhoc_query(testing_connection, query, limit=2)
+    assert page["ident"].tolist() == ["1001", "1002"]
+    assert more
+    page, more = run_adhoc_query(testing_connection, query, limit=2, offset=2)
+    assert page["ident"].tolist() == ["1003"]
+    assert not more
+    with pytest.raises(ValueError):
+        run_adhoc_query(testing_connection, "DROP TABLE enheter")
+
+
+def test_run_adhoc_query_timeout_and_cancel() -> None:
+    with pytest.raises(QueryCancelledError, match=r"more than 0\.2 seconds"):
+        run_adhoc_query(SlowDatabase(), "SELECT 1", timeout=0.2)
+
+    database = SlowDatabase()
+    threading.Timer(
+        0.1, lambda: database.started.wait() and cancel_adhoc_query("run-1")
+    ).start()
+    with pytest.raises(QueryCancelledError, match="cancelled"):
+        run_adhoc_query(database, "SELECT 1", query_id="run-1")
+    assert not cancel_adhoc_query("run-1")
+
+
+def test_estimate_rows() -> None:
+    conn = ibis.duckdb.connect()
+    conn.raw_sql("CREATE TABLE t AS SELECT range AS a FROM range(10000)")
+    assert estimate_rows(conn, "SELECT * FROM t") == 10000
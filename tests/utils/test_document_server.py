@@ -0,0 +1,123 @@
+import io
+
+import pymupdf
+import pytest
+from flask import Flask
+from PIL import Image
+
+from ssb_dash_framework.utils import document_server
+from ssb_dash_framework.utils.document_server import DocumentCache
+from ssb_dash_framework.utils.document_server import fetch_document
+from ssb_dash_framework.utils.document_server import get_page_renderer
+from ssb_dash_framework.utils.document_server import page_count
+from ssb_dash_framework.utils.document_server import register_document_routes
+from ssb_dash_framework.utils.document_server import register_document_source
+from ssb_dash_framework.utils.document_server import set_document_cache
+
+
+@pytest.fixture
+def documents(tmp_path):
+    root = tmp_path / "bucket"
+    (root / "g2024").mkdir(parents=True)
+    (root / "g2024" / "123_2024.pdf").write_bytes(b"%PDF-1.4 " + b"x" * 2000)
+    doc = pymupdf.open()
+    for _ in range(3):
+        doc.new_page(width=144, height=72)
+    doc.save(root / "g2024" / "789_2024.pdf")
+    (root / "g2024" / "bad_2024.pdf").write_bytes(b"not a pdf")
+    pages = [Image.new("RGB", (10, 10), color) for color in ("red", "blue")]
+    pages[0].save(
+        root / "g2024" / "456_2024.tif", save_all=True, append_images=pages[1:]
+    )
+    set_document_cache(directory=str(tmp_path / "cache"))
+    register_document_source("test", str(root))
+    yield root
+    document_server._SOURCES.pop("test", None)
+
+
+@pytest.fixture
+def client(documents):
+    server = Flask(__name__)
+    register_document_routes(server)
+    return server.test_client()
+
+
+def test_serves_pdf_with_caching_headers(client) -> None:
+    response = client.get("/_documents/test/g2024/123_2024.pdf")
+    assert response.status_code == 200
+    assert response.mimetype == "application/pdf"
+    assert response.data.startswith(b"%PDF")
+    assert response.headers["ETag"]
+    assert response.cache_control.max_age == 3600
+    assert response.cache_control.private
+    assert not response.cache_control.public
+    response.close()
+
+
+def test_serves_range_requests(client) -> None:
+    response = client.get(
+        "/_documents/test/g2024/123_2024.pdf", headers={"Range": "bytes=0-3"}
+    )
+    assert response.status_code == 206
+    assert response.data == b"%PDF"
+    response.close()
+
+
+def test_missing_document_returns_404(client) -> None:
+    assert client.get("/_documents/test/g2024/999_2024.pdf").status_code == 404
+    assert client.get("/_documents/test/../secret.pdf").status_code == 404
+    assert client.get("/_documents/unknown/g2024/123_2024.pdf").status_code == 404
+
+
+def test_serves_tif_pages_as_png(client) -> None:
+    assert page_count("test", "g2024/456_2024.tif") == 2
+    response = client.get("/_documents/test/g2024/456_2024.tif?page=1")
+    assert response.status_code == 200
+    assert response.mimetype == "image/png"
+    assert Image.open(io.BytesIO(response.data)).getpixel((0, 0)) == (0, 0, 255)
+    response.close()
+    assert client.get("/_documents/test/g2024/456_2024.tif?page=5").status_code == 404
+
+
+def test_renders_pdf_pages(client) -> None:
+    assert page_count("test", "g2024/789_2024.pdf") == 3
+    response = client.get("/_documents/test/g2024/789_2024.pdf?page=2&dpi=24")
+    assert response.status_code == 200
+    assert Image.open(io.BytesIO(response.data)).size == (48, 24)
+    response.close()
+    assert (
+        client.get("/_documents/test/g2024/789_2024.pdf?page=1&dpi=13").status_code
+        == 400
+    )
+    assert client.get("/_documents/test/g2024/789_2024.pdf?page=3").status_code == 404
+
+
+def test_unreadable_document_returns_415(client) -> None:
+    assert client.get("/_documents/test/g2024/bad_2024.pdf?page=0").status_code == 415
+
+
+def test_prefetch_renders_first_pages(documents) -> None:
+    renderer = get_page_renderer()
+    renderer.prefetch("test", "g2024/789_2024.pdf", pages=2).result(timeout=10)
+    first = renderer.submit("test", "g2024/789_2024.pdf", 0).result(timeout=10)
+    second = renderer.submit("test", "g2024/789_2024.pdf", 0)
+    assert second.done()
+    assert second.result() == first
+
+
+def test_document_is_fetched_once(documents) -> None:
+    first = fetch_document("test", "g2024/123_2024.pdf")
+    (documents / "g2024" / "123_2024.pdf").unlink()
+    assert fetch_document("test", "g2024/123_2024.pdf") == first
+
+
+def test_cache_evicts_least_recently_used(tmp_path) -> None:
+    cache = DocumentCache(directory=str(tmp_path), max_bytes=25)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"x" * 10)
+    assert cache.get("a") is not None
+    cache.put("c", b"x" * 10)
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.size == 20
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from ssb_dash_framework.utils.figures import downsample
+from ssb_dash_framework.utils.figures import lttb_indices
+from ssb_dash_framework.utils.figures import minmax_indices
+from ssb_dash_framework.utils.figures import scatter_trace
+from ssb_dash_framework.utils.figures import summary_box
+
+
+def test_lttb_keeps_endpoints_and_peak() -> None:
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[437] = 100
+    selected = lttb_indices(x, y, 50)
+    assert len(selected) == 50
+    assert selected[0] == 0
+    assert selected[-1] == 999
+    assert 437 in selected
+    assert np.all(np.diff(selected) > 0)
+
+
+def test_minmax_keeps_extremes() -> None:
+    y = np.sin(np.linspace(0, 20, 2000))
+    y[1234] = -5
+    selected = minmax_indices(y, 100)
+    assert len(selected) <= 100
+    assert 1234 in selected
+    assert int(np.argmax(y)) in selected
+
+
+def test_downsample_keeps_flagged_rows() -> None:
+    rng = np.random.default_rng(1)
+    data = pd.DataFrame(
+        {"id": [f"id{i}" for i in range(20000)], "x": rng.random(20000)}
+    ).assign(y=lambda df: df["x"] * 2, outlier=0)
+    data.loc[[17, 9000], "outlier"] = 1
+    data.loc[5, "y"] = np.nan
+
+    reduced = downsample(data, "x", "y", max_points=500, keep=data["outlier"] == 1)
+    assert 500 <= len(reduced) <= 502
+    assert {"id17", "id9000"} <= set(reduced["id"])
+    assert reduced["x"].is_monotonic_increasing
+    assert len(downsample(data.head(100), "x", "y", max_points=500)) == 100
+
+
+def test_scatter_trace_switches_to_webgl() -> None:
+    assert isinstance(scatter_trace([1, 2], [1, 2]), go.Scatter)
+    trace = scatter_trace(list(range(5000)), list(range(5000)), hovertext=["a"] * 5000)
+    assert isinstance(trace, go.Scattergl)
+    assert trace.hovertext[0] == "a"
+
+
+def test_summary_box_matches_quartiles() -> None:
+    data = pd.DataFrame(
+        {"g": ["a"] * 5 + ["b"] * 4, "v": [1, 2, 3, 4, 100, 1, 2, 3, 4]}
+    )
+    box = summary_box(data, "g", "v")
+    assert list(box.x) == ["a", "b"]
+    assert list(box.median) == [3, 2.5]
+    assert list(box.q1) == [2, 1.75]
+    assert list(box.upperfence) == [4, 4]
@@ -5,7 +5,10 @@ import dash_bootstrap_components as dbc
 from dash import html
 
 from ssb_dash_framework import TabImplementation
+from ssb_dash_framework import VariableSelector
 from ssb_dash_framework import WindowImplementation
+from ssb_dash_framework import set_variables
+from ssb_dash_framework.utils import is_tab_or_window
 
 
 def test_tab_implementation() -> None:
@@ -72,3 +75,31 @@ def test_window_implementation() -> None:
         raise AttributeError("Missing attribute '_window_n'")
     if not hasattr(instanced_window_module, "icon"):
         raise AttributeError("Missing attribute 'icon'")
+
+
+def test_tab_with_deferred_inputs_adds_its_stores() -> None:
+    set_variables(["ident"])
+
+    class test_module:
+        def __init__(self) -> None:
+            self.module_name = "Deferred"
+            self.module_layout = html.Div()
+            self.label = "Label"
+            self.variableselector = VariableSelector(["ident"], [])
+            self.inputs = self.variableselector.get_all_inputs(
+                deferred=is_tab_or_window(self)
+            )
+
+    class test_module_tab(TabImplementation, test_module):
+        def __init__(self) -> None:
+            test_module.__init__(self)
+            TabImplementation.__init__(self)
+
+    assert not is_tab_or_window(test_module())
+
+    tab = test_module_tab()
+    tab.tab_value = "tab-2"
+    ids = [getattr(c, "id", None) for c in tab.layout()._traverse()]
+
+    assert tab.inputs[0].component_id in ids
+    assert tab.inputs[0].component_property == "data"
@@ -0,0 +1,168 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ssb_dash_framework.utils.outlier_methods import hb_method
+from ssb_dash_framework.utils.outlier_methods import th_error
+
+# Worked through by hand from the definitions in Hidiroglou and Berthelot (1986),
+# with R's default (type 7) quantiles, for pC=4, pU=0.5 and pA=0.05.
+HB_DATA = pd.DataFrame(
+    {
+        "ident": list("abcdefghij"),
+        "x1": [100, 200, 150, 80, 120, 90, 300, 50, 0, None],
+        "x2": [110, 190, 160, 85, 400, 95, 310, 49, 10, 5],
+    }
+)
+HB_EXPECTED = {
+    "medRatio": 1.0590277777777777,
+    "Q1": -0.4709067047321689,
+    "medE": -0.0009169044442915511,
+    "Q3": 0.16987178222337984,
+    "lowerE": -1.880876105595801,
+    "upperE": 0.6822378422263939,
+    "E": [
+        0.405769,
+        -1.623037,
+        0.091239,
+        0.030228,
+        42.95082,
+        -0.032062,
+        -0.437804,
+        -0.570215,
+        np.nan,
+        np.nan,
+    ],
+    "lowerLimit": [0.897988, 0.934713, 0.921939, 0.879584, 0.967994],
+    "upperLimit": [1.127916, 1.110117, 1.116147, 1.137395, 1.095153],
+    "outlier": [0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
+}
+
+# Results of Kostra::Hb and Kostra::ThError, written by make_outlier_fixtures.R.
+FIXTURES = Path(__file__).parent / "outlier_fixtures"
+HB_COLUMNS = ["ratio", "medRatio", "E", "lowerLimit", "upperLimit", "outlier"]
+
+
+def test_hb_method_matches_fixture() -> None:
+    result = hb_method(HB_DATA, p_c=4, p_u=0.5, p_a=0.05, id_field_name="ident")
+    assert result["id"].tolist() == list("abcdefghij")
+    for column in ["medRatio", "Q1", "medE", "Q3", "lowerE", "upperE"]:
+        assert result[column].iloc[0] == pytest.approx(HB_EXPECTED[column])
+    np.testing.assert_allclose(result["E"], HB_EXPECTED["E"], atol=1e-6)
+    np.testing.assert_allclose(
+        result["lowerLimit"].iloc[:5], HB_EXPECTED["lowerLimit"], atol=1e-6
+    )
+    np.testing.assert_allclose(
+        result["upperLimit"].iloc[:5], HB_EXPECTED["upperLimit"], atol=1e-6
+    )
+    assert result["outlier"].tolist() == HB_EXPECTED["outlier"]
+
+
+def test_hb_method_leaves_out_equal_values_if_they_are_the_majority() -> None:
+    data = pd.DataFrame(
+        {"id": range(5), "x1": [10, 20, 30, 40, 50], "x2": [10, 20, 30, 44, 60]}
+    )
+    result = hb_method(data, p_c=4, p_u=0.5, p_a=0.05)
+    assert result["medRatio"].iloc[0] == pytest.approx(np.median([1.1, 1.2]))
+    assert result["outlier"].iloc[:3].tolist() == [0, 0, 0]
+
+
+def test_hb_method_without_usable_units() -> None:
+    data = pd.DataFrame({"id": [1, 2], "x1": [0, None], "x2": [1, 2]})
+    result = hb_method(data, p_c=20, p_u=0.5, p_a=0.05)
+    assert result["outlier"].tolist() == [0, 0]
+    assert result["upperLimit"].isna().all()
+
+
+def test_th_error_drops_thousand_errors() -> None:
+    data = pd.DataFrame(
+        {
+            "id": list("abcde"),
+            "x1": [1, 2, 3, 4000, 5],
+            "x2": [1000, 2, 3, 4, 50],
+        }
+    )
+    result = th_error(data, "id", "x1", "x2")
+    assert result["id"].tolist() == ["b", "c", "e"]
+
+
+def _read_fixture(name: str) -> pd.DataFrame:
+    return pd.read_csv(FIXTURES / name, dtype={"id": str})
+
+
+def _kostra():
+    try:
+        from rpy2.robjects.packages import importr
+
+        return importr("Kostra")
+    except Exception:
+        pytest.skip("The R package Kostra is not available")
+
+
+def test_hb_method_matches_kostra_fixture() -> None:
+    data = _read_fixture("hb_input.csv")
+    expected = _read_fixture("hb_expected.csv")
+    result = hb_method(data, p_c=4, p_u=0.5, p_a=0.05)
+    assert result["id"].tolist() == expected["id"].tolist()
+    for column in HB_COLUMNS:
+        np.testing.assert_allclose(
+            result[column].to_numpy(dtype=float),
+            expected[column].to_numpy(dtype=float),
+            rtol=1e-9,
+            err_msg=column,
+        )
+
+
+def test_th_error_matches_kostra_fixture() -> None:
+    expected = _read_fixture("th_error_expected.csv")
+    result = th_error(_read_fixture("th_error_input.csv"), "id", "x1", "x2")
+    assert result["id"].tolist() == expected.loc[expected.outlier == 0, "id"].tolist()
+
+
+def test_fixtures_match_kostra() -> None:
+    _kostra()
+    from ssb_dash_framework.utils import r_helpers
+
+    expected = r_helpers.hb_method(
+        _read_fixture("hb_input.csv"), p_c=4, p_u=0.5, p_a=0.05
+    )
+    fixture = _read_fixture("hb_expected.csv")
+    for column in HB_COLUMNS:
+        np.testing.assert_allclose(
+            fixture[column].to_numpy(dtype=float),
+            expected[column].to_numpy(dtype=float),
+            rtol=1e-9,
+            err_msg=column,
+        )
+
+    expected = r_helpers.th_error(_read_fixture("th_error_input.csv"), "id", "x1", "x2")
+    fixture = _read_fixture("th_error_expected.csv")
+    assert fixture.loc[fixture.outlier == 0, "id"].tolist() == expected["id"].tolist()
+
+
+def test_hb_method_grouped_matches_single_runs() -> None:
+    from ssb_dash_framework.utils.outlier_methods import hb_method_grouped
+    from ssb_dash_framework.utils.outlier_methods import hb_outlier_ranking
+
+    data = pd.concat(
+        [
+            HB_DATA.assign(variabel="omsetning"),
+            HB_DATA.assign(variabel="ansatte", x2=HB_DATA["x1"] * 1.1),
+            HB_DATA.assign(variabel="navn", x1="a", x2="b"),
+        ],
+        ignore_index=True,
+    )
+    result = hb_method_grouped(
+        data, p_c=4, p_u=0.5, p_a=0.05, id_field_name="ident", max_workers=2
+    )
+    single = hb_method(HB_DATA, p_c=4, p_u=0.5, p_a=0.05, id_field_name="ident")
+    pd.testing.assert_frame_equal(
+        result[result.variabel == "omsetning"].drop(columns="variabel"), single
+    )
+
+    ranking = hb_outlier_ranking(result)
+    assert ranking["variabel"].tolist() == ["omsetning", "ansatte"]
+    assert ranking["utliggere"].tolist() == [1, 0]
+    assert ranking["enheter"].tolist() == [8, 8]
@@ -0,0 +1,133 @@
+import threading
+import time
+
+import pytest
+
+from ssb_dash_framework.utils.prefetch import UnitPrefetcher
+from ssb_dash_framework.utils.unit_cache import TTLCache
+from ssb_dash_framework.utils.unit_cache import evict_unit_table
+from ssb_dash_framework.utils.unit_cache import get_unit_table
+from ssb_dash_framework.utils.unit_cache import unit_cache_stats
+
+
+@pytest.fixture
+def prefetcher(monkeypatch):
+    monkeypatch.setattr(UnitPrefetcher, "_loaders", {})
+    yield UnitPrefetcher
+    UnitPrefetcher.configure(count=3, ttl=300.0, enabled=True)
+
+
+def test_ttl_cache_loads_concurrent_misses_once() -> None:
+    cache = TTLCache(max_size=2, ttl=60)
+    loads = []
+
+    def load():
+        loads.append(1)
+        time.sleep(0.05)
+        return "form"
+
+    threads = [
+        threading.Thread(target=cache.get_or_load, args=("a", load)) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loads == [1]
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 7
+
+
+def test_ttl_cache_entry_ttl_and_eviction() -> None:
+    cache = TTLCache(max_size=2, ttl=0)
+    cache.get_or_load("short", lambda: 1)
+    cache.get_or_load("long", lambda: 2, ttl=60)
+    assert "short" not in cache
+    assert "long" in cache
+    cache.evict("long")
+    assert "long" not in cache
+
+
+def test_unit_table_is_cached_until_evicted() -> None:
+    first = get_unit_table("kontaktinfo", ident="1002", aar=2024)
+    assert first["skjema"].tolist() == ["RA-001"]
+    misses = unit_cache_stats()["misses"]
+    assert get_unit_table("kontaktinfo", ident="1002", aar=2024) is first
+    assert unit_cache_stats()["misses"] == misses
+    evict_unit_table("kontaktinfo", ident="1001")
+    assert get_unit_table("kontaktinfo", ident="1002", aar=2024) is first
+    evict_unit_table("kontaktinfo", ident="1002")
+    assert get_unit_table("kontaktinfo", ident="1002", aar=2024) is not first
+
+
+def test_next_units() -> None:
+    units = [{"refnr": str(i)} for i in range(6)]
+    assert UnitPrefetcher.next_units(units, {"refnr": "1"}, count=2) == [
+        {"refnr": "2"},
+        {"refnr": "3"},
+    ]
+    assert UnitPrefetcher.next_units(units, None, count=1) == [{"refnr": "0"}]
+    assert UnitPrefetcher.next_units(units, {"refnr": "5"}) == []
+
+
+def test_prefetch_runs_loaders_for_next_units(prefetcher) -> None:
+    seen = []
+    prefetcher.register_loader("test", seen.append)
+    units = [{"refnr": str(i), "ident": f"10{i}"} for i in range(6)]
+    future = prefetcher.prefetch(units, current=units[1], aar=2024)
+    future.result(timeout=10)
+    assert seen == [
+        {"aar": 2024, "refnr": "2", "ident": "102"},
+        {"aar": 2024, "refnr": "3", "ident": "103"},
+        {"aar": 2024, "refnr": "4", "ident": "104"},
+    ]
+
+
+def test_prefetch_skips_outdated_requests(prefetcher) -> None:
+    seen = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def loader(unit):
+        started.set()
+        release.wait(timeout=10)
+        seen.append(unit["refnr"])
+
+    prefetcher.register_loader("test", loader)
+    units = [{"refnr": str(i)} for i in range(10)]
+    first = prefetcher.prefetch(units, current=units[0])
+    started.wait(timeout=10)
+    latest = prefetcher.prefetch(units, current=units[6])
+    release.set()
+    first.result(timeout=10)
+    latest.result(timeout=10)
+    assert seen == ["1", "7", "8", "9"]
+
+
+def test_prefetch_can_be_disabled(prefetcher) -> None:
+    prefetcher.register_loader("test", lambda unit: None)
+    prefetcher.configure(enabled=False)
+    assert prefetcher.prefetch([{"refnr": "1"}]) is None
+
+
+def test_unit_tables_share_one_connection(monkeypatch) -> None:
+    from ssb_dash_framework.utils import unit_cache
+
+    opened = []
+    get_connection = unit_cache.get_connection
+
+    def counting_connection(**kwargs):
+        opened.append(kwargs)
+        return get_connection(**kwargs)
+
+    monkeypatch.setattr(unit_cache, "get_connection", counting_connection)
+    slices = {
+        "kontaktinfo": {"ident": "1003", "aar": 2024},
+        "enhetsinfo": {"ident": "1003", "aar": 2024},
+    }
+    context = unit_cache.get_unit_tables(slices)
+    assert context["kontaktinfo"]["kontaktperson"].tolist() == ["Per Johansen"]
+    assert context["enhetsinfo"]["variabel"].tolist() == ["omsetning"]
+    assert len(opened) == 1
+    assert unit_cache.get_unit_tables(slices)["enhetsinfo"] is context["enhetsinfo"]
+    assert len(opened) == 1